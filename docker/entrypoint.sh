@@ -17,6 +17,30 @@ if [ -n "${DATABASE_URL:-}" ]; then
     # For SQLite in Docker, this keeps the schema in sync even if migrations were not shipped.
     npx prisma db push --skip-generate
   fi
+
+  # Idempotent: fills OrderItem rows / deliveryDate for orders created before those columns existed.
+  echo "[entrypoint] Backfilling order items..."
+  npm run backfill:order-items || echo "[entrypoint] Order item backfill failed; continuing startup."
+
+  # Idempotent: parses Service.timeSlotsJson into ServiceSlot rows and links existing bookings.
+  echo "[entrypoint] Backfilling service slots..."
+  npm run backfill:service-slots || echo "[entrypoint] Service slot backfill failed; continuing startup."
+
+  # One-time: fills the per-merchant / per-day rollups (MerchantStats, MerchantDailyStats) from existing
+  # data after the tables are created. After that the app keeps them up to date on every write; run
+  # `npm run backfill:merchant-stats` by hand to repair, or delete the marker to rebuild on next start.
+  MERCHANT_STATS_MARKER="${MERCHANT_STATS_MARKER_FILE:-/data/.merchant-stats-built}"
+  if [ -f "${MERCHANT_STATS_MARKER}" ]; then
+    echo "[entrypoint] Merchant stats already built (${MERCHANT_STATS_MARKER}); skipping rebuild."
+  else
+    echo "[entrypoint] Building merchant stats..."
+    if npm run backfill:merchant-stats; then
+      mkdir -p "$(dirname "${MERCHANT_STATS_MARKER}")"
+      date -u +"%Y-%m-%dT%H:%M:%SZ" > "${MERCHANT_STATS_MARKER}"
+    else
+      echo "[entrypoint] Merchant stats rebuild failed; continuing startup (will retry on next start)."
+    fi
+  fi
 else
   echo "[entrypoint] DATABASE_URL is empty; skipping prisma schema sync."
 fi
@@ -50,6 +74,12 @@ if [ "${SEED_ON_START_VAL}" = "1" ] || [ "${SEED_ON_START_VAL}" = "true" ] || [
   fi
 fi
 
+# CLUSTER_WORKERS=0 (one per core) or N > 1: multi-process mode; sessions are shared via the database.
+if [ -n "${CLUSTER_WORKERS:-}" ] && [ "${CLUSTER_WORKERS}" != "1" ]; then
+  echo "[entrypoint] Starting app in cluster mode (CLUSTER_WORKERS=${CLUSTER_WORKERS})..."
+  exec npm run start:cluster
+fi
+
 echo "[entrypoint] Starting app..."
 exec npm start
 
@@ -3,8 +3,17 @@ module.exports = {
     {
       name: 'group-buy-system',
       script: './dist/server.js',
-      instances: 1,
-      exec_mode: 'fork',
+      // 多核：cluster 模式（会话存数据库，SESSION_STORE=prisma）；同步任务等只在 0 号实例运行。
+      // 默认 2 个实例：SQLite 只有一个写者，实例多了只会增加锁等待；PM2 下目录变更不会通知其他实例
+      // （只有 start:cluster 会转发），其他实例的页面缓存/搜索索引最长在 TTL 后更新
+      instances: process.env.PM2_INSTANCES || 2,
+      exec_mode: 'cluster',
+      // 停止/重载时给进行中的请求和 Shopify 同步最多 10 秒收尾
+      kill_timeout: 10000,
+      // 预热完成、开始监听后进程发送 ready（src/services/warmup.ts），reload 时新实例就绪才停旧实例
+      wait_ready: true,
+      // 须大于整个预热的上限 WARMUP_TIMEOUT_MS（默认 20 秒）
+      listen_timeout: 30000,
       env: {
         NODE_ENV: 'development',
         PORT: 3000,
@@ -0,0 +1,123 @@
+/**
+ * Cluster scaling benchmark: runs the built server (dist/cluster.js) with 1 worker and then
+ * with N workers, load-tests an EJS page against each, and checks that a cart stored in the
+ * session survives a full restart.
+ *
+ *   npm run build
+ *   DATABASE_URL=file:./bench.db npx prisma db push --skip-generate
+ *   DATABASE_URL=file:./bench.db npx tsx scripts/bench-cluster.ts
+ *
+ * BENCH_WORKERS (default: CPU cores), BENCH_PATH (default /order), LOAD_CONCURRENCY, LOAD_DURATION_S.
+ * The load generator is a single process; on many-core hosts run scripts/loadgen.ts from
+ * another machine for an accurate ceiling.
+ */
+import { spawn, ChildProcess } from 'child_process';
+import fs from 'fs';
+import os from 'os';
+import path from 'path';
+import { runLoad } from './loadgen';
+
+const ROOT = path.resolve(__dirname, '..');
+const PORT = Number(process.env.BENCH_PORT || 3100);
+const WORKERS = Number(process.env.BENCH_WORKERS || os.availableParallelism());
+const PAGE = process.env.BENCH_PATH || '/order';
+const CONCURRENCY = Number(process.env.LOAD_CONCURRENCY || 64);
+const DURATION_MS = Number(process.env.LOAD_DURATION_S || 10) * 1000;
+const BASE = `http://127.0.0.1:${PORT}`;
+
+async function startServer(workers: number): Promise<ChildProcess> {
+  const child = spawn(process.execPath, [path.join(ROOT, 'dist/cluster.js')], {
+    cwd: ROOT,
+    env: {
+      ...process.env,
+      PORT: String(PORT),
+      CLUSTER_WORKERS: String(workers),
+      SESSION_STORE: 'prisma',
+      SHOPIFY_SYNC_ENABLED: 'false',
+      NODE_ENV: 'production',
+    },
+    stdio: ['ignore', 'ignore', 'inherit'],
+  });
+  const deadline = Date.now() + 30000;
+  while (Date.now() < deadline) {
+    try {
+      const res = await fetch(BASE + PAGE);
+      if (res.ok) return child;
+    } catch {
+      // not listening yet
+    }
+    await new Promise((resolve) => setTimeout(resolve, 200));
+  }
+  child.kill('SIGTERM');
+  throw new Error(`server with ${workers} workers did not become ready`);
+}
+
+function stopServer(child: ChildProcess): Promise<void> {
+  return new Promise((resolve) => {
+    child.once('exit', () => resolve());
+    child.kill('SIGTERM');
+  });
+}
+
+async function measure(workers: number) {
+  const server = await startServer(workers);
+  try {
+    // Warm up template cache / DB connections in every worker
+    await runLoad({ url: BASE + PAGE, concurrency: CONCURRENCY, durationMs: 2000 });
+    return { workers, ...(await runLoad({ url: BASE + PAGE, concurrency: CONCURRENCY, durationMs: DURATION_MS })) };
+  } finally {
+    await stopServer(server);
+  }
+}
+
+async function cartSurvivesRestart(): Promise<boolean> {
+  const marker = `bench-pkg-${Date.now()}`;
+  let server = await startServer(1);
+  const res = await fetch(`${BASE}/cart/set`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ items: { [marker]: 2 } }),
+  });
+  const cookie = (res.headers.get('set-cookie') || '').split(';')[0];
+  await stopServer(server);
+
+  server = await startServer(WORKERS);
+  try {
+    // Different workers answer these requests; each must see the cart
+    const pages = await Promise.all(
+      Array.from({ length: WORKERS * 2 }, () => fetch(BASE + '/order', { headers: { Cookie: cookie } }).then((r) => r.text()))
+    );
+    return Boolean(cookie) && pages.every((html) => html.includes(marker));
+  } finally {
+    await stopServer(server);
+  }
+}
+
+async function main() {
+  if (!fs.existsSync(path.join(ROOT, 'dist/cluster.js'))) {
+    throw new Error('dist/cluster.js not found, run `npm run build` first');
+  }
+
+  const single = await measure(1);
+  const multi = WORKERS > 1 ? await measure(WORKERS) : null;
+  const cartPersisted = await cartSurvivesRestart();
+
+  console.log(
+    JSON.stringify(
+      {
+        page: PAGE,
+        results: [single, multi].filter(Boolean),
+        speedup: multi ? Math.round((multi.requestsPerSec / single.requestsPerSec) * 100) / 100 : null,
+        cartPersisted,
+      },
+      null,
+      2
+    )
+  );
+  if (!cartPersisted) process.exitCode = 1;
+}
+
+main().catch((error) => {
+  console.error(error);
+  process.exit(1);
+});
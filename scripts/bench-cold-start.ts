@@ -0,0 +1,105 @@
+/**
+ * Cold start benchmark: starts the built server (dist/server.js) with WARMUP_ENABLED=false and
+ * then =true, and measures the time until GET /readyz answers 200 and the latency of the first
+ * and second request to each page right after that. Reports the median over BENCH_RUNS starts.
+ *
+ *   npm run build
+ *   DATABASE_URL=file:./bench.db npx prisma db push --skip-generate
+ *   DATABASE_URL=file:./bench.db npm run seed:dev
+ *   DATABASE_URL=file:./bench.db npx tsx scripts/bench-cold-start.ts
+ *
+ * BENCH_PAGES (comma separated, default /order,/home,/merchants,/service-booking,/login), BENCH_RUNS (default 3).
+ */
+import { spawn, ChildProcess } from 'child_process';
+import path from 'path';
+
+const ROOT = path.resolve(__dirname, '..');
+const PORT = Number(process.env.BENCH_PORT || 3102);
+const PAGES = (process.env.BENCH_PAGES || '/order,/home,/merchants,/service-booking,/login').split(',').filter(Boolean);
+const RUNS = Math.max(1, Number(process.env.BENCH_RUNS || 3));
+const BASE = `http://127.0.0.1:${PORT}`;
+
+function median(values: number[]): number {
+  const sorted = [...values].sort((a, b) => a - b);
+  return Math.round(sorted[Math.floor(sorted.length / 2)] * 10) / 10;
+}
+
+async function startServer(warmup: boolean): Promise<{ child: ChildProcess; readyMs: number }> {
+  const started = performance.now();
+  const child = spawn(process.execPath, [path.join(ROOT, 'dist/server.js')], {
+    cwd: ROOT,
+    env: {
+      ...process.env,
+      PORT: String(PORT),
+      WARMUP_ENABLED: String(warmup),
+      SHOPIFY_SYNC_ENABLED: 'false',
+      NODE_ENV: 'production',
+    },
+    stdio: ['ignore', 'ignore', 'inherit'],
+  });
+  const deadline = Date.now() + 60000;
+  while (Date.now() < deadline) {
+    try {
+      const res = await fetch(BASE + '/readyz');
+      if (res.ok) return { child, readyMs: performance.now() - started };
+    } catch {
+      // not listening yet
+    }
+    await new Promise((resolve) => setTimeout(resolve, 20));
+  }
+  child.kill('SIGTERM');
+  throw new Error('server did not become ready');
+}
+
+function stopServer(child: ChildProcess): Promise<void> {
+  return new Promise((resolve) => {
+    child.once('exit', () => resolve());
+    child.kill('SIGTERM');
+  });
+}
+
+async function timedGet(pathname: string): Promise<number> {
+  const started = performance.now();
+  const res = await fetch(BASE + pathname);
+  await res.arrayBuffer();
+  if (!res.ok) throw new Error(`GET ${pathname} returned ${res.status}`);
+  return performance.now() - started;
+}
+
+async function measure(warmup: boolean) {
+  const readyMs: number[] = [];
+  const first = new Map<string, number[]>(PAGES.map((page) => [page, []]));
+  const second = new Map<string, number[]>(PAGES.map((page) => [page, []]));
+
+  for (let run = 0; run < RUNS; run++) {
+    const { child, readyMs: ready } = await startServer(warmup);
+    try {
+      readyMs.push(ready);
+      for (const page of PAGES) first.get(page)!.push(await timedGet(page));
+      for (const page of PAGES) second.get(page)!.push(await timedGet(page));
+    } finally {
+      await stopServer(child);
+    }
+  }
+
+  return {
+    warmup,
+    readyMs: median(readyMs),
+    pages: PAGES.map((page) => ({
+      page,
+      firstMs: median(first.get(page)!),
+      secondMs: median(second.get(page)!),
+    })),
+  };
+}
+
+async function main() {
+  const results = [];
+  for (const warmup of [false, true]) results.push(await measure(warmup));
+  console.log(JSON.stringify({ runs: RUNS, results }, null, 2));
+}
+
+main().catch((error) => {
+  console.error(error);
+  process.exit(1);
+});
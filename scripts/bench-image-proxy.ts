@@ -0,0 +1,151 @@
+/**
+ * S3 image proxy benchmark against the local S3 stub (no real bucket needed).
+ *
+ *   npx tsx scripts/bench-image-proxy.ts
+ *
+ * Simulates admin order-list page views (one payment screenshot per row) and reports, per phase,
+ * request latency plus how many GETs / bytes reached "S3":
+ *   cold    - empty disk cache, thumbnails rendered on demand
+ *   warm    - same page again, served from the disk cache
+ *   revalidate - browser cache expired, If-None-Match -> 304
+ * Also checks that Range requests on originals return 206.
+ */
+import fs from 'fs';
+import os from 'os';
+import path from 'path';
+import http from 'http';
+import type { AddressInfo } from 'net';
+import express from 'express';
+import { startS3Stub } from './stubs/s3-stub';
+import { LatencyHistogram } from '../src/utils/latencyHistogram';
+
+const ROWS = Number(process.env.BENCH_ROWS || 50);
+const IMAGE_KB = Number(process.env.BENCH_IMAGE_KB || 400);
+const S3_LATENCY_MS = Number(process.env.BENCH_S3_LATENCY_MS || 30);
+const BUCKET = 'bench-bucket';
+
+type Reply = { status: number; etag?: string; bytes: number };
+
+function request(port: number, urlPath: string, headers: Record<string, string> = {}): Promise<Reply> {
+  return new Promise((resolve, reject) => {
+    http
+      .get({ host: '127.0.0.1', port, path: urlPath, headers }, (res) => {
+        let bytes = 0;
+        res.on('data', (chunk) => (bytes += chunk.length));
+        res.on('end', () => resolve({ status: res.statusCode || 0, etag: res.headers.etag, bytes }));
+      })
+      .on('error', reject);
+  });
+}
+
+async function makeImage(index: number): Promise<{ body: Buffer; contentType: string }> {
+  try {
+    const sharp = (await import('sharp')).default;
+    const side = Math.round(Math.sqrt((IMAGE_KB * 1024) / 3));
+    const raw = Buffer.alloc(side * side * 3);
+    for (let i = 0; i < raw.length; i++) raw[i] = (i * 31 + index * 17) & 0xff;
+    const body = await sharp(raw, { raw: { width: side, height: side, channels: 3 } }).png().toBuffer();
+    return { body, contentType: 'image/png' };
+  } catch {
+    // sharp not installed: opaque bytes (the proxy then serves originals instead of thumbnails)
+    return { body: Buffer.alloc(IMAGE_KB * 1024, index & 0xff), contentType: 'image/png' };
+  }
+}
+
+async function main() {
+  const stub = await startS3Stub({ latencyMs: S3_LATENCY_MS });
+  const cacheDir = fs.mkdtempSync(path.join(os.tmpdir(), 'bench-image-cache-'));
+
+  process.env.S3_ENABLED = 'true';
+  process.env.S3_ENDPOINT = stub.endpoint;
+  process.env.S3_BUCKET = BUCKET;
+  process.env.S3_ACCESS_KEY_ID = 'bench';
+  process.env.S3_SECRET_ACCESS_KEY = 'bench';
+  process.env.IMAGE_CACHE_DIR = cacheDir;
+  const { config } = await import('../src/config');
+  const { proxyS3Image } = await import('../src/controllers/imageController');
+  const { getImageCacheStats } = await import('../src/services/imageService');
+
+  const keys: string[] = [];
+  for (let i = 0; i < ROWS; i++) {
+    const key = `uploads/bench-${i}.png`;
+    const { body, contentType } = await makeImage(i);
+    stub.put(BUCKET, key, body, contentType);
+    keys.push(key);
+  }
+
+  const app = express();
+  app.get('/api/images/s3/:key(*)', proxyS3Image);
+  const server = app.listen(0, '127.0.0.1');
+  await new Promise((resolve) => server.once('listening', resolve));
+  const { port } = server.address() as AddressInfo;
+
+  const width = Math.min(...config.imageCache.thumbnailWidths);
+  const etags = new Map<string, string>();
+
+  const pageView = async (phase: string, conditional: boolean) => {
+    stub.resetStats();
+    const histogram = new LatencyHistogram();
+    const statuses: Record<number, number> = {};
+    let bytes = 0;
+    const started = Date.now();
+    await Promise.all(
+      keys.map(async (key) => {
+        const urlPath = `/api/images/s3/${key}?w=${width}`;
+        const headers: Record<string, string> = conditional && etags.has(key) ? { 'If-None-Match': etags.get(key)! } : {};
+        const t = Date.now();
+        const reply = await request(port, urlPath, headers);
+        histogram.record(Date.now() - t);
+        statuses[reply.status] = (statuses[reply.status] || 0) + 1;
+        bytes += reply.bytes;
+        if (reply.etag) etags.set(key, reply.etag);
+      })
+    );
+    const { p50Ms, p99Ms, maxMs } = histogram.snapshot();
+    return {
+      phase,
+      requests: keys.length,
+      elapsedMs: Date.now() - started,
+      p50Ms,
+      p99Ms,
+      maxMs,
+      statuses,
+      bytesToBrowser: bytes,
+      s3Gets: stub.stats.gets,
+      s3BytesOut: stub.stats.bytesOut,
+    };
+  };
+
+  const results = [await pageView('cold', false), await pageView('warm', false), await pageView('revalidate', true)];
+
+  // Range on an original (video-style partial fetch / resumable download)
+  const range = await request(port, `/api/images/s3/${keys[0]}`, { Range: 'bytes=0-1023' });
+
+  console.log(
+    JSON.stringify(
+      {
+        rows: ROWS,
+        imageKb: IMAGE_KB,
+        thumbnailWidth: width,
+        baselineS3GetsPerPageView: ROWS,
+        phases: results,
+        range: { status: range.status, bytes: range.bytes },
+        cache: getImageCacheStats(),
+      },
+      null,
+      2
+    )
+  );
+
+  server.close();
+  await stub.close();
+  fs.rmSync(cacheDir, { recursive: true, force: true });
+  const [, warm, revalidate] = results;
+  if (warm.s3Gets !== 0 || revalidate.statuses[304] !== ROWS || range.status !== 206) process.exitCode = 1;
+  process.exit();
+}
+
+main().catch((error) => {
+  console.error(error);
+  process.exit(1);
+});
@@ -0,0 +1,124 @@
+/**
+ * Public catalog page cache benchmark: runs the built server (dist/server.js) with
+ * PAGE_CACHE_ENABLED=false and then =true, load-tests the public pages as an anonymous
+ * visitor and reports p50/p99 for each. Also checks ETag revalidation (304) and that
+ * POST /admin/api/page-cache/invalidate (the same path catalog writes take) drops the cached page.
+ *
+ *   npm run build
+ *   DATABASE_URL=file:./bench.db npx prisma db push --skip-generate
+ *   DATABASE_URL=file:./bench.db npm run seed:dev
+ *   DATABASE_URL=file:./bench.db npx tsx scripts/bench-page-cache.ts
+ *
+ * BENCH_PAGES (comma separated, default /home,/merchants,/service-booking), LOAD_CONCURRENCY, LOAD_DURATION_S.
+ * The invalidation check runs when ADMIN_USERNAME / ADMIN_PASSWORD are set.
+ */
+import { spawn, ChildProcess } from 'child_process';
+import fs from 'fs';
+import path from 'path';
+import { runLoad } from './loadgen';
+
+const ROOT = path.resolve(__dirname, '..');
+const PORT = Number(process.env.BENCH_PORT || 3101);
+const PAGES = (process.env.BENCH_PAGES || '/home,/merchants,/service-booking').split(',').filter(Boolean);
+const CONCURRENCY = Number(process.env.LOAD_CONCURRENCY || 32);
+const DURATION_MS = Number(process.env.LOAD_DURATION_S || 10) * 1000;
+const BASE = `http://127.0.0.1:${PORT}`;
+
+async function startServer(pageCache: boolean): Promise<ChildProcess> {
+  const child = spawn(process.execPath, [path.join(ROOT, 'dist/server.js')], {
+    cwd: ROOT,
+    env: {
+      ...process.env,
+      PORT: String(PORT),
+      PAGE_CACHE_ENABLED: String(pageCache),
+      SHOPIFY_SYNC_ENABLED: 'false',
+      NODE_ENV: 'production',
+    },
+    stdio: ['ignore', 'ignore', 'inherit'],
+  });
+  const deadline = Date.now() + 30000;
+  while (Date.now() < deadline) {
+    try {
+      const res = await fetch(BASE + PAGES[0]);
+      if (res.ok) return child;
+    } catch {
+      // not listening yet
+    }
+    await new Promise((resolve) => setTimeout(resolve, 200));
+  }
+  child.kill('SIGTERM');
+  throw new Error('server did not become ready');
+}
+
+function stopServer(child: ChildProcess): Promise<void> {
+  return new Promise((resolve) => {
+    child.once('exit', () => resolve());
+    child.kill('SIGTERM');
+  });
+}
+
+async function measure(pageCache: boolean) {
+  const server = await startServer(pageCache);
+  try {
+    const results: Record<string, { requestsPerSec: number; p50Ms: number | null; p99Ms: number | null; statuses: Record<number, number> }> = {};
+    for (const page of PAGES) {
+      await runLoad({ url: BASE + page, concurrency: CONCURRENCY, durationMs: 1000 });
+      const { requestsPerSec, latency, statuses } = await runLoad({ url: BASE + page, concurrency: CONCURRENCY, durationMs: DURATION_MS });
+      results[page] = { requestsPerSec, p50Ms: latency.p50Ms, p99Ms: latency.p99Ms, statuses };
+    }
+    return results;
+  } finally {
+    await stopServer(server);
+  }
+}
+
+async function checkCorrectness() {
+  const server = await startServer(true);
+  try {
+    const first = await fetch(BASE + PAGES[0]);
+    await first.text();
+    const etag = first.headers.get('etag') || '';
+    const revalidated = await fetch(BASE + PAGES[0], { headers: { 'If-None-Match': etag } });
+
+    let invalidated: boolean | null = null;
+    if (process.env.ADMIN_USERNAME && process.env.ADMIN_PASSWORD) {
+      const login = await fetch(`${BASE}/admin-login`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/x-www-form-urlencoded' },
+        body: new URLSearchParams({ username: process.env.ADMIN_USERNAME, password: process.env.ADMIN_PASSWORD }),
+        redirect: 'manual',
+      });
+      const cookie = (login.headers.get('set-cookie') || '').split(';')[0];
+      await fetch(`${BASE}/admin/api/page-cache/invalidate`, { method: 'POST', headers: { Cookie: cookie } });
+      const after = await fetch(BASE + PAGES[0]);
+      await after.text();
+      invalidated = after.headers.get('x-page-cache') === 'MISS';
+    }
+
+    return {
+      etag: Boolean(etag),
+      notModified: revalidated.status === 304,
+      invalidated,
+    };
+  } finally {
+    await stopServer(server);
+  }
+}
+
+async function main() {
+  if (!fs.existsSync(path.join(ROOT, 'dist/server.js'))) {
+    throw new Error('dist/server.js not found, run `npm run build` first');
+  }
+
+  const before = await measure(false);
+  const after = await measure(true);
+  const checks = await checkCorrectness();
+
+  console.log(JSON.stringify({ concurrency: CONCURRENCY, before, after, checks }, null, 2));
+  if (!checks.etag || !checks.notModified || checks.invalidated === false) process.exitCode = 1;
+}
+
+main().catch((error) => {
+  console.error(error);
+  process.exit(1);
+});
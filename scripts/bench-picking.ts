@@ -0,0 +1,129 @@
+/**
+ * Picking list benchmark: seeds N orders (with OrderItem rows) into the configured database
+ * and times GET /admin/api/picking for one delivery day.
+ *
+ *   DATABASE_URL=file:./bench.db npx prisma db push --skip-generate
+ *   DATABASE_URL=file:./bench.db npx tsx scripts/bench-picking.ts
+ *
+ * Use a throwaway database: seeded orders are tagged with phone "bench-*" and are not removed.
+ */
+import type { Request, Response } from 'express';
+import { prisma } from '../src/db';
+import { getPickingList } from '../src/controllers/orderController';
+import { buildOrderItemRows, parseDeliveryDate } from '../src/utils/orderItems';
+
+const ORDERS = Number(process.env.BENCH_ORDERS || 50000);
+const DAYS = Number(process.env.BENCH_DAYS || 30);
+const PRODUCTS = Number(process.env.BENCH_PRODUCTS || 200);
+const RUNS = Number(process.env.BENCH_RUNS || 20);
+const BATCH = 500;
+const REGIONS = ['Sydney CBD', 'Inner West', 'North Shore', 'Eastern Suburbs'];
+
+function dayString(offset: number): string {
+  const d = new Date(Date.UTC(2026, 0, 1) + offset * 24 * 60 * 60 * 1000);
+  return d.toISOString().slice(0, 10);
+}
+
+async function seed() {
+  const existing = await prisma.order.count({ where: { phone: { startsWith: 'bench-' } } });
+  for (let i = existing; i < ORDERS; i += BATCH) {
+    const creates = [];
+    for (let j = i; j < Math.min(i + BATCH, ORDERS); j++) {
+      const deliveryTime = `${dayString(j % DAYS)} 10:00-18:00`;
+      const deliveryDate = parseDeliveryDate(deliveryTime);
+      const region = REGIONS[j % REGIONS.length];
+      const items = Array.from({ length: 1 + (j % 4) }, (_, k) => {
+        const product = (j * 7 + k * 13) % PRODUCTS;
+        return {
+          title: `Bench product ${product}`,
+          price: '9.90',
+          quantity: 1 + ((j + k) % 3),
+          shopifyProductId: `bench_prod_${product}`,
+          shopifyVariantId: `bench_var_${product}`,
+        };
+      });
+      creates.push(
+        prisma.order.create({
+          data: {
+            customerName: `Bench ${j}`,
+            phone: `bench-${j}`,
+            address: '1 George St, Sydney',
+            deliveryTime,
+            deliveryDate,
+            region,
+            itemsJson: JSON.stringify(items),
+            internalStatus: j % 20 === 0 ? 'cancelled' : 'new',
+            lineItems: { create: buildOrderItemRows(items, { deliveryDate, region }) },
+          },
+        })
+      );
+    }
+    await prisma.$transaction(creates);
+    process.stdout.write(`\rseeded ${Math.min(i + BATCH, ORDERS)}/${ORDERS}`);
+  }
+  if (existing < ORDERS) process.stdout.write('\n');
+}
+
+function call(query: Record<string, string>): Promise<{ ms: number; body: any }> {
+  return new Promise((resolve) => {
+    const startedAt = process.hrtime.bigint();
+    const res = {
+      statusCode: 200,
+      status(code: number) {
+        this.statusCode = code;
+        return this;
+      },
+      json(body: any) {
+        resolve({ ms: Number(process.hrtime.bigint() - startedAt) / 1e6, body });
+        return this;
+      },
+    };
+    void getPickingList({ query } as unknown as Request, res as unknown as Response);
+  });
+}
+
+async function main() {
+  await seed();
+
+  const date = dayString(3);
+  const timings: Record<string, number[]> = { allRegions: [], oneRegion: [] };
+  let sample: any = null;
+  for (let i = 0; i < RUNS; i++) {
+    const all = await call({ date });
+    timings.allRegions.push(all.ms);
+    const one = await call({ date, region: REGIONS[1] });
+    timings.oneRegion.push(one.ms);
+    sample = one.body;
+  }
+
+  const summarize = (values: number[]) => {
+    const sorted = [...values].sort((a, b) => a - b);
+    return {
+      p50Ms: Math.round(sorted[Math.floor(sorted.length * 0.5)]),
+      p99Ms: Math.round(sorted[Math.min(sorted.length - 1, Math.floor(sorted.length * 0.99))]),
+      maxMs: Math.round(sorted[sorted.length - 1]),
+    };
+  };
+
+  console.log(
+    JSON.stringify(
+      {
+        orders: await prisma.order.count(),
+        orderItems: await prisma.orderItem.count(),
+        date,
+        allRegions: summarize(timings.allRegions),
+        oneRegion: summarize(timings.oneRegion),
+        sample: { orderCount: sample?.orderCount, totalQuantity: sample?.totalQuantity, products: sample?.items?.length },
+      },
+      null,
+      2
+    )
+  );
+  await prisma.$disconnect();
+}
+
+main().catch(async (error) => {
+  console.error(error);
+  await prisma.$disconnect();
+  process.exit(1);
+});
@@ -0,0 +1,162 @@
+/**
+ * Bulk print benchmark: seeds N orders for one delivery day into the configured database and
+ * renders the print document (packing slips + labels) on the main thread and on the worker
+ * pool, reporting render time and the main thread's event-loop delay while rendering. Then
+ * checks that a repeat request is served from the cache and that editing one order in the
+ * batch changes the fingerprint.
+ *
+ *   DATABASE_URL=file:./bench.db npx prisma db push --skip-generate
+ *   DATABASE_URL=file:./bench.db npx tsx scripts/bench-print.ts
+ *
+ * BENCH_ORDERS (default 2000), BENCH_RUNS (default 5), PRINT_WORKERS (pool size, default from config).
+ * Use a throwaway database: seeded orders are tagged with phone "bench-print-*" and are not removed.
+ */
+import { monitorEventLoopDelay } from 'perf_hooks';
+import { prisma } from '../src/db';
+import { config } from '../src/config';
+import { buildOrderItemRows, parseDeliveryDate } from '../src/utils/orderItems';
+import {
+  closePrintPool,
+  getCachedPrint,
+  getPrintStats,
+  printCacheKey,
+  printFingerprint,
+  renderPrintDocument,
+  storePrint,
+  PrintLayout,
+} from '../src/services/printService';
+
+const ORDERS = Number(process.env.BENCH_ORDERS || 2000);
+const RUNS = Number(process.env.BENCH_RUNS || 5);
+const BATCH = 500;
+const DELIVERY_TIME = '2026-04-01 10:00-18:00';
+const REGIONS = ['Sydney CBD', 'Inner West', 'North Shore', 'Eastern Suburbs'];
+
+async function seed() {
+  const deliveryDate = parseDeliveryDate(DELIVERY_TIME);
+  const existing = await prisma.order.count({ where: { phone: { startsWith: 'bench-print-' } } });
+  for (let i = existing; i < ORDERS; i += BATCH) {
+    const creates = [];
+    for (let j = i; j < Math.min(i + BATCH, ORDERS); j++) {
+      const region = REGIONS[j % REGIONS.length];
+      const items = Array.from({ length: 2 + (j % 6) }, (_, k) => {
+        const product = (j * 7 + k * 13) % 200;
+        return {
+          title: `Bench product ${product}`,
+          price: '9.90',
+          quantity: 1 + ((j + k) % 3),
+          shopifyProductId: `bench_prod_${product}`,
+          shopifyVariantId: `bench_var_${product}`,
+        };
+      });
+      creates.push(
+        prisma.order.create({
+          data: {
+            customerName: `Bench ${j}`,
+            phone: `bench-print-${j}`,
+            address: `${j} George St, Sydney NSW 2000`,
+            deliveryTime: DELIVERY_TIME,
+            deliveryDate,
+            region,
+            paymentMethod: j % 3 === 0 ? 'cash_on_delivery' : 'transfer',
+            optionalNote: j % 5 === 0 ? '请放在门口' : null,
+            itemsJson: JSON.stringify(items),
+            lineItems: { create: buildOrderItemRows(items, { deliveryDate, region }) },
+          },
+        })
+      );
+    }
+    await prisma.$transaction(creates);
+  }
+  return deliveryDate!;
+}
+
+async function render(filter: { deliveryDate: Date; region: string | null }, layout: PrintLayout) {
+  const histogram = monitorEventLoopDelay({ resolution: 5 });
+  histogram.enable();
+  const startedAt = process.hrtime.bigint();
+  let body = '';
+  for await (const chunk of renderPrintDocument(filter, layout)) body += chunk;
+  const ms = Number(process.hrtime.bigint() - startedAt) / 1e6;
+  histogram.disable();
+  return { ms, body, maxLoopDelayMs: histogram.max / 1e6 };
+}
+
+function summarize(values: number[]) {
+  const sorted = [...values].sort((a, b) => a - b);
+  return {
+    p50Ms: Math.round(sorted[Math.floor(sorted.length * 0.5)] * 10) / 10,
+    maxMs: Math.round(sorted[sorted.length - 1] * 10) / 10,
+  };
+}
+
+async function measure(workers: number, filter: { deliveryDate: Date; region: string | null }, layout: PrintLayout) {
+  // The pool is created lazily with the configured size
+  await closePrintPool();
+  config.print.workers = workers;
+  await render(filter, layout); // warm-up (template compile, worker start)
+  const times: number[] = [];
+  const loopDelays: number[] = [];
+  let bytes = 0;
+  for (let i = 0; i < RUNS; i++) {
+    const { ms, body, maxLoopDelayMs } = await render(filter, layout);
+    times.push(ms);
+    loopDelays.push(maxLoopDelayMs);
+    bytes = Buffer.byteLength(body);
+  }
+  return { workers, render: summarize(times), maxEventLoopDelay: summarize(loopDelays), bytes };
+}
+
+async function main() {
+  const deliveryDate = await seed();
+  const filter = { deliveryDate, region: null };
+  const layout: PrintLayout = { include: 'all', labelsPerPage: config.print.labelsPerPage };
+  const poolSize = config.print.workers || 2;
+
+  const mainThread = await measure(0, filter, layout);
+  const pool = await measure(poolSize, filter, layout);
+
+  // Cached path: fingerprint query + memory lookup
+  const key = printCacheKey(filter, layout);
+  const fingerprint = await printFingerprint(filter);
+  const { body } = await render(filter, layout);
+  storePrint(key, fingerprint, body);
+  const cachedTimes: number[] = [];
+  let hits = 0;
+  for (let i = 0; i < RUNS * 4; i++) {
+    const startedAt = process.hrtime.bigint();
+    if (getCachedPrint(key, await printFingerprint(filter)) !== null) hits++;
+    cachedTimes.push(Number(process.hrtime.bigint() - startedAt) / 1e6);
+  }
+
+  // Editing one order in the batch must invalidate the cached document
+  const first = await prisma.order.findFirstOrThrow({ where: { phone: { startsWith: 'bench-print-' } } });
+  await prisma.order.update({ where: { id: first.id }, data: { optionalNote: `edited ${Date.now()}` } });
+  const invalidated = getCachedPrint(key, await printFingerprint(filter)) === null;
+
+  console.log(
+    JSON.stringify(
+      {
+        orders: ORDERS,
+        mainThread,
+        pool,
+        cached: { ...summarize(cachedTimes), hits, of: RUNS * 4 },
+        invalidatedOnEdit: invalidated,
+        stats: getPrintStats(),
+      },
+      null,
+      2
+    )
+  );
+  if (hits !== RUNS * 4 || !invalidated) process.exitCode = 1;
+
+  await closePrintPool();
+  await prisma.$disconnect();
+}
+
+main().catch(async (error) => {
+  console.error(error);
+  await closePrintPool();
+  await prisma.$disconnect();
+  process.exit(1);
+});
@@ -0,0 +1,60 @@
+/**
+ * Route planner benchmark (pure CPU, no database or external API).
+ *
+ *   npm run bench:routes
+ *
+ * Random stops across greater Sydney; reports solve time and distance vs. visiting in list order
+ * (what the old Google Maps waypoint link did).
+ */
+import { planRoutes, routeDistanceKm } from '../src/services/routePlanner';
+
+const SIZES = (process.env.BENCH_STOPS || '50,100,300,500').split(',').map(Number);
+const DRIVERS = (process.env.BENCH_DRIVERS || '1,4').split(',').map(Number);
+const RUNS = Number(process.env.BENCH_RUNS || 5);
+const depot = { lat: -33.8613, lng: 151.2108 };
+
+// Deterministic LCG so runs are comparable
+function random(seed: number) {
+  let state = seed;
+  return () => {
+    state = (state * 1103515245 + 12345) % 2147483648;
+    return state / 2147483648;
+  };
+}
+
+function main() {
+  const rows = [];
+  for (const size of SIZES) {
+    for (const drivers of DRIVERS) {
+      const timings: number[] = [];
+      let optimizedKm = 0;
+      let baselineKm = 0;
+      for (let run = 0; run < RUNS; run++) {
+        const rand = random(size * 1000 + run);
+        const stops = Array.from({ length: size }, (_, i) => ({
+          id: `stop-${i}`,
+          lat: -34.05 + rand() * 0.4,
+          lng: 150.85 + rand() * 0.45,
+        }));
+        const startedAt = process.hrtime.bigint();
+        const plan = planRoutes(stops, { depot, drivers, timeBudgetMs: 5000 });
+        timings.push(Number(process.hrtime.bigint() - startedAt) / 1e6);
+        optimizedKm += plan.totalDistanceKm;
+        baselineKm += routeDistanceKm(depot, stops);
+      }
+      timings.sort((a, b) => a - b);
+      rows.push({
+        stops: size,
+        drivers,
+        p50Ms: Math.round(timings[Math.floor(timings.length / 2)]),
+        maxMs: Math.round(timings[timings.length - 1]),
+        listOrderKm: Math.round(baselineKm / RUNS),
+        optimizedKm: Math.round(optimizedKm / RUNS),
+      });
+    }
+  }
+  console.table(rows);
+  if (rows.some((row) => row.stops <= 300 && row.maxMs >= 1000)) process.exitCode = 1;
+}
+
+main();
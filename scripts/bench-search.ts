@@ -0,0 +1,134 @@
+/**
+ * Catalog search benchmark: seeds N merchants and packages (Chinese + English names) into the
+ * configured database and compares, for a set of queries, the previous `contains` scan
+ * (findMany + count) with the search index (ranked ids + one page loaded by id).
+ *
+ *   DATABASE_URL=file:./bench.db npx prisma db push --skip-generate
+ *   DATABASE_URL=file:./bench.db npx tsx scripts/bench-search.ts
+ *
+ * Use a throwaway database: seeded rows are named "Bench*" / dashboardKey "bench-*" and are not removed.
+ */
+import { prisma } from '../src/db';
+import { searchCatalog, getSearchIndexStats } from '../src/services/searchIndex';
+
+const MERCHANTS = Number(process.env.BENCH_MERCHANTS || 5000);
+const PACKAGES = Number(process.env.BENCH_PACKAGES || 20000);
+const RUNS = Number(process.env.BENCH_RUNS || 50);
+const BATCH = 500;
+const PAGE_SIZE = 12;
+const QUERIES = ['纸巾', '清洁', 'clean', 'glove', '手套 nitrile', 'Inner West', '有机蔬菜'];
+
+const ZH = ['纸巾', '手套', '清洁', '有机', '蔬菜', '水果', '家政', '搬家', '维修', '洗衣', '零食', '大米'];
+const EN = ['tissue', 'gloves', 'cleaning', 'organic', 'vegetables', 'fruit', 'moving', 'repair', 'laundry', 'snacks', 'rice', 'nitrile'];
+const REGIONS = ['Sydney CBD', 'Inner West', 'North Shore', 'Eastern Suburbs'];
+
+const words = (i: number, pool: string[], n: number) => Array.from({ length: n }, (_, k) => pool[(i * 7 + k * 5) % pool.length]);
+
+async function seed() {
+  const existingMerchants = await prisma.merchant.count({ where: { dashboardKey: { startsWith: 'bench-' } } });
+  for (let i = existingMerchants; i < MERCHANTS; i += BATCH) {
+    const data = [];
+    for (let j = i; j < Math.min(i + BATCH, MERCHANTS); j++) {
+      data.push({
+        name: `Bench ${words(j, EN, 1)[0]} ${words(j, ZH, 1)[0]}${j}`,
+        description: `${words(j, ZH, 3).join('')} ${words(j, EN, 3).join(' ')} service`,
+        address: `${j} George St, ${REGIONS[j % REGIONS.length]}`,
+        dashboardKey: `bench-${j}`,
+      });
+    }
+    await prisma.$transaction(data.map((row) => prisma.merchant.create({ data: row })));
+  }
+
+  const existingPackages = await prisma.package.count({ where: { name: { startsWith: 'Bench' } } });
+  for (let i = existingPackages; i < PACKAGES; i += BATCH) {
+    const data = [];
+    for (let j = i; j < Math.min(i + BATCH, PACKAGES); j++) {
+      const items = words(j, EN, 3).map((w, k) => ({ title: `${w} pack`, shopifyProductId: `bench_prod_${(j + k) % 300}`, quantity: 1 }));
+      data.push({
+        name: `Bench套餐 ${words(j, ZH, 2).join('')} ${j}`,
+        description: `${words(j + 3, ZH, 4).join('，')}`,
+        price: '19.90',
+        itemsJson: JSON.stringify(items),
+        region: REGIONS[j % REGIONS.length],
+      });
+    }
+    await prisma.$transaction(data.map((row) => prisma.package.create({ data: row })));
+  }
+}
+
+async function time(fn: () => Promise<unknown>): Promise<number> {
+  const startedAt = process.hrtime.bigint();
+  await fn();
+  return Number(process.hrtime.bigint() - startedAt) / 1e6;
+}
+
+// Previous implementation: LIKE '%q%' over several columns, twice per request
+async function containsScan(q: string) {
+  const merchantWhere = {
+    isActive: true,
+    OR: [{ name: { contains: q } }, { description: { contains: q } }, { address: { contains: q } }],
+  };
+  const packageWhere = { isActive: true, OR: [{ name: { contains: q } }, { description: { contains: q } }] };
+  await Promise.all([
+    prisma.merchant.findMany({ where: merchantWhere, take: PAGE_SIZE, orderBy: [{ updatedAt: 'desc' }] }),
+    prisma.merchant.count({ where: merchantWhere }),
+    prisma.package.findMany({ where: packageWhere, take: PAGE_SIZE, orderBy: [{ sortOrder: 'asc' }] }),
+    prisma.package.count({ where: packageWhere }),
+  ]);
+}
+
+async function indexed(q: string) {
+  const [merchants, packages] = await Promise.all([
+    searchCatalog(q, { type: 'merchant' }),
+    searchCatalog(q, { type: 'package' }),
+  ]);
+  await Promise.all([
+    prisma.merchant.findMany({ where: { id: { in: merchants.slice(0, PAGE_SIZE).map((h) => h.id) } } }),
+    prisma.package.findMany({ where: { id: { in: packages.slice(0, PAGE_SIZE).map((h) => h.id) } } }),
+  ]);
+  return { merchants: merchants.length, packages: packages.length };
+}
+
+function summarize(values: number[]) {
+  const sorted = [...values].sort((a, b) => a - b);
+  return {
+    p50Ms: Math.round(sorted[Math.floor(sorted.length * 0.5)] * 10) / 10,
+    p99Ms: Math.round(sorted[Math.min(sorted.length - 1, Math.floor(sorted.length * 0.99))] * 10) / 10,
+  };
+}
+
+async function main() {
+  await seed();
+
+  const buildMs = await time(() => searchCatalog('warmup', { type: 'merchant' }));
+  const timings = { contains: [] as number[], indexed: [] as number[] };
+  const matches: Record<string, unknown> = {};
+  for (let i = 0; i < RUNS; i++) {
+    for (const q of QUERIES) {
+      timings.contains.push(await time(() => containsScan(q)));
+      timings.indexed.push(await time(async () => (matches[q] = await indexed(q))));
+    }
+  }
+
+  console.log(
+    JSON.stringify(
+      {
+        merchants: await prisma.merchant.count(),
+        packages: await prisma.package.count(),
+        index: { ...getSearchIndexStats(), firstBuildMs: Math.round(buildMs) },
+        contains: summarize(timings.contains),
+        indexed: summarize(timings.indexed),
+        matches,
+      },
+      null,
+      2
+    )
+  );
+  await prisma.$disconnect();
+}
+
+main().catch(async (error) => {
+  console.error(error);
+  await prisma.$disconnect();
+  process.exit(1);
+});
@@ -0,0 +1,102 @@
+/**
+ * Shopify HTTP client benchmark against the local stub (no real Shopify calls).
+ *
+ *   npx tsx scripts/bench-shopify-client.ts
+ *
+ * 1. Connection reuse: N product-page calls through a non-keep-alive client vs ShopifyService's pool.
+ * 2. 429 storm: the stub rejects everything for a few seconds; every order create must still succeed.
+ */
+import axios from 'axios';
+import http from 'http';
+import { startShopifyStub } from './stubs/shopify-stub';
+
+const CALLS = Number(process.env.BENCH_CALLS || 200);
+const CONCURRENCY = Number(process.env.BENCH_CONCURRENCY || 10);
+const STORM_MS = Number(process.env.BENCH_STORM_MS || 3000);
+const STORM_ORDERS = Number(process.env.BENCH_STORM_ORDERS || 50);
+
+async function runPool<T>(count: number, concurrency: number, fn: (i: number) => Promise<T>): Promise<T[]> {
+  const results: T[] = new Array(count);
+  let next = 0;
+  await Promise.all(
+    Array.from({ length: Math.min(concurrency, count) }, async () => {
+      while (next < count) {
+        const i = next++;
+        results[i] = await fn(i);
+      }
+    })
+  );
+  return results;
+}
+
+async function main() {
+  // Generous leak rate so the connection test measures sockets, not throttling
+  const stub = await startShopifyStub({ productCount: 250, bucketSize: 80, leakRate: 80 });
+
+  process.env.SHOPIFY_API_BASE_URL = stub.baseUrl;
+  process.env.SHOPIFY_BUCKET_SIZE = '80';
+  process.env.SHOPIFY_LEAK_RATE = '80';
+  process.env.SHOPIFY_MAX_RETRIES = process.env.SHOPIFY_MAX_RETRIES || '8';
+  const { shopifyService } = await import('../src/services/shopifyService');
+
+  // --- 1. baseline: one connection per call (previous behaviour without keep-alive)
+  const baseline = axios.create({ baseURL: stub.baseUrl, httpAgent: new http.Agent({ keepAlive: false }) });
+  let started = Date.now();
+  await runPool(CALLS, CONCURRENCY, () => baseline.get('/products.json?limit=250'));
+  const baselineResult = { calls: CALLS, connections: stub.stats.connections, elapsedMs: Date.now() - started };
+
+  // --- 1b. pooled keep-alive client
+  stub.resetStats();
+  started = Date.now();
+  await runPool(CALLS, CONCURRENCY, () => shopifyService.getProducts());
+  const pooledResult = { calls: CALLS, connections: stub.stats.connections, elapsedMs: Date.now() - started };
+
+  // --- 2. 429 storm recovery
+  stub.resetStats();
+  stub.storm(STORM_MS, 1);
+  started = Date.now();
+  const outcomes = await runPool(STORM_ORDERS, CONCURRENCY, async (i) => {
+    try {
+      await shopifyService.createPaidOrder({
+        items: [{ title: 'Stub item', price: '9.99', quantity: 1 }],
+        customerName: 'Bench User',
+        phone: '0400000000',
+        address: '1 George St, Sydney',
+        deliveryTime: '2026-01-01 10:00-18:00',
+        localOrderId: `bench-${i}`,
+      });
+      return true;
+    } catch {
+      return false;
+    }
+  });
+  const stormResult = {
+    orders: STORM_ORDERS,
+    succeeded: outcomes.filter(Boolean).length,
+    throttledByStub: stub.stats.throttled,
+    ordersCreated: stub.stats.ordersCreated,
+    elapsedMs: Date.now() - started,
+  };
+
+  const clientStats = shopifyService.getHttpStats();
+  console.log(
+    JSON.stringify(
+      {
+        connectionReuse: { baseline: baselineResult, pooled: pooledResult },
+        storm: stormResult,
+        client: { retries: clientStats.retries, throttled429: clientStats.throttled429, endpoints: clientStats.endpoints },
+      },
+      null,
+      2
+    )
+  );
+
+  await stub.close();
+  if (stormResult.succeeded !== STORM_ORDERS || stormResult.ordersCreated !== STORM_ORDERS) process.exitCode = 1;
+  process.exit();
+}
+
+main().catch((error) => {
+  console.error(error);
+  process.exit(1);
+});
@@ -0,0 +1,456 @@
+/**
+ * Reproducible load benchmark for the checkout and catalog hot paths.
+ *
+ * Seeds (or tops up) a dataset at the configured scale, starts the built server (dist/server.js)
+ * against the local Shopify and S3 stubs, then runs each scenario with a fixed concurrency and
+ * duration:
+ *   browse-order  GET /order (anonymous)
+ *   add-to-cart   POST /cart/item (logged-in user)
+ *   checkout      add to cart -> POST /cart/checkout -> POST /payment/:orderId with a screenshot upload
+ *   admin-orders  GET /admin/api/orders, paging through the first 50 pages
+ *   image-proxy   GET /api/images/s3/:key (thumbnails, every 4th request the original)
+ * Reports throughput, p50/p95/p99 latency, the server's event-loop lag and RSS per scenario as JSON.
+ *
+ *   npm run build
+ *   DATABASE_URL=file:./bench.db npx prisma db push --skip-generate
+ *   DATABASE_URL=file:./bench.db npm run bench:suite > bench-$(git rev-parse --short HEAD).json
+ *   npm run bench:suite -- compare bench-old.json bench-new.json
+ *
+ * BENCH_MERCHANTS (50), BENCH_PACKAGES (500), BENCH_ORDERS (100000), BENCH_USERS (32),
+ * BENCH_SCENARIOS (comma separated, default all), LOAD_CONCURRENCY (16), LOAD_DURATION_S (10),
+ * BENCH_WARMUP_S (2), BENCH_OUTPUT (also write the JSON to this file),
+ * BENCH_MAX_REGRESSION (compare: allowed throughput drop / p99 increase, default 0.15).
+ * Use a throwaway database: the seeded data is tagged "bench-suite" and kept for the next run,
+ * so only the first run pays for seeding.
+ */
+import { spawn, execSync, ChildProcess } from 'child_process';
+import fs from 'fs';
+import os from 'os';
+import path from 'path';
+import { prisma } from '../src/db';
+import { hashPassword } from '../src/utils/password';
+import { buildOrderItemRows, parseDeliveryDate } from '../src/utils/orderItems';
+import { LatencyHistogram } from '../src/utils/latencyHistogram';
+import { startShopifyStub } from './stubs/shopify-stub';
+import { startS3Stub } from './stubs/s3-stub';
+
+const ROOT = path.resolve(__dirname, '..');
+const PORT = Number(process.env.BENCH_PORT || 3102);
+const BASE = `http://127.0.0.1:${PORT}`;
+const SCALE = {
+  merchants: Number(process.env.BENCH_MERCHANTS || 50),
+  packages: Number(process.env.BENCH_PACKAGES || 500),
+  orders: Number(process.env.BENCH_ORDERS || 100000),
+  users: Number(process.env.BENCH_USERS || 32),
+};
+const ALL_SCENARIOS = ['browse-order', 'add-to-cart', 'checkout', 'admin-orders', 'image-proxy'];
+const SCENARIOS = (process.env.BENCH_SCENARIOS || ALL_SCENARIOS.join(',')).split(',').filter(Boolean);
+const CONCURRENCY = Number(process.env.LOAD_CONCURRENCY || 16);
+const DURATION_MS = Number(process.env.LOAD_DURATION_S || 10) * 1000;
+const WARMUP_MS = Number(process.env.BENCH_WARMUP_S ?? 2) * 1000;
+const MAX_REGRESSION = Number(process.env.BENCH_MAX_REGRESSION || 0.15);
+
+const TAG = 'bench-suite';
+const BUCKET = 'bench-suite';
+const BATCH = 500;
+const STUB_PRODUCTS = 600;
+const SCREENSHOT_KEYS = 50;
+const REGIONS = ['Sydney CBD', 'Inner West', 'North Shore', 'Eastern Suburbs'];
+const DELIVERY_TIME = `${new Date().getFullYear() + 1}-04-01 10:00-18:00`;
+const ADMIN = { username: 'bench-admin', password: 'bench-admin-password' };
+const USER_PASSWORD = 'Bench123456';
+const LATENCY_BOUNDS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000];
+
+// --- Seeding (idempotent: only the missing rows are created)
+
+async function inBatches(from: number, to: number, make: (i: number) => any) {
+  for (let i = from; i < to; i += BATCH) {
+    const creates = [];
+    for (let j = i; j < Math.min(i + BATCH, to); j++) creates.push(make(j));
+    await prisma.$transaction(creates);
+    if (to - from > BATCH) console.error(`[bench-suite] seeded ${Math.min(i + BATCH, to)}/${to}`);
+  }
+}
+
+function screenshotKey(i: number): string {
+  return `uploads/${TAG}-${i % SCREENSHOT_KEYS}.png`;
+}
+
+async function seed(): Promise<{ packageIds: string[]; userCount: number }> {
+  const merchantTag = { dashboardKey: { startsWith: `${TAG}-m` } };
+  await inBatches(await prisma.merchant.count({ where: merchantTag }), SCALE.merchants, (i) =>
+    prisma.merchant.create({ data: { name: `Bench merchant ${i}`, dashboardKey: `${TAG}-m${i}` } })
+  );
+  const merchants = await prisma.merchant.findMany({ where: merchantTag, select: { id: true } });
+
+  await inBatches(await prisma.package.count({ where: { description: TAG } }), SCALE.packages, (i) => {
+    const items = Array.from({ length: 3 }, (_, k) => {
+      const product = (i * 3 + k) % STUB_PRODUCTS;
+      return {
+        title: `Stub Product ${product + 1}`,
+        quantity: 1 + (k % 2),
+        shopifyProductId: String(1000 + product),
+        shopifyVariantId: String(50000 + product),
+      };
+    });
+    return prisma.package.create({
+      data: {
+        name: `Bench package ${i}`,
+        description: TAG,
+        price: (19.9 + (i % 30)).toFixed(2),
+        itemsJson: JSON.stringify(items),
+        deliveryDatesJson: JSON.stringify([DELIVERY_TIME]),
+        region: REGIONS[i % REGIONS.length],
+        sortOrder: i,
+        merchantId: merchants[i % merchants.length]?.id ?? null,
+      },
+    });
+  });
+  const packages = await prisma.package.findMany({ where: { description: TAG, isActive: true }, select: { id: true } });
+
+  // Every concurrent checkout needs its own session (one cart per user)
+  const userCount = Math.max(SCALE.users, CONCURRENCY);
+  const passwordHash = await hashPassword(USER_PASSWORD);
+  await inBatches(await prisma.user.count({ where: { email: { startsWith: `${TAG}-` } } }), userCount, (i) =>
+    prisma.user.create({ data: { email: `${TAG}-${i}@bench.local`, phone: `${TAG}-u${i}`, passwordHash } })
+  );
+
+  const orderTag = { phone: { startsWith: `${TAG}-o` } };
+  await inBatches(await prisma.order.count({ where: orderTag }), SCALE.orders, (j) => {
+    const day = String(1 + (j % 28)).padStart(2, '0');
+    const deliveryTime = DELIVERY_TIME.replace(/-\d{2} /, `-${day} `);
+    const deliveryDate = parseDeliveryDate(deliveryTime);
+    const region = REGIONS[j % REGIONS.length];
+    const items = Array.from({ length: 2 + (j % 4) }, (_, k) => {
+      const product = (j * 7 + k * 13) % STUB_PRODUCTS;
+      return {
+        title: `Stub Product ${product + 1}`,
+        price: '9.90',
+        quantity: 1 + ((j + k) % 3),
+        shopifyProductId: String(1000 + product),
+        shopifyVariantId: String(50000 + product),
+      };
+    });
+    const transfer = j % 3 !== 0;
+    return prisma.order.create({
+      data: {
+        customerName: `Bench ${j}`,
+        phone: `${TAG}-o${j}`,
+        address: `${j} George St, Sydney NSW 2000`,
+        deliveryTime,
+        deliveryDate,
+        region,
+        paymentMethod: transfer ? 'transfer' : 'cash_on_delivery',
+        paymentScreenshotPath: transfer ? `s3://${BUCKET}/${screenshotKey(j)}` : null,
+        internalStatus: ['new', 'paid_confirmed', 'preparing', 'completed'][j % 4],
+        itemsJson: JSON.stringify(items),
+        lineItems: { create: buildOrderItemRows(items, { deliveryDate, region }) },
+      },
+    });
+  });
+
+  return { packageIds: packages.map((p) => p.id), userCount };
+}
+
+async function screenshotImage(seed: number): Promise<Buffer> {
+  try {
+    const sharp = (await import('sharp')).default;
+    const side = 480;
+    const raw = Buffer.alloc(side * side * 3);
+    for (let i = 0; i < raw.length; i++) raw[i] = (i * 31 + seed * 17) & 0xff;
+    return await sharp(raw, { raw: { width: side, height: side, channels: 3 } }).png().toBuffer();
+  } catch {
+    // sharp not installed: opaque bytes (served and stored as-is)
+    return Buffer.alloc(200 * 1024, seed & 0xff);
+  }
+}
+
+// --- Server
+
+async function startServer(env: Record<string, string>): Promise<ChildProcess> {
+  const child = spawn(process.execPath, [path.join(ROOT, 'dist/server.js')], {
+    cwd: ROOT,
+    env: { ...process.env, ...env, PORT: String(PORT), NODE_ENV: 'production' },
+    stdio: ['ignore', 'ignore', 'inherit'],
+  });
+  const deadline = Date.now() + 30000;
+  while (Date.now() < deadline) {
+    try {
+      const res = await fetch(BASE + '/home');
+      if (res.ok) return child;
+    } catch {
+      // not listening yet
+    }
+    await new Promise((resolve) => setTimeout(resolve, 200));
+  }
+  child.kill('SIGTERM');
+  throw new Error('server did not become ready');
+}
+
+function stopServer(child: ChildProcess): Promise<void> {
+  return new Promise((resolve) => {
+    child.once('exit', () => resolve());
+    child.kill('SIGTERM');
+  });
+}
+
+async function login(pathname: string, form: Record<string, string>): Promise<string> {
+  const res = await fetch(BASE + pathname, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/x-www-form-urlencoded' },
+    body: new URLSearchParams(form),
+    redirect: 'manual',
+  });
+  const cookie = (res.headers.get('set-cookie') || '').split(';')[0];
+  if (res.status !== 302 || !cookie) throw new Error(`login via ${pathname} failed (${res.status})`);
+  return cookie;
+}
+
+type ServerMetrics = {
+  rssMb: number;
+  heapUsedMb: number;
+  eventLoopLag: { samples: number; meanMs: number | null; p50Ms: number | null; p99Ms: number | null; maxMs: number | null };
+};
+
+async function serverMetrics(adminCookie: string): Promise<ServerMetrics> {
+  const res = await fetch(`${BASE}/admin/api/metrics`, { headers: { Cookie: adminCookie } });
+  const body: any = await res.json();
+  return body.process;
+}
+
+// --- Scenarios
+
+type Step = (worker: number, iteration: number) => Promise<number>;
+
+async function drain(res: Response): Promise<number> {
+  await res.arrayBuffer();
+  return res.status;
+}
+
+function buildScenarios(ctx: { packageIds: string[]; userCookies: string[]; adminCookie: string; screenshot: Buffer }) {
+  const pick = (worker: number, iteration: number) => ctx.packageIds[(worker * 7919 + iteration) % ctx.packageIds.length];
+  const addToCart = (worker: number, iteration: number) =>
+    fetch(`${BASE}/cart/item`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', Cookie: ctx.userCookies[worker] },
+      body: JSON.stringify({ packageId: pick(worker, iteration), qty: 1 + (iteration % 3) }),
+    }).then(drain);
+
+  const scenarios: Record<string, Step> = {
+    'browse-order': () => fetch(`${BASE}/order`).then(drain),
+
+    'add-to-cart': addToCart,
+
+    checkout: async (worker, iteration) => {
+      const cookie = ctx.userCookies[worker];
+      const added = await addToCart(worker, iteration);
+      if (added !== 200) return added;
+      const placed = await fetch(`${BASE}/cart/checkout`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/x-www-form-urlencoded', Cookie: cookie },
+        body: new URLSearchParams({ customerName: `Bench user ${worker}`, address: `${worker} George St, Sydney NSW 2000`, deliveryTime: DELIVERY_TIME }),
+        redirect: 'manual',
+      });
+      await placed.arrayBuffer();
+      const orderId = new URL(placed.headers.get('location') || '/', BASE).searchParams.get('orderId');
+      if (placed.status !== 302) return placed.status;
+      if (!orderId) throw new Error(`checkout redirected to ${placed.headers.get('location')}`);
+
+      const form = new FormData();
+      form.append('paymentMethod', 'transfer');
+      form.append('payment_screenshot', new Blob([ctx.screenshot], { type: 'image/png' }), 'screenshot.png');
+      const paid = await fetch(`${BASE}/payment/${encodeURIComponent(orderId)}`, {
+        method: 'POST',
+        headers: { Cookie: cookie },
+        body: form,
+        redirect: 'manual',
+      });
+      return drain(paid);
+    },
+
+    'admin-orders': (_worker, iteration) =>
+      fetch(`${BASE}/admin/api/orders?page=${1 + (iteration % 50)}&limit=20`, { headers: { Cookie: ctx.adminCookie } }).then(drain),
+
+    'image-proxy': (worker, iteration) => {
+      const key = screenshotKey(worker * 13 + iteration);
+      return fetch(`${BASE}/api/images/s3/${key}${iteration % 4 === 0 ? '' : '?w=160'}`).then(drain);
+    },
+  };
+  return scenarios;
+}
+
+async function runScenario(step: Step, durationMs: number, adminCookie: string) {
+  await fetch(`${BASE}/admin/api/metrics/reset`, { method: 'POST', headers: { Cookie: adminCookie } });
+  const histogram = new LatencyHistogram(LATENCY_BOUNDS_MS);
+  const statuses: Record<number, number> = {};
+  let requests = 0;
+  let errors = 0;
+
+  // Sample the server's RSS while the scenario runs
+  let peakRssMb = 0;
+  const sampler = setInterval(() => {
+    serverMetrics(adminCookie)
+      .then((m) => (peakRssMb = Math.max(peakRssMb, m.rssMb)))
+      .catch(() => undefined);
+  }, 1000);
+
+  const startedAt = Date.now();
+  const deadline = startedAt + durationMs;
+  await Promise.all(
+    Array.from({ length: CONCURRENCY }, async (_, worker) => {
+      for (let iteration = 0; Date.now() < deadline; iteration++) {
+        const t = process.hrtime.bigint();
+        try {
+          const status = await step(worker, iteration);
+          statuses[status] = (statuses[status] || 0) + 1;
+          if (status >= 400) errors++;
+        } catch {
+          errors++;
+        }
+        histogram.record(Number(process.hrtime.bigint() - t) / 1e6);
+        requests++;
+      }
+    })
+  );
+  const elapsedMs = Date.now() - startedAt;
+  clearInterval(sampler);
+
+  const server = await serverMetrics(adminCookie);
+  const { p50Ms, p95Ms, p99Ms, maxMs } = histogram.snapshot();
+  return {
+    requests,
+    errors,
+    requestsPerSec: Math.round((requests / elapsedMs) * 10000) / 10,
+    statuses,
+    latency: { p50Ms, p95Ms, p99Ms, maxMs },
+    eventLoopLag: server.eventLoopLag,
+    rssMb: { end: server.rssMb, peak: Math.max(peakRssMb, server.rssMb) },
+    heapUsedMb: server.heapUsedMb,
+  };
+}
+
+function gitCommit(): string | null {
+  try {
+    return execSync('git rev-parse --short HEAD', { cwd: ROOT, stdio: ['ignore', 'pipe', 'ignore'] }).toString().trim();
+  } catch {
+    return null;
+  }
+}
+
+async function run() {
+  if (!fs.existsSync(path.join(ROOT, 'dist/server.js'))) {
+    throw new Error('dist/server.js not found, run `npm run build` first');
+  }
+  const unknown = SCENARIOS.filter((name) => !ALL_SCENARIOS.includes(name));
+  if (unknown.length) throw new Error(`unknown scenario(s): ${unknown.join(', ')}`);
+
+  const { packageIds, userCount } = await seed();
+  const shopify = await startShopifyStub({ productCount: STUB_PRODUCTS, latencyMs: 20 });
+  const s3 = await startS3Stub({ latencyMs: 10 });
+  for (let i = 0; i < SCREENSHOT_KEYS; i++) s3.put(BUCKET, screenshotKey(i), await screenshotImage(i), 'image/png');
+  const workDir = fs.mkdtempSync(path.join(os.tmpdir(), 'bench-suite-'));
+
+  const server = await startServer({
+    ADMIN_USERNAME: ADMIN.username,
+    ADMIN_PASSWORD: ADMIN.password,
+    SESSION_SECRET: 'bench-suite-session-secret',
+    SESSION_STORE: 'prisma',
+    SHOPIFY_STORE_DOMAIN: 'bench.myshopify.com',
+    SHOPIFY_ADMIN_API_ACCESS_TOKEN: 'bench',
+    SHOPIFY_API_BASE_URL: shopify.baseUrl,
+    S3_ENABLED: 'true',
+    S3_ENDPOINT: s3.endpoint,
+    S3_BUCKET: BUCKET,
+    S3_ACCESS_KEY_ID: 'bench',
+    S3_SECRET_ACCESS_KEY: 'bench',
+    IMAGE_CACHE_DIR: path.join(workDir, 'image-cache'),
+    UPLOAD_DEST: path.join(workDir, 'uploads'),
+  });
+
+  try {
+    const adminCookie = await login('/admin-login', ADMIN);
+    const userCookies: string[] = [];
+    for (let i = 0; i < Math.min(userCount, CONCURRENCY); i++) {
+      userCookies.push(await login('/login', { identifier: `${TAG}-${i}@bench.local`, password: USER_PASSWORD }));
+    }
+    const steps = buildScenarios({ packageIds, userCookies, adminCookie, screenshot: await screenshotImage(SCREENSHOT_KEYS) });
+
+    const scenarios: Record<string, Awaited<ReturnType<typeof runScenario>>> = {};
+    for (const name of SCENARIOS) {
+      console.error(`[bench-suite] ${name}`);
+      if (WARMUP_MS > 0) await runScenario(steps[name], WARMUP_MS, adminCookie);
+      scenarios[name] = await runScenario(steps[name], DURATION_MS, adminCookie);
+    }
+
+    const result = {
+      commit: gitCommit(),
+      startedAt: new Date().toISOString(),
+      node: process.version,
+      cpus: os.cpus().length,
+      scale: { ...SCALE, users: userCount },
+      concurrency: CONCURRENCY,
+      durationMs: DURATION_MS,
+      scenarios,
+      stubs: { shopifyRequests: shopify.stats.requests, s3Requests: s3.stats.requests },
+    };
+    const json = JSON.stringify(result, null, 2);
+    if (process.env.BENCH_OUTPUT) fs.writeFileSync(process.env.BENCH_OUTPUT, json + '\n');
+    console.log(json);
+  } finally {
+    await stopServer(server);
+    await shopify.close();
+    await s3.close();
+    fs.rmSync(workDir, { recursive: true, force: true });
+  }
+}
+
+// --- compare <base.json> <head.json>: per-scenario deltas, non-zero exit on regression
+
+function compare(basePath: string, headPath: string) {
+  const base = JSON.parse(fs.readFileSync(basePath, 'utf8'));
+  const head = JSON.parse(fs.readFileSync(headPath, 'utf8'));
+  const change = (from: number | null, to: number | null) =>
+    from && to !== null ? Math.round(((to - from) / from) * 1000) / 10 : null;
+
+  const rows = Object.keys(head.scenarios)
+    .filter((name) => base.scenarios[name])
+    .map((name) => {
+      const a = base.scenarios[name];
+      const b = head.scenarios[name];
+      const throughputChangePct = change(a.requestsPerSec, b.requestsPerSec);
+      const p99ChangePct = change(a.latency.p99Ms, b.latency.p99Ms);
+      return {
+        scenario: name,
+        requestsPerSec: [a.requestsPerSec, b.requestsPerSec],
+        throughputChangePct,
+        p99Ms: [a.latency.p99Ms, b.latency.p99Ms],
+        p99ChangePct,
+        eventLoopLagP99Ms: [a.eventLoopLag?.p99Ms ?? null, b.eventLoopLag?.p99Ms ?? null],
+        peakRssMb: [a.rssMb?.peak ?? null, b.rssMb?.peak ?? null],
+        regression:
+          (throughputChangePct !== null && throughputChangePct < -MAX_REGRESSION * 100) ||
+          (p99ChangePct !== null && p99ChangePct > MAX_REGRESSION * 100),
+      };
+    });
+  console.log(JSON.stringify({ base: base.commit, head: head.commit, maxRegressionPct: MAX_REGRESSION * 100, scenarios: rows }, null, 2));
+  if (rows.some((row) => row.regression)) process.exitCode = 1;
+}
+
+async function main() {
+  const [command, ...args] = process.argv.slice(2);
+  if (command === 'compare') {
+    if (args.length !== 2) throw new Error('usage: bench-suite.ts compare <base.json> <head.json>');
+    compare(args[0], args[1]);
+    return;
+  }
+  try {
+    await run();
+  } finally {
+    await prisma.$disconnect();
+  }
+}
+
+main().catch((error) => {
+  console.error(error);
+  process.exit(1);
+});
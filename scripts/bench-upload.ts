@@ -0,0 +1,120 @@
+/**
+ * Upload pipeline benchmark against the local S3 stub (no real bucket needed).
+ *
+ *   npx tsx --expose-gc scripts/bench-upload.ts
+ *
+ * Sends a burst of concurrent payment-screenshot uploads (multipart/form-data) through
+ *   buffered  - multer.memoryStorage() + one PutObject of the whole buffer (previous behaviour)
+ *   streaming - the S3 streaming storage engine used by uploadWithS3 (recompresses to WebP)
+ * and reports peak memory (heap + Buffers) while the burst is in flight, bytes stored in the
+ * bucket and request latency.
+ */
+import type { AddressInfo } from 'net';
+import express, { Request, Response, NextFunction } from 'express';
+import multer from 'multer';
+import { PutObjectCommand } from '@aws-sdk/client-s3';
+import { startS3Stub } from './stubs/s3-stub';
+import { LatencyHistogram } from '../src/utils/latencyHistogram';
+
+const UPLOADS = Number(process.env.BENCH_UPLOADS || 40);
+const IMAGE_KB = Number(process.env.BENCH_IMAGE_KB || 4000);
+
+async function makeScreenshot(): Promise<Buffer> {
+  const sharp = (await import('sharp')).default;
+  // Phone-screenshot-like PNG: 1170px wide, noisy enough that PNG stays large
+  const width = 1170;
+  const height = Math.max(200, Math.round((IMAGE_KB * 1024) / (width * 3)));
+  const raw = Buffer.alloc(width * height * 3);
+  for (let i = 0; i < raw.length; i++) raw[i] = (i * 7919) % 251;
+  return sharp(raw, { raw: { width, height, channels: 3 } }).png({ compressionLevel: 1 }).toBuffer();
+}
+
+function memoryNow(): number {
+  const { heapUsed, arrayBuffers } = process.memoryUsage();
+  return heapUsed + arrayBuffers;
+}
+
+async function burst(url: string, image: Buffer) {
+  // One shared Blob so the client side doesn't add a copy per request to the measurement
+  const blob = new Blob([image], { type: 'image/png' });
+  global.gc?.();
+  const before = memoryNow();
+  let peak = before;
+  const sampler = setInterval(() => {
+    peak = Math.max(peak, memoryNow());
+  }, 5);
+
+  const histogram = new LatencyHistogram();
+  const statuses: Record<number, number> = {};
+  const started = Date.now();
+  await Promise.all(
+    Array.from({ length: UPLOADS }, async (_, i) => {
+      const form = new FormData();
+      form.append('payment_screenshot', blob, `screenshot-${i}.png`);
+      const t = Date.now();
+      const res = await fetch(url, { method: 'POST', body: form });
+      await res.arrayBuffer();
+      histogram.record(Date.now() - t);
+      statuses[res.status] = (statuses[res.status] || 0) + 1;
+    })
+  );
+  clearInterval(sampler);
+  const { p50Ms, p99Ms } = histogram.snapshot();
+  return {
+    uploads: UPLOADS,
+    elapsedMs: Date.now() - started,
+    p50Ms,
+    p99Ms,
+    statuses,
+    peakExtraMemoryMb: Math.round(((peak - before) / 1024 / 1024) * 10) / 10,
+  };
+}
+
+async function main() {
+  const stub = await startS3Stub({ latencyMs: 10 });
+  process.env.S3_ENABLED = 'true';
+  process.env.S3_ENDPOINT = stub.endpoint;
+  process.env.S3_BUCKET = 'bench-bucket';
+  process.env.S3_ACCESS_KEY_ID = 'bench';
+  process.env.S3_SECRET_ACCESS_KEY = 'bench';
+  process.env.UPLOAD_MAX_SIZE = String(Math.max(IMAGE_KB * 2, 5 * 1024) * 1024);
+  const { s3Client, buildS3Key } = await import('../src/services/s3Service');
+  const { uploadWithS3 } = await import('../src/middlewares/upload');
+
+  const image = await makeScreenshot();
+
+  const app = express();
+  const buffered = multer({ storage: multer.memoryStorage(), limits: { fileSize: Number(process.env.UPLOAD_MAX_SIZE) } });
+  app.post('/buffered/upload', buffered.single('payment_screenshot'), async (req: Request, res: Response) => {
+    const key = buildS3Key(req.file!.originalname);
+    await s3Client.send(
+      new PutObjectCommand({ Bucket: process.env.S3_BUCKET, Key: key, Body: req.file!.buffer, ContentType: req.file!.mimetype })
+    );
+    res.json({ key });
+  });
+  app.post('/streaming/upload', uploadWithS3, (req: Request, res: Response) => {
+    res.json({ key: req.file?.s3Key, size: req.file?.size, mimetype: req.file?.mimetype });
+  });
+  app.use((err: any, _req: Request, res: Response, _next: NextFunction) => res.status(500).json({ error: err.message }));
+
+  const server = app.listen(0, '127.0.0.1');
+  await new Promise((resolve) => server.once('listening', resolve));
+  const { port } = server.address() as AddressInfo;
+
+  const results: Record<string, unknown> = {};
+  for (const mode of ['buffered', 'streaming']) {
+    stub.resetStats();
+    const result = await burst(`http://127.0.0.1:${port}/${mode}/upload`, image);
+    results[mode] = { ...result, storedBytes: stub.stats.bytesIn, storedPerUploadKb: Math.round(stub.stats.bytesIn / UPLOADS / 1024) };
+  }
+
+  console.log(JSON.stringify({ imageKb: Math.round(image.length / 1024), ...results }, null, 2));
+  server.close();
+  await stub.close();
+  process.exit();
+}
+
+main().catch((error) => {
+  console.error(error);
+  process.exit(1);
+});
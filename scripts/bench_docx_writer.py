@@ -0,0 +1,121 @@
+"""
+DOCX writer benchmark: builds an order-report-like document with N paragraphs (default 100k)
+with the in-memory path (build_docx_bytes + package_docx, everything held as strings/bytes) and
+with the streaming writer (paragraphs from a generator, document.xml deflated incrementally),
+each in a fresh process, and reports wall time, peak RSS and output size. Also checks that both
+paths produce the same bytes.
+
+    python3 scripts/bench_docx_writer.py [--paragraphs 100000] [--out-dir /tmp]
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Iterator
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate_user_manual_docx import (  # noqa: E402
+    Paragraph,
+    Run,
+    bullet,
+    build_docx_bytes,
+    h1,
+    h2,
+    p,
+    package_docx,
+    write_docx_stream,
+)
+
+REGIONS = ["Sydney CBD", "Inner West", "North Shore", "Eastern Suburbs"]
+
+
+def report_paragraphs(count: int) -> Iterator[Paragraph]:
+    """A per-delivery-day order report: one heading, then per order a heading, a detail line and items."""
+    yield h1("Delivery report 2026-04-01")
+    emitted = 1
+    order = 0
+    while emitted < count:
+        order += 1
+        block = [
+            h2(f"#{order} Bench {order} · {REGIONS[order % len(REGIONS)]}"),
+            p(f"{order} George St, Sydney NSW 2000 · 04{order:08d} · 10:00-18:00"),
+            *(bullet(f"Bench product {(order * 7 + k) % 200} × {1 + (order + k) % 3}") for k in range(2 + order % 4)),
+            Paragraph(runs=[Run(text="Total: "), Run(text=f"${order % 97 + 10}.90", bold=True)], style="Normal"),
+        ]
+        for paragraph in block[: count - emitted]:
+            yield paragraph
+        emitted += len(block)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_mode(mode: str, count: int, out_path: str) -> dict:
+    started = time.perf_counter()
+    if mode == "in-memory":
+        data = package_docx(build_docx_bytes(list(report_paragraphs(count))))
+        with open(out_path, "wb") as f:
+            f.write(data)
+    else:
+        write_docx_stream(out_path, report_paragraphs(count))
+    seconds = time.perf_counter() - started
+    with open(out_path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    return {
+        "mode": mode,
+        "seconds": round(seconds, 3),
+        "peakRssMb": round(peak_rss_mb(), 1),
+        "bytes": os.path.getsize(out_path),
+        "sha256": digest,
+    }
+
+
+def baseline_rss_mb() -> float:
+    # Interpreter + imports only, to separate the writer's own footprint
+    out = subprocess.run(
+        [sys.executable, "-c", f"import sys; sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r}); "
+         "import bench_docx_writer as b; print(b.peak_rss_mb())"],
+        check=True, capture_output=True, text=True,
+    )
+    return float(out.stdout)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--paragraphs", type=int, default=100_000)
+    parser.add_argument("--out-dir", default=tempfile.gettempdir())
+    parser.add_argument("--mode", choices=["in-memory", "stream"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        out_path = os.path.join(args.out_dir, f"bench-docx-{args.mode}.docx")
+        print(json.dumps(run_mode(args.mode, args.paragraphs, out_path)))
+        return 0
+
+    results = []
+    for mode in ("in-memory", "stream"):
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--mode", mode, "--paragraphs", str(args.paragraphs), "--out-dir", args.out_dir],
+            check=True, capture_output=True, text=True,
+        )
+        results.append(json.loads(out.stdout))
+
+    identical = results[0]["sha256"] == results[1]["sha256"]
+    print(json.dumps({"paragraphs": args.paragraphs, "baselineRssMb": round(baseline_rss_mb(), 1), "results": results, "identical": identical}, indent=2))
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
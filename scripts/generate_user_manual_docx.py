@@ -1,14 +1,39 @@
 from __future__ import annotations
 
+import argparse
+import hashlib
 import html
+import io
 import os
+import struct
+import sys
 import zipfile
-from dataclasses import dataclass
-from datetime import date
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from functools import lru_cache
+from typing import BinaryIO, Callable, Iterable, Iterator
 
 
 NS_W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
 NS_R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_WP = "http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing"
+NS_A = "http://schemas.openxmlformats.org/drawingml/2006/main"
+NS_PIC = "http://schemas.openxmlformats.org/drawingml/2006/picture"
+REL_IMAGE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image"
+IMAGE_CONTENT_TYPES = {"png": "image/png", "jpeg": "image/jpeg"}
+
+# Letter page minus 1" margins (see sectPr): 6.5", in twips and EMU
+TEXT_WIDTH_TWIPS = 9360
+EMU_PER_INCH = 914400
+
+# Every zip entry gets the same timestamp so identical content gives byte-identical files
+FIXED_ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+# Stored as the zip archive comment; lets a later build see what an existing file was built from
+MODEL_HASH_PREFIX = b"groupbuy-manual-model:"
+
+# Screenshots embedded by screenshot(): <dir>/<name>.png|.jpg; --screenshots overrides
+SCREENSHOT_DIR_ENV = "USER_MANUAL_SCREENSHOTS"
 
 
 def _xml_escape(s: str) -> str:
@@ -33,6 +58,100 @@ class Paragraph:
     page_break_before: bool = False
 
 
+@dataclass(frozen=True)
+class Table:
+    rows: list[list[str | Paragraph]]
+    # Leading rows drawn bold and shaded, and repeated at the top of each page
+    header_rows: int = 1
+    # Column widths in twips (1/1440"); default: the text width split evenly
+    widths: tuple[int, ...] | None = None
+
+    def __post_init__(self) -> None:
+        # Word refuses a table without rows or cells, so fail here rather than write a corrupt file
+        columns = max((len(row) for row in self.rows), default=0)
+        if columns == 0:
+            raise ValueError("table needs at least one row with at least one cell")
+        if not 0 <= self.header_rows <= len(self.rows):
+            raise ValueError(f"header_rows must be between 0 and {len(self.rows)}, got {self.header_rows}")
+        if self.widths is not None:
+            if len(self.widths) != columns:
+                raise ValueError(f"widths has {len(self.widths)} entries but the table has {columns} columns")
+            if any(w <= 0 for w in self.widths):
+                raise ValueError("widths must be positive")
+
+
+def _image_info(data: bytes) -> tuple[str, int, int]:
+    """(extension, width px, height px) of a PNG or JPEG."""
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        width, height = struct.unpack(">II", data[16:24])
+        return "png", width, height
+    if data[:2] == b"\xff\xd8":
+        i = 2
+        while i + 9 < len(data):
+            if data[i] != 0xFF:
+                break
+            marker = data[i + 1]
+            if marker == 0xFF:
+                i += 1
+                continue
+            # SOFn frames carry the size; C4/C8/CC are other segments in the same range
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack(">HH", data[i + 5:i + 9])
+                return "jpeg", width, height
+            i += 2 + struct.unpack(">H", data[i + 2:i + 4])[0]
+    raise ValueError("unsupported image: only PNG and JPEG can be embedded")
+
+
+@dataclass(frozen=True)
+class Image:
+    """
+    A picture embedded in the package (word/media), shown in its own centred paragraph.
+    Identical bytes are stored once per document however often the image is used.
+    """
+    data: bytes = field(repr=False)
+    description: str = ""
+    # Display width in inches; the height follows the aspect ratio
+    width_in: float = 6.0
+    sha1: str = field(init=False)
+    ext: str = field(init=False)
+    size_px: tuple[int, int] = field(init=False)
+
+    def __post_init__(self) -> None:
+        ext, width, height = _image_info(self.data)
+        object.__setattr__(self, "sha1", hashlib.sha1(self.data).hexdigest())
+        object.__setattr__(self, "ext", ext)
+        object.__setattr__(self, "size_px", (width, height))
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> Image:
+        with open(path, "rb") as f:
+            return cls(f.read(), **kwargs)
+
+
+@dataclass(frozen=True)
+class TocField:
+    """A real TOC field over the heading levels; Word offers to fill it in when the file is opened."""
+    levels: str = "1-3"
+    placeholder: str = "Right-click and choose “Update Field” to generate the Table of Contents."
+
+
+Block = Paragraph | Table | Image | TocField
+
+EMPTY_RUN_XML = "<w:r><w:t xml:space=\"preserve\"> </w:t></w:r>"
+
+
+# XML fragments are memoized: manuals and reports repeat the same styles, run formats and short texts
+@lru_cache(maxsize=None)
+def _rpr_xml(bold: bool, color: str | None) -> str:
+    rpr = []
+    if bold:
+        rpr.append("<w:b/>")
+    if color:
+        rpr.append(f"<w:color w:val=\"{color}\"/>")
+    return f"<w:rPr>{''.join(rpr)}</w:rPr>" if rpr else ""
+
+
+@lru_cache(maxsize=8192)
 def _run_xml(run: Run) -> str:
     # Preserve line breaks inside a run using <w:br/>
     parts: list[str] = []
@@ -44,49 +163,133 @@ def _run_xml(run: Run) -> str:
         else:
             parts.append("<w:t xml:space=\"preserve\"> </w:t>")
 
-    rpr = []
-    if run.bold:
-        rpr.append("<w:b/>")
-    if run.color:
-        rpr.append(f"<w:color w:val=\"{run.color}\"/>")
-    rpr_xml = f"<w:rPr>{''.join(rpr)}</w:rPr>" if rpr else ""
-
-    return f"<w:r>{rpr_xml}{''.join(parts)}</w:r>"
+    return f"<w:r>{_rpr_xml(run.bold, run.color)}{''.join(parts)}</w:r>"
 
 
-def _p_xml(p: Paragraph) -> str:
+@lru_cache(maxsize=None)
+def _ppr_xml(style: str | None, page_break_before: bool, num_id: int | None, ilvl: int | None) -> str:
     ppr_parts: list[str] = []
-    if p.style:
-        ppr_parts.append(f"<w:pStyle w:val=\"{_xml_escape(p.style)}\"/>")
-    if p.page_break_before:
+    if style:
+        ppr_parts.append(f"<w:pStyle w:val=\"{_xml_escape(style)}\"/>")
+    if page_break_before:
         ppr_parts.append("<w:pageBreakBefore/>")
-    if p.num_id is not None and p.ilvl is not None:
+    if num_id is not None and ilvl is not None:
         ppr_parts.append(
-            f"<w:numPr><w:ilvl w:val=\"{int(p.ilvl)}\"/><w:numId w:val=\"{int(p.num_id)}\"/></w:numPr>"
+            f"<w:numPr><w:ilvl w:val=\"{int(ilvl)}\"/><w:numId w:val=\"{int(num_id)}\"/></w:numPr>"
         )
+    return f"<w:pPr>{''.join(ppr_parts)}</w:pPr>" if ppr_parts else ""
 
-    ppr_xml = f"<w:pPr>{''.join(ppr_parts)}</w:pPr>" if ppr_parts else ""
-    runs_xml = "".join(_run_xml(r) for r in p.runs) if p.runs else "<w:r><w:t xml:space=\"preserve\"> </w:t></w:r>"
+
+def _p_xml(p: Paragraph) -> str:
+    ppr_xml = _ppr_xml(p.style, p.page_break_before, p.num_id, p.ilvl)
+    runs_xml = "".join(_run_xml(r) for r in p.runs) if p.runs else EMPTY_RUN_XML
     return f"<w:p>{ppr_xml}{runs_xml}</w:p>"
 
 
-def _toc_field_paragraph() -> Paragraph:
-    # A simple TOC field that Word can update: References -> Update Table
-    # It will show headings 1-3. Word may require user to "Update Field" once.
-    fld = (
-        "<w:r><w:fldChar w:fldCharType=\"begin\"/></w:r>"
-        "<w:r><w:instrText xml:space=\"preserve\"> TOC \\\\o \"1-3\" \\\\h \\\\z \\\\u </w:instrText></w:r>"
+def _toc_xml(toc: TocField) -> str:
+    return (
+        "<w:p><w:pPr><w:pStyle w:val=\"Normal\"/></w:pPr>"
+        "<w:r><w:fldChar w:fldCharType=\"begin\" w:dirty=\"true\"/></w:r>"
+        f"<w:r><w:instrText xml:space=\"preserve\"> TOC \\o \"{_xml_escape(toc.levels)}\" \\h \\z \\u </w:instrText></w:r>"
         "<w:r><w:fldChar w:fldCharType=\"separate\"/></w:r>"
-        "<w:r><w:t>Right-click and choose “Update Field” to generate the Table of Contents.</w:t></w:r>"
+        f"<w:r><w:t xml:space=\"preserve\">{_xml_escape(toc.placeholder)}</w:t></w:r>"
         "<w:r><w:fldChar w:fldCharType=\"end\"/></w:r>"
+        "</w:p>"
     )
-    return Paragraph(runs=[Run(text="")], style="Normal")  # placeholder; we will inject raw runs via special case
+
+
+def _table_xml(table: Table) -> str:
+    columns = max((len(row) for row in table.rows), default=0)
+    widths = table.widths or (TEXT_WIDTH_TWIPS // max(columns, 1),) * columns
+    grid = "".join(f"<w:gridCol w:w=\"{w}\"/>" for w in widths)
+    rows_xml: list[str] = []
+    for index, row in enumerate(table.rows):
+        header = index < table.header_rows
+        cells: list[str] = []
+        for col in range(columns):
+            cell = row[col] if col < len(row) else ""
+            para = cell if isinstance(cell, Paragraph) else Paragraph(runs=[Run(text=cell, bold=header)], style="TableText")
+            shading = "<w:shd w:val=\"clear\" w:color=\"auto\" w:fill=\"F2F2F2\"/>" if header else ""
+            cells.append(f"<w:tc><w:tcPr><w:tcW w:w=\"{widths[col]}\" w:type=\"dxa\"/>{shading}</w:tcPr>{_p_xml(para)}</w:tc>")
+        trpr = "<w:trPr><w:tblHeader/></w:trPr>" if header else ""
+        rows_xml.append(f"<w:tr>{trpr}{''.join(cells)}</w:tr>")
+    return (
+        "<w:tbl><w:tblPr><w:tblStyle w:val=\"TableGrid\"/><w:tblW w:w=\"0\" w:type=\"auto\"/></w:tblPr>"
+        f"<w:tblGrid>{grid}</w:tblGrid>{''.join(rows_xml)}</w:tbl>"
+    )
+
+
+class _Media:
+    """Images of one document, one part per distinct content hash. rId1/rId2 are styles and numbering."""
+
+    def __init__(self) -> None:
+        self._by_hash: dict[str, tuple[str, str, bytes]] = {}
+        self.drawings = 0
+
+    def add(self, image: Image) -> str:
+        entry = self._by_hash.get(image.sha1)
+        if entry is None:
+            n = len(self._by_hash) + 1
+            entry = (f"rId{n + 2}", f"media/image{n}.{image.ext}", image.data)
+            self._by_hash[image.sha1] = entry
+        return entry[0]
+
+    def entries(self) -> list[tuple[str, str, bytes]]:
+        """(relationship id, target relative to word/, bytes)"""
+        return list(self._by_hash.values())
+
+    def extensions(self) -> list[str]:
+        return sorted({target.rsplit(".", 1)[1] for _, target, _ in self._by_hash.values()})
+
+
+def _image_xml(image: Image, media: _Media) -> str:
+    rid = media.add(image)
+    media.drawings += 1
+    n = media.drawings
+    width_px, height_px = image.size_px
+    cx = int(min(image.width_in, TEXT_WIDTH_TWIPS / 1440) * EMU_PER_INCH)
+    cy = int(cx * height_px / max(width_px, 1))
+    descr = html.escape(image.description, quote=True)
+    return (
+        "<w:p><w:pPr><w:pStyle w:val=\"Figure\"/></w:pPr><w:r><w:drawing>"
+        f"<wp:inline distT=\"0\" distB=\"0\" distL=\"0\" distR=\"0\"><wp:extent cx=\"{cx}\" cy=\"{cy}\"/>"
+        f"<wp:docPr id=\"{n}\" name=\"Picture {n}\" descr=\"{descr}\"/>"
+        "<wp:cNvGraphicFramePr><a:graphicFrameLocks noChangeAspect=\"1\"/></wp:cNvGraphicFramePr>"
+        f"<a:graphic><a:graphicData uri=\"{NS_PIC}\"><pic:pic>"
+        f"<pic:nvPicPr><pic:cNvPr id=\"{n}\" name=\"image{n}.{image.ext}\"/><pic:cNvPicPr/></pic:nvPicPr>"
+        f"<pic:blipFill><a:blip r:embed=\"{rid}\"/><a:stretch><a:fillRect/></a:stretch></pic:blipFill>"
+        f"<pic:spPr><a:xfrm><a:off x=\"0\" y=\"0\"/><a:ext cx=\"{cx}\" cy=\"{cy}\"/></a:xfrm>"
+        "<a:prstGeom prst=\"rect\"><a:avLst/></a:prstGeom></pic:spPr>"
+        "</pic:pic></a:graphicData></a:graphic></wp:inline></w:drawing></w:r></w:p>"
+    )
+
+
+def _block_xml(block: Block, media: _Media) -> str:
+    if isinstance(block, Paragraph):
+        return _p_xml(block)
+    if isinstance(block, Table):
+        return _table_xml(block)
+    if isinstance(block, Image):
+        return _image_xml(block, media)
+    if isinstance(block, TocField):
+        return _toc_xml(block)
+    raise TypeError(f"unsupported block: {type(block).__name__}")
 
 
 def red_note(text: str) -> Paragraph:
     return Paragraph(runs=[Run(text=f"[SCREENSHOT REQUIRED] {text}", bold=True, color="FF0000")], style="ScreenshotNote")
 
 
+def screenshot(name: str, text: str) -> Block:
+    """The screenshot <name>.png / .jpg from the screenshots directory if present, otherwise a red placeholder note."""
+    directory = os.environ.get(SCREENSHOT_DIR_ENV) or os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "docs", "screenshots")
+    for ext in ("png", "jpg", "jpeg"):
+        path = os.path.join(directory, f"{name}.{ext}")
+        if os.path.isfile(path):
+            return Image.from_file(path, description=text)
+    return red_note(text)
+
+
 def h1(text: str, *, page_break_before: bool = False) -> Paragraph:
     return Paragraph(runs=[Run(text=text, bold=True)], style="Heading1", page_break_before=page_break_before)
 
@@ -113,9 +316,17 @@ def step(text: str, *, level: int = 0) -> Paragraph:
     return Paragraph(runs=[Run(text=text)], style="ListParagraph", num_id=2, ilvl=level)
 
 
-def build_document_paragraphs() -> list[Paragraph]:
-    today = date.today().isoformat()
-    paragraphs: list[Paragraph] = []
+def _build_date() -> str:
+    # Honour SOURCE_DATE_EPOCH (reproducible builds); otherwise today
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if epoch:
+        return datetime.fromtimestamp(int(epoch), tz=timezone.utc).date().isoformat()
+    return date.today().isoformat()
+
+
+def build_document_paragraphs() -> list[Block]:
+    today = _build_date()
+    paragraphs: list[Block] = []
 
     # Cover
     paragraphs += [
@@ -126,11 +337,10 @@ def build_document_paragraphs() -> list[Paragraph]:
         p("Version: 1.0.0"),
         p(f"Date: {today}"),
         p(""),
-        red_note("Insert a screenshot of the system home page (/home)."),
+        screenshot("home", "Insert a screenshot of the system home page (/home)."),
         p(""),
         h1("Table of Contents", page_break_before=True),
-        # TOC placeholder (Word field)
-        Paragraph(runs=[Run(text="(Table of Contents field placeholder)")] , style="Normal"),
+        TocField(),
         p(""),
         h1("1. Overview", page_break_before=True),
         p("This document explains how each user role can use the GroupBuy system. It is written as an instruction manual."),
@@ -167,9 +377,15 @@ def build_document_paragraphs() -> list[Paragraph]:
         p(""),
         h2("2.3 Demo accounts (if seed data is loaded)"),
         p("Default password for all demo accounts: Test123456"),
-        bullet("Admin (ADMIN): admin1@test.local / admin2@test.local"),
-        bullet("Users (USER): user1@test.local to user5@test.local"),
-        bullet("Merchants (MERCHANT): merchant1@test.local to merchant10@test.local"),
+        Table(
+            rows=[
+                ["Role", "Accounts"],
+                ["Admin (ADMIN)", "admin1@test.local / admin2@test.local"],
+                ["Users (USER)", "user1@test.local to user5@test.local"],
+                ["Merchants (MERCHANT)", "merchant1@test.local to merchant10@test.local"],
+            ],
+            widths=(2880, 6480),
+        ),
         red_note("If your submission requires real accounts, replace the demo credentials above with your actual test accounts."),
         p(""),
     ]
@@ -181,49 +397,49 @@ def build_document_paragraphs() -> list[Paragraph]:
         step("Open the registration page: /register"),
         step("Fill in Email, Phone, and Password (at least 6 characters)."),
         step("Click “Register & Login”. After success, you will be logged in automatically."),
-        red_note("Insert a screenshot of the Register page (/register)."),
+        screenshot("register-page", "Insert a screenshot of the Register page (/register)."),
         p(""),
         h2("3.2 Log in / log out"),
         step("Open the login page: /login"),
         step("In “Email / Phone”, enter your email or phone, then enter your password."),
         step("Click “Login”."),
         step("To log out, open /account and click “Logout”."),
-        red_note("Insert a screenshot of the Login page (/login)."),
-        red_note("Insert a screenshot of the My Account page showing the Logout button (/account)."),
+        screenshot("login-page", "Insert a screenshot of the Login page (/login)."),
+        screenshot("account-logout", "Insert a screenshot of the My Account page showing the Logout button (/account)."),
         p(""),
         h2("3.3 Select packages and add to cart"),
         step("Open the group-buy page: /order"),
         step("Use “Search packages...” and/or “Region” to filter packages."),
         step("Use “+ / -” to change quantity, then click “Add to cart”."),
         step("Click “Go to cart” to proceed to /cart."),
-        red_note("Insert a screenshot of /order showing filters, quantity controls, and “Add to cart / Go to cart”."),
+        screenshot("order", "Insert a screenshot of /order showing filters, quantity controls, and “Add to cart / Go to cart”."),
         p(""),
         h2("3.4 Review cart and adjust items"),
         step("Open the cart page: /cart (login required)."),
         step("Use “+ / -” to adjust quantity; click “Remove” to remove an item."),
         step("Click “Clear cart” to empty the entire cart."),
-        red_note("Insert a screenshot of /cart showing quantity controls, Remove, and Clear cart."),
+        screenshot("cart", "Insert a screenshot of /cart showing quantity controls, Remove, and Clear cart."),
         p(""),
         h2("3.5 Checkout (place an order)"),
         step("In the Checkout panel, fill in Name, Delivery address, and Delivery time (required)."),
         step("Optionally fill in Note."),
         step("Click “Place order → Pay”. The system will create the order and redirect to the payment page."),
         p("Note: Delivery time options are derived from the selected packages’ configured delivery dates. If no options exist, the order cannot be submitted."),
-        red_note("Insert a screenshot of the Checkout form on /cart (Name/Address/Delivery time/Place order → Pay)."),
+        screenshot("checkout-form", "Insert a screenshot of the Checkout form on /cart (Name/Address/Delivery time/Place order → Pay)."),
         p(""),
         h2("3.6 Payment and payment proof"),
         step("On /payment, review the order summary."),
         step("Choose a payment method: Bank transfer or Cash on delivery."),
         step("If Bank transfer is selected: upload “Payment proof” (image) and click “Submit payment”."),
         step("After submission, you will be redirected to /success."),
-        red_note("Insert a screenshot of /payment showing payment method and payment proof upload."),
-        red_note("Insert a screenshot of the success page (/success)."),
+        screenshot("payment", "Insert a screenshot of /payment showing payment method and payment proof upload."),
+        screenshot("success-page", "Insert a screenshot of the success page (/success)."),
         p(""),
         h2("3.7 View your orders and status"),
         step("Open “My Orders”: /query-order (login required)."),
         step("Review the order status (New / Payment confirmed / Preparing / Out for delivery / Completed / Cancelled) and details."),
         step("If you used Bank transfer, the uploaded payment proof will be displayed in the order card."),
-        red_note("Insert a screenshot of /query-order showing status and the payment proof image."),
+        screenshot("query-order", "Insert a screenshot of /query-order showing status and the payment proof image."),
         p(""),
     ]
 
@@ -234,19 +450,19 @@ def build_document_paragraphs() -> list[Paragraph]:
         step("Open /login (users and merchants share the same login page)."),
         step("Log in with a merchant account and open /account."),
         step("Confirm your Role shows MERCHANT."),
-        red_note("Insert a screenshot of /account showing Role: MERCHANT."),
+        screenshot("account-merchant-role", "Insert a screenshot of /account showing Role: MERCHANT."),
         p(""),
         h2("4.2 Upgrade a normal user to MERCHANT (if needed)"),
         step("After logging in, open /merchant/upgrade."),
         step("Fill in Store name (required) and other optional fields."),
         step("Click “Upgrade”. Then open /merchant/dashboard."),
-        red_note("Insert a screenshot of the Upgrade to Merchant page (/merchant/upgrade)."),
+        screenshot("upgrade-to-merchant-page", "Insert a screenshot of the Upgrade to Merchant page (/merchant/upgrade)."),
         p(""),
         h2("4.3 Maintain store profile"),
         step("Open the Merchant Dashboard: /merchant/dashboard."),
         step("In “Store profile”, update store details (name, contact, phone, email, WeChat, hours, address, description)."),
         step("Upload “Store promo image” or fill “Store promo image URL”, then click “Save profile”."),
-        red_note("Insert a screenshot of Merchant Dashboard → Store profile (/merchant/dashboard)."),
+        screenshot("merchant-dashboard-store-profile", "Insert a screenshot of Merchant Dashboard → Store profile (/merchant/dashboard)."),
         p(""),
         h2("4.4 Publish group-buy packages (merchant simplified flow)"),
         p("Note: Admin Console provides the full package builder (select product/variant). Merchant Dashboard supports basic fields plus an advanced itemsJson field."),
@@ -254,23 +470,23 @@ def build_document_paragraphs() -> list[Paragraph]:
         step("Optionally fill Description, Region, and upload an Image or provide an Image URL."),
         step("If you need to define package items, edit “itemsJson” in Advanced fields (JSON array)."),
         step("Click “Create package”. Use “View” to open details or “Delete” to remove a package."),
-        red_note("Insert a screenshot of the package creation form (/merchant/dashboard → Publish group-buy packages)."),
-        red_note("Insert a screenshot of the merchant package list (showing View/Delete)."),
+        screenshot("package-creation-form", "Insert a screenshot of the package creation form (/merchant/dashboard → Publish group-buy packages)."),
+        screenshot("merchant-package-list", "Insert a screenshot of the merchant package list (showing View/Delete)."),
         p(""),
         h2("4.5 Publish services (for Service Booking)"),
         step("On /merchant/dashboard, under “Publish services”, fill in Name (required)."),
         step("Optionally fill Price, Description, Duration (mins), and upload an Image or provide an Image URL."),
         step("If you want pre-defined booking slots, fill “Time slots (JSON array)”."),
         step("Click “Create service”. Use “View” to open details or “Delete” to remove a service."),
-        red_note("Insert a screenshot of the service creation form (/merchant/dashboard → Publish services)."),
+        screenshot("service-creation-form", "Insert a screenshot of the service creation form (/merchant/dashboard → Publish services)."),
         p(""),
         h2("4.6 Quote on custom service requests"),
         step("Open the quote hub: /service-booking/merchant (legacy links may require ?key=...)."),
         step("Click an open request to view details."),
         step("Fill in Price (required), optional Details and Contact info, then click “Submit quote”."),
         step("The user can select your quote. There is no in-app chat; users contact you via the info you provided."),
-        red_note("Insert a screenshot of the merchant quote hub list (/service-booking/merchant)."),
-        red_note("Insert a screenshot of the request detail + quote form (/service-booking/merchant/requests/:id)."),
+        screenshot("merchant-quote-hub-list", "Insert a screenshot of the merchant quote hub list (/service-booking/merchant)."),
+        screenshot("request-detail-quote-form", "Insert a screenshot of the request detail + quote form (/service-booking/merchant/requests/:id)."),
         p(""),
     ]
 
@@ -281,7 +497,7 @@ def build_document_paragraphs() -> list[Paragraph]:
         step("Open /admin-login."),
         step("Enter Username and Password, then click “Login”."),
         step("To log out, click “Logout/退出登录” in the admin pages header."),
-        red_note("Insert a screenshot of the Admin Login page (/admin-login)."),
+        screenshot("admin-login-page", "Insert a screenshot of the Admin Login page (/admin-login)."),
         p(""),
         h2("5.2 Order management"),
         step("Open /admin/orders."),
@@ -290,14 +506,14 @@ def build_document_paragraphs() -> list[Paragraph]:
         step("On the detail page, click “Print/打印订单” to print."),
         step("Update the order status under “Update order status/更新订单状态”, then click “Save/保存”."),
         step("Delete orders from the list or detail page (may also delete the Shopify order)."),
-        red_note("Insert a screenshot of /admin/orders showing filters and the order list."),
-        red_note("Insert a screenshot of /admin/orders/:id showing print, payment proof, and status update."),
+        screenshot("admin-orders", "Insert a screenshot of /admin/orders showing filters and the order list."),
+        screenshot("admin-order-detail", "Insert a screenshot of /admin/orders/:id showing print, payment proof, and status update."),
         p(""),
         h2("5.3 Route planning (Google Maps)"),
         step("On /admin/orders, filter by Region and Delivery date so the list contains orders."),
         step("Click “Route planning/路线规划” to open the modal."),
         step("Click “Open in Google Maps/在 Google Maps 中打开路线规划”."),
-        red_note("Insert a screenshot of the route planning modal (/admin/orders → Route planning)."),
+        screenshot("route-planning-modal", "Insert a screenshot of the route planning modal (/admin/orders → Route planning)."),
         p(""),
         h2("5.4 Package management"),
         step("Open /admin/packages."),
@@ -305,15 +521,15 @@ def build_document_paragraphs() -> list[Paragraph]:
         step("Optionally configure delivery dates and time slot (All day / Morning / Afternoon)."),
         step("Add items by selecting product + variant and quantity, then click “Add item/添加商品”."),
         step("Click “Save/保存”. Use Edit/Enable/Disable/Delete on package cards."),
-        red_note("Insert a screenshot of /admin/packages."),
-        red_note("Insert a screenshot of the Create/Edit package modal (delivery dates + item selection)."),
+        screenshot("admin-packages", "Insert a screenshot of /admin/packages."),
+        screenshot("create-edit-package-modal", "Insert a screenshot of the Create/Edit package modal (delivery dates + item selection)."),
         p(""),
         h2("5.5 Product translation mapping"),
         step("Open /admin/product-mappings."),
         step("Click “Sync products from Shopify/从 Shopify 同步商品”."),
         step("Fill Chinese translations and click “Save/保存” per row, or “Save all/保存所有翻译”."),
         step("Use the search box to find products by English or Chinese name."),
-        red_note("Insert a screenshot of /admin/product-mappings."),
+        screenshot("admin-product-mappings", "Insert a screenshot of /admin/product-mappings."),
         p(""),
     ]
 
@@ -325,9 +541,9 @@ def build_document_paragraphs() -> list[Paragraph]:
         step("On the service detail page, fill Name, Phone, and Preferred time (required)."),
         step("Optionally upload a Reference image and fill Note."),
         step("Click “Submit booking”, then record the Booking ID on the success page."),
-        red_note("Insert a screenshot of the service list (/service-booking)."),
-        red_note("Insert a screenshot of the service detail + booking form (/service-booking/services/:id)."),
-        red_note("Insert a screenshot of booking success (/service-booking/bookings/:id/success)."),
+        screenshot("service-list", "Insert a screenshot of the service list (/service-booking)."),
+        screenshot("service-detail-booking-form", "Insert a screenshot of the service detail + booking form (/service-booking/services/:id)."),
+        screenshot("booking-success", "Insert a screenshot of booking success (/service-booking/bookings/:id/success)."),
         p(""),
         h2("6.2 Post a custom request and select a quote"),
         step("Open /service-booking/requests/new."),
@@ -335,8 +551,8 @@ def build_document_paragraphs() -> list[Paragraph]:
         step("Click “Publish request”."),
         step("Open the generated request detail page and review private quotes."),
         step("Click “Select this quote” on the quote you choose."),
-        red_note("Insert a screenshot of the custom request form (/service-booking/requests/new)."),
-        red_note("Insert a screenshot of the quote list and selection button (/service-booking/requests/:id?token=...)."),
+        screenshot("custom-request-form", "Insert a screenshot of the custom request form (/service-booking/requests/new)."),
+        screenshot("request-quotes", "Insert a screenshot of the quote list and selection button (/service-booking/requests/:id?token=...)."),
         p(""),
     ]
 
@@ -380,35 +596,14 @@ def build_document_paragraphs() -> list[Paragraph]:
     return paragraphs
 
 
-def build_docx_bytes() -> dict[str, bytes]:
-    paragraphs = build_document_paragraphs()
-
-    # Special case: we want a real field for TOC. Since we don’t have a full XML object model,
-    # inject it as a raw paragraph after "Table of Contents" title (the next paragraph currently is placeholder).
-    body_xml_parts: list[str] = []
-    toc_injected = False
-    for pp in paragraphs:
-        # Replace our placeholder text with the TOC field paragraph once.
-        if (not toc_injected) and pp.style == "Normal" and len(pp.runs) == 1 and pp.runs[0].text == "(Table of Contents field placeholder)":
-            toc_injected = True
-            body_xml_parts.append(
-                "<w:p><w:pPr><w:pStyle w:val=\"Normal\"/></w:pPr>"
-                "<w:r><w:fldChar w:fldCharType=\"begin\"/></w:r>"
-                "<w:r><w:instrText xml:space=\"preserve\"> TOC \\\\o \"1-3\" \\\\h \\\\z \\\\u </w:instrText></w:r>"
-                "<w:r><w:fldChar w:fldCharType=\"separate\"/></w:r>"
-                "<w:r><w:t xml:space=\"preserve\">Right-click and choose “Update Field” to generate the Table of Contents.</w:t></w:r>"
-                "<w:r><w:fldChar w:fldCharType=\"end\"/></w:r>"
-                "</w:p>"
-            )
-            continue
-        body_xml_parts.append(_p_xml(pp))
-
-    body_xml = "".join(body_xml_parts)
-
-    document_xml = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
-<w:document xmlns:w="{NS_W}" xmlns:r="{NS_R}">
+DOCUMENT_PART = "word/document.xml"
+
+DOCUMENT_XML_HEAD = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:document xmlns:w="{NS_W}" xmlns:r="{NS_R}" xmlns:wp="{NS_WP}" xmlns:a="{NS_A}" xmlns:pic="{NS_PIC}">
   <w:body>
-    {body_xml}
+    """
+
+DOCUMENT_XML_TAIL = """
     <w:sectPr>
       <w:pgSz w:w="12240" w:h="15840"/>
       <w:pgMar w:top="1440" w:right="1440" w:bottom="1440" w:left="1440" w:header="720" w:footer="720" w:gutter="0"/>
@@ -417,7 +612,7 @@ def build_docx_bytes() -> dict[str, bytes]:
 </w:document>
 """
 
-    styles_xml = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+STYLES_XML = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
 <w:styles xmlns:w="{NS_W}">
   <w:docDefaults>
     <w:rPrDefault>
@@ -494,10 +689,39 @@ def build_docx_bytes() -> dict[str, bytes]:
     </w:pPr>
     <w:rPr><w:b/><w:color w:val="FF0000"/></w:rPr>
   </w:style>
+
+  <w:style w:type="paragraph" w:styleId="TableText">
+    <w:name w:val="Table Text"/>
+    <w:basedOn w:val="Normal"/>
+    <w:qFormat/>
+    <w:pPr><w:spacing w:before="40" w:after="40" w:line="240" w:lineRule="auto"/></w:pPr>
+  </w:style>
+
+  <w:style w:type="paragraph" w:styleId="Figure">
+    <w:name w:val="Figure"/>
+    <w:basedOn w:val="Normal"/>
+    <w:qFormat/>
+    <w:pPr><w:keepNext/><w:jc w:val="center"/></w:pPr>
+  </w:style>
+
+  <w:style w:type="table" w:styleId="TableGrid">
+    <w:name w:val="Table Grid"/>
+    <w:tblPr>
+      <w:tblBorders>
+        <w:top w:val="single" w:sz="4" w:space="0" w:color="A6A6A6"/>
+        <w:left w:val="single" w:sz="4" w:space="0" w:color="A6A6A6"/>
+        <w:bottom w:val="single" w:sz="4" w:space="0" w:color="A6A6A6"/>
+        <w:right w:val="single" w:sz="4" w:space="0" w:color="A6A6A6"/>
+        <w:insideH w:val="single" w:sz="4" w:space="0" w:color="A6A6A6"/>
+        <w:insideV w:val="single" w:sz="4" w:space="0" w:color="A6A6A6"/>
+      </w:tblBorders>
+      <w:tblCellMar><w:left w:w="108" w:type="dxa"/><w:right w:w="108" w:type="dxa"/></w:tblCellMar>
+    </w:tblPr>
+  </w:style>
 </w:styles>
 """
 
-    numbering_xml = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+NUMBERING_XML = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
 <w:numbering xmlns:w="{NS_W}">
   <!-- Bullet list (numId=1) -->
   <w:abstractNum w:abstractNumId="1">
@@ -541,7 +765,7 @@ def build_docx_bytes() -> dict[str, bytes]:
 </w:numbering>
 """
 
-    content_types = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+CONTENT_TYPES_XML = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
 <Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
   <Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
   <Default Extension="xml" ContentType="application/xml"/>
@@ -551,47 +775,220 @@ def build_docx_bytes() -> dict[str, bytes]:
 </Types>
 """
 
-    rels = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+RELS_XML = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
 <Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
   <Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
 </Relationships>
 """
 
-    doc_rels = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+DOCUMENT_RELS_XML = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
 <Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
   <Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
   <Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/numbering" Target="numbering.xml"/>
 </Relationships>
 """
 
-    return {
-        "[Content_Types].xml": content_types.encode("utf-8"),
-        "_rels/.rels": rels.encode("utf-8"),
-        "word/document.xml": document_xml.encode("utf-8"),
-        "word/styles.xml": styles_xml.encode("utf-8"),
-        "word/numbering.xml": numbering_xml.encode("utf-8"),
-        "word/_rels/document.xml.rels": doc_rels.encode("utf-8"),
-    }
+def iter_body_xml(blocks: Iterable[Block], media: _Media) -> Iterator[str]:
+    """XML of each block in turn; consumes the iterable lazily. Images are registered in media."""
+    for block in blocks:
+        yield _block_xml(block, media)
 
 
-def write_docx(out_path: str) -> None:
-    os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    parts = build_docx_bytes()
-    with zipfile.ZipFile(out_path, "w", compression=zipfile.ZIP_DEFLATED) as z:
+def _content_types_xml(media: _Media) -> str:
+    defaults = "".join(
+        f"  <Default Extension=\"{ext}\" ContentType=\"{IMAGE_CONTENT_TYPES[ext]}\"/>\n" for ext in media.extensions()
+    )
+    return CONTENT_TYPES_XML.replace("  <Override", defaults + "  <Override", 1)
+
+
+def _document_rels_xml(media: _Media) -> str:
+    rels = "".join(
+        f"  <Relationship Id=\"{rid}\" Type=\"{REL_IMAGE}\" Target=\"{target}\"/>\n" for rid, target, _ in media.entries()
+    )
+    return DOCUMENT_RELS_XML.replace("</Relationships>", rels + "</Relationships>")
+
+
+def _parts_after_document(media: _Media) -> dict[str, bytes]:
+    """
+    Every part except document.xml, in archive order. They follow document.xml because the
+    media, relationships and content types are only known once the body has been rendered.
+    """
+    parts = {f"word/{target}": data for _, target, data in media.entries()}
+    parts["word/styles.xml"] = STYLES_XML.encode("utf-8")
+    parts["word/numbering.xml"] = NUMBERING_XML.encode("utf-8")
+    parts["word/_rels/document.xml.rels"] = _document_rels_xml(media).encode("utf-8")
+    parts["_rels/.rels"] = RELS_XML.encode("utf-8")
+    parts["[Content_Types].xml"] = _content_types_xml(media).encode("utf-8")
+    return parts
+
+
+def build_docx_bytes(blocks: list[Block] | None = None) -> dict[str, bytes]:
+    """All package parts in memory (document.xml as one string); see write_docx_stream for large documents."""
+    if blocks is None:
+        blocks = build_document_paragraphs()
+    media = _Media()
+    document_xml = DOCUMENT_XML_HEAD + "".join(iter_body_xml(blocks, media)) + DOCUMENT_XML_TAIL
+    return {DOCUMENT_PART: document_xml.encode("utf-8"), **_parts_after_document(media)}
+
+
+def _zip_info(name: str) -> zipfile.ZipInfo:
+    info = zipfile.ZipInfo(name, date_time=FIXED_ZIP_DATE_TIME)
+    # PNG/JPEG are already compressed; deflating them again only costs time
+    info.compress_type = zipfile.ZIP_STORED if name.startswith("word/media/") else zipfile.ZIP_DEFLATED
+    info.external_attr = 0o644 << 16
+    return info
+
+
+def write_docx_stream(
+    dest: str | BinaryIO,
+    blocks: Iterable[Block],
+    *,
+    comment: bytes = b"",
+    flush_chars: int = 1 << 16,
+) -> None:
+    """
+    Write a .docx to a path or binary file object, pulling blocks from an iterable (e.g. a
+    generator) and deflating document.xml incrementally, so peak memory stays at about
+    flush_chars of XML regardless of document size (plus the distinct images, which are written
+    after the body). Same bytes as package_docx(build_docx_bytes(...)).
+    The zip64 extension is not used, so document.xml must stay under 2 GiB uncompressed.
+    """
+    media = _Media()
+    with zipfile.ZipFile(dest, "w", compression=zipfile.ZIP_DEFLATED) as z:
+        with z.open(_zip_info(DOCUMENT_PART), "w") as entry:
+            pending: list[str] = [DOCUMENT_XML_HEAD]
+            size = len(DOCUMENT_XML_HEAD)
+            for fragment in iter_body_xml(blocks, media):
+                pending.append(fragment)
+                size += len(fragment)
+                if size >= flush_chars:
+                    entry.write("".join(pending).encode("utf-8"))
+                    pending, size = [], 0
+            pending.append(DOCUMENT_XML_TAIL)
+            entry.write("".join(pending).encode("utf-8"))
+        for name, data in _parts_after_document(media).items():
+            z.writestr(_zip_info(name), data)
+        z.comment = comment
+
+
+def model_hash(blocks: list[Block]) -> str:
+    """
+    Content hash of the block model (images by their content hash) plus this generator's
+    source (the XML templates live here too), so either kind of change triggers a rebuild.
+    """
+    h = hashlib.sha256()
+    with open(__file__, "rb") as f:
+        h.update(f.read())
+    h.update(repr(blocks).encode("utf-8"))
+    return h.hexdigest()
+
+
+def package_docx(parts: dict[str, bytes], *, comment: bytes = b"") -> bytes:
+    """Deflate the parts once into an in-memory .docx with fixed timestamps and permissions."""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as z:
         for name, data in parts.items():
-            z.writestr(name, data)
+            z.writestr(_zip_info(name), data)
+        z.comment = comment
+    return buf.getvalue()
+
+
+def _built_hash(path: str) -> str | None:
+    try:
+        with zipfile.ZipFile(path) as z:
+            comment = z.comment
+    except (OSError, zipfile.BadZipFile):
+        return None
+    if not comment.startswith(MODEL_HASH_PREFIX):
+        return None
+    return comment[len(MODEL_HASH_PREFIX):].decode("ascii", "replace")
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def write_docx_outputs(blocks: list[Block], out_paths: list[str], *, force: bool = False) -> list[str]:
+    """
+    Write the same document to every path in out_paths from one in-memory archive.
+    Paths whose existing file was built from the same model hash are left alone (unless force).
+    Returns the paths actually written.
+    """
+    digest = model_hash(blocks)
+    stale = [path for path in out_paths if force or _built_hash(path) != digest]
+    if not stale:
+        return []
+    data = package_docx(build_docx_bytes(blocks), comment=MODEL_HASH_PREFIX + digest.encode("ascii"))
+    for path in stale:
+        _write_atomic(path, data)
+    return stale
+
+
+def write_docx(out_path: str) -> None:
+    write_docx_outputs(build_document_paragraphs(), [out_path], force=True)
+
+
+@dataclass(frozen=True)
+class Variant:
+    # Builds the block model for this language / role
+    build: Callable[[], list[Block]]
+    # Output file names, relative to the output directory; all share one archive
+    outputs: tuple[str, ...]
+
+
+# Add language or role editions here; --jobs builds them in parallel processes
+VARIANTS: dict[str, Variant] = {
+    "en": Variant(build=build_document_paragraphs, outputs=("User Manual.docx", "2.3 User Manual.docx")),
+}
 
 
-def main() -> None:
+def build_variant(name: str, out_dir: str, force: bool = False) -> tuple[str, list[str], list[str]]:
+    """Build one variant; returns (name, written paths, up-to-date paths)."""
+    variant = VARIANTS[name]
+    out_paths = [os.path.join(out_dir, filename) for filename in variant.outputs]
+    written = write_docx_outputs(variant.build(), out_paths, force=force)
+    return name, written, [path for path in out_paths if path not in written]
+
+
+def main(argv: list[str] | None = None) -> int:
     repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-    out1 = os.path.join(repo_root, "User Manual.docx")
-    out2 = os.path.join(repo_root, "2.3 User Manual.docx")
-    write_docx(out1)
-    write_docx(out2)
-    print(f"Wrote: {out1}")
-    print(f"Wrote: {out2}")
+    parser = argparse.ArgumentParser(description="Generate the GroupBuy user manual (.docx).")
+    parser.add_argument("--out-dir", default=repo_root, help="output directory (default: repository root)")
+    parser.add_argument(
+        "--variant",
+        action="append",
+        choices=sorted(VARIANTS),
+        help="variant to build (repeatable; default: all)",
+    )
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="build variants in N parallel processes")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the outputs are up to date")
+    parser.add_argument("--screenshots", help="directory of <name>.png screenshots to embed (default: docs/screenshots)")
+    args = parser.parse_args(argv)
+
+    if args.screenshots:
+        # Through the environment so --jobs worker processes see it too
+        os.environ[SCREENSHOT_DIR_ENV] = os.path.abspath(args.screenshots)
+
+    names = args.variant or list(VARIANTS)
+    out_dir = os.path.abspath(args.out_dir)
+    jobs = max(1, min(args.jobs, len(names)))
+    if jobs == 1:
+        results = [build_variant(name, out_dir, args.force) for name in names]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(build_variant, names, [out_dir] * len(names), [args.force] * len(names)))
+
+    for name, written, unchanged in results:
+        for path in written:
+            print(f"Wrote: {path}")
+        for path in unchanged:
+            print(f"Up to date: {path}")
+    return 0
 
 
 if __name__ == "__main__":
-    main()
-
+    sys.exit(main())
@@ -0,0 +1,97 @@
+/**
+ * Minimal HTTP load generator (keep-alive, fixed concurrency, fixed duration).
+ *
+ *   npx tsx scripts/loadgen.ts http://127.0.0.1:3000/order
+ *   LOAD_CONCURRENCY=64 LOAD_DURATION_S=20 npx tsx scripts/loadgen.ts http://127.0.0.1:3000/home
+ *
+ * Prints requests/second, status counts and latency percentiles as JSON.
+ */
+import http from 'http';
+import { LatencyHistogram } from '../src/utils/latencyHistogram';
+
+export type LoadOptions = {
+  url: string;
+  concurrency?: number;
+  durationMs?: number;
+  headers?: Record<string, string>;
+};
+
+export type LoadResult = {
+  url: string;
+  concurrency: number;
+  durationMs: number;
+  requests: number;
+  errors: number;
+  requestsPerSec: number;
+  statuses: Record<number, number>;
+  latency: { p50Ms: number | null; p95Ms: number | null; p99Ms: number | null; maxMs: number | null };
+};
+
+export async function runLoad(options: LoadOptions): Promise<LoadResult> {
+  const concurrency = options.concurrency ?? 32;
+  const durationMs = options.durationMs ?? 10000;
+  const target = new URL(options.url);
+  const agent = new http.Agent({ keepAlive: true, maxSockets: concurrency });
+  const histogram = new LatencyHistogram([1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]);
+  const statuses: Record<number, number> = {};
+  let requests = 0;
+  let errors = 0;
+
+  const once = () =>
+    new Promise<void>((resolve) => {
+      const startedAt = process.hrtime.bigint();
+      const req = http.get(
+        { host: target.hostname, port: target.port, path: target.pathname + target.search, agent, headers: options.headers },
+        (res) => {
+          res.resume();
+          res.on('end', () => {
+            histogram.record(Number(process.hrtime.bigint() - startedAt) / 1e6);
+            statuses[res.statusCode || 0] = (statuses[res.statusCode || 0] || 0) + 1;
+            requests++;
+            resolve();
+          });
+        }
+      );
+      req.on('error', () => {
+        errors++;
+        resolve();
+      });
+    });
+
+  const startedAt = Date.now();
+  const deadline = startedAt + durationMs;
+  await Promise.all(
+    Array.from({ length: concurrency }, async () => {
+      while (Date.now() < deadline) await once();
+    })
+  );
+  const elapsedMs = Date.now() - startedAt;
+  agent.destroy();
+
+  const { p50Ms, p95Ms, p99Ms, maxMs } = histogram.snapshot();
+  return {
+    url: options.url,
+    concurrency,
+    durationMs: elapsedMs,
+    requests,
+    errors,
+    requestsPerSec: Math.round((requests / elapsedMs) * 1000),
+    statuses,
+    latency: { p50Ms, p95Ms, p99Ms, maxMs },
+  };
+}
+
+if (require.main === module) {
+  const url = process.argv[2] || process.env.LOAD_URL || 'http://127.0.0.1:3000/order';
+  runLoad({
+    url,
+    concurrency: Number(process.env.LOAD_CONCURRENCY || 32),
+    durationMs: Number(process.env.LOAD_DURATION_S || 10) * 1000,
+    headers: process.env.LOAD_COOKIE ? { Cookie: process.env.LOAD_COOKIE } : undefined,
+  })
+    .then((result) => console.log(JSON.stringify(result, null, 2)))
+    .catch((error) => {
+      console.error(error);
+      process.exit(1);
+    });
+}
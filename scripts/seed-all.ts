@@ -1,6 +1,9 @@
 import { PrismaClient } from '@prisma/client';
 import crypto from 'crypto';
 import { hashPassword } from '../src/utils/password';
+import { buildServiceSlotRows } from '../src/utils/serviceSlots';
+import { prisma as appPrisma } from '../src/db';
+import { rebuildMerchantStats } from '../src/services/merchantStatsService';
 
 const prisma = new PrismaClient();
 
@@ -488,6 +491,9 @@ async function main() {
           isActive: true,
           sortOrder: s,
           merchantId: merchant.id,
+          slots: {
+            create: buildServiceSlotRows(timeSlots, { durationMins: svc.durationMins, merchantId: merchant.id }, randInt(1, 3)),
+          },
         },
       });
     }
@@ -535,6 +541,9 @@ async function main() {
     });
   }
 
+  // 套餐 / 服务直接写入，商家汇总（MerchantStats）统一重建一次
+  await rebuildMerchantStats();
+
   console.log('\n✅ Seed completed.\n');
   console.log('Admin accounts:');
   for (const a of adminAccounts) console.log(`- ${a.email} / ${a.phone} / ${demoPassword}`);
@@ -555,5 +564,6 @@ main()
   })
   .finally(async () => {
     await prisma.$disconnect();
+    await appPrisma.$disconnect();
   });
 
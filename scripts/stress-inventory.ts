@@ -0,0 +1,188 @@
+/**
+ * Inventory concurrency stress test: hundreds of simultaneous checkouts of the same package
+ * through the real order controller, then concurrent (and duplicated) cancels and hold expiry.
+ * Exits non-zero when any invariant is broken.
+ *
+ *   DATABASE_URL=file:./bench.db npx prisma db push --skip-generate
+ *   DATABASE_URL=file:./bench.db npx tsx scripts/stress-inventory.ts
+ *
+ * STRESS_CHECKOUTS (default 400), STRESS_PACKAGE_QUOTA (default 150), STRESS_VARIANT_STOCK (default 400).
+ * Each checkout buys 1-3 packages of 2 items (so 2-6 units of the variant). Everything the test
+ * creates is removed at the end.
+ */
+import type { Request, Response } from 'express';
+import { prisma } from '../src/db';
+import { createOrder, updateOrderStatus } from '../src/controllers/orderController';
+import { createOrderWithStock, getInventoryStats, releaseExpiredHolds } from '../src/services/inventoryService';
+import { LatencyHistogram } from '../src/utils/latencyHistogram';
+
+const CHECKOUTS = Number(process.env.STRESS_CHECKOUTS || 400);
+const PACKAGE_QUOTA = Number(process.env.STRESS_PACKAGE_QUOTA || 150);
+const VARIANT_STOCK = Number(process.env.STRESS_VARIANT_STOCK || 400);
+const RUN = `stress-${Date.now()}`;
+const VARIANT_ID = `${RUN}-variant`;
+
+const failures: string[] = [];
+function check(condition: boolean, message: string) {
+  if (!condition) failures.push(message);
+}
+
+function call(handler: (req: any, res: Response) => Promise<unknown>, req: Record<string, unknown>) {
+  return new Promise<{ status: number; body: any }>((resolve) => {
+    const res = {
+      statusCode: 200,
+      status(code: number) {
+        this.statusCode = code;
+        return this;
+      },
+      json(body: any) {
+        resolve({ status: this.statusCode, body });
+        return this;
+      },
+    };
+    void handler(req as unknown as Request, res as unknown as Response);
+  });
+}
+
+async function level(kind: string, refId: string) {
+  return prisma.stockLevel.findUniqueOrThrow({ where: { kind_refId: { kind, refId } } });
+}
+
+async function activeReserved(stockLevelId: string) {
+  const sum = await prisma.stockReservation.aggregate({
+    where: { stockLevelId, status: { in: ['held', 'committed'] } },
+    _sum: { quantity: true },
+  });
+  return sum._sum.quantity || 0;
+}
+
+async function main() {
+  const pkg = await prisma.package.create({
+    data: {
+      name: `Stress package ${RUN}`,
+      price: '20.00',
+      itemsJson: JSON.stringify([{ title: 'Stress item', shopifyProductId: `${RUN}-product`, shopifyVariantId: VARIANT_ID, quantity: 2 }]),
+      region: 'Inner West',
+    },
+  });
+  await prisma.stockLevel.create({ data: { kind: 'package', refId: pkg.id, label: pkg.name, available: PACKAGE_QUOTA } });
+  await prisma.stockLevel.create({ data: { kind: 'variant', refId: VARIANT_ID, label: 'Stress item', available: VARIANT_STOCK } });
+
+  try {
+    // --- 1. Concurrent checkouts on the same package
+    const histogram = new LatencyHistogram();
+    const started = Date.now();
+    const results = await Promise.all(
+      Array.from({ length: CHECKOUTS }, async (_, i) => {
+        const packages = 1 + (i % 3);
+        const items = [{ title: 'Stress item', price: '10.00', quantity: 2 * packages, shopifyProductId: `${RUN}-product`, shopifyVariantId: VARIANT_ID }];
+        const t = Date.now();
+        const result = await call(createOrder, {
+          body: {
+            customerName: `Stress ${i}`,
+            phone: `${RUN}-${i}`,
+            address: '1 George St, Sydney',
+            deliveryTime: '2026-03-01 10:00-18:00',
+            paymentMethod: 'cash_on_delivery',
+            items: JSON.stringify(items),
+            packageId: pkg.id,
+          },
+          session: {},
+        });
+        histogram.record(Date.now() - t);
+        return { ...result, packages };
+      })
+    );
+    const elapsedMs = Date.now() - started;
+
+    const ok = results.filter((r) => r.status === 200);
+    const soldOut = results.filter((r) => r.status === 409);
+    const errors = results.filter((r) => r.status !== 200 && r.status !== 409);
+    const soldPackages = ok.reduce((sum, r) => sum + r.packages, 0);
+
+    let pkgLevel = await level('package', pkg.id);
+    let variantLevel = await level('variant', VARIANT_ID);
+    check(errors.length === 0, `${errors.length} checkouts failed with errors: ${JSON.stringify(errors.slice(0, 3).map((e) => e.body))}`);
+    check(pkgLevel.available >= 0 && variantLevel.available >= 0, 'stock went negative');
+    check(soldPackages <= PACKAGE_QUOTA, `oversold: ${soldPackages} packages sold, quota ${PACKAGE_QUOTA}`);
+    check(PACKAGE_QUOTA - pkgLevel.available === soldPackages, 'package quota does not match sold packages (lost update)');
+    check(VARIANT_STOCK - variantLevel.available === soldPackages * 2, 'variant stock does not match sold items (lost update)');
+    check((await activeReserved(pkgLevel.id)) === soldPackages, 'reservations do not match sold packages');
+    check(pkgLevel.available < 3 || variantLevel.available < 6 || soldOut.length === 0, 'checkouts were rejected while stock was left');
+    const orders = await prisma.order.count({ where: { phone: { startsWith: RUN } } });
+    check(orders === ok.length, `${orders} orders stored for ${ok.length} successful checkouts`);
+
+    // --- 2. Concurrent cancels, each sent twice
+    const cancelIds = ok.filter((_, i) => i % 2 === 0).map((r) => r.body.orderId as string);
+    await Promise.all(
+      [...cancelIds, ...cancelIds].map((id) => call(updateOrderStatus, { params: { id }, body: { status: 'cancelled' } }))
+    );
+    const returnedPackages = ok.filter((r) => cancelIds.includes(r.body.orderId)).reduce((sum, r) => sum + r.packages, 0);
+    pkgLevel = await level('package', pkg.id);
+    check(
+      (await prisma.order.count({ where: { id: { in: cancelIds }, internalStatus: 'cancelled' } })) === cancelIds.length,
+      'orders were not cancelled'
+    );
+    check(pkgLevel.available === PACKAGE_QUOTA - soldPackages + returnedPackages, 'cancel returned the wrong quantity (double release?)');
+
+    // --- 3. Unpaid holds expire: order cancelled, stock returned once even with two sweepers
+    const before = (await level('package', pkg.id)).available;
+    const holds = Math.min(5, before);
+    const heldOrders: Array<{ id: string }> = [];
+    for (let i = 0; i < holds; i++) {
+      heldOrders.push(
+        await createOrderWithStock(
+          [{ kind: 'package', refId: pkg.id, quantity: 1 }],
+          (tx) =>
+            tx.order.create({
+              data: { customerName: 'Hold', phone: `${RUN}-hold-${i}`, address: '-', deliveryTime: '-', itemsJson: '[]', internalStatus: 'new' },
+            }),
+          { hold: true }
+        )
+      );
+    }
+    check((await level('package', pkg.id)).available === before - holds, 'holds did not reserve stock');
+    await prisma.stockReservation.updateMany({
+      where: { orderId: { in: heldOrders.map((o) => o.id) } },
+      data: { expiresAt: new Date(Date.now() - 1000) },
+    });
+    await Promise.all([releaseExpiredHolds(), releaseExpiredHolds()]);
+    check((await level('package', pkg.id)).available === before, 'expired holds were not returned exactly once');
+    const stillOpen = await prisma.order.count({ where: { id: { in: heldOrders.map((o) => o.id) }, internalStatus: { not: 'cancelled' } } });
+    check(stillOpen === 0, 'expired unpaid orders were not cancelled');
+
+    const { p50Ms, p99Ms } = histogram.snapshot();
+    console.log(
+      JSON.stringify(
+        {
+          checkouts: CHECKOUTS,
+          succeeded: ok.length,
+          soldOut: soldOut.length,
+          errors: errors.length,
+          soldPackages,
+          quota: PACKAGE_QUOTA,
+          elapsedMs,
+          checkoutLatency: { p50Ms, p99Ms },
+          cancelled: cancelIds.length,
+          inventory: getInventoryStats(),
+          failures,
+        },
+        null,
+        2
+      )
+    );
+  } finally {
+    await prisma.order.deleteMany({ where: { phone: { startsWith: RUN } } });
+    await prisma.stockLevel.deleteMany({ where: { OR: [{ refId: pkg.id }, { refId: VARIANT_ID }] } });
+    await prisma.package.delete({ where: { id: pkg.id } });
+  }
+
+  if (failures.length) process.exitCode = 1;
+  await prisma.$disconnect();
+}
+
+main().catch(async (error) => {
+  console.error(error);
+  await prisma.$disconnect();
+  process.exit(1);
+});
@@ -0,0 +1,133 @@
+/**
+ * Service slot concurrency stress test: many simultaneous bookings of the same time slot
+ * through the real booking controller, then concurrent (and duplicated) cancels.
+ * Exits non-zero when a slot is overbooked or a cancel returns its place twice.
+ *
+ *   DATABASE_URL=file:./bench.db npx prisma db push --skip-generate
+ *   DATABASE_URL=file:./bench.db npx tsx scripts/stress-service-slots.ts
+ *
+ * STRESS_BOOKINGS (default 200), STRESS_SLOT_CAPACITY (default 5). Everything the test creates is removed at the end.
+ */
+import type { Request, Response } from 'express';
+import { prisma } from '../src/db';
+import { createServiceBooking, getServiceAvailability, updateServiceBookingStatus } from '../src/controllers/serviceBookingController';
+import { buildServiceSlotRows } from '../src/utils/serviceSlots';
+import { LatencyHistogram } from '../src/utils/latencyHistogram';
+
+const BOOKINGS = Number(process.env.STRESS_BOOKINGS || 200);
+const CAPACITY = Number(process.env.STRESS_SLOT_CAPACITY || 5);
+const RUN = `stress-slots-${Date.now()}`;
+
+const failures: string[] = [];
+function check(condition: boolean, message: string) {
+  if (!condition) failures.push(message);
+}
+
+function call(handler: (req: any, res: Response) => Promise<unknown>, req: Record<string, unknown>) {
+  return new Promise<{ status: number; body: any }>((resolve) => {
+    const res = {
+      statusCode: 200,
+      status(code: number) {
+        this.statusCode = code;
+        return this;
+      },
+      json(body: any) {
+        resolve({ status: this.statusCode, body });
+        return this;
+      },
+    };
+    void handler(req as unknown as Request, res as unknown as Response);
+  });
+}
+
+async function main() {
+  // Two slots a year ahead: the first one is contended, the second stays free
+  const year = new Date().getFullYear() + 1;
+  const labels = [`${year}-03-01 10:00`, `${year}-03-01 14:00`];
+  const merchant = await prisma.merchant.create({ data: { name: `Stress merchant ${RUN}`, dashboardKey: RUN } });
+  const service = await prisma.service.create({
+    data: {
+      name: `Stress service ${RUN}`,
+      durationMins: 60,
+      timeSlotsJson: JSON.stringify(labels),
+      merchantId: merchant.id,
+      slots: { create: buildServiceSlotRows(labels, { durationMins: 60, merchantId: merchant.id }, CAPACITY) },
+    },
+    include: { slots: { orderBy: { startsAt: 'asc' } } },
+  });
+  const slot = service.slots[0];
+
+  try {
+    // --- 1. Concurrent bookings of one slot
+    const histogram = new LatencyHistogram();
+    const results = await Promise.all(
+      Array.from({ length: BOOKINGS }, async (_, i) => {
+        const t = Date.now();
+        const result = await call(createServiceBooking, {
+          body: { serviceId: service.id, customerName: `Stress ${i}`, phone: `${RUN}-${i}`, slotId: slot.id },
+          session: {},
+        });
+        histogram.record(Date.now() - t);
+        return result;
+      })
+    );
+    const ok = results.filter((r) => r.status === 200);
+    const full = results.filter((r) => r.status === 409);
+    const errors = results.filter((r) => r.status !== 200 && r.status !== 409);
+
+    let stored = await prisma.serviceSlot.findUniqueOrThrow({ where: { id: slot.id } });
+    check(errors.length === 0, `${errors.length} bookings failed with errors: ${JSON.stringify(errors.slice(0, 3).map((e) => e.body))}`);
+    check(ok.length === CAPACITY, `${ok.length} bookings succeeded for a slot with capacity ${CAPACITY}`);
+    check(stored.bookedCount === ok.length, `bookedCount ${stored.bookedCount} does not match ${ok.length} bookings (lost update)`);
+    check((await prisma.serviceBooking.count({ where: { slotId: slot.id } })) === ok.length, 'stored bookings do not match successes');
+
+    // Free text for a slotted service is rejected
+    const freeText = await call(createServiceBooking, {
+      body: { serviceId: service.id, customerName: 'Stress', phone: `${RUN}-free`, preferredTime: 'tomorrow afternoon' },
+      session: {},
+    });
+    check(freeText.status === 400, `free-text booking of a slotted service returned ${freeText.status}`);
+
+    // --- 2. Availability hides the full slot
+    const availability = await call(getServiceAvailability, { query: { merchantId: merchant.id } });
+    const openIds = (availability.body.slots || []).map((s: any) => s.id);
+    check(!openIds.includes(slot.id) && openIds.includes(service.slots[1].id), 'availability does not reflect the full slot');
+
+    // --- 3. Concurrent cancels, each sent twice: one place back per booking
+    const cancelIds = ok.slice(0, 2).map((r) => r.body.bookingId as string);
+    await Promise.all(
+      [...cancelIds, ...cancelIds].map((id) => call(updateServiceBookingStatus, { params: { id }, body: { status: 'cancelled' } }))
+    );
+    stored = await prisma.serviceSlot.findUniqueOrThrow({ where: { id: slot.id } });
+    check(stored.bookedCount === CAPACITY - cancelIds.length, `bookedCount ${stored.bookedCount} after cancels (double release?)`);
+
+    const { p50Ms, p99Ms } = histogram.snapshot();
+    console.log(
+      JSON.stringify(
+        {
+          bookings: BOOKINGS,
+          capacity: CAPACITY,
+          succeeded: ok.length,
+          full: full.length,
+          errors: errors.length,
+          bookingLatency: { p50Ms, p99Ms },
+          failures,
+        },
+        null,
+        2
+      )
+    );
+  } finally {
+    await prisma.service.delete({ where: { id: service.id } });
+    await prisma.merchant.delete({ where: { id: merchant.id } });
+  }
+
+  if (failures.length) process.exitCode = 1;
+  await prisma.$disconnect();
+}
+
+main().catch(async (error) => {
+  console.error(error);
+  await prisma.$disconnect();
+  process.exit(1);
+});
@@ -0,0 +1,203 @@
+import crypto from 'crypto';
+import http from 'http';
+import type { AddressInfo } from 'net';
+
+/**
+ * Minimal local stand-in for S3 / MinIO (benchmarks / local tests only).
+ *
+ * Path-style only (`/<bucket>/<key>`, use S3_ENDPOINT + S3_FORCE_PATH_STYLE=true).
+ * Supports PUT (incl. aws-chunked bodies), multipart uploads, GET with ETag /
+ * If-None-Match (304) / Range (206), HEAD and DELETE. Authentication is not checked.
+ * Counts requests and bytes in/out so cache hits and upload sizes can be measured.
+ */
+export type S3StubOptions = {
+  port?: number;
+  /** Added to every response, to simulate the round trip to a real bucket */
+  latencyMs?: number;
+};
+
+export type S3Stub = {
+  endpoint: string;
+  stats: { requests: number; gets: number; notModified: number; puts: number; multipartUploads: number; bytesIn: number; bytesOut: number };
+  put: (bucket: string, key: string, body: Buffer, contentType: string) => string;
+  resetStats: () => void;
+  close: () => Promise<void>;
+};
+
+type StoredObject = { body: Buffer; etag: string; contentType: string; lastModified: Date };
+
+// aws-chunked: "<hex size>[;chunk-signature=...]\r\n<data>\r\n" ... "0\r\n" + trailers
+function decodeAwsChunked(raw: Buffer): Buffer {
+  const parts: Buffer[] = [];
+  let offset = 0;
+  while (offset < raw.length) {
+    const lineEnd = raw.indexOf('\r\n', offset);
+    if (lineEnd < 0) break;
+    const size = Number.parseInt(raw.subarray(offset, lineEnd).toString().split(';')[0], 16);
+    if (!size) break;
+    parts.push(raw.subarray(lineEnd + 2, lineEnd + 2 + size));
+    offset = lineEnd + 2 + size + 2;
+  }
+  return Buffer.concat(parts);
+}
+
+function xmlError(code: string, message: string): string {
+  return `<?xml version="1.0" encoding="UTF-8"?><Error><Code>${code}</Code><Message>${message}</Message></Error>`;
+}
+
+export async function startS3Stub(options: S3StubOptions = {}): Promise<S3Stub> {
+  const latencyMs = options.latencyMs ?? 20;
+  const objects = new Map<string, StoredObject>();
+  const stats = { requests: 0, gets: 0, notModified: 0, puts: 0, multipartUploads: 0, bytesIn: 0, bytesOut: 0 };
+  // uploadId -> object path + parts by number
+  const multipart = new Map<string, { path: string; contentType: string; parts: Map<number, Buffer> }>();
+  let nextUploadId = 1;
+
+  const store = (path: string, body: Buffer, contentType: string): string => {
+    const etag = `"${crypto.createHash('md5').update(body).digest('hex')}"`;
+    objects.set(path, { body, etag, contentType, lastModified: new Date() });
+    return etag;
+  };
+
+  const server = http.createServer((req, res) => {
+    stats.requests++;
+    const url = new URL(req.url || '/', 'http://stub');
+    const path = decodeURIComponent(url.pathname);
+    const uploadId = url.searchParams.get('uploadId');
+
+    const chunks: Buffer[] = [];
+    req.on('data', (chunk) => chunks.push(chunk));
+    req.on('end', () => {
+      setTimeout(() => {
+        let body = Buffer.concat(chunks);
+        const encoding = String(req.headers['content-encoding'] || '');
+        const sha = String(req.headers['x-amz-content-sha256'] || '');
+        if (encoding.includes('aws-chunked') || sha.startsWith('STREAMING-')) body = decodeAwsChunked(body);
+
+        // --- multipart: initiate / upload part / complete / abort
+        if (req.method === 'POST' && url.searchParams.has('uploads')) {
+          const id = String(nextUploadId++);
+          multipart.set(id, { path, contentType: String(req.headers['content-type'] || 'application/octet-stream'), parts: new Map() });
+          res.writeHead(200, { 'Content-Type': 'application/xml' });
+          return res.end(
+            `<?xml version="1.0" encoding="UTF-8"?><InitiateMultipartUploadResult><Bucket>${path.split('/')[1]}</Bucket>` +
+              `<Key>${path.split('/').slice(2).join('/')}</Key><UploadId>${id}</UploadId></InitiateMultipartUploadResult>`
+          );
+        }
+        if (uploadId) {
+          const pending = multipart.get(uploadId);
+          if (!pending) {
+            res.writeHead(404, { 'Content-Type': 'application/xml' });
+            return res.end(xmlError('NoSuchUpload', 'The specified upload does not exist.'));
+          }
+          if (req.method === 'PUT') {
+            stats.bytesIn += body.length;
+            pending.parts.set(Number(url.searchParams.get('partNumber')), body);
+            res.writeHead(200, { ETag: `"${crypto.createHash('md5').update(body).digest('hex')}"` });
+            return res.end();
+          }
+          if (req.method === 'DELETE') {
+            multipart.delete(uploadId);
+            res.writeHead(204);
+            return res.end();
+          }
+          if (req.method === 'POST') {
+            multipart.delete(uploadId);
+            const numbers = [...pending.parts.keys()].sort((a, b) => a - b);
+            store(pending.path, Buffer.concat(numbers.map((n) => pending.parts.get(n)!)), pending.contentType);
+            stats.multipartUploads++;
+            const etag = objects.get(pending.path)!.etag;
+            res.writeHead(200, { 'Content-Type': 'application/xml' });
+            return res.end(
+              `<?xml version="1.0" encoding="UTF-8"?><CompleteMultipartUploadResult><Key>${path.split('/').slice(2).join('/')}</Key>` +
+                `<ETag>${etag.replace(/"/g, '&quot;')}</ETag></CompleteMultipartUploadResult>`
+            );
+          }
+        }
+
+        if (req.method === 'PUT') {
+          stats.bytesIn += body.length;
+          stats.puts++;
+          const etag = store(path, body, String(req.headers['content-type'] || 'application/octet-stream'));
+          res.writeHead(200, { ETag: etag });
+          return res.end();
+        }
+
+        const object = objects.get(path);
+        if (req.method === 'DELETE') {
+          objects.delete(path);
+          res.writeHead(204);
+          return res.end();
+        }
+        if (req.method !== 'GET' && req.method !== 'HEAD') {
+          res.writeHead(405, { 'Content-Type': 'application/xml' });
+          return res.end(xmlError('MethodNotAllowed', 'Method not allowed'));
+        }
+        if (!object) {
+          res.writeHead(404, { 'Content-Type': 'application/xml' });
+          return res.end(req.method === 'HEAD' ? undefined : xmlError('NoSuchKey', 'The specified key does not exist.'));
+        }
+
+        const headers: Record<string, string> = {
+          ETag: object.etag,
+          'Content-Type': object.contentType,
+          'Last-Modified': object.lastModified.toUTCString(),
+          'Accept-Ranges': 'bytes',
+        };
+        if (req.method === 'GET') stats.gets++;
+        if (req.headers['if-none-match'] === object.etag) {
+          stats.notModified++;
+          res.writeHead(304, headers);
+          return res.end();
+        }
+
+        let payload = object.body;
+        let status = 200;
+        const range = /^bytes=(\d*)-(\d*)$/.exec(String(req.headers.range || ''));
+        if (range && (range[1] || range[2])) {
+          const size = object.body.length;
+          const start = range[1] ? Number(range[1]) : Math.max(0, size - Number(range[2]));
+          const end = range[1] && range[2] ? Math.min(size - 1, Number(range[2])) : size - 1;
+          if (start > end || start >= size) {
+            res.writeHead(416, { 'Content-Range': `bytes */${size}` });
+            return res.end();
+          }
+          payload = object.body.subarray(start, end + 1);
+          status = 206;
+          headers['Content-Range'] = `bytes ${start}-${end}/${size}`;
+        }
+        headers['Content-Length'] = String(payload.length);
+        res.writeHead(status, headers);
+        if (req.method === 'HEAD') return res.end();
+        stats.bytesOut += payload.length;
+        res.end(payload);
+      }, latencyMs);
+    });
+  });
+
+  await new Promise<void>((resolve) => server.listen(options.port ?? 0, '127.0.0.1', resolve));
+  const { port } = server.address() as AddressInfo;
+
+  return {
+    endpoint: `http://127.0.0.1:${port}`,
+    stats,
+    put(bucket: string, key: string, body: Buffer, contentType: string) {
+      return store(`/${bucket}/${key}`, body, contentType);
+    },
+    resetStats() {
+      stats.requests = 0;
+      stats.gets = 0;
+      stats.notModified = 0;
+      stats.puts = 0;
+      stats.multipartUploads = 0;
+      stats.bytesIn = 0;
+      stats.bytesOut = 0;
+    },
+    close() {
+      return new Promise<void>((resolve) => {
+        server.closeAllConnections?.();
+        server.close(() => resolve());
+      });
+    },
+  };
+}
@@ -0,0 +1,158 @@
+import http from 'http';
+import type { AddressInfo } from 'net';
+
+/**
+ * Minimal local stand-in for the Shopify Admin REST API (benchmarks / load tests only).
+ *
+ * Implements the endpoints ShopifyService uses (products pagination, orders create/list/delete),
+ * simulates the leaky-bucket limit with `X-Shopify-Shop-Api-Call-Limit` + 429/Retry-After,
+ * and counts TCP connections so keep-alive behaviour can be measured.
+ */
+export type ShopifyStubOptions = {
+  port?: number;
+  productCount?: number;
+  pageSize?: number;
+  bucketSize?: number;
+  leakRate?: number;
+  latencyMs?: number;
+};
+
+export type ShopifyStub = {
+  baseUrl: string;
+  stats: { connections: number; requests: number; throttled: number; ordersCreated: number };
+  /** Answer every request with 429 for `ms` milliseconds */
+  storm: (ms: number, retryAfterSeconds?: number) => void;
+  resetStats: () => void;
+  close: () => Promise<void>;
+};
+
+export async function startShopifyStub(options: ShopifyStubOptions = {}): Promise<ShopifyStub> {
+  const productCount = options.productCount ?? 600;
+  const pageSize = options.pageSize ?? 250;
+  const bucketSize = options.bucketSize ?? 40;
+  const leakPerMs = (options.leakRate ?? 2) / 1000;
+  const latencyMs = options.latencyMs ?? 5;
+
+  const products = Array.from({ length: productCount }, (_, i) => ({
+    id: 1000 + i,
+    title: `Stub Product ${i + 1}`,
+    variants: [{ id: 50000 + i, title: 'Default Title', price: (5 + (i % 20)).toFixed(2), inventory_quantity: 100 }],
+    images: [{ src: `https://cdn.example.com/products/${1000 + i}.png` }],
+  }));
+  const orders: Array<{ id: number; name: string; source_identifier?: string; note?: string; created_at: string }> = [];
+
+  const stats = { connections: 0, requests: 0, throttled: 0, ordersCreated: 0 };
+  let level = 0;
+  let levelAt = Date.now();
+  let stormUntil = 0;
+  let stormRetryAfter = 1;
+
+  let baseUrl = '';
+
+  const server = http.createServer((req, res) => {
+    stats.requests++;
+    const url = new URL(req.url || '/', 'http://stub');
+    const path = url.pathname.replace(/^\/admin\/api\/[^/]+/, '');
+
+    const now = Date.now();
+    level = Math.max(0, level - (now - levelAt) * leakPerMs);
+    levelAt = now;
+
+    const send = (status: number, body: unknown, headers: Record<string, string> = {}) => {
+      setTimeout(() => {
+        res.writeHead(status, {
+          'Content-Type': 'application/json',
+          'X-Shopify-Shop-Api-Call-Limit': `${Math.ceil(level)}/${bucketSize}`,
+          ...headers,
+        });
+        res.end(JSON.stringify(body));
+      }, latencyMs);
+    };
+
+    if (now < stormUntil || level + 1 > bucketSize) {
+      stats.throttled++;
+      req.resume();
+      return send(429, { errors: 'Exceeded 2 calls per second for api client. Reduce request rates to resume uninterrupted service.' }, {
+        'Retry-After': String(now < stormUntil ? stormRetryAfter : 1),
+      });
+    }
+    level += 1;
+
+    let raw = '';
+    req.on('data', (chunk) => (raw += chunk));
+    req.on('end', () => {
+      if (req.method === 'GET' && path === '/products.json') {
+        const page = Math.max(0, Number(url.searchParams.get('page_info') || 0));
+        const slice = products.slice(page * pageSize, (page + 1) * pageSize);
+        const headers: Record<string, string> = {};
+        if ((page + 1) * pageSize < products.length) {
+          headers.Link = `<${baseUrl}/products.json?limit=${pageSize}&page_info=${page + 1}>; rel="next"`;
+        }
+        return send(200, { products: slice }, headers);
+      }
+
+      if (req.method === 'POST' && path === '/orders.json') {
+        let payload: any = {};
+        try {
+          payload = JSON.parse(raw || '{}').order || {};
+        } catch {
+          return send(400, { errors: 'invalid json' });
+        }
+        const id = 900000 + orders.length;
+        const order = {
+          id,
+          name: `#${1000 + orders.length}`,
+          source_identifier: payload.source_identifier,
+          note: payload.note,
+          created_at: new Date().toISOString(),
+        };
+        orders.push(order);
+        stats.ordersCreated++;
+        return send(201, { order });
+      }
+
+      if (req.method === 'GET' && path === '/orders.json') {
+        return send(200, { orders });
+      }
+
+      const deleteMatch = /^\/orders\/(\d+)\.json$/.exec(path);
+      if (req.method === 'DELETE' && deleteMatch) {
+        const index = orders.findIndex((o) => o.id === Number(deleteMatch[1]));
+        if (index < 0) return send(404, { errors: 'Not Found' });
+        orders.splice(index, 1);
+        return send(200, {});
+      }
+
+      return send(404, { errors: 'Not Found' });
+    });
+  });
+
+  server.on('connection', () => {
+    stats.connections++;
+  });
+
+  await new Promise<void>((resolve) => server.listen(options.port ?? 0, '127.0.0.1', resolve));
+  const { port } = server.address() as AddressInfo;
+  baseUrl = `http://127.0.0.1:${port}/admin/api/2024-01`;
+
+  return {
+    baseUrl,
+    stats,
+    storm(ms: number, retryAfterSeconds = 1) {
+      stormUntil = Date.now() + ms;
+      stormRetryAfter = retryAfterSeconds;
+    },
+    resetStats() {
+      stats.connections = 0;
+      stats.requests = 0;
+      stats.throttled = 0;
+      stats.ordersCreated = 0;
+    },
+    close() {
+      return new Promise<void>((resolve) => {
+        server.closeAllConnections?.();
+        server.close(() => resolve());
+      });
+    },
+  };
+}
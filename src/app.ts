@@ -5,16 +5,41 @@ import multer from 'multer';
 import routes from './routes';
 import { config } from './config';
 import { showMyOrdersPage } from './controllers/myOrdersController';
+import { prisma } from './db';
+import { requestContext } from './middlewares/requestContext';
+import { PrismaSessionStore } from './services/prismaSessionStore';
+import { trackFirstRequest } from './services/warmup';
+import { getHealth, getReadiness } from './controllers/healthController';
 
 const app = express();
 
-// 视图引擎配置
+// Session 存储：默认存数据库（重启不丢购物车，多进程共享）；memory 仅适合单进程开发
+export const sessionStore =
+  config.session.store === 'prisma'
+    ? new PrismaSessionStore({ maxAgeMs: config.session.maxAgeMs, touchIntervalMs: config.session.touchIntervalMs })
+    : null;
+if (!sessionStore && process.env.NODE_APP_INSTANCE !== undefined) {
+  console.warn('[session] SESSION_STORE=memory in cluster mode: sessions are not shared between workers');
+}
+
+// 视图引擎配置（生产环境缓存编译后的模板，启动时由 services/warmup.ts 预先载入）
 app.set('view engine', 'ejs');
 app.set('views', path.join(__dirname, 'views'));
+app.set('view cache', config.startup.viewCache);
+
+// 存活 / 就绪检查（不经过 session）
+app.get('/healthz', getHealth);
+app.get('/readyz', getReadiness);
 
 // 静态文件服务
 app.use(express.static(path.join(__dirname, '../public')));
 
+// 启动后第一个请求的耗时（GET /admin/api/metrics）
+app.use(trackFirstRequest);
+
+// Per-request context (route label for DB metrics)
+app.use(requestContext);
+
 // Body parser
 app.use(express.json());
 app.use(express.urlencoded({ extended: true }));
@@ -23,6 +48,7 @@ app.use(express.urlencoded({ extended: true }));
 app.use(
   session({
     secret: config.session.secret,
+    store: sessionStore ?? undefined,
     resave: false,
     saveUninitialized: false,
     cookie: {
@@ -30,7 +56,7 @@ app.use(
       // 如果使用 HTTP，secure 必须为 false，否则 cookie 不会被保存
       secure: process.env.NODE_ENV === 'production' && process.env.USE_HTTPS === 'true',
       httpOnly: true,
-      maxAge: 24 * 60 * 60 * 1000, // 24 hours
+      maxAge: config.session.maxAgeMs, // 默认 24 小时（SESSION_MAX_AGE_HOURS）
       sameSite: 'lax', // 防止 CSRF 攻击
     },
   })
@@ -63,9 +89,6 @@ app.get('/order', async (req: Request, res: Response) => {
   // 如果指定了套餐ID，获取套餐信息用于分享
   if (packageId) {
     try {
-      const { PrismaClient } = await import('@prisma/client');
-      const prisma = new PrismaClient();
-      
       const pkg = await prisma.package.findUnique({
         where: { id: packageId },
       });
@@ -96,8 +119,6 @@ app.get('/order', async (req: Request, res: Response) => {
           url: `${baseUrl}/order?packageId=${packageId}`,
         };
       }
-      
-      await prisma.$disconnect();
     } catch (error) {
       console.error('Error fetching package for share:', error);
       // 出错时使用默认分享内容
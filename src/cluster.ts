@@ -0,0 +1,56 @@
+import cluster, { Worker } from 'cluster';
+import { config } from './config';
+
+/**
+ * Multi-core entry point (`npm run start:cluster`), for hosts without pm2 (e.g. Docker).
+ *
+ * Forks CLUSTER_WORKERS copies of the server (default: one per core) that share the port.
+ * Each worker gets NODE_APP_INSTANCE like pm2 cluster mode, so singleton jobs only run on
+ * instance 0. Crashed workers are restarted with the same instance number. Catalog-change
+ * notifications are relayed between workers so page caches stay in sync.
+ * Requires a shared session store (SESSION_STORE=prisma, the default).
+ */
+if (cluster.isPrimary) {
+  const instances = new Map<number, string>(); // worker.id -> NODE_APP_INSTANCE
+  let shuttingDown = false;
+
+  const fork = (instance: string) => {
+    const worker = cluster.fork({ NODE_APP_INSTANCE: instance, CLUSTER_RELAY: '1' });
+    instances.set(worker.id, instance);
+    // Relay cache invalidations (see services/catalogEvents.ts) to the other workers
+    worker.on('message', (message: any) => {
+      if (!message || message.type !== 'catalog:changed') return;
+      for (const other of Object.values(cluster.workers || {})) {
+        if (other && other.id !== worker.id) other.send({ ...message, relayed: true });
+      }
+    });
+  };
+
+  console.log(`[cluster] primary ${process.pid} starting ${config.cluster.workers} workers`);
+  for (let i = 0; i < config.cluster.workers; i++) fork(String(i));
+
+  cluster.on('exit', (worker: Worker, code, signal) => {
+    const instance = instances.get(worker.id);
+    instances.delete(worker.id);
+    if (shuttingDown) {
+      if (instances.size === 0) process.exit(0);
+      return;
+    }
+    console.error(`[cluster] worker ${worker.process.pid} (instance ${instance}) exited (${signal || code}), restarting`);
+    setTimeout(() => {
+      if (!shuttingDown) fork(instance ?? '0');
+    }, 1000);
+  });
+
+  const shutdown = (signal: NodeJS.Signals) => {
+    if (shuttingDown) return;
+    shuttingDown = true;
+    console.log(`[cluster] ${signal} received, stopping workers...`);
+    for (const worker of Object.values(cluster.workers || {})) worker?.process.kill('SIGTERM');
+    if (instances.size === 0) process.exit(0);
+  };
+  process.on('SIGTERM', () => shutdown('SIGTERM'));
+  process.on('SIGINT', () => shutdown('SIGINT'));
+} else {
+  require('./server');
+}
@@ -1,4 +1,5 @@
 import dotenv from 'dotenv';
+import os from 'os';
 import path from 'path';
 
 // Load env vars from project root `.env` (if present)
@@ -9,6 +10,11 @@ function toInt(value: string | undefined, fallback: number): number {
   return Number.isFinite(n) ? n : fallback;
 }
 
+function toFloat(value: string | undefined, fallback: number): number {
+  const n = Number.parseFloat(String(value ?? ''));
+  return Number.isFinite(n) ? n : fallback;
+}
+
 function toBool(value: string | undefined, fallback: boolean): boolean {
   if (value === undefined) return fallback;
   const v = value.trim().toLowerCase();
@@ -31,15 +37,64 @@ export type AppConfig = {
   };
   session: {
     secret: string;
+    store: 'prisma' | 'memory';
+    maxAgeMs: number;
+    touchIntervalMs: number;
+    sweepIntervalMs: number;
+  };
+  cluster: {
+    workers: number;
+    runBackgroundJobs: boolean;
+  };
+  db: {
+    poolSize: number;
+    poolTimeoutSec: number;
+    slowQueryMs: number;
   };
   upload: {
     dest: string;
     maxSize: number;
+    recompress: boolean;
+    maxDimension: number;
+    webpQuality: number;
   };
   shopify: {
     storeDomain: string;
     accessToken: string;
     apiVersion: string;
+    catalogTtlMs: number;
+    catalogStaleMs: number;
+    bucketSize: number;
+    leakRate: number;
+    apiBaseUrl?: string;
+    maxSockets: number;
+    maxRetries: number;
+    timeoutMs: number;
+  };
+  shopifySync: {
+    enabled: boolean;
+    concurrency: number;
+    pollIntervalMs: number;
+    maxAttempts: number;
+    baseBackoffMs: number;
+    maxBackoffMs: number;
+    lockTimeoutMs: number;
+  };
+  inventory: {
+    holdMinutes: number;
+    sweepIntervalMs: number;
+    trackShopifyInventory: boolean;
+    reconcileIntervalMs: number;
+  };
+  routing: {
+    depotAddress: string;
+    depotLat: number;
+    depotLng: number;
+    defaultDrivers: number;
+    defaultCapacity: number;
+    geocoder: 'google' | 'none';
+    googleApiKey?: string;
+    geocodeConcurrency: number;
   };
   s3: {
     enabled: boolean;
@@ -50,6 +105,33 @@ export type AppConfig = {
     folderPrefix?: string;
     publicAccess: boolean;
     publicUrl?: string;
+    endpoint?: string;
+    forcePathStyle: boolean;
+  };
+  imageCache: {
+    dir: string;
+    maxBytes: number;
+    thumbnailWidths: number[];
+  };
+  pageCache: {
+    enabled: boolean;
+    ttlMs: number;
+    maxEntries: number;
+  };
+  serviceSlots: {
+    defaultCapacity: number;
+    timeZone: string;
+  };
+  print: {
+    workers: number;
+    cacheEntries: number;
+    labelsPerPage: number;
+  };
+  startup: {
+    viewCache: boolean;
+    warmup: boolean;
+    warmupTimeoutMs: number;
+    warmShopifyCatalog: boolean;
   };
 };
 
@@ -64,17 +146,86 @@ export const config: AppConfig = {
   },
   session: {
     secret: getEnv('SESSION_SECRET', 'dev-session-secret-change-me'),
+    // prisma: sessions (carts, logins) live in the database, survive restarts and are shared by
+    // all workers; memory: express-session's MemoryStore (single process only)
+    store: getEnv('SESSION_STORE', 'prisma') === 'memory' ? 'memory' : 'prisma',
+    maxAgeMs: toInt(process.env.SESSION_MAX_AGE_HOURS, 24) * 60 * 60 * 1000,
+    // Unchanged sessions only get their expiry pushed forward this often (saves a write per request)
+    touchIntervalMs: toInt(process.env.SESSION_TOUCH_INTERVAL_MS, 10 * 60 * 1000),
+    sweepIntervalMs: toInt(process.env.SESSION_SWEEP_INTERVAL_MS, 15 * 60 * 1000),
+  },
+  cluster: {
+    // Worker processes for `npm run start:cluster`; 0 = one per CPU core
+    workers: toInt(process.env.CLUSTER_WORKERS, 0) || os.availableParallelism(),
+    // Singleton jobs (Shopify sync worker, session sweeper) run on instance 0 only.
+    // NODE_APP_INSTANCE is set by pm2 cluster mode and by src/cluster.ts.
+    runBackgroundJobs: (process.env.NODE_APP_INSTANCE ?? '0') === '0',
+  },
+  db: {
+    // 0 = keep Prisma's default (num_cpus * 2 + 1)
+    poolSize: toInt(process.env.DB_POOL_SIZE, 0),
+    poolTimeoutSec: toInt(process.env.DB_POOL_TIMEOUT, 10),
+    slowQueryMs: toInt(process.env.DB_SLOW_QUERY_MS, 200),
   },
   upload: {
     // Keep it absolute so `fs.existsSync` works reliably no matter where process is started.
     dest: path.resolve(process.cwd(), getEnv('UPLOAD_DEST', './public/uploads')),
     maxSize: toInt(process.env.UPLOAD_MAX_SIZE, 5 * 1024 * 1024), // 5MB
+    // S3 uploads: re-encode images to WebP, longest side capped at maxDimension (needs sharp)
+    recompress: toBool(process.env.UPLOAD_RECOMPRESS, true),
+    maxDimension: toInt(process.env.UPLOAD_MAX_DIMENSION, 1600),
+    webpQuality: toInt(process.env.UPLOAD_WEBP_QUALITY, 80),
   },
   shopify: {
     // Use a safe placeholder so the server can boot even before Shopify is configured.
     storeDomain: getEnv('SHOPIFY_STORE_DOMAIN', 'example.myshopify.com'),
     accessToken: getEnv('SHOPIFY_ADMIN_API_ACCESS_TOKEN', 'YOUR_SHOPIFY_ADMIN_API_ACCESS_TOKEN'),
     apiVersion: getEnv('SHOPIFY_API_VERSION', '2024-01'),
+    // Product catalog cache: fresh for `catalogTtlMs`, then served stale (while refreshing
+    // in the background) until `catalogStaleMs` after the last successful fetch.
+    catalogTtlMs: toInt(process.env.SHOPIFY_CATALOG_TTL_MS, 5 * 60 * 1000),
+    catalogStaleMs: toInt(process.env.SHOPIFY_CATALOG_STALE_MS, 60 * 60 * 1000),
+    // Shopify REST leaky bucket (standard plans: 40 calls, leaking 2/s; Plus: 400 and 20/s)
+    bucketSize: toInt(process.env.SHOPIFY_BUCKET_SIZE, 40),
+    leakRate: toInt(process.env.SHOPIFY_LEAK_RATE, 2),
+    // Override the Admin API base URL (e.g. a local stub server for benchmarks)
+    apiBaseUrl: process.env.SHOPIFY_API_BASE_URL || undefined,
+    // Keep-alive connection pool size for api calls
+    maxSockets: Math.max(1, toInt(process.env.SHOPIFY_MAX_SOCKETS, 8)),
+    maxRetries: toInt(process.env.SHOPIFY_MAX_RETRIES, 3),
+    timeoutMs: toInt(process.env.SHOPIFY_TIMEOUT_MS, 20000),
+  },
+  shopifySync: {
+    // Background worker that drains the ShopifySyncJob outbox
+    enabled: toBool(process.env.SHOPIFY_SYNC_ENABLED, true),
+    concurrency: Math.max(1, toInt(process.env.SHOPIFY_SYNC_CONCURRENCY, 2)),
+    pollIntervalMs: toInt(process.env.SHOPIFY_SYNC_POLL_MS, 2000),
+    maxAttempts: toInt(process.env.SHOPIFY_SYNC_MAX_ATTEMPTS, 10),
+    baseBackoffMs: toInt(process.env.SHOPIFY_SYNC_BACKOFF_MS, 5000),
+    maxBackoffMs: toInt(process.env.SHOPIFY_SYNC_MAX_BACKOFF_MS, 30 * 60 * 1000),
+    // A job stuck in "processing" longer than this (e.g. process crashed) is picked up again
+    lockTimeoutMs: toInt(process.env.SHOPIFY_SYNC_LOCK_TIMEOUT_MS, 5 * 60 * 1000),
+  },
+  inventory: {
+    // Cart checkouts hold stock until the payment is submitted; unpaid orders are cancelled after this
+    holdMinutes: Math.max(1, toInt(process.env.STOCK_HOLD_MINUTES, 30)),
+    sweepIntervalMs: toInt(process.env.STOCK_SWEEP_INTERVAL_MS, 60 * 1000),
+    // Create/refresh StockLevel rows for Shopify variants with inventory tracking
+    trackShopifyInventory: toBool(process.env.STOCK_TRACK_SHOPIFY_INVENTORY, false),
+    reconcileIntervalMs: toInt(process.env.STOCK_RECONCILE_INTERVAL_MS, 10 * 60 * 1000),
+  },
+  routing: {
+    // Delivery route planning: routes start/end at the depot
+    depotAddress: getEnv('ROUTE_DEPOT_ADDRESS', '1 George St, Sydney NSW 2000'),
+    depotLat: toFloat(process.env.ROUTE_DEPOT_LAT, -33.8613),
+    depotLng: toFloat(process.env.ROUTE_DEPOT_LNG, 151.2108),
+    defaultDrivers: Math.max(1, toInt(process.env.ROUTE_DEFAULT_DRIVERS, 1)),
+    // Max stops per driver (0 = unlimited)
+    defaultCapacity: Math.max(0, toInt(process.env.ROUTE_DEFAULT_CAPACITY, 0)),
+    // Geocoding for addresses not yet in GeocodeCache; "none" = only use cached coordinates
+    geocoder: process.env.GOOGLE_MAPS_API_KEY ? 'google' : 'none',
+    googleApiKey: process.env.GOOGLE_MAPS_API_KEY || undefined,
+    geocodeConcurrency: Math.max(1, toInt(process.env.GEOCODE_CONCURRENCY, 4)),
   },
   s3: {
     enabled: toBool(process.env.S3_ENABLED, false),
@@ -87,6 +238,50 @@ export const config: AppConfig = {
     folderPrefix: process.env.S3_FOLDER_PREFIX,
     publicAccess: toBool(process.env.S3_PUBLIC_ACCESS, false),
     publicUrl: process.env.S3_PUBLIC_URL,
+    // S3-compatible endpoint (MinIO, local stub); usually needs path-style addressing
+    endpoint: process.env.S3_ENDPOINT || undefined,
+    forcePathStyle: toBool(process.env.S3_FORCE_PATH_STYLE, !!process.env.S3_ENDPOINT),
+  },
+  imageCache: {
+    // On-disk LRU cache for the S3 image proxy (originals + thumbnails)
+    dir: path.resolve(process.cwd(), getEnv('IMAGE_CACHE_DIR', path.join(os.tmpdir(), 'group-buy-image-cache'))),
+    maxBytes: toInt(process.env.IMAGE_CACHE_MAX_MB, 512) * 1024 * 1024,
+    // Allowed ?w= values; thumbnails are generated for these widths only
+    thumbnailWidths: getEnv('IMAGE_THUMBNAIL_WIDTHS', '160,480')
+      .split(',')
+      .map((w) => Number.parseInt(w.trim(), 10))
+      .filter((w) => Number.isFinite(w) && w > 0),
+  },
+  pageCache: {
+    // Rendered public catalog pages (home, merchants, services), keyed by URL + role.
+    // Dropped on catalog writes; the TTL bounds staleness across separate processes/hosts.
+    enabled: toBool(process.env.PAGE_CACHE_ENABLED, true),
+    ttlMs: toInt(process.env.PAGE_CACHE_TTL_MS, 60 * 1000),
+    maxEntries: toInt(process.env.PAGE_CACHE_MAX_ENTRIES, 500),
+  },
+  serviceSlots: {
+    // Bookings per time slot when the merchant doesn't set one
+    defaultCapacity: Math.max(1, toInt(process.env.SERVICE_SLOT_CAPACITY, 1)),
+    // Slot times are the merchant's local wall-clock time; used to hide slots that have started
+    timeZone: getEnv('SERVICE_TIME_ZONE', 'Australia/Sydney'),
+  },
+  print: {
+    // Worker threads rendering bulk packing slips / labels; 0 = render on the main thread
+    workers: Math.max(0, toInt(process.env.PRINT_WORKERS, Math.min(4, Math.max(1, os.availableParallelism() - 1)))),
+    // Rendered print documents kept in memory (reused until an order in the batch changes)
+    cacheEntries: Math.max(0, toInt(process.env.PRINT_CACHE_ENTRIES, 20)),
+    labelsPerPage: Math.min(30, Math.max(1, toInt(process.env.PRINT_LABELS_PER_PAGE, 8))),
+  },
+  startup: {
+    // Compiled EJS templates kept in memory (Express "view cache"); off in development so edits show up
+    viewCache: toBool(process.env.VIEW_CACHE, env === 'production'),
+    // Load templates, open DB connections and fill caches before listening (see services/warmup.ts)
+    warmup: toBool(process.env.WARMUP_ENABLED, true),
+    // The whole warm-up gives up after this long and the server starts anyway; keep it below
+    // listen_timeout in ecosystem.config.js so pm2 doesn't kill a slow-starting instance
+    warmupTimeoutMs: Math.max(1000, toInt(process.env.WARMUP_TIMEOUT_MS, 20000)),
+    // Prefetch the Shopify product catalog (product images on package pages); only with real credentials
+    warmShopifyCatalog: toBool(process.env.WARMUP_SHOPIFY_CATALOG, Boolean(process.env.SHOPIFY_ADMIN_API_ACCESS_TOKEN)),
   },
 };
 
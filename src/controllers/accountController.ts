@@ -1,7 +1,5 @@
 import { Request, Response } from 'express';
-import { PrismaClient } from '@prisma/client';
-
-const prisma = new PrismaClient();
+import { prisma } from '../db';
 
 export const showAccount = async (req: Request, res: Response) => {
   const userId = req.session.auth?.userId;
@@ -1,6 +1,10 @@
 import { Request, Response } from 'express';
 import { config } from '../config';
 import { shopifyService } from '../services/shopifyService';
+import { getProductNameMappings } from '../utils/productNameMapper';
+import { getPageCacheStats } from '../middlewares/pageCache';
+import { notifyCatalogChanged } from '../services/catalogEvents';
+import { getSearchIndexStats } from '../services/searchIndex';
 
 /**
  * 显示登录页面
@@ -79,7 +83,7 @@ export const showOrderDetail = (req: Request, res: Response) => {
  */
 export const getProducts = async (req: Request, res: Response) => {
   try {
-    const products = await shopifyService.getProducts();
+    const products = await shopifyService.getCachedProducts();
     res.json({ products });
   } catch (error: any) {
     console.error('Error fetching products:', error);
@@ -92,21 +96,16 @@ export const getProducts = async (req: Request, res: Response) => {
  */
 export const getProductsWithTranslations = async (req: Request, res: Response) => {
   try {
-    const { PrismaClient } = await import('@prisma/client');
-    const prisma = new PrismaClient();
-    
     // 获取 Shopify 商品
-    const products = await shopifyService.getProducts();
+    const products = await shopifyService.getCachedProducts();
     
-    // 获取所有映射
-    const mappings = await prisma.productNameMapping.findMany();
-    const mappingMap = new Map(
-      mappings.map(m => [m.shopifyProductId, m.chineseName])
-    );
+    // 获取所有映射（进程内缓存）
+    const mappingMap = await getProductNameMappings();
+    const mappings = Array.from(mappingMap.values());
     
     // 为每个商品添加中文名称
     const productsWithTranslations = products.map(product => {
-      const productChineseName = mappingMap.get(product.id.toString()) || product.title;
+      const productChineseName = mappingMap.get(product.id.toString())?.chineseName || product.title;
       return {
         ...product,
         chineseTitle: productChineseName,
@@ -123,7 +122,6 @@ export const getProductsWithTranslations = async (req: Request, res: Response) =
       };
     });
     
-    await prisma.$disconnect();
     res.json({ products: productsWithTranslations, mappings });
   } catch (error: any) {
     console.error('Error fetching products with translations:', error);
@@ -131,3 +129,56 @@ export const getProductsWithTranslations = async (req: Request, res: Response) =
   }
 };
 
+
+/**
+ * 商品目录缓存统计（命中/未命中/刷新耗时）
+ */
+export const getProductCacheStats = (req: Request, res: Response) => {
+  res.json({ cache: shopifyService.getCatalogCacheStats() });
+};
+
+/**
+ * 使商品目录缓存失效（Shopify 后台改了商品/图片后手动刷新）
+ * ?refresh=1 时立即重新拉取，否则在下次访问时拉取
+ */
+export const invalidateProductCache = async (req: Request, res: Response) => {
+  try {
+    shopifyService.invalidateProductCache();
+    if (req.query.refresh === '1' || req.body?.refresh === true) {
+      await shopifyService.getCachedProducts({ forceRefresh: true });
+    }
+    res.json({ success: true, cache: shopifyService.getCatalogCacheStats() });
+  } catch (error: any) {
+    console.error('Error refreshing product cache:', error);
+    res.status(502).json({ error: '刷新商品缓存失败: ' + error.message });
+  }
+};
+
+/**
+ * 前台页面缓存统计（首页、商家、服务列表）
+ */
+export const getPageCacheStatus = (req: Request, res: Response) => {
+  res.json({ cache: getPageCacheStats() });
+};
+
+/**
+ * 清空前台页面缓存（所有进程）
+ */
+export const invalidatePageCache = (req: Request, res: Response) => {
+  notifyCatalogChanged('admin');
+  res.json({ success: true, cache: getPageCacheStats() });
+};
+
+/**
+ * 搜索索引统计（文档数、词条数、最近一次构建耗时）
+ */
+export const getSearchIndexStatus = (req: Request, res: Response) => {
+  res.json({ index: getSearchIndexStats() });
+};
+
+/**
+ * Shopify API 调用统计（按接口的延迟分布、重试、连接池、限流）
+ */
+export const getShopifyHttpStats = (req: Request, res: Response) => {
+  res.json({ http: shopifyService.getHttpStats(), catalog: shopifyService.getCatalogCacheStats() });
+};
@@ -1,10 +1,8 @@
 import { Request, Response } from 'express';
-import { PrismaClient } from '@prisma/client';
+import { prisma } from '../db';
 import { config } from '../config';
 import { hashPassword, verifyPassword } from '../utils/password';
 
-const prisma = new PrismaClient();
-
 type Role = 'USER' | 'MERCHANT' | 'ADMIN';
 
 function normalizeEmail(email: string) {
@@ -1,8 +1,10 @@
 import type { Request, Response } from 'express';
-import { PrismaClient } from '@prisma/client';
-import { mapProductNames } from '../utils/productNameMapper';
-
-const prisma = new PrismaClient();
+import type { Prisma } from '@prisma/client';
+import { prisma } from '../db';
+import { mapProductNameLists } from '../utils/productNameMapper';
+import { buildOrderItemRows, parseDeliveryDate } from '../utils/orderItems';
+import { createOrderWithStock, InsufficientStockError, stockRequestsFor } from '../services/inventoryService';
+import { applyOrderToStats, orderRevenueCents } from '../services/merchantStatsService';
 
 function getCart(req: Request) {
   if (!req.session.cart) req.session.cart = { items: {} };
@@ -48,41 +50,43 @@ export const showCartPage = async (req: Request, res: Response) => {
     return new Date(b.updatedAt).getTime() - new Date(a.updatedAt).getTime();
   });
 
-  const cartPackages = await Promise.all(
-    packagesSorted.map(async (pkg) => {
-      const qty = cart.items[pkg.id] || 0;
-      const itemsRaw = (() => {
-        try {
-          return JSON.parse(pkg.itemsJson || '[]');
-        } catch {
-          return [];
-        }
-      })();
-      const items = await mapProductNames(itemsRaw);
-      const deliveryDates = pkg.deliveryDatesJson ? (() => {
-        try {
-          return JSON.parse(pkg.deliveryDatesJson);
-        } catch {
-          return null;
-        }
-      })() : null;
-      return {
-        id: pkg.id,
-        name: pkg.name,
-        description: pkg.description,
-        price: pkg.price,
-        originalPrice: pkg.originalPrice,
-        imageUrl: pkg.imageUrl,
-        region: pkg.region,
-        qty,
-        items,
-        deliveryDates,
-        subtotal: Number.parseFloat(String(pkg.price)) * qty,
-        originalSubtotal: pkg.originalPrice ? Number.parseFloat(String(pkg.originalPrice)) * qty : 0,
-      };
+  // 整个购物车一次映射中文名称（进程内缓存，不逐个套餐查库）
+  const mappedItemLists = await mapProductNameLists(
+    packagesSorted.map((pkg) => {
+      try {
+        return JSON.parse(pkg.itemsJson || '[]');
+      } catch {
+        return [];
+      }
     })
   );
 
+  const cartPackages = packagesSorted.map((pkg, index) => {
+    const qty = cart.items[pkg.id] || 0;
+    const items = mappedItemLists[index];
+    const deliveryDates = pkg.deliveryDatesJson ? (() => {
+      try {
+        return JSON.parse(pkg.deliveryDatesJson);
+      } catch {
+        return null;
+      }
+    })() : null;
+    return {
+      id: pkg.id,
+      name: pkg.name,
+      description: pkg.description,
+      price: pkg.price,
+      originalPrice: pkg.originalPrice,
+      imageUrl: pkg.imageUrl,
+      region: pkg.region,
+      qty,
+      items,
+      deliveryDates,
+      subtotal: Number.parseFloat(String(pkg.price)) * qty,
+      originalSubtotal: pkg.originalPrice ? Number.parseFloat(String(pkg.originalPrice)) * qty : 0,
+    };
+  });
+
   const allowedDeliveryDatesSet = new Set<string>();
   for (const p of cartPackages) {
     if (p.qty > 0 && p.deliveryDates && Array.isArray(p.deliveryDates)) {
@@ -202,17 +206,21 @@ export const checkoutCart = async (req: Request, res: Response) => {
     orderRegion = pkg?.region || null;
   }
 
-  for (const pkg of packages) {
+  const mappedItemLists = await mapProductNameLists(
+    packages.map((pkg) => {
+      try {
+        return JSON.parse(pkg.itemsJson || '[]');
+      } catch {
+        return [];
+      }
+    })
+  );
+
+  for (const [index, pkg] of packages.entries()) {
     const qty = cart.items[pkg.id] || 0;
     if (qty <= 0) continue;
 
-    let pkgItemsRaw: any[] = [];
-    try {
-      pkgItemsRaw = JSON.parse(pkg.itemsJson || '[]');
-    } catch {
-      pkgItemsRaw = [];
-    }
-    const pkgItems = await mapProductNames(pkgItemsRaw);
+    const pkgItems = mappedItemLists[index];
     const totalItemsInPkg = pkgItems.reduce((sum: number, it: any) => sum + Number(it.quantity || 0), 0);
     const totalPkgPrice = Number.parseFloat(String(pkg.price));
     const pricePerItem = totalItemsInPkg > 0 ? totalPkgPrice / totalItemsInPkg : 0;
@@ -228,22 +236,49 @@ export const checkoutCart = async (req: Request, res: Response) => {
     }
   }
 
-  const order = await prisma.order.create({
-    data: {
-      customerName,
-      phone,
-      address,
-      deliveryTime,
-      itemsJson: JSON.stringify(items),
-      packageId: singlePackageId,
-      region: orderRegion,
-      paymentMethod: 'transfer', // chosen on payment page later
-      paymentScreenshotPath: null,
-      optionalNote: optionalNote || null,
-      internalStatus: 'new',
-      userId,
-    },
-  });
+  // 套餐名额 + 变体库存：与订单在同一事务内预留，付款前为临时占用（超时自动取消订单并归还）
+  const stockRequests = stockRequestsFor(
+    packages.filter((pkg) => (cart.items[pkg.id] || 0) > 0).map((pkg) => ({ id: pkg.id, name: pkg.name, quantity: cart.items[pkg.id] })),
+    items
+  );
+
+  // 所有套餐属于同一商家时记录 merchantId（评价、商家汇总按它归属）
+  const orderMerchantIds = new Set(packages.filter((pkg) => (cart.items[pkg.id] || 0) > 0).map((pkg) => pkg.merchantId));
+  const orderMerchantId = orderMerchantIds.size === 1 ? Array.from(orderMerchantIds)[0] : null;
+
+  const deliveryDate = parseDeliveryDate(deliveryTime);
+  const lineItemRows = buildOrderItemRows(items, { deliveryDate, region: orderRegion });
+  const createOrder = async (tx: Prisma.TransactionClient) => {
+    const created = await tx.order.create({
+      data: {
+        customerName,
+        phone,
+        address,
+        deliveryTime,
+        deliveryDate,
+        itemsJson: JSON.stringify(items),
+        lineItems: { create: lineItemRows },
+        packageId: singlePackageId,
+        region: orderRegion,
+        merchantId: orderMerchantId,
+        paymentMethod: 'transfer', // chosen on payment page later
+        paymentScreenshotPath: null,
+        optionalNote: optionalNote || null,
+        internalStatus: 'new',
+        userId,
+      },
+    });
+    await applyOrderToStats(tx, { ...created, revenueCents: orderRevenueCents(lineItemRows) }, 1);
+    return created;
+  };
+
+  let order: Awaited<ReturnType<typeof createOrder>>;
+  try {
+    order = await createOrderWithStock(stockRequests, createOrder, { hold: true });
+  } catch (error) {
+    if (error instanceof InsufficientStockError) return res.status(409).send(error.message);
+    throw error;
+  }
 
   // Clear cart after placing order
   cart.items = {};
@@ -1,10 +1,8 @@
 import { Request, Response } from 'express';
 import crypto from 'crypto';
-import { PrismaClient } from '@prisma/client';
+import { prisma } from '../db';
 import { config } from '../config';
 
-const prisma = new PrismaClient();
-
 function randomToken(bytes = 16) {
   return crypto.randomBytes(bytes).toString('hex');
 }
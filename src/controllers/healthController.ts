@@ -0,0 +1,17 @@
+import { Request, Response } from 'express';
+import { isReady } from '../services/warmup';
+
+/**
+ * 存活检查：进程在运行即返回 200（不访问数据库）
+ */
+export const getHealth = (req: Request, res: Response) => {
+  res.json({ status: 'ok', uptimeSec: Math.round(process.uptime()) });
+};
+
+/**
+ * 就绪检查：启动预热完成后返回 200；预热前、关闭中返回 503（负载均衡 / pm2 据此切流量）
+ */
+export const getReadiness = (req: Request, res: Response) => {
+  if (!isReady()) return res.status(503).json({ status: 'not_ready' });
+  return res.json({ status: 'ready' });
+};
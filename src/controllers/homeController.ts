@@ -1,41 +1,45 @@
 import { Request, Response } from 'express';
-import { PrismaClient } from '@prisma/client';
-
-const prisma = new PrismaClient();
+import { prisma } from '../db';
+import { cachedFragment } from '../middlewares/pageCache';
 
 export const showHome = async (req: Request, res: Response) => {
   try {
-    const hotPackages = await prisma.package.findMany({
-      where: { isActive: true },
-      orderBy: [{ sortOrder: 'asc' }, { updatedAt: 'desc' }],
-      take: 5,
-      select: {
-        id: true,
-        name: true,
-        description: true,
-        price: true,
-        originalPrice: true,
-        region: true,
-        imageUrl: true,
-        createdAt: true,
-      },
-    });
+    // 首页各角色版本（导航不同）共用同一份查询结果，目录变更时随页面缓存一起失效
+    const hotPackages = await cachedFragment('home:hotPackages', () =>
+      prisma.package.findMany({
+        where: { isActive: true },
+        orderBy: [{ sortOrder: 'asc' }, { updatedAt: 'desc' }],
+        take: 5,
+        select: {
+          id: true,
+          name: true,
+          description: true,
+          price: true,
+          originalPrice: true,
+          region: true,
+          imageUrl: true,
+          createdAt: true,
+        },
+      })
+    );
 
-    const hotServices = await prisma.service.findMany({
-      where: { isActive: true },
-      orderBy: [{ sortOrder: 'asc' }, { updatedAt: 'desc' }],
-      take: 5,
-      select: {
-        id: true,
-        name: true,
-        description: true,
-        price: true,
-        durationMins: true,
-        imageUrl: true,
-        createdAt: true,
-        updatedAt: true,
-      },
-    });
+    const hotServices = await cachedFragment('home:hotServices', () =>
+      prisma.service.findMany({
+        where: { isActive: true },
+        orderBy: [{ sortOrder: 'asc' }, { updatedAt: 'desc' }],
+        take: 5,
+        select: {
+          id: true,
+          name: true,
+          description: true,
+          price: true,
+          durationMins: true,
+          imageUrl: true,
+          createdAt: true,
+          updatedAt: true,
+        },
+      })
+    );
 
     res.render('public/home', {
       hotPackages,
@@ -1,26 +1,31 @@
 import { Request, Response } from 'express';
-import { S3Client, GetObjectCommand } from '@aws-sdk/client-s3';
-import { config } from '../config';
+import { getOriginal, getThumbnail, imageCache, isThumbnailWidth, getImageCacheStats } from '../services/imageService';
+import type { DiskCacheEntry } from '../utils/diskLruCache';
 
-// 初始化 S3 客户端
-const s3Client = new S3Client({
-  region: config.s3.region,
-  credentials: config.s3.accessKeyId && config.s3.secretAccessKey ? {
-    accessKeyId: config.s3.accessKeyId,
-    secretAccessKey: config.s3.secretAccessKey,
-  } : undefined,
-});
+// 对象键带时间戳+随机数，内容不会变化：浏览器可长期缓存，过期后用 ETag 协商
+const CACHE_CONTROL = 'public, max-age=86400';
+
+function sendCached(res: Response, entry: DiskCacheEntry): Promise<void> {
+  return new Promise((resolve, reject) => {
+    // send 模块会沿用已设置的 ETag / Content-Type / Cache-Control，并处理 If-None-Match(304) 和 Range(206)
+    res.setHeader('ETag', entry.etag);
+    res.setHeader('Content-Type', entry.contentType);
+    res.setHeader('Cache-Control', CACHE_CONTROL);
+    res.sendFile(entry.file, { dotfiles: 'allow', lastModified: false }, (err) => (err ? reject(err) : resolve()));
+  });
+}
 
 /**
  * 代理 S3 图片（仅允许后端访问 S3，前端通过后端获取图片）
- * 路由格式：/api/images/s3/:key
- * key 格式：uploads/timestamp-random.ext
+ * 路由格式：/api/images/s3/:key[?w=160]
+ * key 格式：uploads/timestamp-random.ext；w 为缩略图宽度（须为 IMAGE_THUMBNAIL_WIDTHS 之一）
+ * 图片缓存在本地磁盘（LRU，有容量上限），支持 ETag/304 和 Range
  */
 export const proxyS3Image = async (req: Request, res: Response) => {
   try {
     // 从路径参数获取 S3 key
     const key = req.params.key;
-    
+
     if (!key) {
       return res.status(400).json({ error: '缺少文件路径' });
     }
@@ -30,40 +35,43 @@ export const proxyS3Image = async (req: Request, res: Response) => {
       return res.status(400).json({ error: '无效的文件路径' });
     }
 
-    // 从 S3 获取文件
-    const command = new GetObjectCommand({
-      Bucket: config.s3.bucket,
-      Key: key,
-    });
-
-    const s3Response = await s3Client.send(command);
-
-    // 设置响应头
-    if (s3Response.ContentType) {
-      res.setHeader('Content-Type', s3Response.ContentType);
-    }
-    if (s3Response.ContentLength) {
-      res.setHeader('Content-Length', s3Response.ContentLength.toString());
+    let width: number | undefined;
+    if (req.query.w !== undefined) {
+      width = Number(req.query.w);
+      if (!isThumbnailWidth(width)) {
+        return res.status(400).json({ error: '不支持的缩略图尺寸' });
+      }
     }
-    
-    // 设置缓存头（可选）
-    res.setHeader('Cache-Control', 'public, max-age=3600'); // 缓存1小时
 
-    // 将 S3 文件流传输到响应
-    if (s3Response.Body) {
-      // @ts-ignore - Body 可能是 ReadableStream
-      s3Response.Body.pipe(res);
-    } else {
-      return res.status(404).json({ error: '文件不存在' });
+    const load = () => (width ? getThumbnail(key, width) : getOriginal(key));
+    const entry = await load();
+    try {
+      await sendCached(res, entry);
+    } catch (sendError: any) {
+      // 发送前文件被淘汰：删除索引后重新回源一次
+      if (sendError.code !== 'ENOENT' || res.headersSent) throw sendError;
+      await imageCache.delete(entry.key);
+      await sendCached(res, await load());
     }
   } catch (error: any) {
+    if (res.headersSent) {
+      // 客户端中途断开等
+      return;
+    }
     console.error('代理 S3 图片失败:', error);
-    
+    for (const header of ['ETag', 'Content-Type', 'Cache-Control']) res.removeHeader(header);
+
     if (error.name === 'NoSuchKey' || error.$metadata?.httpStatusCode === 404) {
       return res.status(404).json({ error: '文件不存在' });
     }
-    
+
     return res.status(500).json({ error: '获取图片失败' });
   }
 };
 
+/**
+ * 图片缓存统计（管理后台）
+ */
+export const getImageCacheStatus = async (_req: Request, res: Response) => {
+  res.json(getImageCacheStats());
+};
@@ -1,8 +1,10 @@
 import { Request, Response } from 'express';
-import { PrismaClient } from '@prisma/client';
+import { prisma, withRetryingTransaction } from '../db';
 import crypto from 'crypto';
-
-const prisma = new PrismaClient();
+import { notifyCatalogChanged } from '../services/catalogEvents';
+import { getMerchantDailyStats, getMerchantStats, refreshCatalogStats } from '../services/merchantStatsService';
+import { config } from '../config';
+import { buildServiceSlotRows, parseSlotLabels } from '../utils/serviceSlots';
 
 function buildStoredImageUrl(file: Express.Multer.File | undefined): string | null {
   if (!file) return null;
@@ -95,8 +97,10 @@ export const onboardToMerchant = async (req: Request, res: Response) => {
         description: String(req.body.description || '').trim() || null,
         address: String(req.body.address || '').trim() || null,
         openHours: String(req.body.openHours || '').trim() || null,
+        stats: { create: {} },
       },
     });
+    notifyCatalogChanged('merchant created');
   }
 
   await prisma.user.update({ where: { id: user.id }, data: { role: 'MERCHANT' } });
@@ -116,16 +120,21 @@ export const showMerchantUpgrade = async (req: Request, res: Response) => {
   return res.render('merchant/upgrade', { error: null, form: {} });
 };
 
+const DASHBOARD_STATS_DAYS = 14;
+
 export const showMerchantDashboard = async (req: Request, res: Response) => {
   const merchant = await getMyMerchant(req);
   if (!merchant) return res.status(403).send('Merchant profile not found');
 
-  const [packages, services] = await Promise.all([
+  // 汇总数字读 MerchantStats / MerchantDailyStats（写入时维护），不再按订单 / 评价现场聚合
+  const [packages, services, stats, dailyStats] = await Promise.all([
     prisma.package.findMany({ where: { merchantId: merchant.id }, orderBy: { updatedAt: 'desc' }, take: 100 }),
     prisma.service.findMany({ where: { merchantId: merchant.id }, orderBy: { updatedAt: 'desc' }, take: 100 }),
+    getMerchantStats(merchant.id),
+    getMerchantDailyStats(merchant.id, DASHBOARD_STATS_DAYS),
   ]);
 
-  res.render('merchant/dashboard', { merchant, packages, services, error: null });
+  res.render('merchant/dashboard', { merchant, packages, services, stats, dailyStats, statsDays: DASHBOARD_STATS_DAYS, error: null });
 };
 
 export const updateMerchantProfile = async (req: Request, res: Response) => {
@@ -149,6 +158,7 @@ export const updateMerchantProfile = async (req: Request, res: Response) => {
   };
 
   await prisma.merchant.update({ where: { id: merchant.id }, data });
+  notifyCatalogChanged('merchant updated');
   return res.redirect('/merchant/dashboard');
 };
 
@@ -172,21 +182,25 @@ export const createMerchantPackage = async (req: Request, res: Response) => {
     return res.status(400).send('Missing delivery time options.');
   }
 
-  await prisma.package.create({
-    data: {
-      name,
-      price,
-      description: String(req.body.description || '').trim() || null,
-      originalPrice: String(req.body.originalPrice || '').trim() || null,
-      region: String(req.body.region || '').trim() || null,
-      imageUrl: finalImageUrl,
-      isActive: String(req.body.isActive || '') === 'on',
-      sortOrder: Number(req.body.sortOrder || 0) || 0,
-      itemsJson: String(req.body.itemsJson || '[]'),
-      deliveryDatesJson: JSON.stringify(deliveryDatesParsed),
-      merchantId: merchant.id,
-    },
+  await withRetryingTransaction(async (tx) => {
+    await tx.package.create({
+      data: {
+        name,
+        price,
+        description: String(req.body.description || '').trim() || null,
+        originalPrice: String(req.body.originalPrice || '').trim() || null,
+        region: String(req.body.region || '').trim() || null,
+        imageUrl: finalImageUrl,
+        isActive: String(req.body.isActive || '') === 'on',
+        sortOrder: Number(req.body.sortOrder || 0) || 0,
+        itemsJson: String(req.body.itemsJson || '[]'),
+        deliveryDatesJson: JSON.stringify(deliveryDatesParsed),
+        merchantId: merchant.id,
+      },
+    });
+    await refreshCatalogStats(tx, [merchant.id]);
   });
+  notifyCatalogChanged('package created');
   return res.redirect('/merchant/dashboard');
 };
 
@@ -196,7 +210,11 @@ export const deleteMerchantPackage = async (req: Request, res: Response) => {
   const id = String(req.params.id || '');
   const pkg = await prisma.package.findUnique({ where: { id } });
   if (!pkg || pkg.merchantId !== merchant.id) return res.status(404).send('Not found');
-  await prisma.package.delete({ where: { id } });
+  await withRetryingTransaction(async (tx) => {
+    await tx.package.delete({ where: { id } });
+    await refreshCatalogStats(tx, [merchant.id]);
+  });
+  notifyCatalogChanged('package deleted');
   return res.redirect('/merchant/dashboard');
 };
 
@@ -211,19 +229,31 @@ export const createMerchantService = async (req: Request, res: Response) => {
   const imageUrlFromInput = String((req.body as any).imageUrl || '').trim() || null;
   const finalImageUrl = uploadedImageUrl || imageUrlFromInput || null;
 
-  await prisma.service.create({
-    data: {
-      name,
-      description: String(req.body.description || '').trim() || null,
-      price: String(req.body.price || '').trim() || null,
-      durationMins: req.body.durationMins ? Number(req.body.durationMins) : null,
-      timeSlotsJson: String(req.body.timeSlotsJson || '').trim() || null,
-      imageUrl: finalImageUrl,
-      isActive: String(req.body.isActive || '') === 'on',
-      sortOrder: Number(req.body.sortOrder || 0) || 0,
-      merchantId: merchant.id,
-    },
+  const durationMins = req.body.durationMins ? Number(req.body.durationMins) : null;
+  const timeSlotsJson = String(req.body.timeSlotsJson || '').trim() || null;
+  const slotCapacity = Math.floor(Number(req.body.slotCapacity)) || config.serviceSlots.defaultCapacity;
+
+  await withRetryingTransaction(async (tx) => {
+    await tx.service.create({
+      data: {
+        name,
+        description: String(req.body.description || '').trim() || null,
+        price: String(req.body.price || '').trim() || null,
+        durationMins,
+        timeSlotsJson,
+        imageUrl: finalImageUrl,
+        isActive: String(req.body.isActive || '') === 'on',
+        sortOrder: Number(req.body.sortOrder || 0) || 0,
+        merchantId: merchant.id,
+        // 时段写入 ServiceSlot（容量、已预约数），预约时按表占用名额
+        slots: {
+          create: buildServiceSlotRows(parseSlotLabels(timeSlotsJson), { durationMins, merchantId: merchant.id }, slotCapacity),
+        },
+      },
+    });
+    await refreshCatalogStats(tx, [merchant.id]);
   });
+  notifyCatalogChanged('service created');
   return res.redirect('/merchant/dashboard');
 };
 
@@ -233,7 +263,11 @@ export const deleteMerchantService = async (req: Request, res: Response) => {
   const id = String(req.params.id || '');
   const svc = await prisma.service.findUnique({ where: { id } });
   if (!svc || svc.merchantId !== merchant.id) return res.status(404).send('Not found');
-  await prisma.service.delete({ where: { id } });
+  await withRetryingTransaction(async (tx) => {
+    await tx.service.delete({ where: { id } });
+    await refreshCatalogStats(tx, [merchant.id]);
+  });
+  notifyCatalogChanged('service deleted');
   return res.redirect('/merchant/dashboard');
 };
 
@@ -270,12 +304,11 @@ export const showMerchantServiceDetail = async (req: Request, res: Response) =>
   const svc = await prisma.service.findUnique({ where: { id } });
   if (!svc || svc.merchantId !== merchant.id) return res.status(404).send('Not found');
 
-  let timeSlots: string[] = [];
-  try {
-    timeSlots = svc.timeSlotsJson ? JSON.parse(svc.timeSlotsJson) : [];
-  } catch {
-    timeSlots = [];
-  }
+  const timeSlots = await prisma.serviceSlot.findMany({
+    where: { serviceId: svc.id },
+    orderBy: { startsAt: 'asc' },
+    select: { id: true, label: true, capacity: true, bookedCount: true },
+  });
 
   return res.render('merchant/service-detail', { merchant, svc, timeSlots });
 };
@@ -1,13 +1,30 @@
-import { PrismaClient } from '@prisma/client';
+import { prisma } from '../db';
+import { searchCatalog } from '../services/searchIndex';
+import { summarize } from '../services/merchantStatsService';
+import type { MerchantStats } from '@prisma/client';
 import type { Request, Response } from 'express';
 
-const prisma = new PrismaClient();
-
 function toInt(value: unknown, fallback: number): number {
   const n = Number.parseInt(String(value ?? ''), 10);
   return Number.isFinite(n) ? n : fallback;
 }
 
+// Counts / rating come from the MerchantStats rollup row (maintained on write), not _count
+const listInclude = { stats: true } as const;
+
+function withStats<T extends { stats: MerchantStats | null }>(merchant: T) {
+  return { ...merchant, stats: merchant.stats ? summarize(merchant.stats) : null };
+}
+
+// Ranked by the in-process search index; only the requested page is loaded from the DB
+async function searchMerchants(q: string, skip: number, limit: number) {
+  const hits = await searchCatalog(q, { type: 'merchant' });
+  const ids = hits.slice(skip, skip + limit).map((hit) => hit.id);
+  const rows = await prisma.merchant.findMany({ where: { id: { in: ids }, isActive: true }, include: listInclude });
+  const byId = new Map(rows.map((row) => [row.id, row]));
+  return [ids.flatMap((id) => byId.get(id) || []), hits.length] as const;
+}
+
 export const showMerchantSearch = async (req: Request, res: Response) => {
   const qRaw = String(req.query.q || '').trim();
   const q = qRaw.length ? qRaw.slice(0, 80) : '';
@@ -15,37 +32,24 @@ export const showMerchantSearch = async (req: Request, res: Response) => {
   const limit = Math.min(50, Math.max(1, toInt(req.query.limit, 12)));
   const skip = (page - 1) * limit;
 
-  const baseWhere = { isActive: true } as const;
-
-  const where = q
-    ? {
-        ...baseWhere,
-        OR: [
-          { name: { contains: q } },
-          { description: { contains: q } },
-          { address: { contains: q } },
-        ],
-      }
-    : baseWhere;
+  const where = { isActive: true } as const;
 
-  const [merchants, total] = await Promise.all([
-    prisma.merchant.findMany({
-      where,
-      include: {
-        _count: { select: { packages: true, services: true } },
-      },
-      skip,
-      take: limit,
-      orderBy: q
-        ? [{ updatedAt: 'desc' }]
-        : [
-            { packages: { _count: 'desc' } },
-            { services: { _count: 'desc' } },
+  const [merchants, total] = q
+    ? await searchMerchants(q, skip, limit)
+    : await Promise.all([
+        prisma.merchant.findMany({
+          where,
+          include: listInclude,
+          skip,
+          take: limit,
+          orderBy: [
+            { stats: { activePackages: 'desc' } },
+            { stats: { activeServices: 'desc' } },
             { updatedAt: 'desc' },
           ],
-    }),
-    prisma.merchant.count({ where }),
-  ]);
+        }),
+        prisma.merchant.count({ where }),
+      ]);
 
   const totalPages = Math.max(1, Math.ceil(total / limit));
   const qs = new URLSearchParams();
@@ -54,7 +58,7 @@ export const showMerchantSearch = async (req: Request, res: Response) => {
 
   res.render('public/merchants', {
     q,
-    merchants,
+    merchants: merchants.map(withStats),
     pagination: { page, limit, total, totalPages },
     queryString: qs.toString(),
   });
@@ -66,9 +70,7 @@ export const showMerchantDetail = async (req: Request, res: Response) => {
 
   const merchant = await prisma.merchant.findUnique({
     where: { id },
-    include: {
-      _count: { select: { packages: true, services: true } },
-    },
+    include: listInclude,
   });
   if (!merchant || !merchant.isActive) return res.status(404).send('Merchant not found');
 
@@ -85,6 +87,6 @@ export const showMerchantDetail = async (req: Request, res: Response) => {
     }),
   ]);
 
-  res.render('public/merchant-detail', { merchant, packages, services });
+  res.render('public/merchant-detail', { merchant: withStats(merchant), packages, services });
 };
 
@@ -0,0 +1,29 @@
+import { Request, Response } from 'express';
+import { getDbMetrics, resetDbMetrics } from '../utils/dbMetrics';
+import { getEventLoopMetrics, resetEventLoopMetrics } from '../utils/eventLoopMetrics';
+import { getStartupMetrics } from '../services/warmup';
+
+/**
+ * Per-route DB metrics (query count, duration distribution, slow queries) + process memory,
+ * event-loop lag and startup (warm-up steps, first-request latency).
+ */
+export const getMetrics = (req: Request, res: Response) => {
+  const memory = process.memoryUsage();
+  res.json({
+    process: {
+      pid: process.pid,
+      uptimeSec: Math.round(process.uptime()),
+      rssMb: Math.round(memory.rss / 1024 / 1024),
+      heapUsedMb: Math.round(memory.heapUsed / 1024 / 1024),
+      eventLoopLag: getEventLoopMetrics(),
+      startup: getStartupMetrics(),
+    },
+    db: getDbMetrics(),
+  });
+};
+
+export const resetMetrics = (req: Request, res: Response) => {
+  resetDbMetrics();
+  resetEventLoopMetrics();
+  res.json({ success: true });
+};
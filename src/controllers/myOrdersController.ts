@@ -1,8 +1,7 @@
 import type { Request, Response } from 'express';
-import { PrismaClient } from '@prisma/client';
+import { prisma } from '../db';
 import { config } from '../config';
-
-const prisma = new PrismaClient();
+import { orderItemsOf, orderLineItemsQuery } from '../utils/orderItems';
 
 function toS3ProxyUrl(p: string | null): string | null {
   if (!p) return null;
@@ -39,6 +38,7 @@ export const showMyOrdersPage = async (req: Request, res: Response) => {
         address: true,
         deliveryTime: true,
         itemsJson: true,
+        lineItems: orderLineItemsQuery,
         paymentMethod: true,
         paymentScreenshotPath: true,
         internalStatus: true,
@@ -48,19 +48,11 @@ export const showMyOrdersPage = async (req: Request, res: Response) => {
       take: 50,
     });
 
-    const ordersWithItems = orders.map((o) => {
-      let items: any[] = [];
-      try {
-        items = JSON.parse(o.itemsJson || '[]');
-      } catch {
-        items = [];
-      }
-      return {
-        ...o,
-        items,
-        paymentScreenshotPath: toS3ProxyUrl(o.paymentScreenshotPath),
-      };
-    });
+    const ordersWithItems = orders.map(({ lineItems, ...o }) => ({
+      ...o,
+      items: orderItemsOf({ lineItems, itemsJson: o.itemsJson }),
+      paymentScreenshotPath: toS3ProxyUrl(o.paymentScreenshotPath),
+    }));
 
     return res.render('public/query-order', {
       userEmail: user?.email || '',
@@ -1,10 +1,29 @@
 import { Request, Response } from 'express';
-import { PrismaClient } from '@prisma/client';
+import type { Prisma } from '@prisma/client';
+import { prisma } from '../db';
 import { shopifyService } from '../services/shopifyService';
+import { shopifySyncWorker } from '../services/shopifySyncWorker';
+import {
+  createOrderWithStock,
+  InsufficientStockError,
+  releaseReservations,
+  restoreReservations,
+  stockRequestsFor,
+  withStockTransaction,
+} from '../services/inventoryService';
 import { config } from '../config';
+import { applyOrderToStats, applyReviewToStats, loadOrderFacts, orderRevenueCents } from '../services/merchantStatsService';
 import { getS3PresignedUrl, getS3PublicUrl } from '../services/s3Service';
-
-const prisma = new PrismaClient();
+import { getProductNameMappings } from '../utils/productNameMapper';
+import {
+  buildOrderItemRows,
+  deliveryDateRange,
+  orderItemsOf,
+  orderLineItemsQuery,
+  parseDeliveryDate,
+  toCents,
+} from '../utils/orderItems';
+import { afterCursorDesc, CountCache, decodeCursor, encodeCursor, type KeysetCursor } from '../utils/pagination';
 
 /**
  * 处理订单中的图片路径：如果是 S3 key，转换为后端代理 URL
@@ -31,6 +50,24 @@ async function processOrderImagePath(path: string | null): Promise<string | null
   return path;
 }
 
+/**
+ * 列表用缩略图 URL：代理图片加上最小的缩略图宽度，其它（本地/公开 URL）及未配置缩略图宽度时原样返回
+ */
+function toThumbnailUrl(url: string | null): string | null {
+  const widths = config.imageCache.thumbnailWidths;
+  if (!url || !url.startsWith('/api/images/s3/') || widths.length === 0) return url;
+  return `${url}?w=${Math.min(...widths)}`;
+}
+
+/**
+ * CSV 单元格：必要时加引号；以 = + - @（及制表符/回车）开头的文本前加 '，防止 Excel 当作公式执行
+ */
+function csvCell(value: unknown): string {
+  let text = value === null || value === undefined ? '' : String(value);
+  if (typeof value === 'string' && /^[=+\-@\t\r]/.test(text)) text = `'${text}`;
+  return /[",\r\n]/.test(text) ? `"${text.replace(/"/g, '""')}"` : text;
+}
+
 interface OrderItem {
   title: string;
   price: string;
@@ -53,6 +90,21 @@ interface CreateOrderRequest extends Request {
   file?: Express.Multer.File;
 }
 
+/**
+ * 下单的套餐份数：提交的商品总数 / 套餐内商品总数（至少 1 份）
+ */
+function packageQuantity(packageItemsJson: string, items: OrderItem[]): number {
+  let perPackage = 0;
+  try {
+    const packageItems = JSON.parse(packageItemsJson);
+    if (Array.isArray(packageItems)) perPackage = packageItems.reduce((sum, it) => sum + (Number(it?.quantity) || 0), 0);
+  } catch {
+    perPackage = 0;
+  }
+  const ordered = items.reduce((sum, it) => sum + (Number(it.quantity) || 0), 0);
+  return perPackage > 0 ? Math.max(1, Math.round(ordered / perPackage)) : 1;
+}
+
 /**
  * 创建订单
  */
@@ -118,127 +170,169 @@ export const createOrder = async (req: CreateOrderRequest, res: Response) => {
 
     // 获取套餐的大区信息（如果订单关联了套餐）
     let orderRegion: string | null = null;
+    let orderMerchantId: string | null = null;
     const { packageId } = req.body;
+    const orderedPackages: Array<{ id: string; name: string; quantity: number }> = [];
     if (packageId) {
       const packageData = await prisma.package.findUnique({
         where: { id: packageId },
-        select: { region: true },
+        select: { id: true, name: true, region: true, itemsJson: true, merchantId: true },
       });
       if (packageData?.region) {
         orderRegion = packageData.region;
       }
+      orderMerchantId = packageData?.merchantId || null;
+      if (packageData) {
+        orderedPackages.push({ id: packageData.id, name: packageData.name, quantity: packageQuantity(packageData.itemsJson, itemsArray) });
+      }
     }
 
-    // 创建本地订单记录
-    const order = await prisma.order.create({
-      data: {
-        customerName,
-        phone,
-        address,
-        deliveryTime,
-        itemsJson: JSON.stringify(itemsArray),
-        packageId: packageId || null,
-        region: orderRegion,
-        paymentMethod: finalPaymentMethod,
-        paymentScreenshotPath: screenshotPath,
-        optionalNote: optionalNote || null,
-        internalStatus: 'new',
-        userId: req.session?.auth?.userId || null,
-      },
+    // 创建本地订单记录，同一事务内写入商品明细、Shopify 同步任务（由后台 worker 推送到 Shopify）和库存预留
+    const deliveryDate = parseDeliveryDate(deliveryTime);
+    const lineItemRows = buildOrderItemRows(itemsArray, { deliveryDate, region: orderRegion });
+    const order = await createOrderWithStock(stockRequestsFor(orderedPackages, itemsArray), async (tx) => {
+      const created = await tx.order.create({
+        data: {
+          customerName,
+          phone,
+          address,
+          deliveryTime,
+          deliveryDate,
+          itemsJson: JSON.stringify(itemsArray),
+          lineItems: { create: lineItemRows },
+          packageId: packageId || null,
+          region: orderRegion,
+          merchantId: orderMerchantId,
+          paymentMethod: finalPaymentMethod,
+          paymentScreenshotPath: screenshotPath,
+          optionalNote: optionalNote || null,
+          internalStatus: 'new',
+          userId: req.session?.auth?.userId || null,
+          shopifySyncJob: { create: {} },
+        },
+      });
+      await applyOrderToStats(tx, { ...created, revenueCents: orderRevenueCents(lineItemRows) }, 1);
+      return created;
     });
 
-    // 创建 Shopify 订单
-    try {
-      const shopifyOrder = await shopifyService.createPaidOrder({
-        items: itemsArray,
-        customerName,
-        phone,
-        address,
-        deliveryTime,
-        localOrderId: order.id,
-        paymentMethod: finalPaymentMethod,
-        optionalNote: optionalNote,
-      });
+    shopifySyncWorker.kick();
 
-      // 更新订单，保存 Shopify 订单 ID
-      await prisma.order.update({
-        where: { id: order.id },
-        data: { shopifyOrderId: shopifyOrder.id.toString() },
-      });
-
-      // 返回成功响应
-      return res.json({
-        success: true,
-        orderId: order.id,
-        shopifyOrderId: shopifyOrder.id,
-      });
-    } catch (shopifyError: any) {
-      // Shopify 创建失败，但本地订单已创建
-      console.error('Shopify order creation failed:', shopifyError);
-      // 可以选择更新订单状态为错误，或者保持 new 状态让管理员手动处理
-      return res.status(500).json({
-        error: 'Order created, but Shopify sync failed. Please contact support.',
-        orderId: order.id,
-      });
-    }
+    return res.json({
+      success: true,
+      orderId: order.id,
+      shopifySync: 'pending',
+    });
   } catch (error: any) {
+    if (error instanceof InsufficientStockError) {
+      return res.status(409).json({ error: error.message, shortages: error.shortages });
+    }
     console.error('Error creating order:', error);
     return res.status(500).json({ error: 'Failed to create order: ' + error.message });
   }
 };
 
+// 后台列表的总数按筛选条件缓存，翻页时不必每页都 COUNT 整表
+const orderCountCache = new CountCache(30 * 1000);
+const EXPORT_BATCH_SIZE = 500;
+
+/**
+ * 订单列表 / 导出共用的筛选条件
+ */
+function buildOrderFilter(query: Request['query']): Prisma.OrderWhereInput {
+  const { status, phone, region, deliveryDate, deliveryFrom, deliveryTo, productId } = query;
+
+  const where: any = {};
+  if (status && status !== 'all') {
+    where.internalStatus = status;
+  }
+  if (phone) {
+    where.phone = { contains: phone as string };
+  }
+  if (region) {
+    where.region = region;
+  }
+  if (deliveryDate || deliveryFrom || deliveryTo) {
+    // 配送日期（YYYY-MM-DD）：走 deliveryDate 索引；无法解析时退回按 deliveryTime 文本匹配
+    const range = deliveryDate
+      ? deliveryDateRange(String(deliveryDate))
+      : deliveryDateRange(String(deliveryFrom || deliveryTo), String(deliveryTo || deliveryFrom));
+    if (range) {
+      where.deliveryDate = range;
+    } else if (deliveryDate) {
+      where.deliveryTime = { contains: deliveryDate as string };
+    }
+  }
+  if (productId) {
+    where.lineItems = { some: { shopifyProductId: String(productId) } };
+  }
+  return where;
+}
+
 /**
  * 获取订单列表（管理后台）
+ * 默认按 (createdAt, id) 游标分页：传入上一页返回的 nextCursor 获取下一页。
+ * 仍兼容旧的 page 参数（offset 分页，页数越大越慢）。
+ * count=approx（默认，缓存 30 秒）| exact | none
  */
 export const getOrders = async (req: Request, res: Response) => {
   try {
-    const { status, phone, region, deliveryDate, page = '1', limit = '20' } = req.query;
+    const { cursor, page, limit = '20', count = 'approx' } = req.query;
 
-    const pageNum = parseInt(page as string, 10);
-    const limitNum = parseInt(limit as string, 10);
-    const skip = (pageNum - 1) * limitNum;
+    const limitNum = Math.min(200, Math.max(1, parseInt(limit as string, 10) || 20));
+    const pageNum = Math.max(1, parseInt(page as string, 10) || 1);
+    const where = buildOrderFilter(req.query);
 
-    const where: any = {};
-    if (status && status !== 'all') {
-      where.internalStatus = status;
-    }
-    if (phone) {
-      where.phone = { contains: phone as string };
-    }
-    if (region) {
-      where.region = region;
-    }
-    if (deliveryDate) {
-      // 配送时间包含指定日期（支持 YYYY-MM-DD 格式）
-      where.deliveryTime = { contains: deliveryDate as string };
+    const after = decodeCursor(cursor);
+    if (cursor && !after) {
+      return res.status(400).json({ error: 'Invalid cursor.' });
     }
 
-    const [orders, total] = await Promise.all([
+    const countPromise: Promise<number | null> =
+      count === 'none'
+        ? Promise.resolve(null)
+        : count === 'exact'
+          ? prisma.order.count({ where })
+          : orderCountCache.get(JSON.stringify(where), () => prisma.order.count({ where }));
+
+    const [rows, total] = await Promise.all([
       prisma.order.findMany({
-        where,
-        orderBy: { createdAt: 'desc' },
-        skip,
-        take: limitNum,
+        where: after ? { AND: [where, afterCursorDesc(after)] } : where,
+        orderBy: [{ createdAt: 'desc' }, { id: 'desc' }],
+        // 多取一条判断是否还有下一页
+        take: limitNum + 1,
+        ...(!after && pageNum > 1 ? { skip: (pageNum - 1) * limitNum } : {}),
+        include: { lineItems: orderLineItemsQuery },
       }),
-      prisma.order.count({ where }),
+      countPromise,
     ]);
 
-    // 解析 itemsJson 并处理图片路径
+    const hasMore = rows.length > limitNum;
+    const orders = hasMore ? rows.slice(0, limitNum) : rows;
+
+    // 商品明细来自 OrderItem，并处理图片路径
     const ordersWithItems = await Promise.all(
-      orders.map(async (order) => ({
-      ...order,
-      items: JSON.parse(order.itemsJson),
-        paymentScreenshotPath: await processOrderImagePath(order.paymentScreenshotPath),
-      }))
+      orders.map(async ({ lineItems, ...order }) => {
+        const paymentScreenshotPath = await processOrderImagePath(order.paymentScreenshotPath);
+        return {
+          ...order,
+          items: orderItemsOf({ lineItems, itemsJson: order.itemsJson }),
+          paymentScreenshotPath,
+          // 列表页只加载缩略图，详情页使用原图
+          paymentScreenshotThumbUrl: toThumbnailUrl(paymentScreenshotPath),
+        };
+      })
     );
 
     return res.json({
       orders: ordersWithItems,
       pagination: {
-        page: pageNum,
+        page: after ? null : pageNum,
         limit: limitNum,
         total,
-        totalPages: Math.ceil(total / limitNum),
+        totalApproximate: count !== 'exact',
+        totalPages: total === null ? null : Math.ceil(total / limitNum),
+        hasMore,
+        nextCursor: hasMore ? encodeCursor(orders[orders.length - 1]) : null,
       },
     });
   } catch (error: any) {
@@ -247,6 +341,116 @@ export const getOrders = async (req: Request, res: Response) => {
   }
 };
 
+/**
+ * 流式导出订单（CSV / NDJSON），筛选条件同订单列表
+ * 按游标分批读取，写入时遵守响应背压，内存占用与导出总量无关。
+ */
+export const exportOrders = async (req: Request, res: Response) => {
+  const format = req.query.format === 'ndjson' ? 'ndjson' : 'csv';
+  const where = buildOrderFilter(req.query);
+
+  let aborted = false;
+  res.on('close', () => {
+    if (!res.writableFinished) aborted = true;
+  });
+
+  const write = async (chunk: string) => {
+    if (!res.write(chunk)) {
+      await new Promise<void>((resolve) => {
+        const done = () => {
+          res.off('drain', done);
+          res.off('close', done);
+          resolve();
+        };
+        res.on('drain', done);
+        res.on('close', done);
+      });
+    }
+  };
+
+  const stamp = new Date().toISOString().slice(0, 19).replace(/[:T]/g, '-');
+  res.setHeader('Content-Type', format === 'csv' ? 'text/csv; charset=utf-8' : 'application/x-ndjson; charset=utf-8');
+  res.setHeader('Content-Disposition', `attachment; filename="orders-${stamp}.${format === 'csv' ? 'csv' : 'ndjson'}"`);
+  res.setHeader('Cache-Control', 'no-store');
+
+  try {
+    if (format === 'csv') {
+      await write(
+        '\uFEFF' +
+          [
+            'id',
+            'createdAt',
+            'customerName',
+            'phone',
+            'address',
+            'region',
+            'deliveryTime',
+            'deliveryDate',
+            'status',
+            'paymentMethod',
+            'shopifyOrderId',
+            'items',
+            'total',
+            'optionalNote',
+          ].join(',') +
+          '\r\n'
+      );
+    }
+
+    let after: KeysetCursor | null = null;
+    while (!aborted) {
+      const batch = await prisma.order.findMany({
+        where: after ? { AND: [where, afterCursorDesc(after)] } : where,
+        orderBy: [{ createdAt: 'desc' }, { id: 'desc' }],
+        take: EXPORT_BATCH_SIZE,
+        include: { lineItems: orderLineItemsQuery },
+      });
+      if (batch.length === 0) break;
+
+      let chunk = '';
+      for (const { lineItems, itemsJson, paymentScreenshotPath, ...order } of batch) {
+        const items = orderItemsOf({ lineItems, itemsJson });
+        if (format === 'ndjson') {
+          chunk += JSON.stringify({ ...order, items }) + '\n';
+          continue;
+        }
+        const totalCents = items.reduce((sum, item) => sum + toCents(item.price) * Number(item.quantity || 0), 0);
+        chunk +=
+          [
+            order.id,
+            order.createdAt.toISOString(),
+            order.customerName,
+            order.phone,
+            order.address,
+            order.region,
+            order.deliveryTime,
+            order.deliveryDate ? order.deliveryDate.toISOString().slice(0, 10) : '',
+            order.internalStatus,
+            order.paymentMethod,
+            order.shopifyOrderId,
+            items.map((item) => `${item.title} x${item.quantity}`).join('; '),
+            (totalCents / 100).toFixed(2),
+            order.optionalNote,
+          ]
+            .map(csvCell)
+            .join(',') + '\r\n';
+      }
+      await write(chunk);
+
+      if (batch.length < EXPORT_BATCH_SIZE) break;
+      after = batch[batch.length - 1];
+    }
+    res.end();
+  } catch (error: any) {
+    console.error('Error exporting orders:', error);
+    if (!res.headersSent) {
+      return res.status(500).json({ error: 'Failed to export orders: ' + error.message });
+    }
+    // 已开始输出：直接断开，客户端会看到不完整的下载而不是被截断的"成功"文件
+    res.destroy(error);
+  }
+};
+
 /**
  * 获取单个订单详情
  */
@@ -256,6 +460,10 @@ export const getOrderById = async (req: Request, res: Response) => {
 
     const order = await prisma.order.findUnique({
       where: { id },
+      include: {
+        shopifySyncJob: { select: { status: true, attempts: true, lastError: true, nextRunAt: true } },
+        lineItems: orderLineItemsQuery,
+      },
     });
 
     if (!order) {
@@ -265,9 +473,10 @@ export const getOrderById = async (req: Request, res: Response) => {
     // 处理图片路径
     const processedScreenshotPath = await processOrderImagePath(order.paymentScreenshotPath);
 
+    const { lineItems, ...orderData } = order;
     return res.json({
-      ...order,
-      items: JSON.parse(order.itemsJson),
+      ...orderData,
+      items: orderItemsOf(order),
       paymentScreenshotPath: processedScreenshotPath,
     });
   } catch (error: any) {
@@ -289,9 +498,28 @@ export const updateOrderStatus = async (req: Request, res: Response) => {
       return res.status(400).json({ error: 'Invalid order status.' });
     }
 
-    const order = await prisma.order.update({
-      where: { id },
-      data: { internalStatus: status },
+    const current = await prisma.order.findUnique({ where: { id }, select: { internalStatus: true } });
+    if (!current) {
+      return res.status(404).json({ error: 'Order not found' });
+    }
+
+    // 取消订单归还库存；已取消的订单恢复时重新占用（库存不足则不允许恢复）
+    const { lineItems, ...order } = await withStockTransaction(async (tx) => {
+      const updated = await tx.order.update({
+        where: { id },
+        data: { internalStatus: status },
+        include: { lineItems: orderLineItemsQuery },
+      });
+      if (status === 'cancelled' && current.internalStatus !== 'cancelled') {
+        await releaseReservations(tx, id);
+        const facts = await loadOrderFacts(tx, id);
+        if (facts) await applyOrderToStats(tx, facts, -1);
+      } else if (current.internalStatus === 'cancelled' && status !== 'cancelled') {
+        await restoreReservations(tx, id);
+        const facts = await loadOrderFacts(tx, id);
+        if (facts) await applyOrderToStats(tx, facts, 1);
+      }
+      return updated;
     });
 
     // 处理图片路径
@@ -301,11 +529,14 @@ export const updateOrderStatus = async (req: Request, res: Response) => {
       success: true,
       order: {
         ...order,
-        items: JSON.parse(order.itemsJson),
+        items: orderItemsOf({ lineItems, itemsJson: order.itemsJson }),
         paymentScreenshotPath: processedScreenshotPath,
       },
     });
   } catch (error: any) {
+    if (error instanceof InsufficientStockError) {
+      return res.status(409).json({ error: error.message, shortages: error.shortages });
+    }
     console.error('Error updating order status:', error);
     return res.status(500).json({ error: 'Failed to update order status: ' + error.message });
   }
@@ -347,9 +578,18 @@ export const deleteOrder = async (req: Request, res: Response) => {
       }
     }
 
-    // 删除本地订单记录
-    await prisma.order.delete({
-      where: { id },
+    // 删除本地订单记录，同时归还占用的库存
+    await withStockTransaction(async (tx) => {
+      const deleted = await tx.order.delete({
+        where: { id },
+        include: { lineItems: { select: { totalCents: true } }, merchantReview: true },
+      });
+      await releaseReservations(tx, id);
+      // 商家汇总：取消的订单已不计入；评价随订单级联删除
+      if (deleted.internalStatus !== 'cancelled') {
+        await applyOrderToStats(tx, { ...deleted, revenueCents: orderRevenueCents(deleted.lineItems) }, -1);
+      }
+      if (deleted.merchantReview) await applyReviewToStats(tx, deleted.merchantReview, -1);
     });
 
     // 如果订单有付款截图，可以考虑删除文件（可选）
@@ -367,6 +607,210 @@ export const deleteOrder = async (req: Request, res: Response) => {
   }
 };
 
+/**
+ * 重新推送订单到 Shopify（同步失败后由管理员手动重试）
+ */
+export const retryShopifySync = async (req: Request, res: Response) => {
+  try {
+    const { id } = req.params;
+
+    const order = await prisma.order.findUnique({ where: { id }, select: { id: true, shopifyOrderId: true } });
+    if (!order) {
+      return res.status(404).json({ error: 'Order not found' });
+    }
+    if (order.shopifyOrderId) {
+      return res.status(409).json({ error: 'Order is already synced to Shopify.' });
+    }
+
+    const job = await prisma.shopifySyncJob.upsert({
+      where: { orderId: id },
+      create: { orderId: id },
+      update: { status: 'pending', attempts: 0, nextRunAt: new Date(), lockedAt: null, lastError: null },
+    });
+    shopifySyncWorker.kick();
+
+    return res.json({ success: true, job });
+  } catch (error: any) {
+    console.error('Error requeueing Shopify sync:', error);
+    return res.status(500).json({ error: 'Failed to requeue Shopify sync: ' + error.message });
+  }
+};
+
+/**
+ * Shopify 同步队列概况
+ */
+export const getShopifySyncStats = async (req: Request, res: Response) => {
+  try {
+    const [byStatus, recentFailures] = await Promise.all([
+      prisma.shopifySyncJob.groupBy({ by: ['status'], _count: { _all: true } }),
+      prisma.shopifySyncJob.findMany({
+        where: { status: 'failed' },
+        orderBy: { updatedAt: 'desc' },
+        take: 20,
+        select: { orderId: true, attempts: true, lastError: true, updatedAt: true },
+      }),
+    ]);
+
+    return res.json({
+      queue: Object.fromEntries(byStatus.map((row) => [row.status, row._count._all])),
+      worker: shopifySyncWorker.getStats(),
+      recentFailures,
+    });
+  } catch (error: any) {
+    console.error('Error fetching Shopify sync stats:', error);
+    return res.status(500).json({ error: 'Failed to load Shopify sync stats: ' + error.message });
+  }
+};
+
+const UNKNOWN_PRODUCT_TITLE = '(unknown product)';
+
+/**
+ * 商品ID -> 展示名称：优先中文映射，其次取明细中的标题（一条聚合查询，不逐行读取）
+ */
+async function resolveProductTitles(
+  productIds: Array<string | null>
+): Promise<Map<string, { title: string; originalTitle: string }>> {
+  const ids = Array.from(new Set(productIds.filter((id): id is string => !!id)));
+  if (ids.length === 0) return new Map();
+
+  const [mappings, titleGroups] = await Promise.all([
+    getProductNameMappings(),
+    prisma.orderItem.groupBy({
+      by: ['shopifyProductId'],
+      where: { shopifyProductId: { in: ids } },
+      _min: { title: true },
+    }),
+  ]);
+
+  const titles = new Map<string, { title: string; originalTitle: string }>();
+  for (const id of ids) {
+    const mapping = mappings.get(id);
+    const fallback = titleGroups.find((g) => g.shopifyProductId === id)?._min.title || UNKNOWN_PRODUCT_TITLE;
+    titles.set(id, {
+      title: mapping?.chineseName || fallback,
+      originalTitle: mapping?.englishName || fallback,
+    });
+  }
+  return titles;
+}
+
+/**
+ * 按商品 + 配送日汇总订单明细（走 OrderItem 索引，不解析 itemsJson）
+ * query: from / to (YYYY-MM-DD), region, productId, includeCancelled
+ */
+export const getOrderItemSummary = async (req: Request, res: Response) => {
+  try {
+    const from = String(req.query.from || req.query.deliveryDate || '').trim();
+    const to = String(req.query.to || '').trim();
+    const region = String(req.query.region || '').trim();
+    const productId = String(req.query.productId || '').trim();
+    const includeCancelled = req.query.includeCancelled === 'true';
+
+    const where: any = {};
+    if (from || to) {
+      const range = deliveryDateRange(from || to, to || from);
+      if (!range) {
+        return res.status(400).json({ error: 'Invalid date. Use YYYY-MM-DD.' });
+      }
+      where.deliveryDate = range;
+    }
+    if (region) where.region = region;
+    if (productId) where.shopifyProductId = productId;
+    if (!includeCancelled) where.order = { internalStatus: { not: 'cancelled' } };
+
+    const groups = await prisma.orderItem.groupBy({
+      by: ['shopifyProductId', 'deliveryDate'],
+      where,
+      _sum: { quantity: true, totalCents: true },
+      _count: { orderId: true },
+      orderBy: [{ deliveryDate: 'asc' }, { shopifyProductId: 'asc' }],
+    });
+
+    const titles = await resolveProductTitles(groups.map((g) => g.shopifyProductId));
+
+    const rows = groups.map((g) => ({
+      shopifyProductId: g.shopifyProductId,
+      title: titles.get(g.shopifyProductId || '')?.title || UNKNOWN_PRODUCT_TITLE,
+      deliveryDate: g.deliveryDate ? g.deliveryDate.toISOString().slice(0, 10) : null,
+      quantity: g._sum.quantity || 0,
+      totalCents: g._sum.totalCents || 0,
+      lines: g._count.orderId,
+    }));
+
+    return res.json({ rows });
+  } catch (error: any) {
+    console.error('Error summarizing order items:', error);
+    return res.status(500).json({ error: 'Failed to summarize order items: ' + error.message });
+  }
+};
+
+/**
+ * 配货清单：指定配送日（和大区）每个 Shopify 商品/变体的总数量
+ * query: date (YYYY-MM-DD, 必填), region, format=csv
+ */
+export const getPickingList = async (req: Request, res: Response) => {
+  try {
+    const date = String(req.query.date || req.query.deliveryDate || '').trim();
+    const region = String(req.query.region || '').trim();
+    const deliveryDate = parseDeliveryDate(date);
+    if (!deliveryDate) {
+      return res.status(400).json({ error: 'Please provide a delivery date (YYYY-MM-DD).' });
+    }
+
+    // 已取消的订单不参与配货
+    const activeOrder = { internalStatus: { not: 'cancelled' } };
+    const itemWhere: any = { deliveryDate, order: activeOrder };
+    const orderWhere: any = { deliveryDate, ...activeOrder };
+    if (region) {
+      itemWhere.region = region;
+      orderWhere.region = region;
+    }
+
+    const [groups, orderCount] = await Promise.all([
+      prisma.orderItem.groupBy({
+        by: ['shopifyProductId', 'shopifyVariantId'],
+        where: itemWhere,
+        _sum: { quantity: true },
+        _count: { orderId: true },
+      }),
+      prisma.order.count({ where: orderWhere }),
+    ]);
+
+    const titles = await resolveProductTitles(groups.map((g) => g.shopifyProductId));
+    const items = groups
+      .map((g) => {
+        const title = titles.get(g.shopifyProductId || '');
+        return {
+          shopifyProductId: g.shopifyProductId,
+          shopifyVariantId: g.shopifyVariantId,
+          title: title?.title || UNKNOWN_PRODUCT_TITLE,
+          originalTitle: title?.originalTitle || UNKNOWN_PRODUCT_TITLE,
+          quantity: g._sum.quantity || 0,
+          lines: g._count.orderId,
+        };
+      })
+      .sort((a, b) => a.title.localeCompare(b.title, 'zh-CN') || b.quantity - a.quantity);
+    const totalQuantity = items.reduce((sum, item) => sum + item.quantity, 0);
+
+    if (req.query.format === 'csv') {
+      const header = ['title', 'originalTitle', 'shopifyProductId', 'shopifyVariantId', 'quantity'];
+      const lines = items.map((item) =>
+        [item.title, item.originalTitle, item.shopifyProductId, item.shopifyVariantId, item.quantity].map(csvCell).join(',')
+      );
+      const filename = `picking-${date}${region ? '-' + region.replace(/\s+/g, '-') : ''}.csv`;
+      res.setHeader('Content-Type', 'text/csv; charset=utf-8');
+      res.setHeader('Content-Disposition', `attachment; filename="${filename}"`);
+      // BOM：Excel 打开中文不乱码
+      return res.send('\uFEFF' + [header.join(','), ...lines].join('\r\n'));
+    }
+
+    return res.json({ date, region: region || null, orderCount, totalQuantity, items });
+  } catch (error: any) {
+    console.error('Error building picking list:', error);
+    return res.status(500).json({ error: 'Failed to build picking list: ' + error.message });
+  }
+};
+
 /**
  * 根据手机号查询订单（公开接口，用于用户查询自己的订单）
  */
@@ -393,6 +837,7 @@ export const getOrdersByPhone = async (req: Request, res: Response) => {
         address: true,
         deliveryTime: true,
         itemsJson: true,
+        lineItems: orderLineItemsQuery,
         paymentMethod: true,
         paymentScreenshotPath: true,
         internalStatus: true,
@@ -403,11 +848,11 @@ export const getOrdersByPhone = async (req: Request, res: Response) => {
       },
     });
 
-    // 解析 itemsJson 并处理图片路径
+    // 商品明细来自 OrderItem，并处理图片路径
     const ordersWithItems = await Promise.all(
-      orders.map(async (order) => ({
-      ...order,
-      items: JSON.parse(order.itemsJson),
+      orders.map(async ({ lineItems, ...order }) => ({
+        ...order,
+        items: orderItemsOf({ lineItems, itemsJson: order.itemsJson }),
         paymentScreenshotPath: await processOrderImagePath(order.paymentScreenshotPath),
       }))
     );
@@ -445,6 +890,7 @@ export const showMyOrdersPage = async (req: Request, res: Response) => {
         address: true,
         deliveryTime: true,
         itemsJson: true,
+        lineItems: orderLineItemsQuery,
         paymentMethod: true,
         paymentScreenshotPath: true,
         internalStatus: true,
@@ -455,19 +901,11 @@ export const showMyOrdersPage = async (req: Request, res: Response) => {
     });
 
     const ordersWithItems = await Promise.all(
-      orders.map(async (o) => {
-        let items: any[] = [];
-        try {
-          items = JSON.parse(o.itemsJson || '[]');
-        } catch {
-          items = [];
-        }
-        return {
-          ...o,
-          items,
-          paymentScreenshotPath: await processOrderImagePath(o.paymentScreenshotPath),
-        };
-      })
+      orders.map(async ({ lineItems, ...o }) => ({
+        ...o,
+        items: orderItemsOf({ lineItems, itemsJson: o.itemsJson }),
+        paymentScreenshotPath: await processOrderImagePath(o.paymentScreenshotPath),
+      }))
     );
 
     return res.render('public/query-order', {
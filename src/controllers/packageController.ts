@@ -1,8 +1,11 @@
 import { Request, Response } from 'express';
-import { PrismaClient } from '@prisma/client';
-import { mapProductNames } from '../utils/productNameMapper';
-
-const prisma = new PrismaClient();
+import type { Package } from '@prisma/client';
+import { prisma, withRetryingTransaction } from '../db';
+import { mapProductNameLists } from '../utils/productNameMapper';
+import { notifyCatalogChanged } from '../services/catalogEvents';
+import { refreshCatalogStats } from '../services/merchantStatsService';
+import { searchCatalog } from '../services/searchIndex';
+import { shopifyService } from '../services/shopifyService';
 
 interface PackageItem {
   productId: string;
@@ -29,6 +32,56 @@ function toInt(value: unknown, fallback: number): number {
   return Number.isFinite(n) ? n : fallback;
 }
 
+/**
+ * 商品ID -> 图片映射；Shopify 不可用时返回空映射，不影响套餐展示
+ */
+async function loadProductImageMap(): Promise<Map<string, string>> {
+  try {
+    return await shopifyService.getProductImageMap();
+  } catch (error) {
+    console.error('Error fetching Shopify products for images:', error);
+    return new Map();
+  }
+}
+
+/**
+ * 套餐列表 -> 前端数据：解析 itemsJson，映射中文名称（整批一次），添加商品图片
+ */
+async function toPackageViews<T extends { itemsJson: string; deliveryDatesJson: string | null; imageUrl: string | null }>(
+  packages: T[]
+) {
+  const [productImageMap, mappedLists] = await Promise.all([
+    loadProductImageMap(),
+    mapProductNameLists(packages.map((pkg) => JSON.parse(pkg.itemsJson))),
+  ]);
+
+  return packages.map((pkg, index) => {
+    // 为每个商品添加图片信息
+    const itemsWithImages = mappedLists[index].map((item: any) => {
+      if (item.shopifyProductId && productImageMap.has(item.shopifyProductId)) {
+        return {
+          ...item,
+          imageUrl: productImageMap.get(item.shopifyProductId),
+        };
+      }
+      return item;
+    });
+
+    // 如果没有设置套餐图片，使用第一个商品的图片
+    let displayImageUrl = pkg.imageUrl;
+    if (!displayImageUrl && itemsWithImages.length > 0 && itemsWithImages[0].imageUrl) {
+      displayImageUrl = itemsWithImages[0].imageUrl;
+    }
+
+    return {
+      ...pkg,
+      items: itemsWithImages,
+      deliveryDates: pkg.deliveryDatesJson ? JSON.parse(pkg.deliveryDatesJson) : null,
+      imageUrl: displayImageUrl,
+    };
+  });
+}
+
 /**
  * 获取所有套餐（前台用，只返回启用的）
  */
@@ -45,68 +98,31 @@ export const getActivePackages = async (req: Request, res: Response) => {
 
     const where: any = { isActive: true };
     if (region) where.region = region;
-    if (q) {
-      where.OR = [{ name: { contains: q } }, { description: { contains: q } }];
-    }
 
-    const [packages, total] = await Promise.all([
-      prisma.package.findMany({
-        where,
-        orderBy: [{ sortOrder: 'asc' }, { updatedAt: 'desc' }],
-        skip,
-        take: limit,
-      }),
-      prisma.package.count({ where }),
-    ]);
-
-    // 一次性获取所有 Shopify 商品（包含图片信息）
-    const { shopifyService } = await import('../services/shopifyService');
-    let shopifyProducts: any[] = [];
-    try {
-      shopifyProducts = await shopifyService.getProducts();
-    } catch (error) {
-      console.error('Error fetching Shopify products for images:', error);
+    let packages: Package[];
+    let total: number;
+    if (q) {
+      // 关键词搜索走进程内索引（含商品中文名），按相关度排序，只查询当前页
+      const hits = await searchCatalog(q, { type: 'package', region: region || undefined });
+      const ids = hits.slice(skip, skip + limit).map((hit) => hit.id);
+      const rows = await prisma.package.findMany({ where: { ...where, id: { in: ids } } });
+      const byId = new Map(rows.map((row) => [row.id, row]));
+      packages = ids.flatMap((id) => byId.get(id) || []);
+      total = hits.length;
+    } else {
+      [packages, total] = await Promise.all([
+        prisma.package.findMany({
+          where,
+          orderBy: [{ sortOrder: 'asc' }, { updatedAt: 'desc' }],
+          skip,
+          take: limit,
+        }),
+        prisma.package.count({ where }),
+      ]);
     }
 
-    // 创建商品ID到图片的映射
-    const productImageMap = new Map<string, string>();
-    shopifyProducts.forEach(product => {
-      if (product.images && product.images.length > 0) {
-        productImageMap.set(product.id.toString(), product.images[0].src);
-      }
-    });
-
-    // 解析 itemsJson 并映射中文名称，同时添加商品图片
-    const packagesWithItems = await Promise.all(
-      packages.map(async (pkg) => {
-        const items = JSON.parse(pkg.itemsJson);
-        const mappedItems = await mapProductNames(items);
-        
-        // 为每个商品添加图片信息
-        const itemsWithImages = mappedItems.map((item: any) => {
-          if (item.shopifyProductId && productImageMap.has(item.shopifyProductId)) {
-            return {
-              ...item,
-              imageUrl: productImageMap.get(item.shopifyProductId),
-            };
-          }
-          return item;
-        });
-        
-        // 如果没有设置套餐图片，使用第一个商品的图片
-        let displayImageUrl = pkg.imageUrl;
-        if (!displayImageUrl && itemsWithImages.length > 0 && itemsWithImages[0].imageUrl) {
-          displayImageUrl = itemsWithImages[0].imageUrl;
-        }
-        
-        return {
-          ...pkg,
-          items: itemsWithImages,
-          deliveryDates: pkg.deliveryDatesJson ? JSON.parse(pkg.deliveryDatesJson) : null,
-          imageUrl: displayImageUrl,
-        };
-      })
-    );
+    // 解析 itemsJson，映射中文名称并添加商品图片
+    const packagesWithItems = await toPackageViews(packages);
 
     const totalPages = Math.max(1, Math.ceil(total / limit));
     return res.json({
@@ -129,54 +145,8 @@ export const getAllPackages = async (req: Request, res: Response) => {
       orderBy: [{ isActive: 'desc' }, { sortOrder: 'asc' }],
     });
 
-    // 一次性获取所有 Shopify 商品（包含图片信息）
-    const { shopifyService } = await import('../services/shopifyService');
-    let shopifyProducts: any[] = [];
-    try {
-      shopifyProducts = await shopifyService.getProducts();
-    } catch (error) {
-      console.error('Error fetching Shopify products for images:', error);
-    }
-
-    // 创建商品ID到图片的映射
-    const productImageMap = new Map<string, string>();
-    shopifyProducts.forEach(product => {
-      if (product.images && product.images.length > 0) {
-        productImageMap.set(product.id.toString(), product.images[0].src);
-      }
-    });
-
-    // 解析 itemsJson 并映射中文名称，同时添加商品图片
-    const packagesWithItems = await Promise.all(
-      packages.map(async (pkg) => {
-        const items = JSON.parse(pkg.itemsJson);
-        const mappedItems = await mapProductNames(items);
-        
-        // 为每个商品添加图片信息
-        const itemsWithImages = mappedItems.map((item: any) => {
-          if (item.shopifyProductId && productImageMap.has(item.shopifyProductId)) {
-            return {
-              ...item,
-              imageUrl: productImageMap.get(item.shopifyProductId),
-            };
-          }
-          return item;
-        });
-        
-        // 如果没有设置套餐图片，使用第一个商品的图片
-        let displayImageUrl = pkg.imageUrl;
-        if (!displayImageUrl && itemsWithImages.length > 0 && itemsWithImages[0].imageUrl) {
-          displayImageUrl = itemsWithImages[0].imageUrl;
-        }
-        
-        return {
-          ...pkg,
-          items: itemsWithImages,
-          deliveryDates: pkg.deliveryDatesJson ? JSON.parse(pkg.deliveryDatesJson) : null,
-          imageUrl: displayImageUrl,
-        };
-      })
-    );
+    // 解析 itemsJson，映射中文名称并添加商品图片
+    const packagesWithItems = await toPackageViews(packages);
 
     return res.json({ packages: packagesWithItems });
   } catch (error: any) {
@@ -201,50 +171,8 @@ export const getPackageById = async (req: Request, res: Response) => {
       return res.status(404).json({ error: 'Package not found' });
     }
 
-    // 获取 Shopify 商品图片
-    const { shopifyService } = await import('../services/shopifyService');
-    let shopifyProducts: any[] = [];
-    try {
-      shopifyProducts = await shopifyService.getProducts();
-    } catch (error) {
-      console.error('Error fetching Shopify products for images:', error);
-    }
-
-    // 创建商品ID到图片的映射
-    const productImageMap = new Map<string, string>();
-    shopifyProducts.forEach(product => {
-      if (product.images && product.images.length > 0) {
-        productImageMap.set(product.id.toString(), product.images[0].src);
-      }
-    });
-
-    // 解析 itemsJson 并映射中文名称，同时添加商品图片
-    const items = JSON.parse(pkg.itemsJson);
-    const mappedItems = await mapProductNames(items);
-    
-    // 为每个商品添加图片信息
-    const itemsWithImages = mappedItems.map((item: any) => {
-      if (item.shopifyProductId && productImageMap.has(item.shopifyProductId)) {
-        return {
-          ...item,
-          imageUrl: productImageMap.get(item.shopifyProductId),
-        };
-      }
-      return item;
-    });
-    
-    // 如果没有设置套餐图片，使用第一个商品的图片
-    let displayImageUrl = pkg.imageUrl;
-    if (!displayImageUrl && itemsWithImages.length > 0 && itemsWithImages[0].imageUrl) {
-      displayImageUrl = itemsWithImages[0].imageUrl;
-    }
-
-    return res.json({
-      ...pkg,
-      items: itemsWithImages,
-      deliveryDates: pkg.deliveryDatesJson ? JSON.parse(pkg.deliveryDatesJson) : null,
-      imageUrl: displayImageUrl,
-    });
+    const [packageWithItems] = await toPackageViews([pkg]);
+    return res.json(packageWithItems);
   } catch (error: any) {
     console.error('Error fetching package:', error);
     return res.status(500).json({ error: 'Failed to load package: ' + error.message });
@@ -292,6 +220,7 @@ export const createPackage = async (req: Request, res: Response) => {
         sortOrder: sortOrder || 0,
       },
     });
+    notifyCatalogChanged('package created');
 
     return res.json({
       success: true,
@@ -345,10 +274,16 @@ export const updatePackage = async (req: Request, res: Response) => {
     if (isActive !== undefined) updateData.isActive = isActive;
     if (sortOrder !== undefined) updateData.sortOrder = sortOrder;
 
-    const pkg = await prisma.package.update({
-      where: { id },
-      data: updateData,
+    // 商家的套餐：启用状态变化同步到 MerchantStats.activePackages
+    const pkg = await withRetryingTransaction(async (tx) => {
+      const updated = await tx.package.update({
+        where: { id },
+        data: updateData,
+      });
+      if (isActive !== undefined) await refreshCatalogStats(tx, [updated.merchantId]);
+      return updated;
     });
+    notifyCatalogChanged('package updated');
 
     return res.json({
       success: true,
@@ -370,9 +305,13 @@ export const deletePackage = async (req: Request, res: Response) => {
   try {
     const { id } = req.params;
 
-    await prisma.package.delete({
-      where: { id },
+    await withRetryingTransaction(async (tx) => {
+      const deleted = await tx.package.delete({
+        where: { id },
+      });
+      await refreshCatalogStats(tx, [deleted.merchantId]);
     });
+    notifyCatalogChanged('package deleted');
 
     return res.json({ success: true });
   } catch (error: any) {
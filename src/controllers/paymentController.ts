@@ -1,9 +1,9 @@
 import type { Request, Response } from 'express';
-import { PrismaClient } from '@prisma/client';
+import { prisma } from '../db';
 import { config } from '../config';
-import { shopifyService } from '../services/shopifyService';
-
-const prisma = new PrismaClient();
+import { shopifySyncWorker } from '../services/shopifySyncWorker';
+import { commitHeldStock, withStockTransaction } from '../services/inventoryService';
+import { orderItemsOf, orderLineItemsQuery } from '../utils/orderItems';
 
 function storedUploadPath(file: Express.Multer.File | undefined): string | null {
   if (!file) return null;
@@ -25,16 +25,11 @@ export const showPaymentPage = async (req: Request, res: Response) => {
   const user = await prisma.user.findUnique({ where: { id: userId }, select: { phone: true, email: true } });
   const phone = user?.phone || '';
 
-  const order = await prisma.order.findUnique({ where: { id: orderId } });
+  const order = await prisma.order.findUnique({ where: { id: orderId }, include: { lineItems: orderLineItemsQuery } });
   if (!order) return res.status(404).send('Order not found');
   if (order.phone !== phone) return res.status(403).send('Forbidden');
 
-  let items: any[] = [];
-  try {
-    items = JSON.parse(order.itemsJson || '[]');
-  } catch {
-    items = [];
-  }
+  const items = orderItemsOf(order);
 
   return res.render('public/payment', {
     userEmail: user?.email || '',
@@ -69,33 +64,33 @@ export const submitPayment = async (req: Request, res: Response) => {
 
   const screenshotPath = storedUploadPath((req as any).file);
 
-  await prisma.order.update({
-    where: { id: order.id },
-    data: {
-      paymentMethod: finalPaymentMethod,
-      paymentScreenshotPath: finalPaymentMethod === 'transfer' ? screenshotPath : null,
-    },
-  });
-
-  // Trigger Shopify sync after payment step (keeps "add to cart -> checkout -> pay" flow)
-  try {
-    const items = JSON.parse(order.itemsJson || '[]');
-    const shopifyOrder = await shopifyService.createPaidOrder({
-      items,
-      customerName: order.customerName,
-      phone: order.phone,
-      address: order.address,
-      deliveryTime: order.deliveryTime,
-      localOrderId: order.id,
-      paymentMethod: finalPaymentMethod,
-      optionalNote: order.optionalNote || undefined,
+  // Record payment, enqueue the Shopify sync and keep the held stock in one transaction; the
+  // background worker pushes it to Shopify so the buyer never waits on (or sees failures from) Shopify.
+  const paid = await withStockTransaction(async (tx) => {
+    // The hold may have expired (order cancelled, stock returned) while the buyer was paying
+    const updated = await tx.order.updateMany({
+      where: { id: order.id, internalStatus: { not: 'cancelled' } },
+      data: {
+        paymentMethod: finalPaymentMethod,
+        paymentScreenshotPath: finalPaymentMethod === 'transfer' ? screenshotPath : null,
+      },
+    });
+    if (updated.count === 0) return false;
+    await tx.shopifySyncJob.upsert({
+      where: { orderId: order.id },
+      create: { orderId: order.id },
+      // Re-submitting payment for an order that already synced must not create a second Shopify order
+      update: {},
     });
-    await prisma.order.update({ where: { id: order.id }, data: { shopifyOrderId: shopifyOrder.id.toString() } });
-  } catch (e) {
-    console.error('Shopify order creation failed (payment step):', e);
-    // Keep local order; admin can handle later
+    await commitHeldStock(tx, order.id);
+    return true;
+  });
+  if (!paid) {
+    return res.status(409).send('This order has been cancelled (payment not submitted in time). Please place a new order.');
   }
 
+  shopifySyncWorker.kick();
+
   return res.redirect(`/success?orderId=${encodeURIComponent(order.id)}`);
 };
 
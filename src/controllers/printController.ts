@@ -0,0 +1,97 @@
+import { Request, Response } from 'express';
+import { config } from '../config';
+import { parseDeliveryDate } from '../utils/orderItems';
+import {
+  PrintLayout,
+  getCachedPrint,
+  getPrintStats,
+  printCacheKey,
+  printFingerprint,
+  renderPrintDocument,
+  storePrint,
+} from '../services/printService';
+
+const MAX_LABELS_PER_PAGE = 30;
+
+// Resolves false when the client went away before the buffer drained
+function writeChunk(res: Response, chunk: string): Promise<boolean> {
+  if (res.destroyed) return Promise.resolve(false);
+  if (res.write(chunk)) return Promise.resolve(true);
+  if (res.destroyed) return Promise.resolve(false);
+  return new Promise((resolve) => {
+    const onDrain = () => {
+      res.off('close', onClose);
+      resolve(true);
+    };
+    const onClose = () => {
+      res.off('drain', onDrain);
+      resolve(false);
+    };
+    res.once('drain', onDrain);
+    res.once('close', onClose);
+  });
+}
+
+/**
+ * 按配送日（+ 大区）批量打印：每单一张配货单 + N 合一地址标签，流式输出可打印 HTML
+ */
+export const printOrders = async (req: Request, res: Response) => {
+  try {
+    const date = String(req.query.deliveryDate || req.query.date || '').trim();
+    const deliveryDate = parseDeliveryDate(date);
+    if (!deliveryDate) {
+      return res.status(400).json({ error: 'Please provide a delivery date (YYYY-MM-DD).' });
+    }
+
+    const include = String(req.query.include || 'all') as PrintLayout['include'];
+    if (!['all', 'slips', 'labels'].includes(include)) {
+      return res.status(400).json({ error: 'include must be all, slips or labels.' });
+    }
+    const labelsPerPage = req.query.labelsPerPage ? Number(req.query.labelsPerPage) : config.print.labelsPerPage;
+    if (!Number.isInteger(labelsPerPage) || labelsPerPage < 1 || labelsPerPage > MAX_LABELS_PER_PAGE) {
+      return res.status(400).json({ error: `labelsPerPage must be an integer between 1 and ${MAX_LABELS_PER_PAGE}.` });
+    }
+
+    const filter = { deliveryDate, region: String(req.query.region || '').trim() || null };
+    const layout: PrintLayout = { include, labelsPerPage };
+
+    // 批次内任一订单变化（新增、修改、取消）或商品名称映射变化时指纹改变
+    const fingerprint = await printFingerprint(filter);
+    const etag = `"print-${fingerprint}"`;
+    res.setHeader('Content-Type', 'text/html; charset=utf-8');
+    res.setHeader('Cache-Control', 'private, no-cache');
+    res.setHeader('ETag', etag);
+    if (req.headers['if-none-match'] === etag) {
+      return res.status(304).end();
+    }
+
+    const key = printCacheKey(filter, layout);
+    const cached = getCachedPrint(key, fingerprint);
+    if (cached !== null) {
+      res.setHeader('X-Print-Cache', 'hit');
+      return res.send(cached);
+    }
+
+    res.setHeader('X-Print-Cache', 'miss');
+    const chunks: string[] = [];
+    for await (const chunk of renderPrintDocument(filter, layout)) {
+      chunks.push(chunk);
+      // 客户端已断开：停止渲染，不写入缓存
+      if (!(await writeChunk(res, chunk))) return;
+    }
+    res.end();
+    storePrint(key, fingerprint, chunks.join(''));
+  } catch (error: any) {
+    console.error('Error rendering print batch:', error);
+    // 已开始输出时只能中断连接
+    if (res.headersSent) return res.destroy(error);
+    return res.status(500).json({ error: 'Failed to render print batch: ' + error.message });
+  }
+};
+
+/**
+ * 批量打印缓存 / 渲染线程统计
+ */
+export const getPrintStatus = async (req: Request, res: Response) => {
+  return res.json(getPrintStats());
+};
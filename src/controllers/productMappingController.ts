@@ -1,7 +1,6 @@
 import { Request, Response } from 'express';
-import { PrismaClient } from '@prisma/client';
-
-const prisma = new PrismaClient();
+import { prisma } from '../db';
+import { notifyCatalogChanged } from '../services/catalogEvents';
 
 /**
  * 获取所有商品名称映射
@@ -69,6 +68,8 @@ export const upsertMapping = async (req: Request, res: Response) => {
         chineseName,
       },
     });
+    // 所有进程的商品名称映射缓存、搜索索引（套餐搜索包含商品中文名）和页面缓存
+    notifyCatalogChanged('product mapping changed');
 
     return res.json({ success: true, mapping });
   } catch (error: any) {
@@ -87,6 +88,8 @@ export const deleteMapping = async (req: Request, res: Response) => {
     await prisma.productNameMapping.delete({
       where: { id },
     });
+    // 所有进程的商品名称映射缓存、搜索索引（套餐搜索包含商品中文名）和页面缓存
+    notifyCatalogChanged('product mapping changed');
 
     return res.json({ success: true });
   } catch (error: any) {
@@ -134,6 +137,9 @@ export const batchCreateMappings = async (req: Request, res: Response) => {
         console.error('Error creating mapping:', err);
       }
     }
+    if (results.length > 0) {
+      notifyCatalogChanged('product mapping changed');
+    }
 
     return res.json({ success: true, count: results.length, mappings: results });
   } catch (error: any) {
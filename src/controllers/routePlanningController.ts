@@ -0,0 +1,144 @@
+import { Request, Response } from 'express';
+import { prisma } from '../db';
+import { config } from '../config';
+import { geocodeAddresses, normalizeAddress, setAddressLocation } from '../services/geocodingService';
+import { planRoutes } from '../services/routePlanner';
+import { parseDeliveryDate } from '../utils/orderItems';
+
+// Google Maps 路线链接最多支持 9 个途经点：超出时拆成多段链接
+const MAPS_MAX_WAYPOINTS = 9;
+
+function toInt(value: unknown, fallback: number): number {
+  const n = Number.parseInt(String(value ?? ''), 10);
+  return Number.isFinite(n) ? n : fallback;
+}
+
+/**
+ * 按顺序生成 Google Maps 导航链接（每段：起点 + 最多 9 个途经点 + 终点，下一段从上一段终点出发）
+ */
+function buildMapsLinks(addresses: string[]): string[] {
+  const links: string[] = [];
+  const step = MAPS_MAX_WAYPOINTS + 1;
+  for (let start = 0; start < addresses.length - 1; start += step) {
+    const segment = addresses.slice(start, start + step + 1);
+    const params = new URLSearchParams({
+      api: '1',
+      origin: segment[0],
+      destination: segment[segment.length - 1],
+      travelmode: 'driving',
+    });
+    const waypoints = segment.slice(1, -1);
+    if (waypoints.length) params.set('waypoints', waypoints.join('|'));
+    links.push(`https://www.google.com/maps/dir/?${params}`);
+  }
+  return links;
+}
+
+/**
+ * 配送路线规划：对选定订单（或某配送日 + 大区的全部有效订单）按司机数量分组并优化顺序
+ * body: { deliveryDate?, region?, orderIds?, drivers?, capacity?, returnToDepot? }
+ */
+export const planDeliveryRoutes = async (req: Request, res: Response) => {
+  try {
+    const { deliveryDate, region, orderIds } = req.body || {};
+    const drivers = Math.min(50, Math.max(1, toInt(req.body?.drivers, config.routing.defaultDrivers)));
+    const capacity = Math.max(0, toInt(req.body?.capacity, config.routing.defaultCapacity));
+    const returnToDepot = req.body?.returnToDepot !== false;
+
+    const where: any = { internalStatus: { not: 'cancelled' } };
+    if (Array.isArray(orderIds) && orderIds.length > 0) {
+      where.id = { in: orderIds.map(String) };
+    } else {
+      const date = parseDeliveryDate(deliveryDate);
+      if (!date) {
+        return res.status(400).json({ error: 'Please provide orderIds or a delivery date (YYYY-MM-DD).' });
+      }
+      where.deliveryDate = date;
+      if (region) where.region = String(region);
+    }
+
+    const orders = await prisma.order.findMany({
+      where,
+      orderBy: { createdAt: 'asc' },
+      select: { id: true, customerName: true, phone: true, address: true, region: true, deliveryTime: true },
+    });
+    if (orders.length === 0) {
+      return res.status(404).json({ error: 'No orders match the selection.' });
+    }
+
+    const locations = await geocodeAddresses(orders.map((o) => o.address));
+    const stops = [];
+    const ungeocoded = [];
+    for (const order of orders) {
+      const location = locations.get(normalizeAddress(order.address));
+      if (location) {
+        stops.push({ ...order, ...location });
+      } else {
+        ungeocoded.push(order);
+      }
+    }
+
+    const depot = { lat: config.routing.depotLat, lng: config.routing.depotLng };
+    const plan = planRoutes(stops, { depot, drivers, capacity, returnToDepot });
+
+    const round = (km: number) => Math.round(km * 100) / 100;
+    const routes = plan.routes.map((route) => {
+      const addresses = [config.routing.depotAddress, ...route.stops.map((s) => s.address)];
+      if (returnToDepot) addresses.push(config.routing.depotAddress);
+      return {
+        driver: route.driver,
+        load: route.load,
+        distanceKm: round(route.distanceKm),
+        returnKm: round(route.returnKm),
+        stops: route.stops.map((stop, index) => ({
+          sequence: index + 1,
+          orderId: stop.id,
+          customerName: stop.customerName,
+          phone: stop.phone,
+          address: stop.address,
+          lat: stop.lat,
+          lng: stop.lng,
+          legKm: round(route.legKm[index]),
+        })),
+        mapsLinks: buildMapsLinks(addresses),
+      };
+    });
+
+    return res.json({
+      depot: { address: config.routing.depotAddress, ...depot },
+      drivers,
+      capacity,
+      totalDistanceKm: round(plan.totalDistanceKm),
+      elapsedMs: plan.elapsedMs,
+      routes,
+      // 超出司机容量的订单
+      unassigned: plan.unassigned.map(({ lat, lng, ...order }) => order),
+      // 无法定位的地址：可通过 PUT /admin/api/geocode 手动设置坐标
+      ungeocoded,
+    });
+  } catch (error: any) {
+    console.error('Error planning routes:', error);
+    return res.status(500).json({ error: 'Failed to plan routes: ' + error.message });
+  }
+};
+
+/**
+ * 手动设置地址坐标
+ * body: { address, lat, lng }
+ */
+export const setGeocode = async (req: Request, res: Response) => {
+  try {
+    const address = String(req.body?.address || '').trim();
+    const lat = Number(req.body?.lat);
+    const lng = Number(req.body?.lng);
+    if (!address || !Number.isFinite(lat) || !Number.isFinite(lng) || Math.abs(lat) > 90 || Math.abs(lng) > 180) {
+      return res.status(400).json({ error: 'address, lat and lng are required.' });
+    }
+
+    const entry = await setAddressLocation(address, { lat, lng });
+    return res.json({ success: true, entry });
+  } catch (error: any) {
+    console.error('Error saving geocode:', error);
+    return res.status(500).json({ error: 'Failed to save geocode: ' + error.message });
+  }
+};
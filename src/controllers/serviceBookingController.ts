@@ -1,8 +1,17 @@
 import { Request, Response } from 'express';
-import { PrismaClient } from '@prisma/client';
+import type { Service } from '@prisma/client';
+import { prisma } from '../db';
 import { config } from '../config';
-
-const prisma = new PrismaClient();
+import { searchCatalog } from '../services/searchIndex';
+import {
+  SlotFullError,
+  bookServiceSlot,
+  findOpenSlots,
+  hasUpcomingSlots,
+  resolveBookingSlot,
+  setServiceBookingStatus,
+} from '../services/serviceSlotService';
+import { parseDeliveryDate } from '../utils/orderItems';
 
 function buildStoredImagePath(file?: Express.Multer.File): string | null {
   if (!file) return null;
@@ -29,27 +38,43 @@ export const listServices = async (req: Request, res: Response) => {
     const limit = Math.min(50, Math.max(1, toInt(req.query.limit, 12)));
     const skip = (page - 1) * limit;
 
+    const qRaw = String(req.query.q || '').trim();
+    const q = qRaw.length ? qRaw.slice(0, 80) : '';
+
     const where = { isActive: true as const };
 
-    const [services, total] = await Promise.all([
-      prisma.service.findMany({
-        where,
-        orderBy: [{ sortOrder: 'asc' }, { updatedAt: 'desc' }],
-        skip,
-        take: limit,
-      }),
-      prisma.service.count({ where }),
-    ]);
+    let services: Service[];
+    let total: number;
+    if (q) {
+      const hits = await searchCatalog(q, { type: 'service' });
+      const ids = hits.slice(skip, skip + limit).map((hit) => hit.id);
+      const rows = await prisma.service.findMany({ where: { ...where, id: { in: ids } } });
+      const byId = new Map(rows.map((row) => [row.id, row]));
+      services = ids.flatMap((id) => byId.get(id) || []);
+      total = hits.length;
+    } else {
+      [services, total] = await Promise.all([
+        prisma.service.findMany({
+          where,
+          orderBy: [{ sortOrder: 'asc' }, { updatedAt: 'desc' }],
+          skip,
+          take: limit,
+        }),
+        prisma.service.count({ where }),
+      ]);
+    }
 
     const totalPages = Math.max(1, Math.ceil(total / limit));
 
     res.render('service-booking/list', {
+      q,
       services,
       pagination: { page, limit, total, totalPages },
     });
   } catch (error) {
     console.error('Error listing services:', error);
     res.status(500).render('service-booking/list', {
+      q: '',
       services: [],
       pagination: { page: 1, limit: 12, total: 0, totalPages: 1 },
       error: 'Failed to load services.',
@@ -65,8 +90,10 @@ export const showServiceDetail = async (req: Request, res: Response) => {
       return res.status(404).render('service-booking/detail', { service: null, timeSlots: [], error: 'Service not found.' });
     }
 
-    const timeSlots: string[] = service.timeSlotsJson ? JSON.parse(service.timeSlotsJson) : [];
-    res.render('service-booking/detail', { service, timeSlots, error: null });
+    // 只列出尚未开始且仍有名额的时段（页面有缓存，时段满员/重新开放时会清空）
+    const timeSlots = await findOpenSlots({ serviceId: service.id });
+    const fullyBooked = timeSlots.length === 0 && (await hasUpcomingSlots(service.id));
+    res.render('service-booking/detail', { service, timeSlots, fullyBooked, error: null });
   } catch (error) {
     console.error('Error loading service detail:', error);
     res.status(500).render('service-booking/detail', { service: null, timeSlots: [], error: 'Failed to load service.' });
@@ -75,9 +102,9 @@ export const showServiceDetail = async (req: Request, res: Response) => {
 
 export const createServiceBooking = async (req: any, res: Response) => {
   try {
-    const { serviceId, customerName, phone, preferredTime, optionalNote } = req.body;
+    const { serviceId, customerName, phone, preferredTime, slotId, optionalNote } = req.body;
 
-    if (!serviceId || !customerName || !phone || !preferredTime) {
+    if (!serviceId || !customerName || !phone || !(preferredTime || slotId)) {
       return res.status(400).json({ error: 'Missing required fields.' });
     }
 
@@ -86,23 +113,40 @@ export const createServiceBooking = async (req: any, res: Response) => {
       return res.status(404).json({ error: 'Service not found.' });
     }
 
-    const referenceImagePath = buildStoredImagePath(req.file);
+    // 配置了时段的服务必须选择其中一个时段；未配置时段的仍可填写期望时间
+    let slot: { id: string; label: string } | null;
+    try {
+      slot = await resolveBookingSlot(serviceId, { slotId, preferredTime });
+    } catch (error: any) {
+      return res.status(400).json({ error: error.message });
+    }
+    if (!slot && !preferredTime) {
+      return res.status(400).json({ error: 'Missing required fields.' });
+    }
 
-    const booking = await prisma.serviceBooking.create({
-      data: {
-        serviceId,
-        customerName: String(customerName).trim(),
-        phone: String(phone).trim(),
-        preferredTime: String(preferredTime).trim(),
-        optionalNote: optionalNote ? String(optionalNote).trim() : null,
-        referenceImagePath,
-        status: 'new',
-        userId: req.session?.auth?.userId || null,
-      },
-    });
+    const referenceImagePath = buildStoredImagePath(req.file);
+    const data = {
+      serviceId,
+      customerName: String(customerName).trim(),
+      phone: String(phone).trim(),
+      preferredTime: slot ? slot.label : String(preferredTime).trim(),
+      slotId: slot ? slot.id : null,
+      optionalNote: optionalNote ? String(optionalNote).trim() : null,
+      referenceImagePath,
+      status: 'new',
+      userId: req.session?.auth?.userId || null,
+    };
+
+    // 占用名额与创建预约在同一事务内，名额已满返回 409
+    const booking = slot
+      ? await bookServiceSlot(slot, (tx) => tx.serviceBooking.create({ data }))
+      : await prisma.serviceBooking.create({ data });
 
     return res.json({ success: true, bookingId: booking.id });
   } catch (error: any) {
+    if (error instanceof SlotFullError) {
+      return res.status(409).json({ error: error.message });
+    }
     console.error('Error creating service booking:', error);
     return res.status(500).json({ error: 'Failed to create booking.' });
   }
@@ -127,3 +171,55 @@ export const showBookingSuccess = async (req: Request, res: Response) => {
   }
 };
 
+/**
+ * 查询可预约时段：按商家和/或服务、日期范围（from/to 为 YYYY-MM-DD，to 含当天）返回尚有名额的时段
+ */
+export const getServiceAvailability = async (req: Request, res: Response) => {
+  try {
+    const merchantId = String(req.query.merchantId || '').trim();
+    const serviceId = String(req.query.serviceId || '').trim();
+    if (!merchantId && !serviceId) {
+      return res.status(400).json({ error: 'merchantId or serviceId is required.' });
+    }
+
+    const from = req.query.from ? parseDeliveryDate(String(req.query.from)) : null;
+    const toDay = req.query.to ? parseDeliveryDate(String(req.query.to)) : null;
+    if ((req.query.from && !from) || (req.query.to && !toDay)) {
+      return res.status(400).json({ error: 'from / to must be dates (YYYY-MM-DD).' });
+    }
+    const to = toDay ? new Date(toDay.getTime() + 24 * 60 * 60 * 1000) : null;
+
+    const slots = await findOpenSlots({
+      merchantId: merchantId || undefined,
+      serviceId: serviceId || undefined,
+      from,
+      to,
+      limit: Math.min(1000, Math.max(1, toInt(req.query.limit, 200))),
+    });
+    return res.json({ slots });
+  } catch (error: any) {
+    console.error('Error loading service availability:', error);
+    return res.status(500).json({ error: 'Failed to load availability: ' + error.message });
+  }
+};
+
+/**
+ * 修改预约状态（后台）：取消时归还时段名额，恢复已取消的预约会重新占用
+ */
+export const updateServiceBookingStatus = async (req: Request, res: Response) => {
+  try {
+    const status = String(req.body?.status || '');
+    if (!['new', 'confirmed', 'completed', 'cancelled'].includes(status)) {
+      return res.status(400).json({ error: 'Invalid status.' });
+    }
+    const booking = await setServiceBookingStatus(req.params.id, status);
+    if (!booking) return res.status(404).json({ error: 'Booking not found.' });
+    return res.json({ success: true, booking });
+  } catch (error: any) {
+    if (error instanceof SlotFullError) {
+      return res.status(409).json({ error: error.message });
+    }
+    console.error('Error updating service booking status:', error);
+    return res.status(500).json({ error: 'Failed to update booking: ' + error.message });
+  }
+};
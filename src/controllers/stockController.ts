@@ -0,0 +1,94 @@
+import { Request, Response } from 'express';
+import { prisma } from '../db';
+import { config } from '../config';
+import { getInventoryStats, reconcileShopifyInventory } from '../services/inventoryService';
+
+/**
+ * 库存 / 名额列表（含待付款占用和已付款占用数量）
+ */
+export const getStockLevels = async (req: Request, res: Response) => {
+  try {
+    const [levels, reserved] = await Promise.all([
+      prisma.stockLevel.findMany({ orderBy: [{ kind: 'asc' }, { label: 'asc' }] }),
+      prisma.stockReservation.groupBy({
+        by: ['stockLevelId', 'status'],
+        where: { status: { in: ['held', 'committed'] } },
+        _sum: { quantity: true },
+      }),
+    ]);
+
+    const usage = new Map<string, { held: number; committed: number }>();
+    for (const row of reserved) {
+      const entry = usage.get(row.stockLevelId) || { held: 0, committed: 0 };
+      if (row.status === 'held') entry.held = row._sum.quantity || 0;
+      else entry.committed = row._sum.quantity || 0;
+      usage.set(row.stockLevelId, entry);
+    }
+
+    return res.json({
+      levels: levels.map((level) => ({ ...level, ...(usage.get(level.id) || { held: 0, committed: 0 }) })),
+      stats: getInventoryStats(),
+    });
+  } catch (error: any) {
+    console.error('Error fetching stock levels:', error);
+    return res.status(500).json({ error: 'Failed to load stock levels: ' + error.message });
+  }
+};
+
+/**
+ * 设置套餐名额 / 变体库存的剩余可售数量（没有记录时开始限量）
+ */
+export const upsertStockLevel = async (req: Request, res: Response) => {
+  try {
+    const kind = String(req.body?.kind || '');
+    const refId = String(req.body?.refId || '').trim();
+    const available = Number(req.body?.available);
+    if (!['package', 'variant'].includes(kind) || !refId || !Number.isInteger(available) || available < 0) {
+      return res.status(400).json({ error: 'kind (package/variant), refId and a non-negative integer available are required.' });
+    }
+
+    let label = req.body?.label ? String(req.body.label) : null;
+    if (kind === 'package') {
+      const pkg = await prisma.package.findUnique({ where: { id: refId }, select: { name: true } });
+      if (!pkg) return res.status(404).json({ error: 'Package not found' });
+      label = label || pkg.name;
+    }
+
+    const level = await prisma.stockLevel.upsert({
+      where: { kind_refId: { kind, refId } },
+      create: { kind, refId, label, available },
+      update: { available, ...(label ? { label } : {}) },
+    });
+    return res.json({ success: true, level });
+  } catch (error: any) {
+    console.error('Error saving stock level:', error);
+    return res.status(500).json({ error: 'Failed to save stock level: ' + error.message });
+  }
+};
+
+/**
+ * 取消限量（删除台账记录及其占用）
+ */
+export const deleteStockLevel = async (req: Request, res: Response) => {
+  try {
+    const { count } = await prisma.stockLevel.deleteMany({ where: { id: req.params.id } });
+    if (count === 0) return res.status(404).json({ error: 'Stock level not found' });
+    return res.json({ success: true });
+  } catch (error: any) {
+    console.error('Error deleting stock level:', error);
+    return res.status(500).json({ error: 'Failed to delete stock level: ' + error.message });
+  }
+};
+
+/**
+ * 立即与 Shopify 库存对账
+ */
+export const reconcileStock = async (req: Request, res: Response) => {
+  try {
+    const result = await reconcileShopifyInventory({ createMissing: config.inventory.trackShopifyInventory });
+    return res.json({ success: true, ...result });
+  } catch (error: any) {
+    console.error('Error reconciling stock:', error);
+    return res.status(500).json({ error: 'Failed to reconcile stock: ' + error.message });
+  }
+};
@@ -0,0 +1,69 @@
+import { PrismaClient, type Prisma } from '@prisma/client';
+import { config } from './config';
+import { currentRouteLabel } from './middlewares/requestContext';
+import { recordQuery, recordSlowQuery } from './utils/dbMetrics';
+
+/**
+ * Apply the configured pool size to DATABASE_URL (unless the URL already sets one).
+ */
+function datasourceUrl(): string | undefined {
+  const url = process.env.DATABASE_URL;
+  if (!url || !config.db.poolSize || /[?&]connection_limit=/.test(url)) return undefined;
+  const sep = url.includes('?') ? '&' : '?';
+  return `${url}${sep}connection_limit=${config.db.poolSize}&pool_timeout=${config.db.poolTimeoutSec}`;
+}
+
+/**
+ * Process-wide Prisma client.
+ * Each PrismaClient owns a query engine and a connection pool, so everything must share this one.
+ */
+export const prisma = new PrismaClient({
+  datasourceUrl: datasourceUrl(),
+});
+
+// Query count / duration per route + slow query log
+prisma.$use(async (params, next) => {
+  const startedAt = process.hrtime.bigint();
+  try {
+    return await next(params);
+  } finally {
+    const durationMs = Number(process.hrtime.bigint() - startedAt) / 1e6;
+    const route = currentRouteLabel();
+    const operation = `${params.model || 'raw'}.${params.action}`;
+    recordQuery(route, operation, durationMs);
+    if (durationMs >= config.db.slowQueryMs) {
+      recordSlowQuery(route, operation, durationMs);
+      console.warn(`[db] slow query ${durationMs.toFixed(0)}ms ${operation} (${route})`);
+    }
+  }
+});
+
+const TX_OPTIONS = { maxWait: 10000, timeout: 15000 };
+const TX_MAX_ATTEMPTS = 6;
+
+function isTransientTxError(error: any): boolean {
+  // P2034: write conflict / deadlock, P2028: transaction could not start in time, P2024: pool timeout
+  if (['P2034', 'P2028', 'P2024', 'P1008'].includes(error?.code)) return true;
+  return /database is locked|SQLITE_BUSY|deadlock detected|could not serialize/i.test(String(error?.message || ''));
+}
+
+/**
+ * Run `fn` in an interactive transaction, retrying the whole transaction on lock timeouts and
+ * write conflicts (`onRetry` is called before each retry). `fn` should start with a write: on
+ * SQLite the transaction then holds the write lock from the start instead of upgrading a read
+ * lock, and on Postgres conditional updates take their row locks first.
+ */
+export async function withRetryingTransaction<T>(
+  fn: (tx: Prisma.TransactionClient) => Promise<T>,
+  onRetry?: () => void
+): Promise<T> {
+  for (let attempt = 1; ; attempt++) {
+    try {
+      return await prisma.$transaction(fn, TX_OPTIONS);
+    } catch (error) {
+      if (attempt >= TX_MAX_ATTEMPTS || !isTransientTxError(error)) throw error;
+      onRetry?.();
+      await new Promise((resolve) => setTimeout(resolve, Math.random() * 10 * 2 ** attempt));
+    }
+  }
+}
@@ -0,0 +1,76 @@
+/**
+ * 回填订单商品明细：为没有 OrderItem 的旧订单解析 itemsJson 写入明细，并补齐 deliveryDate。
+ * 可重复执行（已回填的订单会被跳过）。
+ *
+ *   npm run backfill:order-items        # 编译后（dist）
+ *   npm run backfill:order-items:dev    # tsx 直接运行源码
+ */
+import type { Prisma } from '@prisma/client';
+import { prisma } from '../db';
+import { buildOrderItemRows, orderItemsOf, parseDeliveryDate } from '../utils/orderItems';
+
+const BATCH_SIZE = Number(process.env.BACKFILL_BATCH_SIZE || 200);
+
+async function main() {
+  let lastId: string | undefined;
+  let scanned = 0;
+  let itemsCreated = 0;
+  let datesSet = 0;
+
+  for (;;) {
+    // 按 id > lastId 翻页：回填后的订单不再满足筛选条件，不能用 cursor + skip（会跳过下一条）
+    const orders = await prisma.order.findMany({
+      where: {
+        AND: [{ OR: [{ lineItems: { none: {} } }, { deliveryDate: null }] }, ...(lastId ? [{ id: { gt: lastId } }] : [])],
+      },
+      orderBy: { id: 'asc' },
+      take: BATCH_SIZE,
+      select: {
+        id: true,
+        deliveryTime: true,
+        deliveryDate: true,
+        region: true,
+        itemsJson: true,
+        _count: { select: { lineItems: true } },
+      },
+    });
+    if (orders.length === 0) break;
+    lastId = orders[orders.length - 1].id;
+    scanned += orders.length;
+
+    await prisma.$transaction(
+      orders.flatMap((order) => {
+        const deliveryDate = order.deliveryDate ?? parseDeliveryDate(order.deliveryTime);
+        const ops: Prisma.PrismaPromise<unknown>[] = [];
+        if (!order.deliveryDate && deliveryDate) {
+          datesSet++;
+          ops.push(
+            prisma.order.update({ where: { id: order.id }, data: { deliveryDate } }),
+            // 已有明细的订单也同步冗余的配送日期
+            prisma.orderItem.updateMany({ where: { orderId: order.id }, data: { deliveryDate } })
+          );
+        }
+        if (order._count.lineItems === 0) {
+          const rows = buildOrderItemRows(orderItemsOf({ itemsJson: order.itemsJson }), {
+            deliveryDate,
+            region: order.region,
+          });
+          itemsCreated += rows.length;
+          if (rows.length > 0) {
+            ops.push(prisma.order.update({ where: { id: order.id }, data: { lineItems: { create: rows } } }));
+          }
+        }
+        return ops;
+      })
+    );
+  }
+
+  console.log(`[backfill] scanned ${scanned} orders, created ${itemsCreated} order items, set ${datesSet} delivery dates`);
+}
+
+main()
+  .catch((error) => {
+    console.error('[backfill] failed:', error);
+    process.exitCode = 1;
+  })
+  .finally(() => prisma.$disconnect());
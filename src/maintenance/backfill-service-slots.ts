@@ -0,0 +1,95 @@
+/**
+ * 回填服务时段：把 Service.timeSlotsJson 解析为 ServiceSlot 行，并把已有预约（preferredTime 与时段文本一致）
+ * 关联到对应时段、计入已预约数。可重复执行（已有时段的服务、已关联的预约会被跳过）。
+ *
+ *   npm run backfill:service-slots        # 编译后（dist）
+ *   npm run backfill:service-slots:dev    # tsx 直接运行源码
+ */
+import { prisma } from '../db';
+import { config } from '../config';
+import { buildServiceSlotRows, parseSlotLabels } from '../utils/serviceSlots';
+
+const BATCH_SIZE = Number(process.env.BACKFILL_BATCH_SIZE || 200);
+
+async function main() {
+  let lastId: string | undefined;
+  let services = 0;
+  let slotsCreated = 0;
+  let unparsed = 0;
+
+  for (;;) {
+    const batch = await prisma.service.findMany({
+      // 按 id > lastId 翻页：建好时段的服务不再满足筛选条件，不能用 cursor + skip（会跳过下一条）
+      where: { timeSlotsJson: { not: null }, slots: { none: {} }, ...(lastId ? { id: { gt: lastId } } : {}) },
+      orderBy: { id: 'asc' },
+      take: BATCH_SIZE,
+      select: { id: true, timeSlotsJson: true, durationMins: true, merchantId: true },
+    });
+    if (batch.length === 0) break;
+    lastId = batch[batch.length - 1].id;
+    services += batch.length;
+
+    await prisma.$transaction(
+      batch.flatMap((service) => {
+        const labels = parseSlotLabels(service.timeSlotsJson);
+        const rows = buildServiceSlotRows(labels, service, config.serviceSlots.defaultCapacity);
+        slotsCreated += rows.length;
+        unparsed += labels.length - rows.length;
+        if (rows.length === 0) return [];
+        return [prisma.service.update({ where: { id: service.id }, data: { slots: { create: rows } } })];
+      })
+    );
+  }
+
+  // 已有预约：按 (serviceId, 时段文本) 关联时段；已取消的不占名额。
+  // 只看有时段的服务的预约（纯文本时间的预约永远关联不上），按 id 分批，每批一次查出对应时段；
+  // 占名额与实时预约一样用条件递增（bookedCount < capacity），已满的时段不会被超订，预约保持未关联。
+  let bookingsLinked = 0;
+  let slotsFull = 0;
+  let lastBookingId: string | undefined;
+  for (;;) {
+    const bookings = await prisma.serviceBooking.findMany({
+      where: { slotId: null, service: { slots: { some: {} } }, ...(lastBookingId ? { id: { gt: lastBookingId } } : {}) },
+      orderBy: { id: 'asc' },
+      take: BATCH_SIZE,
+      select: { id: true, serviceId: true, preferredTime: true, status: true },
+    });
+    if (bookings.length === 0) break;
+    lastBookingId = bookings[bookings.length - 1].id;
+
+    const slots = await prisma.serviceSlot.findMany({
+      where: { OR: bookings.map((b) => ({ serviceId: b.serviceId, label: b.preferredTime.trim() })) },
+      select: { id: true, serviceId: true, label: true },
+    });
+    const slotIdOf = new Map(slots.map((slot) => [`${slot.serviceId}\n${slot.label}`, slot.id]));
+
+    for (const booking of bookings) {
+      const slotId = slotIdOf.get(`${booking.serviceId}\n${booking.preferredTime.trim()}`);
+      if (!slotId) continue;
+      const linked = await prisma.$transaction(async (tx) => {
+        if (booking.status !== 'cancelled') {
+          const { count } = await tx.serviceSlot.updateMany({
+            where: { id: slotId, bookedCount: { lt: prisma.serviceSlot.fields.capacity } },
+            data: { bookedCount: { increment: 1 } },
+          });
+          if (count === 0) return false;
+        }
+        await tx.serviceBooking.update({ where: { id: booking.id }, data: { slotId } });
+        return true;
+      });
+      if (linked) bookingsLinked++;
+      else slotsFull++;
+    }
+  }
+
+  console.log(
+    `[backfill] scanned ${services} services, created ${slotsCreated} slots (${unparsed} unparseable/duplicate), linked ${bookingsLinked} bookings (${slotsFull} left unlinked: slot full)`
+  );
+}
+
+main()
+  .catch((error) => {
+    console.error('[backfill] failed:', error);
+    process.exitCode = 1;
+  })
+  .finally(() => prisma.$disconnect());
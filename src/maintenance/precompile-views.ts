@@ -0,0 +1,19 @@
+/**
+ * 预编译 EJS 模板：把 dist/views 下所有 .ejs 编译为一个模块（dist/views/templates.compiled.js），
+ * 启动时直接载入模板缓存，首个请求不再读取 / 编译模板。模板有语法错误时构建失败。
+ *
+ *   npm run build:views   # npm run build 最后一步（需先 copy-views）
+ */
+import path from 'path';
+import { COMPILED_VIEWS_FILE, precompileViews } from '../utils/viewTemplates';
+
+const viewsDir = path.resolve(process.argv[2] || path.join(__dirname, '../views'));
+
+try {
+  const started = Date.now();
+  const count = precompileViews(viewsDir);
+  console.log(`[views] compiled ${count} templates into ${path.join(viewsDir, COMPILED_VIEWS_FILE)} in ${Date.now() - started} ms`);
+} catch (error) {
+  console.error('[views] precompile failed:', error);
+  process.exitCode = 1;
+}
@@ -0,0 +1,28 @@
+/**
+ * 重建商家汇总（MerchantStats / MerchantDailyStats）：按订单、订单明细、评价、套餐 / 服务全量重新计算。
+ * 用于首次上线回填或修复；可重复执行。可传商家 ID 只重建指定商家。
+ *
+ *   npm run backfill:merchant-stats                 # 编译后（dist）
+ *   npm run backfill:merchant-stats:dev -- <id...>  # tsx 直接运行源码
+ */
+import { prisma } from '../db';
+import { rebuildMerchantStats } from '../services/merchantStatsService';
+
+const BATCH_SIZE = Number(process.env.BACKFILL_BATCH_SIZE || 500);
+
+async function main() {
+  const merchantIds = process.argv.slice(2).filter(Boolean);
+  const started = Date.now();
+  const { merchants } = await rebuildMerchantStats({
+    merchantIds: merchantIds.length ? merchantIds : undefined,
+    batchSize: BATCH_SIZE,
+  });
+  console.log(`[backfill] rebuilt stats for ${merchants} merchants in ${Date.now() - started} ms`);
+}
+
+main()
+  .catch((error) => {
+    console.error('[backfill] failed:', error);
+    process.exitCode = 1;
+  })
+  .finally(() => prisma.$disconnect());
@@ -0,0 +1,128 @@
+import crypto from 'crypto';
+import type { Request, Response, NextFunction } from 'express';
+import { config } from '../config';
+import { onCatalogChanged } from '../services/catalogEvents';
+
+type PageEntry = {
+  body: string;
+  etag: string;
+  contentType: string;
+  expiresAt: number;
+};
+
+type FragmentEntry = { value: unknown; expiresAt: number };
+
+// Map insertion order = least recently used first
+const pages = new Map<string, PageEntry>();
+const fragments = new Map<string, FragmentEntry>();
+// Bumped on every invalidation: renders that started before it are not stored
+let generation = 0;
+const stats = { hits: 0, misses: 0, notModified: 0, stores: 0, invalidations: 0, lastInvalidatedAt: null as string | null };
+
+export function clearPageCache(reason = 'manual'): void {
+  generation++;
+  pages.clear();
+  fragments.clear();
+  stats.invalidations++;
+  stats.lastInvalidatedAt = new Date().toISOString();
+  if (reason !== 'manual') console.log(`[page-cache] cleared (${reason})`);
+}
+
+onCatalogChanged((reason) => clearPageCache(reason));
+
+function remember<T>(map: Map<string, T>, key: string, value: T): void {
+  map.delete(key);
+  map.set(key, value);
+  while (map.size > config.pageCache.maxEntries) {
+    const [oldest] = map.keys();
+    map.delete(oldest);
+  }
+}
+
+function cacheKey(req: Request, res: Response): string {
+  // The page only varies by the nav (role / logged in), not by the individual user
+  const role = res.locals.currentRole || 'anonymous';
+  return `${role}|${res.locals.isLoggedIn ? 1 : 0}|${req.originalUrl}`;
+}
+
+/**
+ * Cache successful HTML responses of a GET route in memory.
+ *
+ * Hits are answered without running the handler; the stored ETag makes browsers revalidate
+ * with If-None-Match and get 304. Entries are dropped on catalog writes (notifyCatalogChanged)
+ * and after PAGE_CACHE_TTL_MS.
+ */
+export function pageCache() {
+  return (req: Request, res: Response, next: NextFunction) => {
+    if (!config.pageCache.enabled || (req.method !== 'GET' && req.method !== 'HEAD')) return next();
+
+    const key = cacheKey(req, res);
+    // Shared between users with the same role, never cached by proxies
+    res.setHeader('Cache-Control', 'private, no-cache');
+    res.setHeader('Vary', 'Cookie');
+
+    const entry = pages.get(key);
+    if (entry && entry.expiresAt > Date.now()) {
+      remember(pages, key, entry);
+      stats.hits++;
+      res.setHeader('X-Page-Cache', 'HIT');
+      res.setHeader('ETag', entry.etag);
+      res.setHeader('Content-Type', entry.contentType);
+      if (req.fresh) stats.notModified++;
+      // res.send keeps the ETag above and answers 304 when it matches If-None-Match
+      return res.send(entry.body);
+    }
+
+    stats.misses++;
+    res.setHeader('X-Page-Cache', 'MISS');
+    const startedAt = generation;
+    const send = res.send.bind(res);
+    res.send = (body?: any) => {
+      if (
+        res.statusCode === 200 &&
+        typeof body === 'string' &&
+        !res.getHeader('Set-Cookie') &&
+        startedAt === generation
+      ) {
+        const etag = `W/"${crypto.createHash('sha1').update(body).digest('base64url')}"`;
+        res.setHeader('ETag', etag);
+        remember(pages, key, {
+          body,
+          etag,
+          contentType: String(res.getHeader('Content-Type') || 'text/html; charset=utf-8'),
+          expiresAt: Date.now() + config.pageCache.ttlMs,
+        });
+        stats.stores++;
+      }
+      return send(body);
+    };
+    next();
+  };
+}
+
+/**
+ * Cache a query result shared by several pages/roles (e.g. "hot packages" on the home page).
+ * Invalidated together with the page cache.
+ */
+export async function cachedFragment<T>(key: string, load: () => Promise<T>): Promise<T> {
+  if (config.pageCache.enabled) {
+    const entry = fragments.get(key);
+    if (entry && entry.expiresAt > Date.now()) return entry.value as T;
+  }
+  const startedAt = generation;
+  const value = await load();
+  if (config.pageCache.enabled && startedAt === generation) {
+    remember(fragments, key, { value, expiresAt: Date.now() + config.pageCache.ttlMs });
+  }
+  return value;
+}
+
+export function getPageCacheStats() {
+  return {
+    enabled: config.pageCache.enabled,
+    ttlMs: config.pageCache.ttlMs,
+    pages: pages.size,
+    fragments: fragments.size,
+    ...stats,
+  };
+}
@@ -0,0 +1,39 @@
+import { AsyncLocalStorage } from 'async_hooks';
+import type { Request, Response, NextFunction } from 'express';
+import { recordRequest } from '../utils/dbMetrics';
+
+type RequestContext = {
+  req: Request;
+};
+
+const storage = new AsyncLocalStorage<RequestContext>();
+
+// Requests no route matched (404s, static files, middleware-only paths): one label, so
+// arbitrary URLs can't grow the metrics key space
+const UNMATCHED = '<unmatched>';
+
+/**
+ * Route label for metrics, e.g. "GET /admin/api/orders/:id".
+ * Uses the matched Express route so ids don't explode the key space.
+ */
+export function routeLabel(req: Request): string {
+  const routePath = req.route?.path;
+  return typeof routePath === 'string' ? `${req.method} ${req.baseUrl || ''}${routePath}` : UNMATCHED;
+}
+
+/**
+ * Label of the request currently being handled ("background" outside of a request).
+ */
+export function currentRouteLabel(): string {
+  const ctx = storage.getStore();
+  return ctx ? routeLabel(ctx.req) : 'background';
+}
+
+/**
+ * Keeps the current request reachable from deeper layers (e.g. Prisma middleware)
+ * without threading it through every call.
+ */
+export const requestContext = (req: Request, res: Response, next: NextFunction) => {
+  res.on('finish', () => recordRequest(routeLabel(req)));
+  storage.run({ req }, () => next());
+};
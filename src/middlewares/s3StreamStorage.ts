@@ -0,0 +1,109 @@
+import { Transform } from 'stream';
+import { pipeline } from 'stream/promises';
+import type { Request } from 'express';
+import type multer from 'multer';
+import { config } from '../config';
+import { buildS3Key, createS3Upload, deleteS3Object } from '../services/s3Service';
+import { primeImage } from '../services/imageService';
+import { loadSharp } from '../utils/sharp';
+
+// Encoded uploads up to this size are also written to the image proxy cache
+const PRIME_MAX_BYTES = 2 * 1024 * 1024;
+
+/**
+ * multer storage engine that streams each file straight to S3 instead of buffering it in memory.
+ *
+ * Images (except GIF) are EXIF-rotated, downscaled to UPLOAD_MAX_DIMENSION and re-encoded
+ * to WebP on the way. sharp decodes once the file has been received and does the work on
+ * libuv's thread pool (UV_THREADPOOL_SIZE threads), so the event loop stays free and at most
+ * that many images are decoded at once. Without sharp, or with UPLOAD_RECOMPRESS=false,
+ * the original bytes are streamed through unchanged.
+ */
+export class S3StreamStorage implements multer.StorageEngine {
+  _handleFile(
+    _req: Request,
+    file: Express.Multer.File,
+    callback: (error?: any, info?: Partial<Express.Multer.File>) => void
+  ): void {
+    const sharp = config.upload.recompress && file.mimetype !== 'image/gif' ? loadSharp() : null;
+    this.store(file, sharp).then(
+      (info) => callback(null, info),
+      (error) => {
+        if (String(error?.message).includes('请上传')) return callback(error);
+        console.error('S3 上传失败:', error);
+        callback(new Error(`文件上传到 S3 失败: ${error.message}`));
+      }
+    );
+  }
+
+  _removeFile(_req: Request, file: Express.Multer.File, callback: (error: Error | null) => void): void {
+    if (!file.s3Key) return callback(null);
+    deleteS3Object(file.s3Key).then(
+      () => callback(null),
+      (error) => callback(error)
+    );
+  }
+
+  private async store(file: Express.Multer.File, sharp: ReturnType<typeof loadSharp>): Promise<Partial<Express.Multer.File>> {
+    const contentType = sharp ? 'image/webp' : file.mimetype;
+    const key = buildS3Key(sharp ? 'image.webp' : file.originalname);
+
+    // Counts bytes and keeps a copy of small outputs for the image cache
+    let size = 0;
+    let kept: Buffer[] | null = [];
+    const tap = new Transform({
+      transform(chunk: Buffer, _encoding, done) {
+        size += chunk.length;
+        if (kept) {
+          kept.push(chunk);
+          if (size > PRIME_MAX_BYTES) kept = null;
+        }
+        done(null, chunk);
+      },
+    });
+
+    const upload = createS3Upload(key, tap, contentType);
+    // Over UPLOAD_MAX_SIZE: multer truncates the stream and rejects the request, stop uploading
+    file.stream.once('limit', () => {
+      upload.abort().catch(() => undefined);
+    });
+
+    const stages: Array<NodeJS.ReadableStream | NodeJS.WritableStream> = [file.stream];
+    let decodeFailed = false;
+    if (sharp) {
+      const transformer = sharp({ animated: false })
+        .rotate()
+        .resize({
+          width: config.upload.maxDimension,
+          height: config.upload.maxDimension,
+          fit: 'inside',
+          withoutEnlargement: true,
+        })
+        .webp({ quality: config.upload.webpQuality });
+      transformer.once('error', () => {
+        decodeFailed = true;
+      });
+      stages.push(transformer);
+    }
+    stages.push(tap);
+
+    const streamed = pipeline(stages).catch((error) => {
+      upload.abort().catch(() => undefined);
+      // 文件类型正确但内容无法解码（损坏/伪装的图片）：按用户输入错误处理
+      throw decodeFailed ? new Error('请上传有效的图片文件（无法读取图片内容）') : error;
+    });
+    // An S3 failure stops reading from `tap`: destroy it so the pipeline fails instead of stalling
+    const uploaded = upload.done().catch((error) => {
+      tap.destroy(error);
+      throw error;
+    });
+    uploaded.catch(() => undefined); // surfaced through `streamed`
+    await streamed;
+    const result = await uploaded;
+
+    const etag = 'ETag' in result ? result.ETag || '' : '';
+    if (kept && etag) primeImage(key, Buffer.concat(kept), { etag, contentType });
+
+    return { s3Key: key, filename: key, size, mimetype: contentType };
+  }
+}
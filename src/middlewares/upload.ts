@@ -2,7 +2,8 @@ import multer from 'multer';
 import path from 'path';
 import fs from 'fs';
 import { config } from '../config';
-import { uploadToS3, getS3PublicUrl } from '../services/s3Service';
+import { getS3PublicUrl } from '../services/s3Service';
+import { S3StreamStorage } from './s3StreamStorage';
 
 declare global {
   namespace Express {
@@ -16,11 +17,11 @@ declare global {
   }
 }
 
-// 如果启用 S3，使用内存存储；否则使用磁盘存储
+// 如果启用 S3，边接收边上传到 S3（不在内存中缓存整个文件）；否则使用磁盘存储
 let storage: multer.StorageEngine;
 
 if (config.s3.enabled) {
-  storage = multer.memoryStorage();
+  storage = new S3StreamStorage();
 } else {
 const uploadDir = config.upload.dest;
 if (!fs.existsSync(uploadDir)) {
@@ -72,23 +73,10 @@ export const uploadWithS3Field = (fieldName: string) => {
         return next(err);
       }
 
-      if (config.s3.enabled && req.file) {
-        try {
-          const fileBuffer = req.file.buffer;
-          const fileName = req.file.originalname;
-          const contentType = req.file.mimetype;
-
-          const s3Key = await uploadToS3(fileBuffer, fileName, contentType);
-          req.file.s3Key = s3Key;
-
-          if (config.s3.publicAccess) {
-            req.file.s3Url = getS3PublicUrl(s3Key);
-          }
-
-          req.file.filename = s3Key;
-        } catch (s3Error: any) {
-          console.error('S3 上传失败:', s3Error);
-          return next(new Error(`文件上传到 S3 失败: ${s3Error.message}`));
+      // S3 存储引擎已完成上传（req.file.s3Key）
+      if (config.s3.enabled && req.file?.s3Key) {
+        if (config.s3.publicAccess) {
+          req.file.s3Url = getS3PublicUrl(req.file.s3Key);
         }
       }
 
@@ -5,12 +5,23 @@ import {
   showOrderDetail,
   getProducts,
   getProductsWithTranslations,
+  getProductCacheStats,
+  invalidateProductCache,
+  getShopifyHttpStats,
+  getPageCacheStatus,
+  invalidatePageCache,
+  getSearchIndexStatus,
 } from '../controllers/adminController';
 import {
   getOrders,
   getOrderById,
   updateOrderStatus,
   deleteOrder,
+  retryShopifySync,
+  getShopifySyncStats,
+  getOrderItemSummary,
+  getPickingList,
+  exportOrders,
 } from '../controllers/orderController';
 import {
   getAllPackages,
@@ -26,6 +37,12 @@ import {
   deleteMapping,
   batchCreateMappings,
 } from '../controllers/productMappingController';
+import { getMetrics, resetMetrics } from '../controllers/metricsController';
+import { getImageCacheStatus } from '../controllers/imageController';
+import { planDeliveryRoutes, setGeocode } from '../controllers/routePlanningController';
+import { getStockLevels, upsertStockLevel, deleteStockLevel, reconcileStock } from '../controllers/stockController';
+import { printOrders, getPrintStatus } from '../controllers/printController';
+import { updateServiceBookingStatus } from '../controllers/serviceBookingController';
 import { requireAuth, redirectIfAuthenticated } from '../middlewares/auth';
 
 const router = Router();
@@ -36,6 +53,9 @@ router.post('/admin/logout', requireAuth, logout);
 // 订单列表页面
 router.get('/admin/orders', requireAuth, showOrders);
 
+// 批量打印（配货单 + 地址标签），须在 /admin/orders/:id 之前
+router.get('/admin/orders/print', requireAuth, printOrders);
+
 // 订单详情页面
 router.get('/admin/orders/:id', requireAuth, showOrderDetail);
 
@@ -51,9 +71,22 @@ router.get('/admin/product-mappings', requireAuth, (req, res) => {
 
 // API 接口 - 订单
 router.get('/admin/api/orders', requireAuth, getOrders);
+router.get('/admin/api/orders/export', requireAuth, exportOrders);
+router.get('/admin/api/order-items/summary', requireAuth, getOrderItemSummary);
+router.get('/admin/api/picking', requireAuth, getPickingList);
+router.get('/admin/api/print', requireAuth, getPrintStatus);
 router.get('/admin/api/orders/:id', requireAuth, getOrderById);
 router.patch('/admin/api/orders/:id/status', requireAuth, updateOrderStatus);
 router.delete('/admin/api/orders/:id', requireAuth, deleteOrder);
+router.post('/admin/api/orders/:id/shopify-sync', requireAuth, retryShopifySync);
+router.get('/admin/api/shopify-sync', requireAuth, getShopifySyncStats);
+
+// API 接口 - 服务预约（取消时归还时段名额）
+router.patch('/admin/api/service-bookings/:id/status', requireAuth, updateServiceBookingStatus);
+
+// API 接口 - 配送路线规划
+router.post('/admin/api/route-plan', requireAuth, planDeliveryRoutes);
+router.put('/admin/api/geocode', requireAuth, setGeocode);
 
 // API 接口 - 套餐
 router.get('/admin/api/packages', requireAuth, getAllPackages);
@@ -70,8 +103,25 @@ router.patch('/admin/api/product-mappings/:id', requireAuth, upsertMapping);
 router.delete('/admin/api/product-mappings/:id', requireAuth, deleteMapping);
 router.post('/admin/api/product-mappings/batch', requireAuth, batchCreateMappings);
 
+// API 接口 - 库存 / 团购名额
+router.get('/admin/api/stock', requireAuth, getStockLevels);
+router.put('/admin/api/stock', requireAuth, upsertStockLevel);
+router.delete('/admin/api/stock/:id', requireAuth, deleteStockLevel);
+router.post('/admin/api/stock/reconcile', requireAuth, reconcileStock);
+
 // API 接口 - 商品（用于套餐管理）
 router.get('/admin/api/products', requireAuth, getProducts);
 router.get('/admin/api/products-with-translations', requireAuth, getProductsWithTranslations);
+router.get('/admin/api/products/cache', requireAuth, getProductCacheStats);
+router.post('/admin/api/products/cache/invalidate', requireAuth, invalidateProductCache);
+router.get('/admin/api/shopify/stats', requireAuth, getShopifyHttpStats);
+
+// API 接口 - 运行指标（按路由的 DB 查询次数/耗时、慢查询）
+router.get('/admin/api/metrics', requireAuth, getMetrics);
+router.post('/admin/api/metrics/reset', requireAuth, resetMetrics);
+router.get('/admin/api/images/cache', requireAuth, getImageCacheStatus);
+router.get('/admin/api/page-cache', requireAuth, getPageCacheStatus);
+router.post('/admin/api/page-cache/invalidate', requireAuth, invalidatePageCache);
+router.get('/admin/api/search-index', requireAuth, getSearchIndexStatus);
 
 export default router;
@@ -1,10 +1,11 @@
 import { Router } from 'express';
 import { showHome } from '../controllers/homeController';
+import { pageCache } from '../middlewares/pageCache';
 
 const router = Router();
 
 // Home Page (new unified entry)
-router.get('/home', showHome);
+router.get('/home', pageCache(), showHome);
 
 // User login placeholder (Phase 2)
 router.get('/user-login', (req, res) => {
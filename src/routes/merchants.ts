@@ -1,12 +1,13 @@
 import { Router } from 'express';
 import { showMerchantDetail, showMerchantSearch } from '../controllers/merchantPublicController';
 import { asyncHandler } from '../utils/asyncHandler';
+import { pageCache } from '../middlewares/pageCache';
 
 const router = Router();
 
 // Public merchant browse/search
-router.get('/merchants', asyncHandler(showMerchantSearch));
-router.get('/merchants/:id', asyncHandler(showMerchantDetail));
+router.get('/merchants', pageCache(), asyncHandler(showMerchantSearch));
+router.get('/merchants/:id', pageCache(), asyncHandler(showMerchantDetail));
 
 export default router;
 
@@ -1,6 +1,7 @@
 import { Router } from 'express';
 import {
   createServiceBooking,
+  getServiceAvailability,
   listServices,
   showBookingSuccess,
   showServiceDetail,
@@ -15,16 +16,20 @@ import {
   upsertMerchantQuote,
 } from '../controllers/customServiceRequestController';
 import { uploadWithS3Field } from '../middlewares/upload';
+import { pageCache } from '../middlewares/pageCache';
 
 const router = Router();
 
 // Service Booking module (Phase 2 extension entry)
-router.get('/service-booking', listServices);
-router.get('/service-booking/services/:id', showServiceDetail);
+router.get('/service-booking', pageCache(), listServices);
+router.get('/service-booking/services/:id', pageCache(), showServiceDetail);
 
 // Create booking (with optional reference image)
 router.post('/service-booking/api/bookings', uploadWithS3Field('reference_image'), createServiceBooking);
 
+// Open time slots for a merchant / service over a date range
+router.get('/service-booking/api/availability', getServiceAvailability);
+
 // Success page
 router.get('/service-booking/bookings/:id/success', showBookingSuccess);
 
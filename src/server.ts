@@ -1,13 +1,55 @@
-import app from './app';
+import type { Server } from 'http';
+import app, { sessionStore } from './app';
 import { config } from './config';
+import { shopifySyncWorker } from './services/shopifySyncWorker';
+import { prisma } from './db';
+import { startStockMaintenance } from './services/inventoryService';
+import { startEventLoopMonitor } from './utils/eventLoopMetrics';
+import { markReady, markShuttingDown, warmUp } from './services/warmup';
 
 const PORT = config.port;
 
-app.listen(PORT, () => {
-  console.log(`🚀 Server is running on http://localhost:${PORT}`);
-  console.log(`🏠 Home page: http://localhost:${PORT}/home`);
-  console.log(`📱 Order page: http://localhost:${PORT}/order`);
-  console.log(`🔍 Query order: http://localhost:${PORT}/query-order`);
-  console.log(`🔐 Admin panel: http://localhost:${PORT}/admin-login`);
+startEventLoopMonitor();
+
+let server: Server | null = null;
+
+// 预热（数据库连接、模板、缓存）完成后才开始监听，pm2 reload / 负载均衡不会把请求交给冷进程
+async function start() {
+  if (config.startup.warmup) await warmUp(app);
+  server = app.listen(PORT, () => {
+    markReady();
+    console.log(`🚀 Server is running on http://localhost:${PORT} (ready ${Math.round(process.uptime() * 1000)} ms after start)`);
+    console.log(`🏠 Home page: http://localhost:${PORT}/home`);
+    console.log(`📱 Order page: http://localhost:${PORT}/order`);
+    console.log(`🔍 Query order: http://localhost:${PORT}/query-order`);
+    console.log(`🔐 Admin panel: http://localhost:${PORT}/admin-login`);
+  });
+}
+
+start().catch((error) => {
+  console.error('Failed to start server:', error);
+  process.exit(1);
 });
 
+// 单例后台任务只在 0 号实例运行（pm2 cluster / src/cluster.ts 会设置 NODE_APP_INSTANCE）
+if (config.cluster.runBackgroundJobs) {
+  if (config.shopifySync.enabled) {
+    shopifySyncWorker.start();
+  }
+  sessionStore?.startSweeper(config.session.sweepIntervalMs);
+  startStockMaintenance();
+}
+
+// Graceful shutdown: stop taking new jobs and let in-flight Shopify syncs finish
+const shutdown = (signal: string) => {
+  console.log(`${signal} received, shutting down...`);
+  markShuttingDown();
+  server?.close();
+  shopifySyncWorker
+    .stop()
+    .catch((error) => console.error('Error stopping Shopify sync worker:', error))
+    .then(() => prisma.$disconnect())
+    .finally(() => process.exit(0));
+};
+process.once('SIGTERM', () => shutdown('SIGTERM'));
+process.once('SIGINT', () => shutdown('SIGINT'));
@@ -0,0 +1,32 @@
+import { EventEmitter } from 'events';
+
+/**
+ * "Catalog changed" notifications (packages, services, merchants).
+ *
+ * Writers call `notifyCatalogChanged()`; caches of rendered pages / query results subscribe with
+ * `onCatalogChanged()`. Under src/cluster.ts the event is also relayed to the other workers
+ * through the primary process. Other multi-instance setups (pm2 cluster, several hosts) rely on
+ * the caches' TTL instead.
+ */
+const CATALOG_CHANGED = 'catalog:changed';
+
+const emitter = new EventEmitter();
+emitter.setMaxListeners(50);
+
+export function onCatalogChanged(listener: (reason: string) => void): void {
+  emitter.on(CATALOG_CHANGED, listener);
+}
+
+export function notifyCatalogChanged(reason: string): void {
+  emitter.emit(CATALOG_CHANGED, reason);
+  if (process.send && process.env.CLUSTER_RELAY === '1') {
+    process.send({ type: CATALOG_CHANGED, reason });
+  }
+}
+
+// Relayed from another worker by the cluster primary
+process.on('message', (message: any) => {
+  if (message && message.type === CATALOG_CHANGED && message.relayed) {
+    emitter.emit(CATALOG_CHANGED, String(message.reason || 'relayed'));
+  }
+});
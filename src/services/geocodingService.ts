@@ -0,0 +1,95 @@
+import axios from 'axios';
+import { config } from '../config';
+import { prisma } from '../db';
+
+export type LatLng = { lat: number; lng: number };
+
+/**
+ * 地址规范化（缓存键）：忽略大小写、多余空格和标点差异
+ */
+export function normalizeAddress(address: string): string {
+  return String(address || '')
+    .toLowerCase()
+    .replace(/[.,#]/g, ' ')
+    .replace(/\s+/g, ' ')
+    .trim();
+}
+
+async function geocodeWithGoogle(address: string): Promise<LatLng | null> {
+  const response = await axios.get('https://maps.googleapis.com/maps/api/geocode/json', {
+    params: { address, key: config.routing.googleApiKey, region: 'au' },
+    timeout: 10000,
+  });
+  const { status, results } = response.data || {};
+  if (status === 'ZERO_RESULTS') return null;
+  if (status !== 'OK' || !results?.length) {
+    throw new Error(`Geocoding failed: ${status || 'unknown status'}`);
+  }
+  const { lat, lng } = results[0].geometry.location;
+  return { lat: Number(lat), lng: Number(lng) };
+}
+
+/**
+ * 批量地址 -> 坐标。先查 GeocodeCache（一次查询），未命中的地址在配置了地理编码服务时
+ * 才调用外部 API（有并发上限）并写回缓存。无法定位的地址不出现在返回的 Map 中。
+ */
+export async function geocodeAddresses(addresses: string[]): Promise<Map<string, LatLng>> {
+  const byKey = new Map<string, string>();
+  for (const address of addresses) {
+    const key = normalizeAddress(address);
+    if (key && !byKey.has(key)) byKey.set(key, address);
+  }
+
+  const result = new Map<string, LatLng>();
+  const cached = await prisma.geocodeCache.findMany({ where: { addressKey: { in: Array.from(byKey.keys()) } } });
+  for (const row of cached) {
+    if (row.status === 'ok' && row.lat !== null && row.lng !== null) {
+      result.set(row.addressKey, { lat: row.lat, lng: row.lng });
+    }
+    byKey.delete(row.addressKey);
+  }
+
+  if (config.routing.geocoder === 'google' && byKey.size > 0) {
+    const misses = Array.from(byKey.entries());
+    let next = 0;
+    const worker = async () => {
+      while (next < misses.length) {
+        const [key, address] = misses[next++];
+        try {
+          const location = await geocodeWithGoogle(address);
+          await prisma.geocodeCache.upsert({
+            where: { addressKey: key },
+            create: {
+              addressKey: key,
+              address,
+              lat: location?.lat ?? null,
+              lng: location?.lng ?? null,
+              status: location ? 'ok' : 'not_found',
+              provider: 'google',
+            },
+            update: {},
+          });
+          if (location) result.set(key, location);
+        } catch (error: any) {
+          // 临时错误不写缓存，下次再试
+          console.error(`Geocoding "${address}" failed:`, error.message);
+        }
+      }
+    };
+    await Promise.all(Array.from({ length: Math.min(config.routing.geocodeConcurrency, misses.length) }, worker));
+  }
+
+  return result;
+}
+
+/**
+ * 手动设置地址坐标（没有地理编码服务时，或修正错误的定位）
+ */
+export async function setAddressLocation(address: string, location: LatLng) {
+  const addressKey = normalizeAddress(address);
+  return prisma.geocodeCache.upsert({
+    where: { addressKey },
+    create: { addressKey, address, lat: location.lat, lng: location.lng, status: 'ok', provider: 'manual' },
+    update: { lat: location.lat, lng: location.lng, status: 'ok', provider: 'manual' },
+  });
+}
@@ -0,0 +1,97 @@
+import fs from 'fs';
+import { config } from '../config';
+import { DiskLruCache, type DiskCacheEntry } from '../utils/diskLruCache';
+import { getS3Object } from './s3Service';
+import { loadSharp } from '../utils/sharp';
+
+export const imageCache = new DiskLruCache(config.imageCache.dir, config.imageCache.maxBytes);
+
+// 同一个对象的并发请求只回源一次（订单列表一次会请求几十张图）
+const inflight = new Map<string, Promise<DiskCacheEntry>>();
+
+function singleFlight(cacheKey: string, load: () => Promise<DiskCacheEntry>): Promise<DiskCacheEntry> {
+  const pending = inflight.get(cacheKey);
+  if (pending) return pending;
+  const promise = load().finally(() => inflight.delete(cacheKey));
+  inflight.set(cacheKey, promise);
+  return promise;
+}
+
+function variantKey(key: string, width?: number): string {
+  return width ? `${key}@w${width}` : key;
+}
+
+export function isThumbnailWidth(width: number): boolean {
+  return config.imageCache.thumbnailWidths.includes(width);
+}
+
+async function renderThumbnail(original: Buffer, etag: string, width: number) {
+  const sharp = loadSharp();
+  if (!sharp) return null;
+  const data = await sharp(original, { animated: false })
+    .rotate() // 按 EXIF 方向摆正（手机截图/照片）
+    .resize({ width, height: width, fit: 'inside', withoutEnlargement: true })
+    .webp({ quality: 75 })
+    .toBuffer();
+  // 缩略图的 ETag 由原图 ETag 派生：原图不变则缩略图不变
+  return { data, etag: `W/"${etag.replace(/^W\//, '').replace(/"/g, '')}-w${width}"`, contentType: 'image/webp' };
+}
+
+/**
+ * 获取原图（本地缓存优先，未命中时从 S3 读取并写入缓存）
+ */
+export function getOriginal(key: string): Promise<DiskCacheEntry> {
+  return singleFlight(key, async () => {
+    const cached = await imageCache.get(key);
+    if (cached) return cached;
+
+    const object = await getS3Object(key);
+    return imageCache.put(key, object.body, { etag: object.etag, contentType: object.contentType });
+  });
+}
+
+/**
+ * 获取指定宽度的缩略图（缓存优先，未命中时由原图生成）；无法生成时返回原图
+ */
+export function getThumbnail(key: string, width: number): Promise<DiskCacheEntry> {
+  const cacheKey = variantKey(key, width);
+  return singleFlight(cacheKey, async () => {
+    const cached = await imageCache.get(cacheKey);
+    if (cached) return cached;
+
+    const original = await getOriginal(key);
+    const thumbnail = await renderThumbnail(await fs.promises.readFile(original.file), original.etag, width).catch(
+      (error) => {
+        console.error(`[images] thumbnail ${cacheKey} failed:`, error.message);
+        return null;
+      }
+    );
+    if (!thumbnail) return original;
+    return imageCache.put(cacheKey, thumbnail.data, { etag: thumbnail.etag, contentType: thumbnail.contentType });
+  });
+}
+
+/**
+ * 上传后预热：写入原图并预先生成全部尺寸的缩略图（后台执行，失败只记录日志）
+ */
+export function primeImage(key: string, data: Buffer, meta: { etag: string; contentType: string }): void {
+  void (async () => {
+    const original = await imageCache.put(key, data, meta);
+    // GIF 等动图不生成缩略图
+    if (meta.contentType === 'image/gif') return;
+    for (const width of config.imageCache.thumbnailWidths) {
+      const cacheKey = variantKey(key, width);
+      const thumbnail = await renderThumbnail(data, original.etag, width);
+      if (!thumbnail) return;
+      await imageCache.put(cacheKey, thumbnail.data, { etag: thumbnail.etag, contentType: thumbnail.contentType });
+    }
+  })().catch((error) => console.error(`[images] priming ${key} failed:`, error.message));
+}
+
+export function getImageCacheStats() {
+  return {
+    ...imageCache.stats(),
+    inflight: inflight.size,
+    thumbnailWidths: config.imageCache.thumbnailWidths,
+  };
+}
@@ -0,0 +1,368 @@
+import type { Prisma } from '@prisma/client';
+import { prisma, withRetryingTransaction } from '../db';
+import { config } from '../config';
+import { shopifyService } from './shopifyService';
+import { applyOrderToStats, loadOrderFacts } from './merchantStatsService';
+
+/**
+ * Local stock / group-buy quota ledger (StockLevel + StockReservation).
+ *
+ * A package or Shopify variant is only limited when it has a StockLevel row. Checkout creates
+ * the order and its reservations in one transaction; each reservation is a conditional
+ * decrement (`available >= quantity`), so concurrent checkouts can never take the same unit
+ * twice. Rows are decremented in id order (no lock-order deadlocks on Postgres), and every
+ * transaction writes before it reads, so on SQLite it holds the write lock from the start
+ * instead of upgrading a read lock. Lock timeouts / write conflicts are retried.
+ *
+ * Cart orders "hold" their stock until the payment is submitted; holds that expire cancel the
+ * unpaid order and return the stock. Cancelling or deleting an order releases its stock,
+ * re-activating a cancelled order takes it again.
+ */
+export type StockKind = 'package' | 'variant';
+
+export type StockRequest = { kind: StockKind; refId: string; quantity: number; label?: string };
+
+export type StockShortage = { kind: StockKind; refId: string; label: string; requested: number; available: number };
+
+export class InsufficientStockError extends Error {
+  shortages: StockShortage[];
+
+  constructor(shortages: StockShortage[]) {
+    super(
+      'Not enough stock: ' +
+        shortages.map((s) => `"${s.label}" (${Math.max(0, s.available)} left, ${s.requested} requested)`).join(', ')
+    );
+    this.name = 'InsufficientStockError';
+    this.shortages = shortages;
+  }
+}
+
+const stats = {
+  reserved: 0,
+  rejected: 0,
+  retries: 0,
+  released: 0,
+  expiredOrders: 0,
+  lastSweepAt: null as string | null,
+  lastReconcileAt: null as string | null,
+  lastReconcileError: null as string | null,
+};
+
+/**
+ * Run `fn` in a retrying interactive transaction (see withRetryingTransaction in db.ts), counting
+ * retries in the inventory stats. `fn` must start with a write (see the note at the top of this file).
+ */
+export function withStockTransaction<T>(fn: (tx: Prisma.TransactionClient) => Promise<T>): Promise<T> {
+  return withRetryingTransaction(fn, () => {
+    stats.retries++;
+  });
+}
+
+function mergeRequests(requests: StockRequest[]): StockRequest[] {
+  const merged = new Map<string, StockRequest>();
+  for (const request of requests) {
+    if (!request.refId || !(request.quantity > 0)) continue;
+    const key = `${request.kind}:${request.refId}`;
+    const existing = merged.get(key);
+    if (existing) existing.quantity += request.quantity;
+    else merged.set(key, { ...request });
+  }
+  return [...merged.values()];
+}
+
+/**
+ * Stock requests for an order: one per package (quota) and one per Shopify variant.
+ */
+export function stockRequestsFor(
+  packages: Array<{ id: string; name: string; quantity: number }>,
+  items: Array<{ title?: string; shopifyVariantId?: string | null; quantity: number | string }>
+): StockRequest[] {
+  return mergeRequests([
+    ...packages.map((pkg) => ({ kind: 'package' as const, refId: pkg.id, quantity: pkg.quantity, label: pkg.name })),
+    ...items
+      .filter((item) => item.shopifyVariantId)
+      .map((item) => ({
+        kind: 'variant' as const,
+        refId: String(item.shopifyVariantId),
+        quantity: Number(item.quantity) || 0,
+        label: item.title,
+      })),
+  ]);
+}
+
+/**
+ * Create an order and reserve its stock atomically: either the order exists with all of its
+ * reservations, or (InsufficientStockError / any other error) nothing was written.
+ *
+ * `hold: true` (cart checkout, payment still to come) makes the reservations expire after
+ * STOCK_HOLD_MINUTES unless commitHeldStock() runs first.
+ */
+export async function createOrderWithStock<T extends { id: string }>(
+  requests: StockRequest[],
+  createOrder: (tx: Prisma.TransactionClient) => Promise<T>,
+  options: { hold?: boolean } = {}
+): Promise<T> {
+  const merged = mergeRequests(requests);
+  const levels = merged.length
+    ? await prisma.stockLevel.findMany({
+        where: { OR: merged.map(({ kind, refId }) => ({ kind, refId })) },
+        select: { id: true, kind: true, refId: true, label: true },
+      })
+    : [];
+  const tracked = levels
+    .map((level) => ({ level, request: merged.find((r) => r.kind === level.kind && r.refId === level.refId)! }))
+    .sort((a, b) => (a.level.id < b.level.id ? -1 : 1));
+  const expiresAt = options.hold ? new Date(Date.now() + config.inventory.holdMinutes * 60 * 1000) : null;
+
+  try {
+    const order = await withStockTransaction(async (tx) => {
+      const created = await createOrder(tx);
+      for (const { level, request } of tracked) {
+        const updated = await tx.stockLevel.updateMany({
+          where: { id: level.id, available: { gte: request.quantity } },
+          data: { available: { decrement: request.quantity } },
+        });
+        if (updated.count === 0) {
+          const current = await tx.stockLevel.findUnique({ where: { id: level.id }, select: { available: true } });
+          if (!current) continue; // no longer tracked
+          throw new InsufficientStockError([
+            {
+              kind: request.kind,
+              refId: request.refId,
+              label: level.label || request.label || request.refId,
+              requested: request.quantity,
+              available: current.available,
+            },
+          ]);
+        }
+        await tx.stockReservation.create({
+          data: {
+            orderId: created.id,
+            stockLevelId: level.id,
+            quantity: request.quantity,
+            status: expiresAt ? 'held' : 'committed',
+            expiresAt,
+          },
+        });
+      }
+      return created;
+    });
+    if (tracked.length) stats.reserved++;
+    return order;
+  } catch (error) {
+    if (error instanceof InsufficientStockError) stats.rejected++;
+    throw error;
+  }
+}
+
+/**
+ * Payment submitted: the order keeps its stock (no expiry any more).
+ */
+export function commitHeldStock(tx: Prisma.TransactionClient, orderId: string) {
+  return tx.stockReservation.updateMany({
+    where: { orderId, status: 'held' },
+    data: { status: 'committed', expiresAt: null },
+  });
+}
+
+/**
+ * Return an order's stock. Call inside withStockTransaction(), after the order write.
+ */
+export async function releaseReservations(tx: Prisma.TransactionClient, orderId: string): Promise<number> {
+  const reservations = await tx.stockReservation.findMany({
+    where: { orderId, status: { not: 'released' } },
+    orderBy: { stockLevelId: 'asc' },
+  });
+  let released = 0;
+  for (const reservation of reservations) {
+    // Flip the status first: a concurrent release of the same reservation returns the stock once
+    const flipped = await tx.stockReservation.updateMany({
+      where: { id: reservation.id, status: { not: 'released' } },
+      data: { status: 'released', expiresAt: null },
+    });
+    if (flipped.count === 0) continue;
+    await tx.stockLevel.updateMany({
+      where: { id: reservation.stockLevelId },
+      data: { available: { increment: reservation.quantity } },
+    });
+    released += reservation.quantity;
+  }
+  stats.released += released;
+  return released;
+}
+
+/**
+ * Take the stock of a cancelled order again (order re-activated). Throws InsufficientStockError
+ * when it is no longer available. Call inside withStockTransaction(), after the order write.
+ */
+export async function restoreReservations(tx: Prisma.TransactionClient, orderId: string): Promise<void> {
+  const reservations = await tx.stockReservation.findMany({
+    where: { orderId, status: 'released' },
+    include: { stockLevel: { select: { kind: true, refId: true, label: true } } },
+    orderBy: { stockLevelId: 'asc' },
+  });
+  for (const reservation of reservations) {
+    const updated = await tx.stockLevel.updateMany({
+      where: { id: reservation.stockLevelId, available: { gte: reservation.quantity } },
+      data: { available: { decrement: reservation.quantity } },
+    });
+    if (updated.count === 0) {
+      const current = await tx.stockLevel.findUnique({ where: { id: reservation.stockLevelId }, select: { available: true } });
+      throw new InsufficientStockError([
+        {
+          kind: reservation.stockLevel.kind as StockKind,
+          refId: reservation.stockLevel.refId,
+          label: reservation.stockLevel.label || reservation.stockLevel.refId,
+          requested: reservation.quantity,
+          available: current?.available ?? 0,
+        },
+      ]);
+    }
+    await tx.stockReservation.update({ where: { id: reservation.id }, data: { status: 'committed', expiresAt: null } });
+  }
+}
+
+/**
+ * Cancel unpaid cart orders whose hold expired and return their stock. Orders that were paid
+ * or handled by an admin in the meantime keep their stock.
+ */
+export async function releaseExpiredHolds(now = new Date()): Promise<number> {
+  const expired = await prisma.stockReservation.findMany({
+    where: { status: 'held', expiresAt: { lt: now } },
+    select: { orderId: true },
+    distinct: ['orderId'],
+    take: 200,
+  });
+
+  let cancelled = 0;
+  for (const { orderId } of expired) {
+    await withStockTransaction(async (tx) => {
+      // Payment not submitted yet = still "new" and no Shopify sync job
+      const result = await tx.order.updateMany({
+        where: { id: orderId, internalStatus: 'new', shopifySyncJob: { is: null } },
+        data: { internalStatus: 'cancelled' },
+      });
+      const exists = result.count === 1 || (await tx.order.count({ where: { id: orderId } })) > 0;
+      if (result.count === 1 || !exists) {
+        await releaseReservations(tx, orderId);
+        if (exists) {
+          const facts = await loadOrderFacts(tx, orderId);
+          if (facts) await applyOrderToStats(tx, facts, -1);
+          cancelled++;
+        }
+      } else {
+        await commitHeldStock(tx, orderId);
+      }
+    });
+  }
+  stats.expiredOrders += cancelled;
+  stats.lastSweepAt = now.toISOString();
+  if (cancelled) console.log(`[inventory] cancelled ${cancelled} unpaid orders with expired stock holds`);
+  return cancelled;
+}
+
+/**
+ * Bring variant stock in line with Shopify's inventory_quantity.
+ *
+ * Orders pushed to Shopify don't change its inventory (inventory_behaviour defaults to bypass),
+ * so the change in Shopify since the last reconcile (restock, manual adjustment, sales in other
+ * channels) is applied to `available`, keeping local reservations in place. With `createMissing`
+ * variants that Shopify tracks get a StockLevel row.
+ */
+export async function reconcileShopifyInventory(options: { createMissing?: boolean } = {}) {
+  const products = await shopifyService.getCachedProducts({ forceRefresh: true });
+  const levels = await prisma.stockLevel.findMany({ where: { kind: 'variant' } });
+  const byVariant = new Map(levels.map((level) => [level.refId, level]));
+  const result = { checked: 0, created: 0, adjusted: 0 };
+
+  for (const product of products) {
+    for (const variant of product.variants || []) {
+      if (typeof variant.inventory_quantity !== 'number') continue;
+      const refId = String(variant.id);
+      const inventory = variant.inventory_quantity;
+      const level = byVariant.get(refId);
+
+      if (!level) {
+        if (!options.createMissing || variant.inventory_management !== 'shopify') continue;
+        try {
+          await prisma.stockLevel.create({
+            data: {
+              kind: 'variant',
+              refId,
+              label: `${product.title} - ${variant.title}`,
+              available: Math.max(0, inventory),
+              shopifyInventory: inventory,
+              reconciledAt: new Date(),
+            },
+          });
+          result.created++;
+        } catch (error: any) {
+          if (error?.code !== 'P2002') throw error; // created concurrently
+        }
+        continue;
+      }
+
+      result.checked++;
+      const delta = level.shopifyInventory === null ? 0 : inventory - level.shopifyInventory;
+      // Conditional on the value we read, so the same change is never applied twice
+      const updated = await prisma.stockLevel.updateMany({
+        where: { id: level.id, shopifyInventory: level.shopifyInventory },
+        data: {
+          ...(delta ? { available: { increment: delta } } : {}),
+          shopifyInventory: inventory,
+          reconciledAt: new Date(),
+        },
+      });
+      if (delta && updated.count === 1) result.adjusted++;
+    }
+  }
+
+  stats.lastReconcileAt = new Date().toISOString();
+  stats.lastReconcileError = null;
+  return result;
+}
+
+let sweepTimer: NodeJS.Timeout | null = null;
+let reconcileTimer: NodeJS.Timeout | null = null;
+
+/**
+ * Periodic hold expiry and (STOCK_TRACK_SHOPIFY_INVENTORY) Shopify reconciliation.
+ * Runs on one instance only (see server.ts).
+ */
+export function startStockMaintenance(): void {
+  if (sweepTimer) return;
+  let sweeping = false;
+  sweepTimer = setInterval(() => {
+    if (sweeping) return;
+    sweeping = true;
+    releaseExpiredHolds()
+      .catch((error) => console.error('[inventory] hold sweep failed:', error))
+      .finally(() => {
+        sweeping = false;
+      });
+  }, config.inventory.sweepIntervalMs);
+  sweepTimer.unref();
+
+  if (config.inventory.trackShopifyInventory) {
+    let reconciling = false;
+    const reconcile = () => {
+      if (reconciling) return;
+      reconciling = true;
+      reconcileShopifyInventory({ createMissing: true })
+        .catch((error) => {
+          stats.lastReconcileError = error?.message || String(error);
+          console.error('[inventory] Shopify reconcile failed:', error);
+        })
+        .finally(() => {
+          reconciling = false;
+        });
+    };
+    reconcile();
+    reconcileTimer = setInterval(reconcile, config.inventory.reconcileIntervalMs);
+    reconcileTimer.unref();
+  }
+}
+
+export function getInventoryStats() {
+  return { ...stats };
+}
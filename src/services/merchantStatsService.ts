@@ -0,0 +1,241 @@
+import type { Prisma } from '@prisma/client';
+import { prisma } from '../db';
+
+/**
+ * Per-merchant and per-day rollups (MerchantStats / MerchantDailyStats).
+ *
+ * Writers update them inside the transaction that writes the order, review, package or service,
+ * so the merchant listing and dashboard read one row instead of counting relations or
+ * aggregating orders/reviews on every request:
+ *
+ * - orders count while they are not cancelled: placing one adds it, cancelling / deleting takes
+ *   it back out, re-activating a cancelled order adds it again. Revenue is the sum of its
+ *   OrderItem.totalCents; the day is the order's createdAt (UTC).
+ * - reviews add their rating (and take it back when the order, and with it the review, is deleted)
+ * - active package / service counts are recounted for the merchant after each catalog write
+ *   (one indexed COUNT on the write path, so toggling isActive can't drift)
+ *
+ * `rebuildMerchantStats()` recomputes everything from the source tables (backfill / repair).
+ */
+export type OrderStatsFacts = { merchantId: string | null; createdAt: Date; revenueCents: number };
+
+export type MerchantStatsSummary = {
+  orderCount: number;
+  revenueCents: number;
+  ratingCount: number;
+  avgRating: number | null;
+  activePackages: number;
+  activeServices: number;
+};
+
+const EMPTY_SUMMARY: MerchantStatsSummary = {
+  orderCount: 0,
+  revenueCents: 0,
+  ratingCount: 0,
+  avgRating: null,
+  activePackages: 0,
+  activeServices: 0,
+};
+
+/** UTC midnight of `date` (the MerchantDailyStats bucket) */
+export function statsDay(date: Date): Date {
+  return new Date(Date.UTC(date.getUTCFullYear(), date.getUTCMonth(), date.getUTCDate()));
+}
+
+export function averageRating(row: { ratingSum: number; ratingCount: number }): number | null {
+  return row.ratingCount > 0 ? Math.round((row.ratingSum / row.ratingCount) * 10) / 10 : null;
+}
+
+type Delta = { orderCount?: number; revenueCents?: number; ratingCount?: number; ratingSum?: number };
+
+function increments(delta: Delta) {
+  const data: Record<string, { increment: number }> = {};
+  for (const [key, value] of Object.entries(delta)) {
+    if (value) data[key] = { increment: value };
+  }
+  return data;
+}
+
+async function applyDelta(tx: Prisma.TransactionClient, merchantId: string, at: Date, delta: Delta) {
+  const data = increments(delta);
+  if (Object.keys(data).length === 0) return;
+  await tx.merchantStats.upsert({
+    where: { merchantId },
+    create: { merchantId, ...delta },
+    update: data,
+  });
+  const day = statsDay(at);
+  await tx.merchantDailyStats.upsert({
+    where: { merchantId_day: { merchantId, day } },
+    create: { merchantId, day, ...delta },
+    update: data,
+  });
+}
+
+/** Count (`sign` 1) or un-count (-1) an order in its merchant's rollups; no-op without merchantId */
+export async function applyOrderToStats(tx: Prisma.TransactionClient, order: OrderStatsFacts, sign: 1 | -1) {
+  if (!order.merchantId) return;
+  await applyDelta(tx, order.merchantId, order.createdAt, {
+    orderCount: sign,
+    revenueCents: sign * order.revenueCents,
+  });
+}
+
+/** What an order contributes to the rollups, read inside `tx` (after the order's own write) */
+export async function loadOrderFacts(tx: Prisma.TransactionClient, orderId: string): Promise<OrderStatsFacts | null> {
+  const order = await tx.order.findUnique({ where: { id: orderId }, select: { merchantId: true, createdAt: true } });
+  if (!order || !order.merchantId) return null;
+  const { _sum } = await tx.orderItem.aggregate({ where: { orderId }, _sum: { totalCents: true } });
+  return { merchantId: order.merchantId, createdAt: order.createdAt, revenueCents: _sum.totalCents ?? 0 };
+}
+
+export function orderRevenueCents(lineItems: Array<{ totalCents: number }>): number {
+  return lineItems.reduce((sum, item) => sum + item.totalCents, 0);
+}
+
+/**
+ * Add (`sign` 1) or remove (-1) a review's rating. Call it in the transaction that creates or
+ * deletes the MerchantReview; a changed rating is -1 with the old value, then 1 with the new one.
+ */
+export async function applyReviewToStats(
+  tx: Prisma.TransactionClient,
+  review: { merchantId: string; rating: number; createdAt: Date },
+  sign: 1 | -1
+) {
+  await applyDelta(tx, review.merchantId, review.createdAt, { ratingCount: sign, ratingSum: sign * review.rating });
+}
+
+/** Recount active packages / services of the given merchants (after a catalog write in `tx`) */
+export async function refreshCatalogStats(tx: Prisma.TransactionClient, merchantIds: Array<string | null | undefined>) {
+  for (const merchantId of new Set(merchantIds.filter((id): id is string => !!id))) {
+    const [activePackages, activeServices] = await Promise.all([
+      tx.package.count({ where: { merchantId, isActive: true } }),
+      tx.service.count({ where: { merchantId, isActive: true } }),
+    ]);
+    await tx.merchantStats.upsert({
+      where: { merchantId },
+      create: { merchantId, activePackages, activeServices },
+      update: { activePackages, activeServices },
+    });
+  }
+}
+
+/** Dashboard / detail page figures: one primary-key read */
+export async function getMerchantStats(merchantId: string): Promise<MerchantStatsSummary> {
+  const row = await prisma.merchantStats.findUnique({ where: { merchantId } });
+  return row ? summarize(row) : { ...EMPTY_SUMMARY };
+}
+
+export function summarize(row: {
+  orderCount: number;
+  revenueCents: number;
+  ratingCount: number;
+  ratingSum: number;
+  activePackages: number;
+  activeServices: number;
+}): MerchantStatsSummary {
+  return {
+    orderCount: row.orderCount,
+    revenueCents: row.revenueCents,
+    ratingCount: row.ratingCount,
+    avgRating: averageRating(row),
+    activePackages: row.activePackages,
+    activeServices: row.activeServices,
+  };
+}
+
+/** The last `days` days (today included) that had orders or reviews, newest first */
+export async function getMerchantDailyStats(merchantId: string, days: number, now = new Date()) {
+  const since = new Date(statsDay(now).getTime() - (days - 1) * 24 * 60 * 60 * 1000);
+  const rows = await prisma.merchantDailyStats.findMany({
+    where: { merchantId, day: { gte: since } },
+    orderBy: { day: 'desc' },
+  });
+  return rows.map((row) => ({
+    day: row.day.toISOString().slice(0, 10),
+    orderCount: row.orderCount,
+    revenueCents: row.revenueCents,
+    ratingCount: row.ratingCount,
+    avgRating: averageRating(row),
+  }));
+}
+
+type DailyRow = { orderCount: number; revenueCents: number; ratingCount: number; ratingSum: number };
+
+/**
+ * Recompute the rollups of every merchant (or of `merchantIds`) from orders, order items,
+ * reviews, packages and services. Each merchant is replaced in its own transaction.
+ */
+export async function rebuildMerchantStats(options: { merchantIds?: string[]; batchSize?: number } = {}) {
+  const batchSize = options.batchSize ?? 500;
+  let merchants = 0;
+  let cursor: string | undefined;
+
+  for (;;) {
+    const batch = await prisma.merchant.findMany({
+      where: options.merchantIds ? { id: { in: options.merchantIds } } : {},
+      orderBy: { id: 'asc' },
+      take: 50,
+      ...(cursor ? { cursor: { id: cursor }, skip: 1 } : {}),
+      select: { id: true },
+    });
+    if (batch.length === 0) break;
+    cursor = batch[batch.length - 1].id;
+
+    for (const { id: merchantId } of batch) {
+      const daily = new Map<number, DailyRow>();
+      const bucket = (at: Date) => {
+        const key = statsDay(at).getTime();
+        let row = daily.get(key);
+        if (!row) daily.set(key, (row = { orderCount: 0, revenueCents: 0, ratingCount: 0, ratingSum: 0 }));
+        return row;
+      };
+
+      // Orders in id-ordered batches (a merchant can have a long history)
+      let orderCursor: string | undefined;
+      for (;;) {
+        const orders = await prisma.order.findMany({
+          where: { merchantId, internalStatus: { not: 'cancelled' } },
+          orderBy: { id: 'asc' },
+          take: batchSize,
+          ...(orderCursor ? { cursor: { id: orderCursor }, skip: 1 } : {}),
+          select: { id: true, createdAt: true, lineItems: { select: { totalCents: true } } },
+        });
+        if (orders.length === 0) break;
+        orderCursor = orders[orders.length - 1].id;
+        for (const order of orders) {
+          const row = bucket(order.createdAt);
+          row.orderCount += 1;
+          row.revenueCents += orderRevenueCents(order.lineItems);
+        }
+      }
+
+      const reviews = await prisma.merchantReview.findMany({ where: { merchantId }, select: { rating: true, createdAt: true } });
+      for (const review of reviews) {
+        const row = bucket(review.createdAt);
+        row.ratingCount += 1;
+        row.ratingSum += review.rating;
+      }
+
+      const totals = { orderCount: 0, revenueCents: 0, ratingCount: 0, ratingSum: 0 };
+      for (const row of daily.values()) {
+        totals.orderCount += row.orderCount;
+        totals.revenueCents += row.revenueCents;
+        totals.ratingCount += row.ratingCount;
+        totals.ratingSum += row.ratingSum;
+      }
+
+      await prisma.$transaction(async (tx) => {
+        await tx.merchantDailyStats.deleteMany({ where: { merchantId } });
+        await tx.merchantStats.upsert({ where: { merchantId }, create: { merchantId, ...totals }, update: totals });
+        // createMany needs Prisma >= 5.12 on SQLite
+        for (const [day, row] of daily) {
+          await tx.merchantDailyStats.create({ data: { merchantId, day: new Date(day), ...row } });
+        }
+        await refreshCatalogStats(tx, [merchantId]);
+      });
+      merchants++;
+    }
+  }
+  return { merchants };
+}
@@ -0,0 +1,101 @@
+import fs from 'fs';
+import path from 'path';
+import ejs, { TemplateFunction } from 'ejs';
+
+/**
+ * HTML for bulk printing (packing slips + N-up address labels), from the templates in
+ * views/admin/print. Pure functions of their input so they can run in worker threads
+ * (workers/printWorker.ts) as well as on the main thread.
+ */
+export type PrintItem = {
+  title: string;
+  originalTitle: string;
+  price: string;
+  quantity: number;
+};
+
+export type PrintOrder = {
+  id: string;
+  /** 1-based position in the batch, printed on both the slip and the label */
+  seq: number;
+  customerName: string;
+  phone: string;
+  address: string;
+  region: string | null;
+  deliveryTime: string;
+  paymentMethod: string;
+  optionalNote: string | null;
+  items: PrintItem[];
+};
+
+export type PrintTask = {
+  part: 'slips' | 'labels';
+  orders: PrintOrder[];
+  labelsPerPage: number;
+};
+
+export type PrintHeader = {
+  deliveryDate: string;
+  region: string | null;
+  orderCount: number;
+  itemCount: number;
+  generatedAt: string;
+};
+
+const TEMPLATE_DIR = path.join(__dirname, '../views/admin/print');
+const templates = new Map<string, TemplateFunction>();
+
+function template(name: string): TemplateFunction {
+  let fn = templates.get(name);
+  if (!fn) {
+    const filename = path.join(TEMPLATE_DIR, `${name}.ejs`);
+    fn = ejs.compile(fs.readFileSync(filename, 'utf8'), { filename });
+    templates.set(name, fn);
+  }
+  return fn;
+}
+
+function money(value: number): string {
+  return (Math.round(value * 100) / 100).toFixed(2);
+}
+
+function withTotals(order: PrintOrder) {
+  const items = order.items.map((item) => ({ ...item, unitPrice: Number.parseFloat(item.price) || 0 }));
+  return {
+    ...order,
+    items,
+    quantity: items.reduce((sum, item) => sum + item.quantity, 0),
+    total: items.reduce((sum, item) => sum + item.unitPrice * item.quantity, 0),
+  };
+}
+
+/** Labels grid for N labels per A4 page: 1-2 in one column, up to 10 in two, more in three */
+export function labelGrid(labelsPerPage: number): { columns: number; rows: number } {
+  const columns = labelsPerPage <= 2 ? 1 : labelsPerPage <= 10 ? 2 : 3;
+  return { columns, rows: Math.ceil(labelsPerPage / columns) };
+}
+
+export function renderPrintHead(header: PrintHeader): string {
+  return template('head')(header);
+}
+
+export function renderPrintFoot(): string {
+  return template('foot')({});
+}
+
+/**
+ * One chunk of the document body. Label chunks should hold a multiple of labelsPerPage
+ * orders (except the last), otherwise a sheet is left partly empty mid-document.
+ */
+export function renderPrintPart(task: PrintTask): string {
+  const orders = task.orders.map(withTotals);
+  if (task.part === 'slips') {
+    return template('slips')({ orders, money });
+  }
+
+  const sheets: Array<typeof orders> = [];
+  for (let i = 0; i < orders.length; i += task.labelsPerPage) {
+    sheets.push(orders.slice(i, i + task.labelsPerPage));
+  }
+  return template('labels')({ sheets, money, ...labelGrid(task.labelsPerPage) });
+}
@@ -0,0 +1,188 @@
+import crypto from 'crypto';
+import path from 'path';
+import type { Prisma } from '@prisma/client';
+import { prisma } from '../db';
+import { config } from '../config';
+import { orderItemsOf, orderLineItemsQuery } from '../utils/orderItems';
+import { mapProductNameLists } from '../utils/productNameMapper';
+import { WorkerPool } from '../utils/workerPool';
+import { PrintOrder, PrintTask, renderPrintFoot, renderPrintHead, renderPrintPart } from './printRenderer';
+
+/**
+ * Bulk print documents for a delivery day: a packing slip per order followed by address labels.
+ *
+ * The document is rendered in chunks of CHUNK_ORDERS orders on a worker-thread pool and
+ * streamed in order. Finished documents are kept in memory together with a fingerprint of the
+ * batch (order ids + updatedAt, product name mappings); a request is served from memory while
+ * the fingerprint is unchanged, i.e. until an order in the batch is edited, added or cancelled.
+ */
+export type PrintFilter = { deliveryDate: Date; region: string | null };
+
+export type PrintLayout = { include: 'all' | 'slips' | 'labels'; labelsPerPage: number };
+
+const CHUNK_ORDERS = 50;
+
+const batchOrder: Prisma.OrderOrderByWithRelationInput[] = [{ region: 'asc' }, { createdAt: 'asc' }, { id: 'asc' }];
+
+function batchWhere(filter: PrintFilter): Prisma.OrderWhereInput {
+  // 已取消的订单不打印
+  const where: Prisma.OrderWhereInput = { deliveryDate: filter.deliveryDate, internalStatus: { not: 'cancelled' } };
+  if (filter.region) where.region = filter.region;
+  return where;
+}
+
+/** Changes whenever an order joins/leaves the batch or is updated, or a name mapping changes */
+export async function printFingerprint(filter: PrintFilter): Promise<string> {
+  const [orders, mappings] = await Promise.all([
+    prisma.order.findMany({ where: batchWhere(filter), select: { id: true, updatedAt: true }, orderBy: batchOrder }),
+    prisma.productNameMapping.aggregate({ _count: { _all: true }, _max: { updatedAt: true } }),
+  ]);
+  const hash = crypto.createHash('sha1');
+  for (const order of orders) hash.update(`${order.id}:${order.updatedAt.getTime()}\n`);
+  hash.update(`mappings:${mappings._count._all}:${mappings._max.updatedAt?.getTime() ?? 0}`);
+  return hash.digest('hex').slice(0, 20);
+}
+
+async function loadBatch(filter: PrintFilter): Promise<PrintOrder[]> {
+  const orders = await prisma.order.findMany({
+    where: batchWhere(filter),
+    orderBy: batchOrder,
+    select: {
+      id: true,
+      customerName: true,
+      phone: true,
+      address: true,
+      region: true,
+      deliveryTime: true,
+      paymentMethod: true,
+      optionalNote: true,
+      itemsJson: true,
+      lineItems: orderLineItemsQuery,
+    },
+  });
+
+  const itemLists = await mapProductNameLists(orders.map((order) => orderItemsOf(order)));
+  return orders.map((order, i) => ({
+    id: order.id,
+    seq: i + 1,
+    customerName: order.customerName,
+    phone: order.phone,
+    address: order.address,
+    region: order.region,
+    deliveryTime: order.deliveryTime,
+    paymentMethod: order.paymentMethod,
+    optionalNote: order.optionalNote,
+    items: itemLists[i].map((item: any) => ({
+      title: String(item.title || ''),
+      originalTitle: String(item.originalTitle || item.title || ''),
+      price: String(item.price ?? '0'),
+      quantity: Number(item.quantity) || 0,
+    })),
+  }));
+}
+
+type PrintEntry = { fingerprint: string; body: string; storedAt: number };
+
+// Map insertion order = least recently used first
+const documents = new Map<string, PrintEntry>();
+const stats = { hits: 0, misses: 0, renders: 0, lastRenderMs: 0, lastOrderCount: 0 };
+
+let pool: WorkerPool<PrintTask, string> | null = null;
+
+function renderTask(task: PrintTask): Promise<string> {
+  if (config.print.workers === 0) return Promise.resolve().then(() => renderPrintPart(task));
+  if (!pool) {
+    // .ts under tsx, .js in dist
+    const file = path.join(__dirname, '../workers/printWorker' + path.extname(__filename));
+    pool = new WorkerPool<PrintTask, string>(file, config.print.workers);
+  }
+  return pool.run(task);
+}
+
+/** Stop the render workers (scripts; the server simply exits) */
+export async function closePrintPool(): Promise<void> {
+  const current = pool;
+  pool = null;
+  await current?.close();
+}
+
+function chunked(orders: PrintOrder[], size: number): PrintOrder[][] {
+  const chunks: PrintOrder[][] = [];
+  for (let i = 0; i < orders.length; i += size) chunks.push(orders.slice(i, i + size));
+  return chunks;
+}
+
+/**
+ * The document as ordered HTML chunks. All chunks are queued on the pool up front; each is
+ * yielded as soon as it and every chunk before it are done.
+ */
+export async function* renderPrintDocument(filter: PrintFilter, layout: PrintLayout): AsyncGenerator<string> {
+  const started = Date.now();
+  const orders = await loadBatch(filter);
+
+  yield renderPrintHead({
+    deliveryDate: filter.deliveryDate.toISOString().slice(0, 10),
+    region: filter.region,
+    orderCount: orders.length,
+    itemCount: orders.reduce((sum, order) => sum + order.items.reduce((n, item) => n + item.quantity, 0), 0),
+    generatedAt: new Date().toLocaleString('zh-CN', { timeZone: 'Australia/Sydney', hour12: false }),
+  });
+
+  const tasks: PrintTask[] = [];
+  if (layout.include !== 'labels') {
+    for (const chunk of chunked(orders, CHUNK_ORDERS)) tasks.push({ part: 'slips', orders: chunk, labelsPerPage: layout.labelsPerPage });
+  }
+  if (layout.include !== 'slips') {
+    // Whole sheets per chunk, so only the last sheet can be partly empty
+    const perChunk = layout.labelsPerPage * Math.max(1, Math.floor(CHUNK_ORDERS / layout.labelsPerPage));
+    for (const chunk of chunked(orders, perChunk)) tasks.push({ part: 'labels', orders: chunk, labelsPerPage: layout.labelsPerPage });
+  }
+
+  const parts = tasks.map(renderTask);
+  // The consumer may stop early (client gone): don't leave the remaining rejections unhandled
+  for (const part of parts) part.catch(() => undefined);
+  for (const part of parts) yield await part;
+  yield renderPrintFoot();
+
+  stats.renders++;
+  stats.lastRenderMs = Date.now() - started;
+  stats.lastOrderCount = orders.length;
+}
+
+export function printCacheKey(filter: PrintFilter, layout: PrintLayout): string {
+  return [filter.deliveryDate.toISOString().slice(0, 10), filter.region || '', layout.include, layout.labelsPerPage].join('|');
+}
+
+/** Cached document for `key`, if it was rendered from a batch with this fingerprint */
+export function getCachedPrint(key: string, fingerprint: string): string | null {
+  const entry = documents.get(key);
+  if (!entry || entry.fingerprint !== fingerprint) {
+    stats.misses++;
+    return null;
+  }
+  stats.hits++;
+  documents.delete(key);
+  documents.set(key, entry);
+  return entry.body;
+}
+
+export function storePrint(key: string, fingerprint: string, body: string): void {
+  if (config.print.cacheEntries === 0) return;
+  documents.delete(key);
+  documents.set(key, { fingerprint, body, storedAt: Date.now() });
+  while (documents.size > config.print.cacheEntries) {
+    documents.delete(documents.keys().next().value as string);
+  }
+}
+
+export function getPrintStats() {
+  let bytes = 0;
+  for (const entry of documents.values()) bytes += entry.body.length;
+  return {
+    ...stats,
+    cachedDocuments: documents.size,
+    cachedChars: bytes,
+    workers: config.print.workers,
+    pool: pool?.getStats() ?? null,
+  };
+}
@@ -0,0 +1,128 @@
+import session from 'express-session';
+import { prisma } from '../db';
+
+type Callback = (err?: any) => void;
+
+// Bound on remembered touch times per process (oldest are forgotten first)
+const MAX_TRACKED_SESSIONS = 10000;
+
+export type PrismaSessionStoreOptions = {
+  /** Used when a session has no cookie expiry */
+  maxAgeMs: number;
+  /** Skip touch() writes if this process refreshed the session more recently than this */
+  touchIntervalMs: number;
+};
+
+/**
+ * express-session store backed by the Session table, so sessions (carts, logins) survive
+ * restarts and are visible to every worker process / instance.
+ *
+ * Expired rows are ignored on read and removed by `sweep()`.
+ */
+export class PrismaSessionStore extends session.Store {
+  // sid -> last time this process wrote the expiry (throttles touch())
+  private readonly touchedAt = new Map<string, number>();
+
+  constructor(private readonly options: PrismaSessionStoreOptions) {
+    super();
+  }
+
+  private remember(sid: string): void {
+    this.touchedAt.delete(sid);
+    this.touchedAt.set(sid, Date.now());
+    if (this.touchedAt.size > MAX_TRACKED_SESSIONS) {
+      const [oldest] = this.touchedAt.keys();
+      this.touchedAt.delete(oldest);
+    }
+  }
+
+  private expiresAt(sess: session.SessionData): Date {
+    const expires = sess.cookie?.expires;
+    return expires ? new Date(expires) : new Date(Date.now() + this.options.maxAgeMs);
+  }
+
+  get(sid: string, callback: (err: any, session?: session.SessionData | null) => void): void {
+    prisma.session
+      .findUnique({ where: { sid } })
+      .then((row) => {
+        if (!row || row.expiresAt.getTime() <= Date.now()) return callback(null, null);
+        callback(null, JSON.parse(row.data));
+      })
+      .catch((error) => callback(error));
+  }
+
+  set(sid: string, sess: session.SessionData, callback?: Callback): void {
+    const data = JSON.stringify(sess);
+    const expiresAt = this.expiresAt(sess);
+    prisma.session
+      .upsert({ where: { sid }, create: { sid, data, expiresAt }, update: { data, expiresAt } })
+      .then(() => {
+        this.remember(sid);
+        callback?.();
+      })
+      .catch((error) => callback?.(error));
+  }
+
+  touch(sid: string, sess: session.SessionData, callback?: Callback): void {
+    const last = this.touchedAt.get(sid);
+    if (last !== undefined && Date.now() - last < this.options.touchIntervalMs) {
+      callback?.();
+      return;
+    }
+    prisma.session
+      .updateMany({ where: { sid }, data: { expiresAt: this.expiresAt(sess) } })
+      .then(() => {
+        this.remember(sid);
+        callback?.();
+      })
+      .catch((error) => callback?.(error));
+  }
+
+  destroy(sid: string, callback?: Callback): void {
+    this.touchedAt.delete(sid);
+    prisma.session
+      .deleteMany({ where: { sid } })
+      .then(() => callback?.())
+      .catch((error) => callback?.(error));
+  }
+
+  length(callback: (err: any, length?: number) => void): void {
+    prisma.session
+      .count({ where: { expiresAt: { gt: new Date() } } })
+      .then((count) => callback(null, count))
+      .catch((error) => callback(error));
+  }
+
+  clear(callback?: Callback): void {
+    this.touchedAt.clear();
+    prisma.session
+      .deleteMany({})
+      .then(() => callback?.())
+      .catch((error) => callback?.(error));
+  }
+
+  /**
+   * Delete expired sessions. Returns the number of rows removed.
+   */
+  async sweep(): Promise<number> {
+    const { count } = await prisma.session.deleteMany({ where: { expiresAt: { lte: new Date() } } });
+    return count;
+  }
+
+  /**
+   * Run `sweep()` every `intervalMs` (does not keep the process alive). Returns a stop function.
+   */
+  startSweeper(intervalMs: number): () => void {
+    const run = () => {
+      this.sweep()
+        .then((count) => {
+          if (count > 0) console.log(`[session] removed ${count} expired sessions`);
+        })
+        .catch((error) => console.error('[session] sweep failed:', error.message));
+    };
+    run();
+    const timer = setInterval(run, intervalMs);
+    timer.unref();
+    return () => clearInterval(timer);
+  }
+}
@@ -0,0 +1,290 @@
+/**
+ * Delivery route planner (pure computation, no I/O).
+ *
+ * Cluster-first, route-second:
+ *   1. sweep: sort stops by bearing around the depot and cut the circle into one
+ *      contiguous sector per driver, balanced by demand and bounded by capacity;
+ *   2. per driver: nearest-neighbour tour, then 2-opt and or-opt local search
+ *      until no improving move is left (or the time budget runs out).
+ *
+ * Distances are great-circle (haversine) kilometres, which is good enough to order stops
+ * within a city; no external routing API is called.
+ */
+export type LatLng = { lat: number; lng: number };
+
+export type RouteStop = LatLng & {
+  id: string;
+  /** Capacity units this stop uses (default 1) */
+  demand?: number;
+};
+
+export type PlanOptions = {
+  depot: LatLng;
+  drivers?: number;
+  /** Max demand per driver; 0 / undefined = unlimited */
+  capacity?: number;
+  /** Include the drive back to the depot (default true) */
+  returnToDepot?: boolean;
+  /** Stop improving after this long; the best tour so far is returned (default 800ms) */
+  timeBudgetMs?: number;
+};
+
+export type PlannedRoute<T extends RouteStop = RouteStop> = {
+  driver: number;
+  stops: T[];
+  /** legKm[i]: distance from the previous stop (or the depot) to stops[i] */
+  legKm: number[];
+  returnKm: number;
+  distanceKm: number;
+  load: number;
+};
+
+export type RoutePlan<T extends RouteStop = RouteStop> = {
+  routes: PlannedRoute<T>[];
+  unassigned: T[];
+  totalDistanceKm: number;
+  elapsedMs: number;
+};
+
+const EARTH_RADIUS_KM = 6371;
+const EPS = 1e-9;
+
+export function haversineKm(a: LatLng, b: LatLng): number {
+  const toRad = Math.PI / 180;
+  const dLat = (b.lat - a.lat) * toRad;
+  const dLng = (b.lng - a.lng) * toRad;
+  const h =
+    Math.sin(dLat / 2) ** 2 + Math.cos(a.lat * toRad) * Math.cos(b.lat * toRad) * Math.sin(dLng / 2) ** 2;
+  return 2 * EARTH_RADIUS_KM * Math.asin(Math.min(1, Math.sqrt(h)));
+}
+
+/**
+ * Symmetric distance matrix; node 0 is the depot, node i (1..n) is points[i - 1].
+ */
+function buildMatrix(depot: LatLng, points: LatLng[]): { size: number; d: Float64Array } {
+  const nodes = [depot, ...points];
+  const size = nodes.length;
+  const d = new Float64Array(size * size);
+  for (let i = 0; i < size; i++) {
+    for (let j = i + 1; j < size; j++) {
+      const km = haversineKm(nodes[i], nodes[j]);
+      d[i * size + j] = km;
+      d[j * size + i] = km;
+    }
+  }
+  return { size, d };
+}
+
+/**
+ * Split stops into per-driver sectors (sweep). Returns the stop groups and what didn't fit.
+ */
+function sweep<T extends RouteStop>(stops: T[], depot: LatLng, drivers: number, capacity: number) {
+  const withAngle = stops
+    .map((stop) => ({ stop, angle: Math.atan2(stop.lat - depot.lat, (stop.lng - depot.lng) * Math.cos((depot.lat * Math.PI) / 180)) }))
+    .sort((a, b) => a.angle - b.angle);
+
+  // Start right after the widest empty sector so no cluster straddles a dense area
+  let start = 0;
+  let widestGap = -1;
+  for (let i = 0; i < withAngle.length; i++) {
+    const next = withAngle[(i + 1) % withAngle.length];
+    const gap = (next.angle - withAngle[i].angle + 2 * Math.PI) % (2 * Math.PI) || 2 * Math.PI;
+    if (gap > widestGap) {
+      widestGap = gap;
+      start = (i + 1) % withAngle.length;
+    }
+  }
+  const ordered = [...withAngle.slice(start), ...withAngle.slice(0, start)].map((x) => x.stop);
+
+  const demandOf = (stop: T) => Math.max(0, stop.demand ?? 1);
+  const totalDemand = ordered.reduce((sum, stop) => sum + demandOf(stop), 0);
+  const balanced = Math.ceil(totalDemand / drivers);
+  const target = capacity > 0 ? Math.min(capacity, balanced) : balanced;
+
+  const groups: T[][] = Array.from({ length: drivers }, () => []);
+  const loads = new Array(drivers).fill(0);
+  const unassigned: T[] = [];
+  let r = 0;
+  for (const stop of ordered) {
+    const demand = demandOf(stop);
+    // Move on to the next driver once this one reached its share (the last driver takes the rest, up to capacity)
+    while (r < drivers - 1 && groups[r].length > 0 && loads[r] + demand > target) r++;
+    if (capacity > 0 && loads[r] + demand > capacity) {
+      unassigned.push(stop);
+      continue;
+    }
+    groups[r].push(stop);
+    loads[r] += demand;
+  }
+  return { groups, unassigned };
+}
+
+/**
+ * Single-driver tour over matrix nodes 1..size-1 starting at the depot (node 0).
+ * Returns node indices in visiting order, without the depot.
+ */
+function solveTour(size: number, d: Float64Array, closed: boolean, deadline: number): number[] {
+  const m = size - 1;
+  if (m <= 1) return m === 1 ? [1] : [];
+
+  // tour[0] is always the depot; -1 stands for "no next node" at the end of an open route
+  const dist = (u: number, v: number) => (u < 0 || v < 0 ? 0 : d[u * size + v]);
+
+  // --- nearest neighbour
+  const tour = [0];
+  const visited = new Uint8Array(size);
+  visited[0] = 1;
+  let current = 0;
+  for (let step = 0; step < m; step++) {
+    let best = -1;
+    let bestKm = Infinity;
+    for (let v = 1; v < size; v++) {
+      if (!visited[v] && d[current * size + v] < bestKm) {
+        bestKm = d[current * size + v];
+        best = v;
+      }
+    }
+    visited[best] = 1;
+    tour.push(best);
+    current = best;
+  }
+
+  const nextOf = (pos: number) => (pos + 1 < tour.length ? tour[pos + 1] : closed ? 0 : -1);
+
+  // --- 2-opt: reverse tour[i+1..j]
+  const twoOpt = (): boolean => {
+    let improved = false;
+    for (let i = 0; i < m - 1; i++) {
+      const a = tour[i];
+      const b = tour[i + 1];
+      for (let j = i + 2; j <= m; j++) {
+        const c = tour[j];
+        const e = nextOf(j);
+        const delta = dist(a, c) + dist(b, e) - dist(a, b) - dist(c, e);
+        if (delta < -EPS) {
+          for (let lo = i + 1, hi = j; lo < hi; lo++, hi--) {
+            const tmp = tour[lo];
+            tour[lo] = tour[hi];
+            tour[hi] = tmp;
+          }
+          improved = true;
+          break;
+        }
+      }
+      if (Date.now() > deadline) break;
+    }
+    return improved;
+  };
+
+  // --- or-opt: move a segment of 1..3 stops (optionally reversed) to a better position
+  const orOpt = (): boolean => {
+    let improved = false;
+    for (let len = 1; len <= 3; len++) {
+      for (let s = 1; s + len - 1 <= m; s++) {
+        const e = s + len - 1;
+        const first = tour[s];
+        const last = tour[e];
+        const prev = tour[s - 1];
+        const next = nextOf(e);
+        const removeGain = dist(prev, first) + dist(last, next) - dist(prev, next);
+        if (removeGain <= EPS) continue;
+
+        let bestPos = -1;
+        let bestCost = removeGain - EPS;
+        let bestReversed = false;
+        for (let k = 0; k <= m; k++) {
+          if (k >= s - 1 && k <= e) continue;
+          const u = tour[k];
+          const v = nextOf(k);
+          const base = dist(u, v);
+          const forward = dist(u, first) + dist(last, v) - base;
+          const reversed = dist(u, last) + dist(first, v) - base;
+          if (forward < bestCost) {
+            bestCost = forward;
+            bestPos = k;
+            bestReversed = false;
+          }
+          if (reversed < bestCost) {
+            bestCost = reversed;
+            bestPos = k;
+            bestReversed = true;
+          }
+        }
+        if (bestPos >= 0) {
+          const segment = tour.splice(s, len);
+          if (bestReversed) segment.reverse();
+          const insertAt = bestPos < s ? bestPos + 1 : bestPos + 1 - len;
+          tour.splice(insertAt, 0, ...segment);
+          improved = true;
+        }
+      }
+      if (Date.now() > deadline) break;
+    }
+    return improved;
+  };
+
+  while (Date.now() <= deadline) {
+    const a = twoOpt();
+    const b = orOpt();
+    if (!a && !b) break;
+  }
+
+  return tour.slice(1);
+}
+
+export function planRoutes<T extends RouteStop>(stops: T[], options: PlanOptions): RoutePlan<T> {
+  const startedAt = Date.now();
+  const drivers = Math.max(1, Math.floor(options.drivers ?? 1));
+  const capacity = Math.max(0, options.capacity ?? 0);
+  const closed = options.returnToDepot !== false;
+  const deadline = startedAt + (options.timeBudgetMs ?? 800);
+
+  const valid = stops.filter((s) => Number.isFinite(s.lat) && Number.isFinite(s.lng));
+  const { groups, unassigned } = sweep(valid, options.depot, drivers, capacity);
+
+  const routes: PlannedRoute<T>[] = [];
+  groups.forEach((group, index) => {
+    if (group.length === 0) return;
+    const { size, d } = buildMatrix(options.depot, group);
+    const order = solveTour(size, d, closed, deadline);
+
+    const ordered = order.map((node) => group[node - 1]);
+    const legKm: number[] = [];
+    let prev = 0;
+    for (const node of order) {
+      legKm.push(d[prev * size + node]);
+      prev = node;
+    }
+    const returnKm = closed ? d[prev * size] : 0;
+    const distanceKm = legKm.reduce((sum, km) => sum + km, 0) + returnKm;
+    routes.push({
+      driver: index + 1,
+      stops: ordered,
+      legKm,
+      returnKm,
+      distanceKm,
+      load: ordered.reduce((sum, stop) => sum + Math.max(0, stop.demand ?? 1), 0),
+    });
+  });
+
+  const invalid = stops.filter((s) => !Number.isFinite(s.lat) || !Number.isFinite(s.lng));
+  return {
+    routes,
+    unassigned: [...unassigned, ...invalid],
+    totalDistanceKm: routes.reduce((sum, route) => sum + route.distanceKm, 0),
+    elapsedMs: Date.now() - startedAt,
+  };
+}
+
+/**
+ * Route distance in the given (unoptimized) order — baseline for comparisons.
+ */
+export function routeDistanceKm(depot: LatLng, stops: LatLng[], returnToDepot = true): number {
+  let km = 0;
+  let prev = depot;
+  for (const stop of stops) {
+    km += haversineKm(prev, stop);
+    prev = stop;
+  }
+  return returnToDepot ? km + haversineKm(prev, depot) : km;
+}
@@ -1,60 +1,60 @@
-import { S3Client, PutObjectCommand, GetObjectCommand } from '@aws-sdk/client-s3';
+import { Readable } from 'stream';
+import { S3Client, GetObjectCommand, DeleteObjectCommand } from '@aws-sdk/client-s3';
+import { Upload } from '@aws-sdk/lib-storage';
 import { getSignedUrl } from '@aws-sdk/s3-request-presigner';
 import { config } from '../config';
 
 // 初始化 S3 客户端
 // 注意：AWS SDK v3 会自动处理区域重定向，但需要确保 region 配置正确
 console.log('🔧 S3 客户端初始化 - 区域:', config.s3.region, '存储桶:', config.s3.bucket);
-const s3Client = new S3Client({
+// 全局共享一个客户端（连接复用）
+export const s3Client = new S3Client({
   region: config.s3.region,
   credentials: config.s3.accessKeyId && config.s3.secretAccessKey ? {
     accessKeyId: config.s3.accessKeyId,
     secretAccessKey: config.s3.secretAccessKey,
   } : undefined,
-  // 强制使用路径样式（某些情况下需要）
-  // forcePathStyle: false,
+  // S3 兼容服务（MinIO / 本地 stub）
+  endpoint: config.s3.endpoint,
+  // 强制使用路径样式（自定义 endpoint 时通常需要）
+  forcePathStyle: config.s3.forcePathStyle,
 });
 
 /**
- * 上传文件到 S3
- * @param fileBuffer 文件缓冲区
- * @param fileName 文件名
- * @param contentType MIME 类型
- * @returns S3 对象键（key）
+ * 生成唯一的对象键：<前缀>/<时间戳>-<随机数>.<扩展名>
  */
-export async function uploadToS3(
-  fileBuffer: Buffer,
-  fileName: string,
-  contentType: string
-): Promise<string> {
-  try {
-    // 生成唯一的文件键（key）
-    const timestamp = Date.now();
-    const randomStr = Math.round(Math.random() * 1e9);
-    const ext = fileName.split('.').pop() || '';
-    const key = `${config.s3.folderPrefix || 'uploads'}/${timestamp}-${randomStr}.${ext}`;
-
-    console.log('📤 开始上传到 S3 - 区域:', config.s3.region, '存储桶:', config.s3.bucket, '文件:', key);
+export function buildS3Key(fileName: string): string {
+  const timestamp = Date.now();
+  const randomStr = Math.round(Math.random() * 1e9);
+  const ext = fileName.split('.').pop() || '';
+  return `${config.s3.folderPrefix || 'uploads'}/${timestamp}-${randomStr}.${ext}`;
+}
 
-    // 上传到 S3
-    const command = new PutObjectCommand({
+/**
+ * 流式上传到 S3（不把整个文件读入内存）：小文件一次 PUT，超过一个分片大小时自动走分片上传
+ * 返回的 Upload 可以 abort()；done() 结果里带 ETag
+ */
+export function createS3Upload(key: string, body: Readable, contentType: string): Upload {
+  return new Upload({
+    client: s3Client,
+    params: {
       Bucket: config.s3.bucket,
       Key: key,
-      Body: fileBuffer,
+      Body: body,
       ContentType: contentType,
-      // 设置 ACL 为公共读取（如果需要公开访问）
-      // ACL: 'public-read',
-    });
-
-    await s3Client.send(command);
-    console.log('✅ S3 上传成功:', key);
+    },
+    // 5MB 是 S3 分片的最小值；同一文件最多 2 个分片并行，内存占用约 2 个分片
+    partSize: 5 * 1024 * 1024,
+    queueSize: 2,
+    leavePartsOnError: false,
+  });
+}
 
-    // 返回 S3 对象键
-    return key;
-  } catch (error: any) {
-    console.error('S3 上传失败:', error);
-    throw new Error(`文件上传失败: ${error.message}`);
-  }
+/**
+ * 删除 S3 对象（上传失败/被拒绝时清理）
+ */
+export async function deleteS3Object(key: string): Promise<void> {
+  await s3Client.send(new DeleteObjectCommand({ Bucket: config.s3.bucket, Key: key }));
 }
 
 /**
@@ -93,3 +93,23 @@ export async function getS3PresignedUrl(key: string, expiresIn: number = 3600):
   }
 }
 
+export type S3Object = { body: Buffer; etag: string; contentType: string; lastModified?: Date };
+
+/**
+ * 读取 S3 对象（整体读入内存，上传大小受 UPLOAD_MAX_SIZE 限制）
+ */
+export async function getS3Object(key: string): Promise<S3Object> {
+  const response = await s3Client.send(
+    new GetObjectCommand({
+      Bucket: config.s3.bucket,
+      Key: key,
+    })
+  );
+  const bytes = response.Body ? await response.Body.transformToByteArray() : new Uint8Array();
+  return {
+    body: Buffer.from(bytes),
+    etag: response.ETag || '',
+    contentType: response.ContentType || 'application/octet-stream',
+    lastModified: response.LastModified,
+  };
+}
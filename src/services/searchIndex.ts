@@ -0,0 +1,317 @@
+import { prisma } from '../db';
+import { getProductNameMappings } from '../utils/productNameMapper';
+import { onCatalogChanged } from './catalogEvents';
+
+/**
+ * In-process inverted index over active merchants, packages and services.
+ *
+ * Text is NFKC-normalised and lower-cased. Latin words/numbers become one term each;
+ * Chinese/Japanese/Korean runs become single characters plus overlapping bigrams, so
+ * "纸巾" matches "抽纸巾" without a dictionary. A query matches a document when every query
+ * term does (latin terms of 2+ characters also match as prefixes); documents are ranked by
+ * field weight (name > product names > description/address), with a bonus when the whole
+ * query appears in the name.
+ *
+ * The index is rebuilt lazily on the first search after a catalog change
+ * (notifyCatalogChanged) and at most every INDEX_TTL_MS otherwise.
+ */
+export type SearchDocType = 'merchant' | 'package' | 'service';
+
+export type SearchHit = { id: string; score: number };
+
+type IndexedDoc = {
+  type: SearchDocType;
+  id: string;
+  name: string;
+  region: string | null;
+};
+
+const INDEX_TTL_MS = 5 * 60 * 1000;
+const PREFIX_MIN_LENGTH = 2;
+// Prefix weight relative to an exact term match
+const PREFIX_FACTOR = 0.5;
+// Upper bound on vocabulary terms expanded for one prefix
+const MAX_PREFIX_TERMS = 200;
+
+const FIELD_WEIGHT = { name: 4, items: 2, region: 1, text: 1 } as const;
+
+// Kana, CJK ideographs (incl. extension A and compatibility block), Hangul syllables
+const CJK = /[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]/;
+const WORD = /[\p{L}\p{N}]+/gu;
+
+export function normalizeSearchText(text: string): string {
+  return text.normalize('NFKC').toLowerCase();
+}
+
+type QueryTerm = { term: string; prefix: boolean };
+
+function splitRuns(text: string, onLatin: (word: string) => void, onCjk: (chars: string[]) => void): void {
+  for (const run of normalizeSearchText(text).match(WORD) || []) {
+    let latin = '';
+    let cjk: string[] = [];
+    for (const ch of run) {
+      if (CJK.test(ch)) {
+        if (latin) onLatin(latin);
+        latin = '';
+        cjk.push(ch);
+      } else {
+        if (cjk.length) onCjk(cjk);
+        cjk = [];
+        latin += ch;
+      }
+    }
+    if (latin) onLatin(latin);
+    if (cjk.length) onCjk(cjk);
+  }
+}
+
+/** Terms stored for a document field: latin words, CJK characters and CJK bigrams */
+export function tokenize(text: string | null | undefined): string[] {
+  const terms = new Set<string>();
+  if (!text) return [];
+  splitRuns(
+    text,
+    (word) => terms.add(word),
+    (chars) => {
+      for (let i = 0; i < chars.length; i++) {
+        terms.add(chars[i]);
+        if (i + 1 < chars.length) terms.add(chars[i] + chars[i + 1]);
+      }
+    }
+  );
+  return [...terms];
+}
+
+/** Terms a query must match: bigrams for CJK runs (a single character stays a unigram) */
+function queryTerms(text: string): QueryTerm[] {
+  const terms = new Map<string, QueryTerm>();
+  splitRuns(
+    text,
+    (word) => terms.set(word, { term: word, prefix: word.length >= PREFIX_MIN_LENGTH }),
+    (chars) => {
+      if (chars.length === 1) terms.set(chars[0], { term: chars[0], prefix: false });
+      for (let i = 0; i + 1 < chars.length; i++) {
+        const bigram = chars[i] + chars[i + 1];
+        terms.set(bigram, { term: bigram, prefix: false });
+      }
+    }
+  );
+  return [...terms.values()];
+}
+
+export class CatalogIndex {
+  private docs: IndexedDoc[] = [];
+  // term -> doc index -> weight
+  private postings = new Map<string, Map<number, number>>();
+  // Sorted vocabulary, for prefix lookups
+  private vocabulary: string[] = [];
+
+  get size(): number {
+    return this.docs.length;
+  }
+
+  get terms(): number {
+    return this.postings.size;
+  }
+
+  /** Documents added earlier win ties, so add them in the default listing order */
+  add(doc: IndexedDoc, fields: Array<[string | null | undefined, number]>): void {
+    const docIndex = this.docs.length;
+    this.docs.push({ ...doc, name: normalizeSearchText(doc.name) });
+    for (const [text, weight] of fields) {
+      for (const term of tokenize(text)) {
+        let posting = this.postings.get(term);
+        if (!posting) {
+          posting = new Map();
+          this.postings.set(term, posting);
+        }
+        posting.set(docIndex, (posting.get(docIndex) || 0) + weight);
+      }
+    }
+  }
+
+  /** Call once after the last add() */
+  finalize(): this {
+    this.vocabulary = [...this.postings.keys()].sort();
+    return this;
+  }
+
+  private matchTerm({ term, prefix }: QueryTerm): Map<number, number> {
+    const matched = new Map(this.postings.get(term) || []);
+    if (!prefix) return matched;
+
+    // Binary search for the first vocabulary entry >= term, then walk while it starts with term
+    let lo = 0;
+    let hi = this.vocabulary.length;
+    while (lo < hi) {
+      const mid = (lo + hi) >> 1;
+      if (this.vocabulary[mid] < term) lo = mid + 1;
+      else hi = mid;
+    }
+    for (let i = lo, n = 0; i < this.vocabulary.length && n < MAX_PREFIX_TERMS; i++, n++) {
+      const candidate = this.vocabulary[i];
+      if (!candidate.startsWith(term)) break;
+      if (candidate === term) continue;
+      for (const [docIndex, weight] of this.postings.get(candidate)!) {
+        const prefixWeight = weight * PREFIX_FACTOR;
+        // Longest-prefix variants shouldn't add up ("clean", "cleaning", "cleaner")
+        if ((matched.get(docIndex) || 0) < prefixWeight) matched.set(docIndex, prefixWeight);
+      }
+    }
+    return matched;
+  }
+
+  search(query: string, filter: { type: SearchDocType; region?: string }): SearchHit[] {
+    const terms = queryTerms(query);
+    if (!terms.length) return [];
+
+    let scores: Map<number, number> | null = null;
+    for (const term of terms) {
+      const matched = this.matchTerm(term);
+      if (!scores) {
+        scores = new Map();
+        for (const [docIndex, weight] of matched) {
+          const doc = this.docs[docIndex];
+          if (doc.type !== filter.type) continue;
+          if (filter.region && doc.region !== filter.region) continue;
+          scores.set(docIndex, weight);
+        }
+      } else {
+        for (const [docIndex, score] of scores) {
+          const weight = matched.get(docIndex);
+          if (weight === undefined) scores.delete(docIndex);
+          else scores.set(docIndex, score + weight);
+        }
+      }
+      if (!scores.size) return [];
+    }
+
+    const phrase = normalizeSearchText(query).trim();
+    const hits: Array<{ docIndex: number; score: number }> = [];
+    for (const [docIndex, score] of scores!) {
+      const bonus = phrase && this.docs[docIndex].name.includes(phrase) ? FIELD_WEIGHT.name : 0;
+      hits.push({ docIndex, score: score + bonus });
+    }
+    hits.sort((a, b) => b.score - a.score || a.docIndex - b.docIndex);
+    return hits.map(({ docIndex, score }) => ({ id: this.docs[docIndex].id, score }));
+  }
+}
+
+function itemNames(itemsJson: string, mappings: Map<string, { chineseName: string }>): string {
+  try {
+    const items = JSON.parse(itemsJson);
+    if (!Array.isArray(items)) return '';
+    return items
+      .map((item: any) => [item?.title, item?.name, mappings.get(String(item?.shopifyProductId))?.chineseName].filter(Boolean).join(' '))
+      .join(' ');
+  } catch {
+    return '';
+  }
+}
+
+async function buildIndex(): Promise<CatalogIndex> {
+  const [merchants, packages, services, mappings] = await Promise.all([
+    prisma.merchant.findMany({
+      where: { isActive: true },
+      select: { id: true, name: true, description: true, address: true },
+      orderBy: [{ updatedAt: 'desc' }],
+    }),
+    prisma.package.findMany({
+      where: { isActive: true },
+      select: { id: true, name: true, description: true, region: true, itemsJson: true },
+      orderBy: [{ sortOrder: 'asc' }, { updatedAt: 'desc' }],
+    }),
+    prisma.service.findMany({
+      where: { isActive: true },
+      select: { id: true, name: true, description: true },
+      orderBy: [{ sortOrder: 'asc' }, { updatedAt: 'desc' }],
+    }),
+    getProductNameMappings(),
+  ]);
+
+  const index = new CatalogIndex();
+  for (const m of merchants) {
+    index.add({ type: 'merchant', id: m.id, name: m.name, region: null }, [
+      [m.name, FIELD_WEIGHT.name],
+      [m.description, FIELD_WEIGHT.text],
+      [m.address, FIELD_WEIGHT.text],
+    ]);
+  }
+  for (const p of packages) {
+    index.add({ type: 'package', id: p.id, name: p.name, region: p.region }, [
+      [p.name, FIELD_WEIGHT.name],
+      [itemNames(p.itemsJson, mappings), FIELD_WEIGHT.items],
+      [p.description, FIELD_WEIGHT.text],
+      [p.region, FIELD_WEIGHT.region],
+    ]);
+  }
+  for (const s of services) {
+    index.add({ type: 'service', id: s.id, name: s.name, region: null }, [
+      [s.name, FIELD_WEIGHT.name],
+      [s.description, FIELD_WEIGHT.text],
+    ]);
+  }
+  return index.finalize();
+}
+
+let current: CatalogIndex | null = null;
+let builtAt = 0;
+let building: Promise<CatalogIndex> | null = null;
+let generation = 0;
+const stats = { builds: 0, lastBuildMs: 0, searches: 0 };
+
+export function invalidateSearchIndex(): void {
+  current = null;
+  building = null;
+  generation++;
+}
+
+onCatalogChanged(() => invalidateSearchIndex());
+
+async function getIndex(): Promise<CatalogIndex> {
+  if (current && Date.now() - builtAt < INDEX_TTL_MS) return current;
+  if (building) return building;
+
+  const startedAt = generation;
+  const started = Date.now();
+  const pending = buildIndex()
+    .then((index) => {
+      stats.builds++;
+      stats.lastBuildMs = Date.now() - started;
+      // A write happened while building: use the result for this search only
+      if (startedAt === generation) {
+        current = index;
+        builtAt = Date.now();
+      }
+      return index;
+    })
+    .finally(() => {
+      if (building === pending) building = null;
+    });
+  building = pending;
+  return pending;
+}
+
+/** Build the index ahead of the first search (startup warm-up); returns the document count */
+export async function warmSearchIndex(): Promise<number> {
+  return (await getIndex()).size;
+}
+
+/**
+ * Ranked ids of active documents of one type matching `query` (best first).
+ * Returns [] for a query without searchable characters.
+ */
+export async function searchCatalog(query: string, filter: { type: SearchDocType; region?: string }): Promise<SearchHit[]> {
+  stats.searches++;
+  const index = await getIndex();
+  return index.search(query, filter);
+}
+
+export function getSearchIndexStats() {
+  return {
+    ...stats,
+    documents: current?.size ?? null,
+    terms: current?.terms ?? null,
+    builtAt: current ? new Date(builtAt).toISOString() : null,
+  };
+}
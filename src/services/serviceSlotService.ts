@@ -0,0 +1,191 @@
+import type { Prisma, ServiceBooking } from '@prisma/client';
+import { prisma, withRetryingTransaction } from '../db';
+import { config } from '../config';
+import { wallClockNow } from '../utils/serviceSlots';
+import { notifyCatalogChanged } from './catalogEvents';
+
+/**
+ * Service time slots (ServiceSlot): capacity is claimed with a conditional increment
+ * (`bookedCount < capacity`) inside the booking's transaction, so concurrent bookings of the
+ * last place in a slot cannot both succeed. Cancelling a booking gives its place back.
+ *
+ * Public service pages are page-cached and list open slots only, so the catalog-changed
+ * event is sent when a slot fills up or reopens, not on every booking.
+ */
+export class SlotFullError extends Error {
+  constructor(label: string) {
+    super(`The time slot "${label}" is fully booked.`);
+    this.name = 'SlotFullError';
+  }
+}
+
+const ACTIVE_BOOKING = { not: 'cancelled' };
+
+/** Slots that have not started yet, in the configured local time */
+function notStarted(): Prisma.DateTimeFilter {
+  return { gt: wallClockNow(config.serviceSlots.timeZone) };
+}
+
+/**
+ * Take one place in a slot. Returns null when the slot is full (or gone), otherwise whether
+ * this booking took the last place.
+ */
+async function claimPlace(tx: Prisma.TransactionClient, slotId: string): Promise<{ filled: boolean } | null> {
+  const { count } = await tx.serviceSlot.updateMany({
+    where: { id: slotId, bookedCount: { lt: prisma.serviceSlot.fields.capacity } },
+    data: { bookedCount: { increment: 1 } },
+  });
+  if (count === 0) return null;
+  const slot = await tx.serviceSlot.findUniqueOrThrow({ where: { id: slotId }, select: { bookedCount: true, capacity: true } });
+  return { filled: slot.bookedCount >= slot.capacity };
+}
+
+/** Give one place back; returns whether the slot was full before */
+async function releasePlace(tx: Prisma.TransactionClient, slotId: string): Promise<boolean> {
+  const slot = await tx.serviceSlot.findUnique({ where: { id: slotId }, select: { bookedCount: true, capacity: true } });
+  if (!slot) return false;
+  const { count } = await tx.serviceSlot.updateMany({
+    where: { id: slotId, bookedCount: { gt: 0 } },
+    data: { bookedCount: { decrement: 1 } },
+  });
+  return count === 1 && slot.bookedCount >= slot.capacity;
+}
+
+/** Whether the service has slots that haven't started (full or not): bookings must then pick one */
+export async function hasUpcomingSlots(serviceId: string): Promise<boolean> {
+  return (await prisma.serviceSlot.count({ where: { serviceId, startsAt: notStarted() } })) > 0;
+}
+
+/**
+ * Slot a booking for `serviceId` should claim: the chosen slotId, or the slot whose label
+ * matches the submitted preferred time. Returns null for services without slots (free text).
+ * Throws when the service has upcoming slots but none was chosen.
+ */
+export async function resolveBookingSlot(
+  serviceId: string,
+  choice: { slotId?: string; preferredTime?: string }
+): Promise<{ id: string; label: string } | null> {
+  const slotId = String(choice.slotId || '').trim();
+  const preferredTime = String(choice.preferredTime || '').trim();
+  const where: Prisma.ServiceSlotWhereInput = { serviceId, startsAt: notStarted() };
+
+  if (slotId || preferredTime) {
+    const slot = await prisma.serviceSlot.findFirst({
+      where: { ...where, ...(slotId ? { id: slotId } : { label: preferredTime }) },
+      select: { id: true, label: true },
+    });
+    if (slot) return slot;
+  }
+  if (await hasUpcomingSlots(serviceId)) {
+    throw new Error('Please choose one of the available time slots.');
+  }
+  return null;
+}
+
+/**
+ * Create a booking that holds one place in `slot` (same transaction).
+ * Throws SlotFullError when the slot has no places left.
+ */
+export async function bookServiceSlot(
+  slot: { id: string; label: string },
+  createBooking: (tx: Prisma.TransactionClient) => Promise<ServiceBooking>
+): Promise<ServiceBooking> {
+  let filled = false;
+  const booking = await withRetryingTransaction(async (tx) => {
+    // The conditional increment comes first: it takes the write lock before anything is read
+    const claimed = await claimPlace(tx, slot.id);
+    if (!claimed) throw new SlotFullError(slot.label);
+    filled = claimed.filled;
+    return createBooking(tx);
+  });
+  if (filled) notifyCatalogChanged('service slot full');
+  return booking;
+}
+
+/**
+ * Change a booking's status. Cancelling gives the slot place back; re-activating a cancelled
+ * booking claims it again (SlotFullError if it was taken meanwhile). Returns null if the
+ * booking doesn't exist.
+ */
+export async function setServiceBookingStatus(bookingId: string, status: string): Promise<ServiceBooking | null> {
+  let availabilityChanged = false;
+  const booking = await withRetryingTransaction(async (tx) => {
+    const cancelling = status === 'cancelled';
+    // Conditional on the current status, so two concurrent cancels release only once
+    const { count } = await tx.serviceBooking.updateMany({
+      where: { id: bookingId, status: cancelling ? ACTIVE_BOOKING : 'cancelled' },
+      data: { status },
+    });
+    const current = await tx.serviceBooking.findUnique({ where: { id: bookingId }, include: { slot: true } });
+    if (!current) return null;
+    if (count === 0) {
+      // No transition between active and cancelled: plain status change
+      if (current.status === status || cancelling) return current;
+      return tx.serviceBooking.update({ where: { id: bookingId }, data: { status } });
+    }
+    if (!current.slotId) return current;
+
+    if (cancelling) {
+      availabilityChanged = await releasePlace(tx, current.slotId);
+    } else {
+      const claimed = await claimPlace(tx, current.slotId);
+      if (!claimed) throw new SlotFullError(current.slot?.label || current.preferredTime);
+      availabilityChanged = claimed.filled;
+    }
+    return current;
+  });
+  if (availabilityChanged) notifyCatalogChanged('service slot availability');
+  return booking;
+}
+
+export type SlotAvailability = {
+  id: string;
+  serviceId: string;
+  serviceName: string;
+  label: string;
+  startsAt: string;
+  endsAt: string;
+  capacity: number;
+  remaining: number;
+};
+
+/**
+ * Open slots (not started, places left) of active services in [from, to), by start time.
+ * Filtered by merchant and/or service; served from the (merchantId, startsAt) / (serviceId, startsAt) indexes.
+ */
+export async function findOpenSlots(filter: {
+  merchantId?: string;
+  serviceId?: string;
+  from?: Date | null;
+  to?: Date | null;
+  limit?: number;
+}): Promise<SlotAvailability[]> {
+  const where: Prisma.ServiceSlotWhereInput = {
+    startsAt: {
+      ...notStarted(),
+      ...(filter.from ? { gte: filter.from } : {}),
+      ...(filter.to ? { lt: filter.to } : {}),
+    },
+    bookedCount: { lt: prisma.serviceSlot.fields.capacity },
+    service: { isActive: true },
+  };
+  if (filter.merchantId) where.merchantId = filter.merchantId;
+  if (filter.serviceId) where.serviceId = filter.serviceId;
+
+  const slots = await prisma.serviceSlot.findMany({
+    where,
+    orderBy: [{ startsAt: 'asc' }, { id: 'asc' }],
+    take: filter.limit ?? 500,
+    include: { service: { select: { name: true } } },
+  });
+  return slots.map((slot) => ({
+    id: slot.id,
+    serviceId: slot.serviceId,
+    serviceName: slot.service.name,
+    label: slot.label,
+    startsAt: slot.startsAt.toISOString().slice(0, 16).replace('T', ' '),
+    endsAt: slot.endsAt.toISOString().slice(0, 16).replace('T', ' '),
+    capacity: slot.capacity,
+    remaining: Math.max(0, slot.capacity - slot.bookedCount),
+  }));
+}
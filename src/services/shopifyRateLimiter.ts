@@ -0,0 +1,106 @@
+import { config } from '../config';
+
+/**
+ * Client-side model of Shopify's leaky-bucket rate limit.
+ *
+ * Shopify allows `bucketSize` calls in a burst and leaks `leakRate` calls per second.
+ * Every response carries `X-Shopify-Shop-Api-Call-Limit: used/size`; we resync our local
+ * estimate from it so other processes/apps sharing the store's bucket are accounted for.
+ */
+export class ShopifyRateLimiter {
+  private capacity: number;
+  private leakPerMs: number;
+  private level = 0;
+  private updatedAt = Date.now();
+  private blockedUntil = 0;
+
+  constructor(capacity: number, leakRatePerSecond: number) {
+    this.capacity = Math.max(1, capacity);
+    this.leakPerMs = Math.max(0.001, leakRatePerSecond) / 1000;
+  }
+
+  /**
+   * Wait until one call fits into the bucket, then account for it.
+   */
+  async acquire(): Promise<void> {
+    for (;;) {
+      const now = Date.now();
+      this.leak(now);
+
+      const blockedFor = this.blockedUntil - now;
+      if (blockedFor > 0) {
+        await sleep(blockedFor);
+        continue;
+      }
+
+      if (this.level + 1 <= this.capacity) {
+        this.level += 1;
+        return;
+      }
+
+      const waitMs = Math.ceil((this.level + 1 - this.capacity) / this.leakPerMs);
+      await sleep(Math.max(10, waitMs));
+    }
+  }
+
+  /**
+   * Resync from `X-Shopify-Shop-Api-Call-Limit` (e.g. "32/40").
+   */
+  observeCallLimit(header: unknown): void {
+    if (header === undefined || header === null || header === '') return;
+    const match = /^\s*(\d+)\s*\/\s*(\d+)\s*$/.exec(String(header));
+    if (!match) return;
+    const used = Number(match[1]);
+    const size = Number(match[2]);
+    if (!Number.isFinite(used) || !Number.isFinite(size) || size <= 0) return;
+    this.capacity = size;
+    this.level = Math.min(size, used);
+    this.updatedAt = Date.now();
+  }
+
+  /**
+   * Stop issuing calls for `ms` (used for 429 responses with `Retry-After`).
+   */
+  pause(ms: number): void {
+    if (!Number.isFinite(ms) || ms <= 0) return;
+    this.blockedUntil = Math.max(this.blockedUntil, Date.now() + ms);
+    this.level = this.capacity;
+    this.updatedAt = Date.now();
+  }
+
+  snapshot() {
+    this.leak(Date.now());
+    return {
+      capacity: this.capacity,
+      level: Number(this.level.toFixed(2)),
+      blockedForMs: Math.max(0, this.blockedUntil - Date.now()),
+    };
+  }
+
+  private leak(now: number): void {
+    const elapsed = now - this.updatedAt;
+    if (elapsed > 0) {
+      this.level = Math.max(0, this.level - elapsed * this.leakPerMs);
+      this.updatedAt = now;
+    }
+  }
+}
+
+/**
+ * Parse a `Retry-After` header (seconds or HTTP date) into milliseconds.
+ */
+export function parseRetryAfter(value: unknown): number | null {
+  if (value === undefined || value === null || value === '') return null;
+  const seconds = Number(value);
+  if (Number.isFinite(seconds)) return Math.max(0, seconds * 1000);
+  const date = Date.parse(String(value));
+  if (Number.isFinite(date)) return Math.max(0, date - Date.now());
+  return null;
+}
+
+function sleep(ms: number): Promise<void> {
+  return new Promise((resolve) => setTimeout(resolve, ms));
+}
+
+// One bucket per process: Shopify limits per store + app, so all callers share it.
+export const shopifyRateLimiter = new ShopifyRateLimiter(config.shopify.bucketSize, config.shopify.leakRate);
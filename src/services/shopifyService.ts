@@ -1,5 +1,9 @@
 import axios, { AxiosInstance } from 'axios';
+import http from 'http';
+import https from 'https';
 import { config } from '../config';
+import { shopifyRateLimiter, parseRetryAfter } from './shopifyRateLimiter';
+import { LatencyHistogram } from '../utils/latencyHistogram';
 
 interface ShopifyProduct {
   id: number;
@@ -9,6 +13,7 @@ interface ShopifyProduct {
     title: string;
     price: string;
     inventory_quantity?: number;
+    inventory_management?: string | null; // "shopify" = Shopify 跟踪库存
   }>;
   images?: Array<{
     src: string;
@@ -38,6 +43,7 @@ interface CreateOrderPayload {
     zip?: string;
   };
   financial_status: 'paid';
+  source_identifier?: string; // 本地订单ID，用于重试时查重
   note?: string;
   tags?: string[];
 }
@@ -50,19 +56,193 @@ interface ShopifyOrderResponse {
   };
 }
 
+/**
+ * Shopify API 调用失败（保留 HTTP 状态码和 Retry-After，供重试逻辑判断）
+ */
+class ShopifyApiError extends Error {
+  status?: number;
+  retryAfterMs?: number;
+
+  constructor(message: string, status?: number, retryAfterMs?: number) {
+    super(message);
+    this.name = 'ShopifyApiError';
+    this.status = status;
+    this.retryAfterMs = retryAfterMs;
+  }
+
+  /** 网络错误、超时、429 和 5xx 可以重试；其他 4xx 重试也不会成功 */
+  get retryable(): boolean {
+    if (this.status === undefined) return true;
+    return this.status === 408 || this.status === 429 || this.status >= 500;
+  }
+}
+
+function toShopifyApiError(prefix: string, error: any): ShopifyApiError {
+  const status: number | undefined = error.response?.status;
+  const retryAfterMs = parseRetryAfter(error.response?.headers?.['retry-after']) ?? undefined;
+  const detail = error.response?.data?.errors || error.message;
+  const message = `${prefix}: ${typeof detail === 'string' ? detail : JSON.stringify(detail)}`;
+  return new ShopifyApiError(message, status, retryAfterMs);
+}
+
+interface CatalogCacheStats {
+  hits: number;
+  staleHits: number;
+  misses: number;
+  refreshes: number;
+  refreshErrors: number;
+  lastRefreshMs: number | null;
+  totalRefreshMs: number;
+  maxRefreshMs: number;
+  fetchedAt: string | null;
+  productCount: number;
+}
+
 class ShopifyService {
   private client: AxiosInstance;
   private baseUrl: string;
 
+  // 商品目录缓存（进程内共享）
+  private catalog: ShopifyProduct[] | null = null;
+  private catalogImageMap: Map<string, string> | null = null;
+  private catalogFetchedAt = 0;
+  private catalogRefresh: Promise<ShopifyProduct[]> | null = null;
+  // Bumped on invalidation so an in-flight refresh started earlier cannot repopulate old data.
+  private catalogGeneration = 0;
+  private catalogStats: CatalogCacheStats = {
+    hits: 0,
+    staleHits: 0,
+    misses: 0,
+    refreshes: 0,
+    refreshErrors: 0,
+    lastRefreshMs: null,
+    totalRefreshMs: 0,
+    maxRefreshMs: 0,
+    fetchedAt: null,
+    productCount: 0,
+  };
+
+  // HTTP 连接池（keep-alive，复用 TLS 连接）
+  private httpAgent: http.Agent;
+  private httpsAgent: https.Agent;
+  private latency = new Map<string, LatencyHistogram>();
+  private httpStats = { requests: 0, retries: 0, throttled429: 0, errors: 0 };
+
   constructor() {
-    this.baseUrl = `https://${config.shopify.storeDomain}/admin/api/${config.shopify.apiVersion}`;
+    this.baseUrl =
+      config.shopify.apiBaseUrl ||
+      `https://${config.shopify.storeDomain}/admin/api/${config.shopify.apiVersion}`;
+
+    const agentOptions = {
+      keepAlive: true,
+      maxSockets: config.shopify.maxSockets,
+      maxFreeSockets: config.shopify.maxSockets,
+      timeout: config.shopify.timeoutMs,
+    };
+    this.httpAgent = new http.Agent(agentOptions);
+    this.httpsAgent = new https.Agent(agentOptions);
+
     this.client = axios.create({
       baseURL: this.baseUrl,
+      timeout: config.shopify.timeoutMs,
+      httpAgent: this.httpAgent,
+      httpsAgent: this.httpsAgent,
       headers: {
         'X-Shopify-Access-Token': config.shopify.accessToken,
         'Content-Type': 'application/json',
       },
     });
+
+    // 发请求前先从本地漏桶取额度，避免被 Shopify 429 拒绝
+    this.client.interceptors.request.use(async (requestConfig) => {
+      await shopifyRateLimiter.acquire();
+      (requestConfig as any).__startedAt = Date.now();
+      this.httpStats.requests++;
+      return requestConfig;
+    });
+
+    // 根据 Shopify 返回的调用额度同步本地漏桶；429 / 可重试错误自动重试
+    this.client.interceptors.response.use(
+      (response) => {
+        this.recordLatency(response.config);
+        shopifyRateLimiter.observeCallLimit(response.headers['x-shopify-shop-api-call-limit']);
+        return response;
+      },
+      async (error) => {
+        const requestConfig = error.config;
+        if (requestConfig) this.recordLatency(requestConfig);
+
+        const status: number | undefined = error.response?.status;
+        const headers = error.response?.headers;
+        if (headers) {
+          shopifyRateLimiter.observeCallLimit(headers['x-shopify-shop-api-call-limit']);
+          if (status === 429) {
+            this.httpStats.throttled429++;
+            shopifyRateLimiter.pause(parseRetryAfter(headers['retry-after']) ?? 2000);
+          }
+        }
+
+        if (requestConfig && this.shouldRetry(requestConfig, status)) {
+          requestConfig.__retryCount = (requestConfig.__retryCount || 0) + 1;
+          this.httpStats.retries++;
+          if (status !== 429) {
+            // 429 already paused the limiter; for transient errors back off briefly
+            await new Promise((resolve) => setTimeout(resolve, 250 * 2 ** (requestConfig.__retryCount - 1)));
+          }
+          return this.client.request(requestConfig);
+        }
+
+        this.httpStats.errors++;
+        return Promise.reject(error);
+      }
+    );
+  }
+
+  /**
+   * 429 总是可以重试（Shopify 未处理该请求）；网络错误/5xx 只对幂等请求重试，
+   * 非幂等的下单请求由同步队列负责查重后重试。
+   */
+  private shouldRetry(requestConfig: any, status: number | undefined): boolean {
+    if ((requestConfig.__retryCount || 0) >= config.shopify.maxRetries) return false;
+    if (status === 429) return true;
+    const method = String(requestConfig.method || 'get').toLowerCase();
+    const idempotent = method === 'get' || method === 'delete' || method === 'head';
+    if (!idempotent) return false;
+    return status === undefined || status >= 500;
+  }
+
+  private recordLatency(requestConfig: any): void {
+    const startedAt = requestConfig?.__startedAt;
+    if (!startedAt) return;
+    const key = endpointKey(requestConfig.method, requestConfig.url);
+    let histogram = this.latency.get(key);
+    if (!histogram) {
+      histogram = new LatencyHistogram();
+      this.latency.set(key, histogram);
+    }
+    histogram.record(Date.now() - startedAt);
+  }
+
+  /**
+   * HTTP 调用统计：按接口的延迟分布、重试次数、连接池状态、限流状态
+   */
+  getHttpStats() {
+    const countSockets = (sockets: NodeJS.ReadOnlyDict<any[]>) =>
+      Object.values(sockets).reduce((sum: number, list) => sum + (list ? list.length : 0), 0);
+    const endpoints: Record<string, ReturnType<LatencyHistogram['snapshot']>> = {};
+    for (const [key, histogram] of this.latency) endpoints[key] = histogram.snapshot();
+
+    return {
+      ...this.httpStats,
+      endpoints,
+      pool: {
+        maxSockets: config.shopify.maxSockets,
+        activeSockets: countSockets(this.httpsAgent.sockets) + countSockets(this.httpAgent.sockets),
+        freeSockets: countSockets(this.httpsAgent.freeSockets) + countSockets(this.httpAgent.freeSockets),
+        queuedRequests: countSockets(this.httpsAgent.requests) + countSockets(this.httpAgent.requests),
+      },
+      rateLimit: shopifyRateLimiter.snapshot(),
+    };
   }
 
   /**
@@ -101,6 +281,101 @@ class ShopifyService {
     }
   }
 
+  /**
+   * 获取商品列表（带缓存）
+   * - TTL 内直接返回缓存
+   * - 过期但未超过 stale 时间：返回旧数据，同时后台刷新
+   * - 无缓存或过旧：等待刷新；并发请求共享同一次刷新（single-flight）
+   */
+  async getCachedProducts(options: { forceRefresh?: boolean } = {}): Promise<ShopifyProduct[]> {
+    const age = Date.now() - this.catalogFetchedAt;
+
+    if (!options.forceRefresh && this.catalog) {
+      if (age < config.shopify.catalogTtlMs) {
+        this.catalogStats.hits++;
+        return this.catalog;
+      }
+      if (age < config.shopify.catalogStaleMs) {
+        this.catalogStats.staleHits++;
+        this.refreshCatalog().catch(() => {
+          // already counted/logged in refreshCatalog; keep serving stale data
+        });
+        return this.catalog;
+      }
+    }
+
+    this.catalogStats.misses++;
+    try {
+      return await this.refreshCatalog();
+    } catch (error) {
+      // Shopify unavailable: fall back to whatever we have rather than failing the page
+      if (this.catalog && !options.forceRefresh) return this.catalog;
+      throw error;
+    }
+  }
+
+  /**
+   * 商品ID -> 首图 URL（基于缓存的商品目录）
+   */
+  async getProductImageMap(): Promise<Map<string, string>> {
+    const products = await this.getCachedProducts();
+    if (this.catalogImageMap && products === this.catalog) return this.catalogImageMap;
+    return buildProductImageMap(products);
+  }
+
+  /**
+   * 使商品目录缓存失效（下次访问会重新拉取）
+   */
+  invalidateProductCache(): void {
+    this.catalog = null;
+    this.catalogImageMap = null;
+    this.catalogFetchedAt = 0;
+    this.catalogRefresh = null;
+    this.catalogGeneration++;
+  }
+
+  getCatalogCacheStats(): CatalogCacheStats & { ageMs: number | null; refreshing: boolean } {
+    return {
+      ...this.catalogStats,
+      ageMs: this.catalog ? Date.now() - this.catalogFetchedAt : null,
+      refreshing: Boolean(this.catalogRefresh),
+    };
+  }
+
+  private refreshCatalog(): Promise<ShopifyProduct[]> {
+    if (this.catalogRefresh) return this.catalogRefresh;
+
+    const generation = this.catalogGeneration;
+    const startedAt = Date.now();
+    const refresh = this.getProducts()
+      .then((products) => {
+        const elapsed = Date.now() - startedAt;
+        this.catalogStats.refreshes++;
+        this.catalogStats.lastRefreshMs = elapsed;
+        this.catalogStats.totalRefreshMs += elapsed;
+        this.catalogStats.maxRefreshMs = Math.max(this.catalogStats.maxRefreshMs, elapsed);
+
+        if (generation === this.catalogGeneration) {
+          this.catalog = products;
+          this.catalogImageMap = buildProductImageMap(products);
+          this.catalogFetchedAt = Date.now();
+          this.catalogStats.fetchedAt = new Date(this.catalogFetchedAt).toISOString();
+          this.catalogStats.productCount = products.length;
+        }
+        return products;
+      })
+      .catch((error) => {
+        this.catalogStats.refreshErrors++;
+        throw error;
+      })
+      .finally(() => {
+        if (this.catalogRefresh === refresh) this.catalogRefresh = null;
+      });
+
+    this.catalogRefresh = refresh;
+    return refresh;
+  }
+
   /**
    * 创建已付款订单
    */
@@ -178,6 +453,7 @@ class ShopifyService {
           country: 'AU', // Australia (Sydney)
         },
         financial_status: 'paid',
+        source_identifier: orderData.localOrderId,
         note: note,
         tags: ['TG', 'WeChat Group-buy', 'Local Payment'],
       };
@@ -193,7 +469,41 @@ class ShopifyService {
       };
     } catch (error: any) {
       console.error('Error creating order in Shopify:', error.response?.data || error.message);
-      throw new Error(`Failed to create Shopify order: ${error.response?.data?.errors || error.message}`);
+      throw toShopifyApiError('Failed to create Shopify order', error);
+    }
+  }
+
+  /**
+   * 按本地订单ID查找已创建的 Shopify 订单（重试前查重，避免重复下单）
+   * @param since 只查此时间之后创建的订单
+   */
+  async findOrderByLocalId(localOrderId: string, since: Date): Promise<{ id: number; name: string } | null> {
+    try {
+      const params = new URLSearchParams({
+        status: 'any',
+        limit: '250',
+        created_at_min: new Date(since.getTime() - 60 * 1000).toISOString(),
+        fields: 'id,name,source_identifier,note',
+      });
+      let nextUrl: string | null = `/orders.json?${params.toString()}`;
+
+      while (nextUrl) {
+        const response: any = await this.client.get(nextUrl);
+        const orders: Array<{ id: number; name: string; source_identifier?: string; note?: string }> =
+          response.data.orders || [];
+        const found = orders.find(
+          (o) => o.source_identifier === localOrderId || (o.note || '').includes(`Local order id: ${localOrderId}`)
+        );
+        if (found) return { id: found.id, name: found.name };
+
+        const linkHeader: string | undefined = response.headers.link as string | undefined;
+        const nextMatch = linkHeader ? linkHeader.match(/<([^>]+)>; rel="next"/) : null;
+        nextUrl = nextMatch ? nextMatch[1].replace(this.baseUrl, '') : null;
+      }
+      return null;
+    } catch (error: any) {
+      console.error('Error looking up Shopify order:', error.response?.data || error.message);
+      throw toShopifyApiError('Failed to look up Shopify order', error);
     }
   }
 
@@ -210,11 +520,34 @@ class ShopifyService {
         return;
       }
       console.error('Error deleting Shopify order:', error.response?.data || error.message);
-      throw new Error(`Failed to delete Shopify order: ${error.response?.data?.errors || error.message}`);
+      throw toShopifyApiError('Failed to delete Shopify order', error);
+    }
+  }
+}
+
+/**
+ * Group URLs into endpoints for metrics: "GET /orders/123.json?x=1" -> "GET /orders/:id.json"
+ */
+function endpointKey(method: string | undefined, url: string | undefined): string {
+  const path = String(url || '')
+    .replace(/^https?:\/\/[^/]+/, '')
+    .replace(/^\/admin\/api\/[^/]+/, '')
+    .split('?')[0]
+    .replace(/\/\d+(?=[/.]|$)/g, '/:id');
+  return `${String(method || 'get').toUpperCase()} ${path || '/'}`;
+}
+
+function buildProductImageMap(products: ShopifyProduct[]): Map<string, string> {
+  const map = new Map<string, string>();
+  for (const product of products) {
+    if (product.images && product.images.length > 0) {
+      map.set(product.id.toString(), product.images[0].src);
     }
   }
+  return map;
 }
 
 export const shopifyService = new ShopifyService();
-export type { ShopifyProduct };
+export { ShopifyApiError };
+export type { ShopifyProduct, CatalogCacheStats };
 
@@ -0,0 +1,236 @@
+import { prisma } from '../db';
+import { config } from '../config';
+import { shopifyService, ShopifyApiError } from './shopifyService';
+import { shopifyRateLimiter } from './shopifyRateLimiter';
+
+type SyncJob = {
+  id: string;
+  orderId: string;
+  attempts: number;
+  createdAt: Date;
+};
+
+/**
+ * Background worker that drains the ShopifySyncJob outbox.
+ *
+ * Checkout only writes the Order + its sync job (in one transaction); this worker pushes
+ * the order to Shopify afterwards with bounded concurrency, exponential backoff, and
+ * idempotency keyed on the local order id. Every Shopify call goes through the shared
+ * leaky-bucket limiter inside ShopifyService's HTTP client.
+ */
+class ShopifySyncWorker {
+  private timer: NodeJS.Timeout | null = null;
+  private running = false;
+  private claiming = false;
+  private active = 0;
+  private idleWaiters: Array<() => void> = [];
+  private stats = {
+    succeeded: 0,
+    retried: 0,
+    failed: 0,
+    lastError: null as string | null,
+    lastSuccessAt: null as string | null,
+  };
+
+  start(): void {
+    if (this.running) return;
+    this.running = true;
+    this.schedule(0);
+    console.log(`[shopify-sync] worker started (concurrency=${config.shopifySync.concurrency})`);
+  }
+
+  async stop(): Promise<void> {
+    this.running = false;
+    if (this.timer) clearTimeout(this.timer);
+    this.timer = null;
+    if (this.active > 0) {
+      await new Promise<void>((resolve) => this.idleWaiters.push(resolve));
+    }
+  }
+
+  /**
+   * Process newly enqueued jobs right away instead of waiting for the next poll.
+   */
+  kick(): void {
+    if (this.running) this.schedule(0);
+  }
+
+  getStats() {
+    return { running: this.running, active: this.active, ...this.stats, rateLimit: shopifyRateLimiter.snapshot() };
+  }
+
+  private schedule(delayMs: number): void {
+    if (this.timer) clearTimeout(this.timer);
+    this.timer = setTimeout(() => {
+      this.timer = null;
+      this.tick().catch((error) => console.error('[shopify-sync] tick failed:', error));
+    }, delayMs);
+  }
+
+  private async tick(): Promise<void> {
+    if (!this.running || this.claiming) return;
+    this.claiming = true;
+    try {
+      while (this.running && this.active < config.shopifySync.concurrency) {
+        const job = await this.claimNext();
+        if (!job) break;
+        this.active++;
+        this.process(job)
+          .catch((error) => console.error(`[shopify-sync] job ${job.id} crashed:`, error))
+          .finally(() => {
+            this.active--;
+            if (this.active === 0) this.idleWaiters.splice(0).forEach((resolve) => resolve());
+            if (this.running) this.schedule(0);
+          });
+      }
+    } finally {
+      this.claiming = false;
+    }
+    if (this.running && !this.timer) this.schedule(config.shopifySync.pollIntervalMs);
+  }
+
+  /**
+   * Atomically claim the next due job. The conditional update on `updatedAt` makes the
+   * claim safe across several app instances polling the same table.
+   */
+  private async claimNext(): Promise<SyncJob | null> {
+    for (let i = 0; i < 5; i++) {
+      const now = new Date();
+      const staleLock = new Date(now.getTime() - config.shopifySync.lockTimeoutMs);
+      const candidate = await prisma.shopifySyncJob.findFirst({
+        where: {
+          OR: [
+            { status: 'pending', nextRunAt: { lte: now } },
+            { status: 'processing', lockedAt: { lt: staleLock } },
+          ],
+        },
+        orderBy: { nextRunAt: 'asc' },
+      });
+      if (!candidate) return null;
+
+      const claimed = await prisma.shopifySyncJob.updateMany({
+        where: { id: candidate.id, updatedAt: candidate.updatedAt },
+        data: { status: 'processing', lockedAt: now, attempts: { increment: 1 } },
+      });
+      if (claimed.count === 1) {
+        return {
+          id: candidate.id,
+          orderId: candidate.orderId,
+          attempts: candidate.attempts + 1,
+          createdAt: candidate.createdAt,
+        };
+      }
+    }
+    return null;
+  }
+
+  private async process(job: SyncJob): Promise<void> {
+    const order = await prisma.order.findUnique({ where: { id: job.orderId } });
+    if (!order) {
+      // Order was deleted; the job row goes with it (onDelete: Cascade)
+      return;
+    }
+
+    // Idempotency: already synced (e.g. by a previous attempt that crashed before marking done)
+    if (order.shopifyOrderId) {
+      await this.markDone(job, order.shopifyOrderId);
+      return;
+    }
+
+    try {
+      // A previous attempt may have reached Shopify before failing (timeout, crash), so look
+      // for an existing order tagged with this local id before creating another one.
+      let shopifyOrder: { id: number; name: string } | null = null;
+      if (job.attempts > 1) {
+        shopifyOrder = await shopifyService.findOrderByLocalId(order.id, job.createdAt);
+      }
+
+      if (!shopifyOrder) {
+        let items: any[] = [];
+        try {
+          items = JSON.parse(order.itemsJson || '[]');
+        } catch {
+          items = [];
+        }
+        shopifyOrder = await shopifyService.createPaidOrder({
+          items,
+          customerName: order.customerName,
+          phone: order.phone,
+          address: order.address,
+          deliveryTime: order.deliveryTime,
+          localOrderId: order.id,
+          paymentMethod: order.paymentMethod,
+          optionalNote: order.optionalNote || undefined,
+        });
+      }
+
+      const shopifyOrderId = shopifyOrder.id.toString();
+      try {
+        await prisma.$transaction([
+          prisma.order.update({ where: { id: order.id }, data: { shopifyOrderId } }),
+          prisma.shopifySyncJob.update({
+            where: { id: job.id },
+            data: { status: 'done', shopifyOrderId, lockedAt: null, lastError: null },
+          }),
+        ]);
+      } catch (error: any) {
+        if (error?.code === 'P2025') {
+          // Local order deleted while we were syncing: don't leave an orphan in Shopify
+          console.warn(`[shopify-sync] order ${order.id} deleted during sync; removing Shopify order ${shopifyOrderId}`);
+          await shopifyService.deleteOrder(shopifyOrderId);
+          return;
+        }
+        throw error;
+      }
+
+      this.stats.succeeded++;
+      this.stats.lastSuccessAt = new Date().toISOString();
+    } catch (error: any) {
+      await this.markFailedAttempt(job, error);
+    }
+  }
+
+  private async markDone(job: SyncJob, shopifyOrderId: string): Promise<void> {
+    await prisma.shopifySyncJob.update({
+      where: { id: job.id },
+      data: { status: 'done', shopifyOrderId, lockedAt: null, lastError: null },
+    });
+  }
+
+  private async markFailedAttempt(job: SyncJob, error: any): Promise<void> {
+    const message = String(error?.message || error).slice(0, 1000);
+    const retryable = error instanceof ShopifyApiError ? error.retryable : true;
+    const exhausted = job.attempts >= config.shopifySync.maxAttempts;
+    this.stats.lastError = message;
+
+    if (!retryable || exhausted) {
+      this.stats.failed++;
+      console.error(`[shopify-sync] order ${job.orderId} failed permanently after ${job.attempts} attempt(s): ${message}`);
+      await prisma.shopifySyncJob.updateMany({
+        where: { id: job.id },
+        data: { status: 'failed', lockedAt: null, lastError: message },
+      });
+      return;
+    }
+
+    const delayMs = backoffDelay(job.attempts, error instanceof ShopifyApiError ? error.retryAfterMs : undefined);
+    this.stats.retried++;
+    console.warn(`[shopify-sync] order ${job.orderId} attempt ${job.attempts} failed, retrying in ${delayMs}ms: ${message}`);
+    await prisma.shopifySyncJob.updateMany({
+      where: { id: job.id },
+      data: { status: 'pending', lockedAt: null, lastError: message, nextRunAt: new Date(Date.now() + delayMs) },
+    });
+  }
+}
+
+/**
+ * Exponential backoff with jitter; Shopify's Retry-After wins when it asks for longer.
+ */
+function backoffDelay(attempt: number, retryAfterMs?: number): number {
+  const { baseBackoffMs, maxBackoffMs } = config.shopifySync;
+  const exp = Math.min(maxBackoffMs, baseBackoffMs * 2 ** Math.max(0, attempt - 1));
+  const jittered = Math.round(exp / 2 + Math.random() * (exp / 2));
+  return Math.max(jittered, retryAfterMs || 0);
+}
+
+export const shopifySyncWorker = new ShopifySyncWorker();
@@ -0,0 +1,131 @@
+import type { Express, NextFunction, Request, Response } from 'express';
+import { config } from '../config';
+import { prisma } from '../db';
+import { getProductNameMappings } from '../utils/productNameMapper';
+import { loadViewTemplates } from '../utils/viewTemplates';
+import { warmSearchIndex } from './searchIndex';
+import { shopifyService } from './shopifyService';
+
+/**
+ * Startup warm-up and readiness.
+ *
+ * server.ts runs `warmUp()` before it starts listening: open the DB connection pool, put every
+ * compiled view into the template cache and fill the in-process caches (search index, product
+ * name mappings, optionally the Shopify catalog). Then it listens, calls `markReady()` (and tells
+ * pm2 `ready`, see `wait_ready` in ecosystem.config.js), so pm2 reloads and load balancers only
+ * send traffic to a warm process. A failed or slow step is logged and skipped, never fatal; the
+ * whole warm-up gives up after WARMUP_TIMEOUT_MS, which must stay below pm2's `listen_timeout`.
+ *
+ * GET /readyz is 200 only between `markReady()` and `markShuttingDown()`; GET /healthz is the
+ * liveness check. Boot time, the warm-up steps and the latency of the first request are
+ * reported by GET /admin/api/metrics (`process.startup`).
+ */
+type WarmupStep = { name: string; ms: number; ok: boolean; detail?: string; error?: string };
+
+const state = {
+  ready: false,
+  shuttingDown: false,
+  readyAtMs: null as number | null, // process uptime when ready
+  warmupMs: null as number | null,
+  steps: [] as WarmupStep[],
+  firstRequest: null as { path: string; status: number; ms: number } | null,
+};
+
+function withTimeout<T>(promise: Promise<T>, ms: number): Promise<T> {
+  let timer: NodeJS.Timeout;
+  return Promise.race([
+    promise,
+    new Promise<never>((_, reject) => {
+      timer = setTimeout(() => reject(new Error(`timed out after ${ms} ms`)), ms);
+    }),
+  ]).finally(() => clearTimeout(timer));
+}
+
+async function step(
+  name: string,
+  deadline: number,
+  run: () => Promise<string | void> | string | void
+): Promise<void> {
+  const started = Date.now();
+  try {
+    const remaining = deadline - started;
+    if (remaining <= 0) throw new Error('skipped, warm-up deadline passed');
+    const detail = await withTimeout(Promise.resolve().then(run), remaining);
+    state.steps.push({ name, ms: Date.now() - started, ok: true, ...(detail ? { detail } : {}) });
+  } catch (error: any) {
+    state.steps.push({ name, ms: Date.now() - started, ok: false, error: String(error?.message || error) });
+    console.warn(`[warmup] ${name} failed: ${error?.message || error}`);
+  }
+}
+
+export async function warmUp(app: Express): Promise<void> {
+  const started = Date.now();
+  // One deadline for all steps (they run one after another), kept below pm2's listen_timeout
+  const deadline = started + config.startup.warmupTimeoutMs;
+  state.steps = [];
+
+  await step('db', deadline, async () => {
+    await prisma.$connect();
+    await prisma.$queryRaw`SELECT 1`;
+  });
+
+  if (app.enabled('view cache')) {
+    await step('views', deadline, () => {
+      const { templates, precompiled } = loadViewTemplates(app.get('views'));
+      return `${templates} templates (${precompiled} precompiled)`;
+    });
+  }
+
+  // Independent of each other: run together
+  await Promise.all([
+    step('searchIndex', deadline, async () => `${await warmSearchIndex()} documents`),
+    step('productNames', deadline, async () => `${(await getProductNameMappings()).size} mappings`),
+    ...(config.startup.warmShopifyCatalog
+      ? [step('shopifyCatalog', deadline, async () => `${(await shopifyService.getCachedProducts()).length} products`)]
+      : []),
+  ]);
+
+  state.warmupMs = Date.now() - started;
+  const summary = state.steps.map((s) => `${s.name} ${s.ok ? `${s.ms}ms` : 'failed'}`).join(', ');
+  console.log(`[warmup] done in ${state.warmupMs} ms (${summary})`);
+}
+
+export function markReady(): void {
+  state.ready = true;
+  state.readyAtMs = Math.round(process.uptime() * 1000);
+  // pm2 `wait_ready`: the previous instance is only stopped once this one is ready
+  if (process.send) process.send('ready');
+}
+
+export function markShuttingDown(): void {
+  state.shuttingDown = true;
+}
+
+export function isReady(): boolean {
+  return state.ready && !state.shuttingDown;
+}
+
+/** Records the latency of the first request served after startup */
+export const trackFirstRequest = (req: Request, res: Response, next: NextFunction) => {
+  if (state.firstRequest || !state.ready) return next();
+  const started = process.hrtime.bigint();
+  res.once('finish', () => {
+    if (state.firstRequest) return;
+    state.firstRequest = {
+      path: req.originalUrl,
+      status: res.statusCode,
+      ms: Math.round(Number(process.hrtime.bigint() - started) / 1e5) / 10,
+    };
+  });
+  next();
+};
+
+export function getStartupMetrics() {
+  return {
+    ready: isReady(),
+    readyAtMs: state.readyAtMs,
+    warmupMs: state.warmupMs,
+    steps: state.steps,
+    firstRequest: state.firstRequest,
+  };
+}
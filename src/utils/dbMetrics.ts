@@ -0,0 +1,82 @@
+import { LatencyHistogram, HistogramSnapshot } from './latencyHistogram';
+
+/**
+ * Per-route database metrics (query count + duration), fed by the Prisma middleware in `db.ts`.
+ */
+type RouteStats = {
+  requests: number;
+  queries: number;
+  histogram: LatencyHistogram;
+  operations: Map<string, number>;
+};
+
+type SlowQuery = {
+  at: string;
+  route: string;
+  operation: string;
+  durationMs: number;
+};
+
+const MAX_SLOW_QUERIES = 50;
+
+const routes = new Map<string, RouteStats>();
+const slowQueries: SlowQuery[] = [];
+let startedAt = Date.now();
+
+function getRoute(route: string): RouteStats {
+  let stats = routes.get(route);
+  if (!stats) {
+    stats = { requests: 0, queries: 0, histogram: new LatencyHistogram(), operations: new Map() };
+    routes.set(route, stats);
+  }
+  return stats;
+}
+
+export function recordRequest(route: string): void {
+  getRoute(route).requests++;
+}
+
+export function recordQuery(route: string, operation: string, durationMs: number): void {
+  const stats = getRoute(route);
+  stats.queries++;
+  stats.histogram.record(durationMs);
+  stats.operations.set(operation, (stats.operations.get(operation) || 0) + 1);
+}
+
+export function recordSlowQuery(route: string, operation: string, durationMs: number): void {
+  slowQueries.unshift({ at: new Date().toISOString(), route, operation, durationMs: Math.round(durationMs) });
+  if (slowQueries.length > MAX_SLOW_QUERIES) slowQueries.length = MAX_SLOW_QUERIES;
+}
+
+export function getDbMetrics() {
+  const byRoute: Array<{
+    route: string;
+    requests: number;
+    queries: number;
+    queriesPerRequest: number | null;
+    duration: HistogramSnapshot;
+    topOperations: Array<{ operation: string; count: number }>;
+  }> = [];
+
+  for (const [route, stats] of routes) {
+    byRoute.push({
+      route,
+      requests: stats.requests,
+      queries: stats.queries,
+      queriesPerRequest: stats.requests ? Math.round((stats.queries / stats.requests) * 10) / 10 : null,
+      duration: stats.histogram.snapshot(),
+      topOperations: Array.from(stats.operations, ([operation, count]) => ({ operation, count }))
+        .sort((a, b) => b.count - a.count)
+        .slice(0, 5),
+    });
+  }
+  byRoute.sort((a, b) => b.duration.totalMs - a.duration.totalMs);
+
+  return { since: new Date(startedAt).toISOString(), routes: byRoute, slowQueries: [...slowQueries] };
+}
+
+export function resetDbMetrics(): void {
+  routes.clear();
+  slowQueries.length = 0;
+  startedAt = Date.now();
+}
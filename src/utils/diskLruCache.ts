@@ -0,0 +1,202 @@
+import crypto from 'crypto';
+import fs from 'fs';
+import path from 'path';
+
+export type DiskCacheEntry = {
+  key: string;
+  /** Absolute path of the cached bytes (serve with res.sendFile) */
+  file: string;
+  size: number;
+  etag: string;
+  contentType: string;
+  storedAt: number;
+};
+
+/**
+ * Size-capped LRU cache of blobs on local disk.
+ *
+ * Each entry is `<hash>` (bytes) + `<hash>.json` (metadata), spread over 256 sub-directories.
+ * The index lives in memory (Map insertion order = least recently used first) and is rebuilt
+ * from the metadata files on startup, so the cache survives restarts.
+ *
+ * Several processes (pm2 / start:cluster workers) share the directory, each with its own index,
+ * so `maxBytes` caps the directory, not one process: every RESCAN_INTERVAL_MS a background scan
+ * merges what the other processes wrote (or removed) into the index and evicts if needed; `put()`
+ * itself never walks the directory. Entries rank by this process's last use, else `storedAt`. An
+ * entry another process evicted surfaces as ENOENT when it is served (see imageController).
+ */
+const RESCAN_INTERVAL_MS = 30 * 1000;
+
+export class DiskLruCache {
+  private readonly entries = new Map<string, DiskCacheEntry>();
+  private totalBytes = 0;
+  private readonly ready: Promise<void>;
+  private hits = 0;
+  private misses = 0;
+  private evictions = 0;
+  // Last hit / write by this process, for ordering entries after a re-scan
+  private readonly usedAt = new Map<string, number>();
+  private rescanning: Promise<void> | null = null;
+  // Removed while a scan runs: the scan may still have read their metadata
+  private readonly removedDuringScan = new Set<string>();
+
+  private readonly dir: string;
+
+  constructor(dir: string, private readonly maxBytes: number) {
+    // Absolute, so entries can be served with res.sendFile
+    this.dir = path.resolve(dir);
+    this.ready = this.load().catch((error) => {
+      console.error('[disk-cache] failed to load index:', error);
+    });
+  }
+
+  private fileFor(key: string): string {
+    const hash = crypto.createHash('sha1').update(key).digest('hex');
+    return path.join(this.dir, hash.slice(0, 2), hash);
+  }
+
+  private async load(): Promise<void> {
+    await fs.promises.mkdir(this.dir, { recursive: true });
+    await this.rescan();
+    setInterval(() => {
+      this.rescan().catch((error) => console.error('[disk-cache] rescan failed:', error));
+    }, RESCAN_INTERVAL_MS).unref();
+  }
+
+  // One scan at a time; a tick that finds one running shares it
+  private rescan(): Promise<void> {
+    if (!this.rescanning) {
+      this.rescanning = this.scanAndMerge().finally(() => {
+        this.rescanning = null;
+      });
+    }
+    return this.rescanning;
+  }
+
+  /** Merge the metadata files on disk (entries written or removed by other processes too) into the index */
+  private async scanAndMerge(): Promise<void> {
+    const scanStartedAt = Date.now();
+    this.removedDuringScan.clear();
+    const loaded: DiskCacheEntry[] = [];
+    for (const sub of await fs.promises.readdir(this.dir)) {
+      const subDir = path.join(this.dir, sub);
+      const names = await fs.promises.readdir(subDir).catch(() => [] as string[]);
+      for (const name of names) {
+        if (!name.endsWith('.json')) continue;
+        try {
+          const meta = JSON.parse(await fs.promises.readFile(path.join(subDir, name), 'utf8'));
+          const file = path.join(subDir, name.slice(0, -'.json'.length));
+          const stat = await fs.promises.stat(file);
+          loaded.push({ ...meta, file, size: stat.size });
+        } catch {
+          // half-written entry: ignore, it will be overwritten or evicted
+        }
+      }
+    }
+    // Synchronous from here on, so puts that finished during the scan are kept
+    const merged = new Map<string, DiskCacheEntry>();
+    for (const entry of loaded) {
+      if (this.removedDuringScan.has(entry.key) && !this.entries.has(entry.key)) continue;
+      const current = merged.get(entry.key);
+      if (!current || entry.storedAt > current.storedAt) merged.set(entry.key, entry);
+    }
+    for (const entry of this.entries.values()) {
+      const scanned = merged.get(entry.key);
+      if (scanned) {
+        if (entry.storedAt >= scanned.storedAt) merged.set(entry.key, entry);
+      } else if (entry.storedAt >= scanStartedAt) {
+        // Written after the scan read its directory
+        merged.set(entry.key, entry);
+      } else {
+        // Removed by another process
+        this.usedAt.delete(entry.key);
+      }
+    }
+
+    const rank = (entry: DiskCacheEntry) => Math.max(entry.storedAt, this.usedAt.get(entry.key) ?? 0);
+    this.removedDuringScan.clear();
+    this.entries.clear();
+    this.totalBytes = 0;
+    for (const entry of [...merged.values()].sort((a, b) => rank(a) - rank(b))) {
+      this.entries.set(entry.key, entry);
+      this.totalBytes += entry.size;
+    }
+    await this.evict();
+  }
+
+  async get(key: string): Promise<DiskCacheEntry | null> {
+    await this.ready;
+    const entry = this.entries.get(key);
+    if (!entry) {
+      this.misses++;
+      return null;
+    }
+    // Mark as most recently used
+    this.entries.delete(key);
+    this.entries.set(key, entry);
+    this.usedAt.set(key, Date.now());
+    this.hits++;
+    return entry;
+  }
+
+  async put(key: string, data: Buffer, meta: { etag: string; contentType: string }): Promise<DiskCacheEntry> {
+    await this.ready;
+    const file = this.fileFor(key);
+    await fs.promises.mkdir(path.dirname(file), { recursive: true });
+
+    // Write to a temp file then rename, so readers never see a partial file
+    const tmp = `${file}.${process.pid}.${Date.now()}.tmp`;
+    await fs.promises.writeFile(tmp, data);
+    await fs.promises.rename(tmp, file);
+
+    const entry: DiskCacheEntry = { key, file, size: data.length, etag: meta.etag, contentType: meta.contentType, storedAt: Date.now() };
+    const { file: _file, size: _size, ...persisted } = entry;
+    await fs.promises.writeFile(`${file}.json`, JSON.stringify(persisted));
+
+    const previous = this.entries.get(key);
+    if (previous) {
+      this.totalBytes -= previous.size;
+      this.entries.delete(key);
+    }
+    this.entries.set(key, entry);
+    this.totalBytes += entry.size;
+    this.usedAt.set(key, entry.storedAt);
+    await this.evict();
+    return entry;
+  }
+
+  async delete(key: string): Promise<void> {
+    await this.ready;
+    await this.remove(key);
+  }
+
+  private async remove(key: string): Promise<void> {
+    const entry = this.entries.get(key);
+    if (!entry) return;
+    this.entries.delete(key);
+    this.usedAt.delete(key);
+    if (this.rescanning) this.removedDuringScan.add(key);
+    this.totalBytes -= entry.size;
+    await Promise.all([fs.promises.rm(entry.file, { force: true }), fs.promises.rm(`${entry.file}.json`, { force: true })]);
+  }
+
+  // Called from load() / the background rescan too, so it must not wait on `ready`
+  private async evict(): Promise<void> {
+    while (this.totalBytes > this.maxBytes && this.entries.size > 0) {
+      const [oldestKey] = this.entries.keys();
+      await this.remove(oldestKey);
+      this.evictions++;
+    }
+  }
+
+  stats() {
+    return {
+      entries: this.entries.size,
+      bytes: this.totalBytes,
+      maxBytes: this.maxBytes,
+      hits: this.hits,
+      misses: this.misses,
+      evictions: this.evictions,
+    };
+  }
+}
@@ -0,0 +1,41 @@
+import { monitorEventLoopDelay, IntervalHistogram } from 'perf_hooks';
+
+/**
+ * Event-loop lag of this process (perf_hooks histogram, sampled every 10 ms).
+ * Started once at boot; reported by GET /admin/api/metrics and reset with the DB metrics.
+ */
+const RESOLUTION_MS = 10;
+
+let histogram: IntervalHistogram | null = null;
+let startedAt = Date.now();
+
+export function startEventLoopMonitor(): void {
+  if (histogram) return;
+  histogram = monitorEventLoopDelay({ resolution: RESOLUTION_MS });
+  histogram.enable();
+  startedAt = Date.now();
+}
+
+// Samples are the time between timer ticks; the lag is what exceeds the sampling interval
+function lagMs(nanoseconds: number): number {
+  return Math.round(Math.max(0, nanoseconds / 1e6 - RESOLUTION_MS) * 10) / 10;
+}
+
+export function getEventLoopMetrics() {
+  if (!histogram || histogram.count === 0) {
+    return { sinceMs: Date.now() - startedAt, samples: 0, meanMs: null, p50Ms: null, p99Ms: null, maxMs: null };
+  }
+  return {
+    sinceMs: Date.now() - startedAt,
+    samples: histogram.count,
+    meanMs: lagMs(histogram.mean),
+    p50Ms: lagMs(histogram.percentile(50)),
+    p99Ms: lagMs(histogram.percentile(99)),
+    maxMs: lagMs(histogram.max),
+  };
+}
+
+export function resetEventLoopMetrics(): void {
+  histogram?.reset();
+  startedAt = Date.now();
+}
@@ -0,0 +1,71 @@
+/**
+ * Fixed-bucket latency histogram (milliseconds).
+ * Cheap to record on every call; percentiles are estimated from bucket upper bounds.
+ */
+const DEFAULT_BOUNDS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000];
+
+export type HistogramSnapshot = {
+  count: number;
+  totalMs: number;
+  avgMs: number;
+  minMs: number | null;
+  maxMs: number | null;
+  p50Ms: number | null;
+  p95Ms: number | null;
+  p99Ms: number | null;
+  buckets: Record<string, number>;
+};
+
+export class LatencyHistogram {
+  private readonly bounds: number[];
+  private readonly counts: number[];
+  private count = 0;
+  private total = 0;
+  private min = Infinity;
+  private max = 0;
+
+  constructor(bounds: number[] = DEFAULT_BOUNDS_MS) {
+    this.bounds = [...bounds].sort((a, b) => a - b);
+    this.counts = new Array(this.bounds.length + 1).fill(0);
+  }
+
+  record(ms: number): void {
+    if (!Number.isFinite(ms) || ms < 0) return;
+    let i = 0;
+    while (i < this.bounds.length && ms > this.bounds[i]) i++;
+    this.counts[i]++;
+    this.count++;
+    this.total += ms;
+    if (ms < this.min) this.min = ms;
+    if (ms > this.max) this.max = ms;
+  }
+
+  percentile(p: number): number | null {
+    if (this.count === 0) return null;
+    const rank = Math.ceil((p / 100) * this.count);
+    let seen = 0;
+    for (let i = 0; i < this.counts.length; i++) {
+      seen += this.counts[i];
+      if (seen >= rank) return i < this.bounds.length ? Math.min(this.bounds[i], this.max) : this.max;
+    }
+    return this.max;
+  }
+
+  snapshot(): HistogramSnapshot {
+    const buckets: Record<string, number> = {};
+    this.counts.forEach((n, i) => {
+      buckets[i < this.bounds.length ? `le_${this.bounds[i]}` : 'gt_' + this.bounds[this.bounds.length - 1]] = n;
+    });
+    return {
+      count: this.count,
+      totalMs: Math.round(this.total),
+      avgMs: this.count ? Math.round((this.total / this.count) * 10) / 10 : 0,
+      minMs: this.count ? Math.round(this.min) : null,
+      maxMs: this.count ? Math.round(this.max) : null,
+      p50Ms: this.percentile(50),
+      p95Ms: this.percentile(95),
+      p99Ms: this.percentile(99),
+      buckets,
+    };
+  }
+}
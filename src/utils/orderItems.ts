@@ -0,0 +1,94 @@
+import type { Prisma } from '@prisma/client';
+
+/**
+ * 订单商品明细（OrderItem 表）与旧 itemsJson 之间的转换
+ */
+export type OrderItemInput = {
+  title: string;
+  price: string | number;
+  quantity: number | string;
+  shopifyProductId?: string | null;
+  shopifyVariantId?: string | null;
+};
+
+/** 读取订单明细时使用的字段（与旧 itemsJson 的结构一致） */
+export const orderItemSelect = {
+  title: true,
+  price: true,
+  quantity: true,
+  shopifyProductId: true,
+  shopifyVariantId: true,
+} satisfies Prisma.OrderItemSelect;
+
+/** include/select 中使用：按下单时的顺序读取明细 */
+export const orderLineItemsQuery = {
+  select: orderItemSelect,
+  orderBy: { position: 'asc' },
+} satisfies Prisma.Order$lineItemsArgs;
+
+/**
+ * 从 deliveryTime（如 "2026-02-01 10:00-18:00"）解析配送日期，返回 UTC 零点；无法解析返回 null
+ */
+export function parseDeliveryDate(deliveryTime: string | null | undefined): Date | null {
+  const m = /^\s*(\d{4})-(\d{2})-(\d{2})/.exec(String(deliveryTime || ''));
+  if (!m) return null;
+  const date = new Date(Date.UTC(Number(m[1]), Number(m[2]) - 1, Number(m[3])));
+  // 过滤 2026-02-31 这类非法日期
+  return date.toISOString().slice(0, 10) === `${m[1]}-${m[2]}-${m[3]}` ? date : null;
+}
+
+/**
+ * YYYY-MM-DD -> 当天的日期范围 { gte, lt }，用于 deliveryDate 的区间查询
+ */
+export function deliveryDateRange(from: string, to?: string): { gte: Date; lt: Date } | null {
+  const start = parseDeliveryDate(from);
+  const end = parseDeliveryDate(to || from);
+  if (!start || !end) return null;
+  return { gte: start, lt: new Date(end.getTime() + 24 * 60 * 60 * 1000) };
+}
+
+export function toCents(price: string | number | null | undefined): number {
+  const n = Number.parseFloat(String(price ?? ''));
+  return Number.isFinite(n) ? Math.round(n * 100) : 0;
+}
+
+/**
+ * 商品列表 -> OrderItem 行（用于 order.create 的嵌套写入 lineItems.create）
+ */
+export function buildOrderItemRows(
+  items: OrderItemInput[],
+  order: { deliveryDate: Date | null; region: string | null }
+): Prisma.OrderItemCreateWithoutOrderInput[] {
+  return items.map((item, position) => {
+    const quantity = Number.parseInt(String(item.quantity ?? 0), 10) || 0;
+    const unitPriceCents = toCents(item.price);
+    return {
+      position,
+      shopifyProductId: item.shopifyProductId || null,
+      shopifyVariantId: item.shopifyVariantId || null,
+      title: String(item.title || ''),
+      price: String(item.price ?? ''),
+      unitPriceCents,
+      quantity,
+      totalCents: unitPriceCents * quantity,
+      deliveryDate: order.deliveryDate,
+      region: order.region,
+    };
+  });
+}
+
+/**
+ * 订单的商品列表：优先使用 OrderItem 明细；尚未回填明细的旧订单回退到解析 itemsJson
+ */
+export function orderItemsOf(order: {
+  lineItems?: Array<Prisma.OrderItemGetPayload<{ select: typeof orderItemSelect }>>;
+  itemsJson?: string | null;
+}): any[] {
+  if (order.lineItems && order.lineItems.length > 0) return order.lineItems;
+  try {
+    const items = JSON.parse(order.itemsJson || '[]');
+    return Array.isArray(items) ? items : [];
+  } catch {
+    return [];
+  }
+}
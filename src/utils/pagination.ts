@@ -0,0 +1,64 @@
+/**
+ * Keyset (cursor) pagination on (createdAt, id) + a short-lived count cache.
+ *
+ * The cursor is opaque to clients: base64url("<createdAt ISO>|<id>") of the last row of a page.
+ */
+export type KeysetCursor = { createdAt: Date; id: string };
+
+export function encodeCursor(row: { createdAt: Date; id: string }): string {
+  return Buffer.from(`${row.createdAt.toISOString()}|${row.id}`, 'utf8').toString('base64url');
+}
+
+export function decodeCursor(raw: unknown): KeysetCursor | null {
+  if (typeof raw !== 'string' || !raw) return null;
+  const decoded = Buffer.from(raw, 'base64url').toString('utf8');
+  const sep = decoded.indexOf('|');
+  if (sep <= 0) return null;
+  const createdAt = new Date(decoded.slice(0, sep));
+  const id = decoded.slice(sep + 1);
+  if (Number.isNaN(createdAt.getTime()) || !id) return null;
+  return { createdAt, id };
+}
+
+/**
+ * Rows strictly after `cursor` in (createdAt DESC, id DESC) order.
+ * Pair with orderBy [{ createdAt: 'desc' }, { id: 'desc' }] and an index on (createdAt, id).
+ */
+export function afterCursorDesc(cursor: KeysetCursor) {
+  return {
+    OR: [{ createdAt: { lt: cursor.createdAt } }, { createdAt: cursor.createdAt, id: { lt: cursor.id } }],
+  };
+}
+
+/**
+ * Caches COUNT(*) results per filter for a few seconds, so paging through a list
+ * doesn't re-count the whole table on every page. Totals may lag by up to `ttlMs`.
+ */
+export class CountCache {
+  private readonly entries = new Map<string, { value: number; expiresAt: number }>();
+  private readonly inflight = new Map<string, Promise<number>>();
+
+  constructor(private readonly ttlMs: number, private readonly maxEntries = 500) {}
+
+  async get(key: string, count: () => Promise<number>): Promise<number> {
+    const hit = this.entries.get(key);
+    if (hit && hit.expiresAt > Date.now()) return hit.value;
+
+    const pending = this.inflight.get(key);
+    if (pending) return pending;
+
+    const promise = count()
+      .then((value) => {
+        if (this.entries.size >= this.maxEntries) this.entries.clear();
+        this.entries.set(key, { value, expiresAt: Date.now() + this.ttlMs });
+        return value;
+      })
+      .finally(() => this.inflight.delete(key));
+    this.inflight.set(key, promise);
+    return promise;
+  }
+
+  clear(): void {
+    this.entries.clear();
+  }
+}
@@ -1,6 +1,64 @@
-import { PrismaClient } from '@prisma/client';
+import type { ProductNameMapping } from '@prisma/client';
+import { prisma } from '../db';
+import { onCatalogChanged } from '../services/catalogEvents';
 
-const prisma = new PrismaClient();
+type MappableItem = {
+  shopifyProductId?: string;
+  shopifyVariantId?: string;
+  title: string;
+  [key: string]: any;
+};
+
+// 映射表很小且只通过 productMappingController 修改：整表加载到进程内存，写入时失效
+// （notifyCatalogChanged，start:cluster 下也会通知其他进程）。
+// TTL 只是兜底（PM2 cluster、多台主机时其他进程的写入无法通知到本进程）。
+const CACHE_TTL_MS = 5 * 60 * 1000;
+
+let mappingCache: Map<string, ProductNameMapping> | null = null;
+let mappingLoadedAt = 0;
+let mappingLoading: Promise<Map<string, ProductNameMapping>> | null = null;
+let mappingGeneration = 0;
+
+/**
+ * 获取 shopifyProductId -> 映射记录（必要时从数据库加载一次，并发请求共享同一次加载）
+ */
+export async function getProductNameMappings(): Promise<Map<string, ProductNameMapping>> {
+  if (mappingCache && Date.now() - mappingLoadedAt < CACHE_TTL_MS) {
+    return mappingCache;
+  }
+  if (mappingLoading) return mappingLoading;
+
+  const generation = mappingGeneration;
+  const loading = prisma.productNameMapping
+    .findMany()
+    .then((rows) => {
+      const map = new Map(rows.map((row) => [row.shopifyProductId, row]));
+      // 加载期间发生了写入：本次结果可能已过时，不写入缓存
+      if (generation === mappingGeneration) {
+        mappingCache = map;
+        mappingLoadedAt = Date.now();
+      }
+      return map;
+    })
+    .finally(() => {
+      if (mappingLoading === loading) mappingLoading = null;
+    });
+
+  mappingLoading = loading;
+  return loading;
+}
+
+/**
+ * 映射表发生变更（创建/更新/删除）后调用
+ */
+export function invalidateProductNameCache(): void {
+  mappingCache = null;
+  mappingLoadedAt = 0;
+  mappingLoading = null;
+  mappingGeneration++;
+}
+
+onCatalogChanged(() => invalidateProductNameCache());
 
 /**
  * 获取商品的中文名称
@@ -15,70 +73,58 @@ export async function getChineseName(
   shopifyVariantId?: string
 ): Promise<string> {
   try {
-    const mapping = await prisma.productNameMapping.findUnique({
-      where: { shopifyProductId },
-    });
-
-    if (mapping) {
-      return mapping.chineseName;
-    }
-
-    return englishName;
+    const mappings = await getProductNameMappings();
+    return mappings.get(shopifyProductId)?.chineseName || englishName;
   } catch (error) {
     console.error('Error getting Chinese name:', error);
     return englishName;
   }
 }
 
+function applyNames(items: MappableItem[], mappings: Map<string, ProductNameMapping>): Array<any> {
+  return items.map((item) => {
+    const mapping = item.shopifyProductId ? mappings.get(item.shopifyProductId) : undefined;
+    if (mapping) {
+      return {
+        ...item,
+        title: mapping.chineseName, // 使用中文名称
+        originalTitle: item.originalTitle || item.title, // 保留原始英文名称（如果已有则保留，否则使用当前 title）
+      };
+    }
+    // 如果没有映射，确保 originalTitle 存在
+    return {
+      ...item,
+      originalTitle: item.originalTitle || item.title, // 如果没有 originalTitle，使用当前 title
+    };
+  });
+}
+
 /**
  * 批量获取商品的中文名称
  * @param items 商品列表，包含 shopifyProductId 和 title
  * @returns 更新后的商品列表，title 替换为中文名称
  */
-export async function mapProductNames(items: Array<{
-  shopifyProductId?: string;
-  shopifyVariantId?: string;
-  title: string;
-  [key: string]: any;
-}>): Promise<Array<any>> {
+export async function mapProductNames(items: MappableItem[]): Promise<Array<any>> {
   try {
-    const productIds = items
-      .map(item => item.shopifyProductId)
-      .filter(Boolean) as string[];
-
-    if (productIds.length === 0) {
+    if (!items.some((item) => item.shopifyProductId)) {
       return items;
     }
-
-    const mappings = await prisma.productNameMapping.findMany({
-      where: {
-        shopifyProductId: { in: productIds },
-      },
-    });
-
-    // 创建映射：shopifyProductId -> chineseName
-    const mappingMap = new Map(
-      mappings.map(m => [m.shopifyProductId, m.chineseName])
-    );
-
-    return items.map(item => {
-      if (item.shopifyProductId && mappingMap.has(item.shopifyProductId)) {
-        const chineseName = mappingMap.get(item.shopifyProductId)!;
-        return {
-          ...item,
-          title: chineseName, // 使用中文名称
-          originalTitle: item.originalTitle || item.title, // 保留原始英文名称（如果已有则保留，否则使用当前 title）
-        };
-      }
-      // 如果没有映射，确保 originalTitle 存在
-      return {
-        ...item,
-        originalTitle: item.originalTitle || item.title, // 如果没有 originalTitle，使用当前 title
-      };
-    });
+    return applyNames(items, await getProductNameMappings());
   } catch (error) {
     console.error('Error mapping product names:', error);
     return items;
   }
 }
 
+/**
+ * 一次性映射多组商品（如整页套餐或订单列表），只读取一次缓存，不逐组访问数据库
+ */
+export async function mapProductNameLists(lists: MappableItem[][]): Promise<Array<any[]>> {
+  try {
+    const mappings = await getProductNameMappings();
+    return lists.map((items) => applyNames(items, mappings));
+  } catch (error) {
+    console.error('Error mapping product names:', error);
+    return lists;
+  }
+}
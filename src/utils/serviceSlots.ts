@@ -0,0 +1,100 @@
+import type { Prisma } from '@prisma/client';
+
+/**
+ * 服务预约时段：把 Service.timeSlotsJson 中的文本时段（"2026-02-01 10:00" 或
+ * "2026-02-01 10:00-12:00"）解析为 ServiceSlot 行。
+ *
+ * 时间按商家填写的当地钟点原样存入 UTC 字段（不做时区换算），与 Order.deliveryDate 的做法一致：
+ * 按日期范围查询时直接用 "YYYY-MM-DD" 的 UTC 零点比较即可。
+ */
+export const DEFAULT_SLOT_MINUTES = 60;
+
+const SLOT_PATTERN = /^\s*(\d{4})-(\d{2})-(\d{2})[ T](\d{1,2}):(\d{2})(?:\s*-\s*(\d{1,2}):(\d{2}))?\s*$/;
+
+function validTime(hours: number, minutes: number): boolean {
+  return hours >= 0 && hours <= 23 && minutes >= 0 && minutes <= 59;
+}
+
+/**
+ * 解析单个时段文本；无法解析（或结束时间不晚于开始时间）返回 null
+ */
+export function parseSlotLabel(
+  label: string | null | undefined,
+  durationMins?: number | null
+): { startsAt: Date; endsAt: Date } | null {
+  const m = SLOT_PATTERN.exec(String(label || ''));
+  if (!m) return null;
+  const [year, month, day, hours, minutes] = m.slice(1, 6).map(Number);
+  if (!validTime(hours, minutes)) return null;
+  const startsAt = new Date(Date.UTC(year, month - 1, day, hours, minutes));
+  // 过滤 2026-02-31 这类非法日期
+  if (startsAt.getUTCMonth() !== month - 1 || startsAt.getUTCDate() !== day) return null;
+
+  let endsAt: Date;
+  if (m[6] !== undefined) {
+    const endHours = Number(m[6]);
+    const endMinutes = Number(m[7]);
+    if (!validTime(endHours, endMinutes)) return null;
+    endsAt = new Date(Date.UTC(year, month - 1, day, endHours, endMinutes));
+  } else {
+    const minutesLong = durationMins && durationMins > 0 ? durationMins : DEFAULT_SLOT_MINUTES;
+    endsAt = new Date(startsAt.getTime() + minutesLong * 60 * 1000);
+  }
+  if (endsAt <= startsAt) return null;
+  return { startsAt, endsAt };
+}
+
+/**
+ * timeSlotsJson -> 时段文本数组（非法 JSON 视为没有时段）
+ */
+export function parseSlotLabels(timeSlotsJson: string | null | undefined): string[] {
+  if (!timeSlotsJson) return [];
+  try {
+    const labels = JSON.parse(timeSlotsJson);
+    return Array.isArray(labels) ? labels.map((label) => String(label).trim()).filter(Boolean) : [];
+  } catch {
+    return [];
+  }
+}
+
+/**
+ * 由时段文本生成 ServiceSlot 行（不含 serviceId，用于嵌套 create）；重复的开始时间只保留第一个
+ */
+export function buildServiceSlotRows(
+  labels: string[],
+  service: { durationMins?: number | null; merchantId?: string | null },
+  capacity: number
+): Prisma.ServiceSlotCreateWithoutServiceInput[] {
+  const rows = new Map<number, Prisma.ServiceSlotCreateWithoutServiceInput>();
+  for (const label of labels) {
+    const parsed = parseSlotLabel(label, service.durationMins);
+    if (!parsed || rows.has(parsed.startsAt.getTime())) continue;
+    rows.set(parsed.startsAt.getTime(), {
+      label,
+      startsAt: parsed.startsAt,
+      endsAt: parsed.endsAt,
+      capacity: Math.max(1, capacity),
+      merchantId: service.merchantId ?? null,
+    });
+  }
+  return [...rows.values()].sort((a, b) => (a.startsAt as Date).getTime() - (b.startsAt as Date).getTime());
+}
+
+/**
+ * 当前时间在 timeZone 下的钟点，按与 ServiceSlot.startsAt 相同的方式存为 UTC 字段
+ */
+export function wallClockNow(timeZone: string, now = new Date()): Date {
+  const parts: Record<string, number> = {};
+  const format = new Intl.DateTimeFormat('en-US', {
+    timeZone,
+    year: 'numeric',
+    month: '2-digit',
+    day: '2-digit',
+    hour: '2-digit',
+    minute: '2-digit',
+    second: '2-digit',
+    hourCycle: 'h23',
+  });
+  for (const part of format.formatToParts(now)) parts[part.type] = Number(part.value);
+  return new Date(Date.UTC(parts.year, parts.month - 1, parts.day, parts.hour % 24, parts.minute, parts.second));
+}
@@ -0,0 +1,20 @@
+type SharpFactory = typeof import('sharp');
+
+let sharpFactory: SharpFactory | null | undefined;
+
+/**
+ * sharp is a native module: when it can't be loaded, callers skip image processing
+ * (thumbnails, upload recompression) instead of failing to start.
+ */
+export function loadSharp(): SharpFactory | null {
+  if (sharpFactory === undefined) {
+    try {
+      // eslint-disable-next-line @typescript-eslint/no-var-requires
+      sharpFactory = require('sharp') as SharpFactory;
+    } catch (error: any) {
+      console.warn('[images] sharp is not available, image processing disabled:', error.message);
+      sharpFactory = null;
+    }
+  }
+  return sharpFactory;
+}
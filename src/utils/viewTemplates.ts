@@ -0,0 +1,107 @@
+import crypto from 'crypto';
+import fs from 'fs';
+import path from 'path';
+import ejs from 'ejs';
+
+/**
+ * Precompiled EJS views.
+ *
+ * `npm run build` runs `build:views` (src/maintenance/precompile-views.ts), which compiles every
+ * .ejs file under dist/views into one module of plain functions (dist/views/templates.compiled.js).
+ * At startup `loadViewTemplates()` puts a render function for every view into ejs's template
+ * cache, which Express uses when "view cache" is on: no request reads or compiles a template.
+ * Views changed after the build (hash mismatch) or without a compiled module (tsx dev) are
+ * compiled from source at load time instead.
+ */
+export const COMPILED_VIEWS_FILE = 'templates.compiled.js';
+
+type CompiledViews = Record<string, { hash: string; render: ejs.ClientFunction }>;
+
+function hashOf(source: string): string {
+  return crypto.createHash('sha1').update(source).digest('hex');
+}
+
+export function listViewFiles(viewsDir: string): string[] {
+  const files: string[] = [];
+  const walk = (dir: string) => {
+    for (const entry of fs.readdirSync(dir, { withFileTypes: true })) {
+      const full = path.join(dir, entry.name);
+      if (entry.isDirectory()) walk(full);
+      else if (entry.name.endsWith('.ejs')) files.push(full);
+    }
+  };
+  walk(viewsDir);
+  return files.sort();
+}
+
+function compileClient(source: string, filename: string): ejs.ClientFunction {
+  return ejs.compile(source, { client: true, async: false, filename });
+}
+
+/** Write the compiled-views module for `viewsDir`; returns the number of templates */
+export function precompileViews(viewsDir: string, outFile = path.join(viewsDir, COMPILED_VIEWS_FILE)): number {
+  const files = listViewFiles(viewsDir);
+  const entries = files.map((file) => {
+    const source = fs.readFileSync(file, 'utf8');
+    const key = path.relative(viewsDir, file).split(path.sep).join('/');
+    // Throws on template syntax errors, so a broken view fails the build instead of the first request
+    const render = compileClient(source, file);
+    return `  ${JSON.stringify(key)}: { hash: ${JSON.stringify(hashOf(source))}, render: ${render.toString()} },`;
+  });
+  // Not strict mode: the compiled templates use `with (locals)`
+  fs.writeFileSync(outFile, `// Generated by precompile-views. Do not edit.\nmodule.exports = {\n${entries.join('\n')}\n};\n`);
+  return files.length;
+}
+
+// Same resolution as ejs for relative includes (`include('../partials/topnav')`)
+function resolveInclude(includePath: string, from: string): string {
+  const resolved = path.resolve(path.dirname(from), includePath);
+  return path.extname(resolved) ? resolved : `${resolved}.ejs`;
+}
+
+function bindTemplate(filename: string, render: ejs.ClientFunction): ejs.TemplateFunction {
+  return (data?: ejs.Data) => {
+    const locals = data || {};
+    const include = (includePath: string, includeData?: ejs.Data) =>
+      templateFor(resolveInclude(includePath, filename))({ ...locals, ...includeData });
+    return render(locals, undefined, include);
+  };
+}
+
+function templateFor(filename: string): ejs.TemplateFunction {
+  let template = ejs.cache.get(filename);
+  if (!template) {
+    template = bindTemplate(filename, compileClient(fs.readFileSync(filename, 'utf8'), filename));
+    ejs.cache.set(filename, template);
+  }
+  return template;
+}
+
+/**
+ * Fill ejs's template cache with every view under `viewsDir` (keys are absolute paths, as
+ * Express passes them). Returns how many came from the precompiled module.
+ */
+export function loadViewTemplates(viewsDir: string): { templates: number; precompiled: number } {
+  const compiledFile = path.join(viewsDir, COMPILED_VIEWS_FILE);
+  let compiled: CompiledViews = {};
+  if (fs.existsSync(compiledFile)) {
+    // eslint-disable-next-line @typescript-eslint/no-var-requires
+    compiled = require(compiledFile);
+  }
+
+  let precompiled = 0;
+  const files = listViewFiles(viewsDir);
+  for (const file of files) {
+    const source = fs.readFileSync(file, 'utf8');
+    const entry = compiled[path.relative(viewsDir, file).split(path.sep).join('/')];
+    let render: ejs.ClientFunction;
+    if (entry && entry.hash === hashOf(source)) {
+      render = entry.render;
+      precompiled++;
+    } else {
+      render = compileClient(source, file);
+    }
+    ejs.cache.set(path.resolve(file), bindTemplate(path.resolve(file), render));
+  }
+  return { templates: files.length, precompiled };
+}
@@ -0,0 +1,108 @@
+import { Worker } from 'worker_threads';
+
+type Task<TIn, TOut> = {
+  input: TIn;
+  resolve: (value: TOut) => void;
+  reject: (error: Error) => void;
+};
+
+/** Message a pool worker posts back for every task it receives */
+export type WorkerReply<TOut> = { ok: true; result: TOut } | { ok: false; error: string };
+
+/**
+ * Fixed-size pool of worker_threads running one script.
+ *
+ * Workers are started on demand (up to `size`) and reused; each runs one task at a time and
+ * answers with a WorkerReply. A worker that crashes fails its current task and is replaced
+ * on the next dispatch. Under tsx the workers inherit the parent's execArgv (tsx loader), so
+ * `.ts` worker scripts work in development too.
+ */
+export class WorkerPool<TIn, TOut> {
+  private readonly idle: Worker[] = [];
+  private readonly busy = new Map<Worker, Task<TIn, TOut>>();
+  private readonly queue: Array<Task<TIn, TOut>> = [];
+  private closed = false;
+  private readonly stats = { tasks: 0, failures: 0, crashes: 0 };
+
+  constructor(private readonly file: string, private readonly size: number) {
+    if (size < 1) throw new Error('WorkerPool size must be at least 1');
+  }
+
+  run(input: TIn): Promise<TOut> {
+    if (this.closed) return Promise.reject(new Error('Worker pool is closed'));
+    return new Promise<TOut>((resolve, reject) => {
+      this.queue.push({ input, resolve, reject });
+      this.dispatch();
+    });
+  }
+
+  private spawn(): Worker {
+    const worker = new Worker(this.file);
+
+    worker.on('message', (reply: WorkerReply<TOut>) => {
+      const task = this.busy.get(worker);
+      if (!task) return;
+      this.busy.delete(worker);
+      this.stats.tasks++;
+      if (reply.ok) {
+        task.resolve(reply.result);
+      } else {
+        this.stats.failures++;
+        task.reject(new Error(reply.error));
+      }
+      if (this.closed) {
+        void worker.terminate();
+      } else {
+        this.idle.push(worker);
+        this.dispatch();
+      }
+    });
+
+    const lost = (error: Error) => {
+      const task = this.busy.get(worker);
+      this.busy.delete(worker);
+      const idleAt = this.idle.indexOf(worker);
+      if (idleAt >= 0) this.idle.splice(idleAt, 1);
+      if (task) {
+        this.stats.crashes++;
+        task.reject(error);
+      }
+      if (!this.closed) this.dispatch();
+    };
+    worker.on('error', lost);
+    worker.on('exit', (code) => lost(new Error(`Worker exited with code ${code}`)));
+    return worker;
+  }
+
+  private dispatch(): void {
+    while (this.queue.length > 0) {
+      let worker = this.idle.pop();
+      if (!worker) {
+        if (this.busy.size + this.idle.length >= this.size) return;
+        worker = this.spawn();
+      }
+      const task = this.queue.shift()!;
+      this.busy.set(worker, task);
+      worker.postMessage(task.input);
+    }
+  }
+
+  getStats() {
+    return {
+      size: this.size,
+      started: this.busy.size + this.idle.length,
+      busy: this.busy.size,
+      queued: this.queue.length,
+      ...this.stats,
+    };
+  }
+
+  /** Reject queued tasks and stop all workers (in-flight tasks are failed) */
+  async close(): Promise<void> {
+    this.closed = true;
+    for (const task of this.queue.splice(0)) task.reject(new Error('Worker pool is closed'));
+    const workers = [...this.idle, ...this.busy.keys()];
+    this.idle.length = 0;
+    await Promise.all(workers.map((worker) => worker.terminate()));
+  }
+}
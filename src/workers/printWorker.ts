@@ -0,0 +1,16 @@
+import { parentPort } from 'worker_threads';
+import { renderPrintPart, PrintTask } from '../services/printRenderer';
+import type { WorkerReply } from '../utils/workerPool';
+
+/**
+ * Worker thread for services/printService.ts: renders one chunk of a bulk print document.
+ */
+parentPort?.on('message', (task: PrintTask) => {
+  let reply: WorkerReply<string>;
+  try {
+    reply = { ok: true, result: renderPrintPart(task) };
+  } catch (error: any) {
+    reply = { ok: false, error: error?.message || String(error) };
+  }
+  parentPort!.postMessage(reply);
+});